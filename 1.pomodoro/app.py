@@ -1,23 +1,78 @@
 """Pomodoro Timer Flask Application with Gamification Features."""
 
+import atexit
 import os
 from flask import Flask, render_template, jsonify, request
-from repositories.database import init_db
-from routes.api import api_bp
+from repositories.database import (
+    init_db, configure_pool, close_pool, DEFAULT_POOL_SIZE, DEFAULT_STORAGE_PROFILE
+)
+from models.week import configure_timezone, DEFAULT_TIMEZONE
+from models.badge_rules import configure_badge_rules, DEFAULT_BADGES_FILE
+from routes.api import api_bp, pomodoro_service, DEFAULT_TRUST_USER_HEADER
+from routes.json_provider import create_json_provider, DEFAULT_JSON_BACKEND
+from services.event_hub import event_hub
+from services.timer_registry import (
+    configure_timer_registry, close_timer_registry, DEFAULT_TIMER_REGISTRY
+)
+from services.write_behind import (
+    configure_write_behind, close_write_behind, DEFAULT_WRITE_BEHIND
+)
+from cli import register_commands
 
 
 def create_app():
     """Flask アプリケーションファクトリ"""
     app = Flask(__name__)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+    app.config['DB_POOL_SIZE'] = DEFAULT_POOL_SIZE
+    app.config['DB_STORAGE_PROFILE'] = DEFAULT_STORAGE_PROFILE
+    app.config['TIMEZONE'] = DEFAULT_TIMEZONE
+    app.config['BADGES_FILE'] = DEFAULT_BADGES_FILE
+    app.config['JSON_BACKEND'] = DEFAULT_JSON_BACKEND
+    app.config['WRITE_BEHIND'] = DEFAULT_WRITE_BEHIND
+    app.config['TIMER_REGISTRY'] = DEFAULT_TIMER_REGISTRY
+    app.config['TRUST_USER_HEADER'] = DEFAULT_TRUST_USER_HEADER
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    
+    # レスポンスの JSON 直列化（orjson があれば orjson を使う）
+    app.json = create_json_provider(app, app.config['JSON_BACKEND'])
+    
+    # 日付・週の境界に使うタイムゾーンを設定
+    configure_timezone(app.config['TIMEZONE'])
+    
+    # バッジ定義ファイルを読み込んで判定ルールを作成（定義が不正なら起動時にエラーにする）
+    configure_badge_rules(app.config['BADGES_FILE'])
+    
+    # コネクションプールを作成し、プロセス終了時に接続を閉じる
+    configure_pool(app.config['DB_POOL_SIZE'], app.config['DB_STORAGE_PROFILE'])
+    atexit.register(close_pool)
     
     # データベースを初期化
     with app.app_context():
         init_db()
     
+    # write-behind モード: 未反映のイベントを再生してから書き込みスレッドを開始し、
+    # 終了時は（接続を閉じる前に）残りのイベントをコミットする
+    if app.config['WRITE_BEHIND']:
+        configure_write_behind(pomodoro_service.apply_event)
+        atexit.register(close_write_behind)
+    
+    # サーバー側のタイマー: 期限の来たセッションを監視スレッドが自動で完了する
+    if app.config['TIMER_REGISTRY']:
+        configure_timer_registry(pomodoro_service.complete_timer)
+        atexit.register(close_timer_registry)
+    else:
+        close_timer_registry()
+    
+    # 終了時は配信中の SSE 接続を閉じる
+    atexit.register(event_hub.close)
+    
     # ブループリントを登録
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # メンテナンス用の CLI コマンドを登録
+    register_commands(app)
+    
     # メインページ
     @app.route('/')
     def index():
@@ -0,0 +1,293 @@
+"""ASGI entry point that streams events on the event loop and runs Flask on DB threads.
+
+使い方:
+    pip install uvicorn
+    python asgi.py
+    （または uvicorn asgi:create_asgi_app --factory --port 5000 --timeout-graceful-shutdown 5）
+
+/api/events（SSE）はイベントループ上のコルーチンで配信し、接続ごとにスレッドを使わない。
+それ以外のリクエストは Flask アプリ（WSGI）を DB 用のスレッドプールで実行するため、
+同時接続数が増えても DB にアクセスするスレッドは POMODORO_DB_THREADS 本に収まる。
+"""
+
+import asyncio
+import contextvars
+import io
+import sys
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import Flask
+from app import create_app
+from repositories.async_db import (
+    configure_db_executor, close_db_executor, run_db, DEFAULT_DB_THREADS
+)
+from routes.api import SSE_RETRY_MS, format_sse, gamification_service, identify_user
+from services.event_hub import event_hub, DEFAULT_SSE_HEARTBEAT
+
+try:
+    import uvicorn
+except ImportError:  # ASGI サーバーは任意（hypercorn など他のサーバーでも動かせる）
+    uvicorn = None
+
+# イベントループで直接配信するパス（それ以外は Flask に渡す）
+EVENTS_PATH = '/api/events'
+
+# サーバーの終了時に、配信中の接続の終了を待つ時間（秒）
+SHUTDOWN_TIMEOUT = 5
+
+Headers = List[Tuple[bytes, bytes]]
+Receive = Callable[[], Any]
+Send = Callable[[Dict], Any]
+
+
+def build_environ(scope: Dict, body: bytes) -> Dict[str, Any]:
+    """ASGI の HTTP スコープとリクエストボディから WSGI の environ を作成"""
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # WSGI の文字列は latin-1 で表したバイト列
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)) if body else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', ()):
+        name = raw_name.decode('latin-1').lower()
+        value = raw_value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def encode_headers(headers: List[Tuple[str, str]]) -> Headers:
+    """WSGI のレスポンスヘッダーを ASGI の形式に変換"""
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+
+class AsgiApp:
+    """Flask アプリを ASGI で提供するアプリケーション
+    
+    SSE の接続はイベントループ上で購読のキューを待つだけで、スレッドを占有しない
+    （購読には発行時にループを起こすコールバックを設定する）。それ以外のリクエストは
+    DB 用のスレッドプールで WSGI アプリとして実行する。Content-Length のある応答は
+    スレッド内で読み切ってからループで送信する。ストリーミングの応答（エクスポート）は
+    ループがチャンクを1つずつ DB 用のスレッドで生成させ、送信を待つ間はスレッドを
+    返すため、遅いクライアントがスレッドを占有して他のリクエストを止めることはない。
+    """
+    
+    def __init__(self, flask_app: Flask):
+        self.flask_app = flask_app
+    
+    async def __call__(self, scope: Dict, receive: Receive, send: Send) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if scope['path'] == EVENTS_PATH and scope['method'] == 'GET':
+                await self._stream_events(scope, receive, send)
+            else:
+                await self._call_wsgi(scope, receive, send)
+        else:
+            raise ValueError(f'Unsupported ASGI scope type: {scope["type"]!r}')
+    
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        """起動・終了の通知を処理（終了時は配信中の接続と DB のスレッドを閉じる）"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                event_hub.close()
+                await asyncio.get_running_loop().run_in_executor(None, close_db_executor)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    # ========== WSGI（Flask）への受け渡し ==========
+    
+    async def _call_wsgi(self, scope: Dict, receive: Receive, send: Send) -> None:
+        """リクエストを DB 用のスレッドで Flask アプリに渡し、応答を送信"""
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+        # ストリーミングの応答はチャンクごとに別のスレッドで生成するため、Flask の
+        # コンテキスト（contextvars）をスレッドではなくリクエストごとに持たせる
+        context = contextvars.copy_context()
+        status, headers, content, iterable = await run_db(context.run, self._start_wsgi, environ)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if iterable is None:
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        
+        iterator = iter(iterable)
+        try:
+            while True:
+                chunk = await run_db(context.run, next, iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await run_db(context.run, close)
+    
+    def _start_wsgi(self, environ: Dict[str, Any]) -> Tuple[int, Headers, bytes, Optional[Any]]:
+        """WSGI アプリを呼び出す（DB 用のスレッドで呼ばれる）
+        
+        （ステータス, ヘッダー, 本文, 応答の iterable）を返す。Content-Length のある応答は
+        ここで読み切って iterable を None にし、ストリーミングの応答は本文を空にして
+        iterable をそのまま返す（読み終えたら呼び出し側が close する）。
+        """
+        response: Dict[str, Any] = {}
+        
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+            return lambda data: None
+        
+        iterable = self.flask_app(environ, start_response)
+        streaming = False
+        try:
+            headers = encode_headers(response['headers'])
+            if not any(name == b'content-length' for name, _ in headers):
+                streaming = True
+                return response['status'], headers, b'', iterable
+            return response['status'], headers, b''.join(iterable), None
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None and not streaming:
+                close()
+    
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        """リクエストボディをすべて読む"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+    
+    # ========== イベント配信（SSE） ==========
+    
+    async def _stream_events(self, scope: Dict, receive: Receive, send: Send) -> None:
+        """/api/events をイベントループ上で配信（WSGI 版と同じイベント・同じ制限）"""
+        user_id, error = self._identify_user(scope)
+        if error is not None:
+            message, status = error
+            await self._send_json(send, status, {'success': False, 'error': message})
+            return
+        # 存在確認はキャッシュ済みのリビジョンで行う（キャッシュにない場合だけ DB を読む）
+        if await run_db(gamification_service.get_user_revision, user_id) is None:
+            await self._send_json(send, 404, {'success': False, 'error': 'User not found'})
+            return
+        
+        subscription = event_hub.subscribe(user_id)
+        if subscription is None:
+            await self._send_json(send, 503, {'success': False, 'error': 'Too many event streams'},
+                                  [(b'retry-after', str(SSE_RETRY_MS // 1000).encode())])
+            return
+        
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        disconnected = False
+        
+        async def watch_disconnect() -> None:
+            nonlocal disconnected
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected = True
+            wakeup.set()
+        
+        subscription.set_waker(lambda: loop.call_soon_threadsafe(wakeup.set))
+        watcher = asyncio.ensure_future(watch_disconnect())
+        dumps = self.flask_app.json.dumps
+        try:
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # リバースプロキシにバッファリングさせない
+                (b'x-accel-buffering', b'no'),
+            ]})
+            await self._send_chunk(send, f'retry: {SSE_RETRY_MS}\n\n')
+            while not disconnected:
+                event = subscription.get(0)
+                if event is not None:
+                    await self._send_chunk(send, format_sse(event, dumps))
+                    continue
+                if subscription.closed:
+                    break
+                
+                # 起こされるまで待つ（clear の後に積まれたイベントは次の get で拾う）
+                wakeup.clear()
+                if subscription.pending_count or subscription.closed:
+                    continue
+                try:
+                    await asyncio.wait_for(wakeup.wait(), DEFAULT_SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    await self._send_chunk(send, ': keep-alive\n\n')
+            
+            if not disconnected:
+                await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            # クライアントの切断やサーバーの終了で購読を解除する
+            watcher.cancel()
+            subscription.set_waker(None)
+            event_hub.unsubscribe(subscription)
+    
+    def _identify_user(self, scope: Dict) -> Tuple[Optional[int], Optional[Tuple[str, int]]]:
+        """対象ユーザーを特定（routes.api.identify_user と同じ規則。セッション Cookie も読む）"""
+        with self.flask_app.request_context(build_environ(scope, b'')):
+            return identify_user()
+    
+    @staticmethod
+    async def _send_chunk(send: Send, text: str) -> None:
+        """ストリームの続きを送信"""
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+    
+    async def _send_json(self, send: Send, status: int, payload: Dict,
+                         extra_headers: Optional[Headers] = None) -> None:
+        """JSON の応答を送信"""
+        body = self.flask_app.json.dumps(payload).encode('utf-8')
+        headers = [(b'content-type', b'application/json'),
+                   (b'content-length', str(len(body)).encode())] + (extra_headers or [])
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def create_asgi_app(flask_app: Optional[Flask] = None,
+                    threads: int = DEFAULT_DB_THREADS) -> AsgiApp:
+    """ASGI アプリを作成（uvicorn の --factory で指定する）"""
+    configure_db_executor(threads)
+    return AsgiApp(flask_app or create_app())
+
+
+if __name__ == '__main__':
+    if uvicorn is None:
+        sys.exit('ASGI モードには uvicorn が必要です: pip install uvicorn')
+    uvicorn.run(create_asgi_app(), host='0.0.0.0', port=5000,
+                timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
@@ -0,0 +1,110 @@
+"""Benchmark: activity series and heatmap, full-history walk vs. rollup + GROUP BY.
+
+使い方:
+    python benchmarks/bench_activity.py --sessions 1000000 --days 30 365
+
+1人のユーザーに数年分のセッションを作成し、全完了セッションを Python で走査して
+日別・曜日×時間帯を集計する従来の方法と、StatisticsService.get_activity
+（日別ロールアップ + 期間内の GROUP BY）の処理時間を期間ごとに比較する。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from repositories.rollup_repository import RollupRepository
+from repositories.session_repository import SessionRepository
+from services.statistics_service import StatisticsService
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+
+def seed(sessions: int, years: int) -> None:
+    """過去 years 年に分散したセッションを作成"""
+    now = datetime.now()
+    span = years * 365 * 24 * 60
+    with get_db() as conn:
+        for offset in range(0, sessions, SEED_CHUNK_SIZE):
+            rows = []
+            for i in range(offset, min(offset + SEED_CHUNK_SIZE, sessions)):
+                started = now - timedelta(minutes=i * 7919 % span + 30)
+                rows.append((
+                    started.isoformat(), (started + timedelta(minutes=25)).isoformat()
+                ))
+            conn.executemany(
+                '''INSERT INTO sessions
+                   (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+                   VALUES (1, 25, 1, ?, ?, 50)''',
+                rows
+            )
+    RollupRepository.rebuild()
+
+
+def legacy_activity(days: int) -> dict:
+    """全完了セッションを走査して日別・曜日×時間帯を集計する従来の方法"""
+    daily_data = {}
+    hour_weekday = [[0] * 24 for _ in range(7)]
+    since = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    for session in SessionRepository.get_completed_by_user(1):
+        day = session.completed_at[:10]
+        daily_data[day] = daily_data.get(day, 0) + 1
+        if day >= since:
+            completed_at = datetime.fromisoformat(session.completed_at)
+            hour_weekday[completed_at.weekday()][completed_at.hour] += 1
+    
+    today = datetime.now()
+    daily = []
+    for i in range(days):
+        day = (today - timedelta(days=days - i - 1)).strftime('%Y-%m-%d')
+        daily.append({'date': day, 'completed': daily_data.get(day, 0)})
+    return {'daily': daily, 'hour_weekday': hour_weekday}
+
+
+def measure(action, repeat: int) -> float:
+    """action の平均実行時間（ミリ秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 365])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        start = time.perf_counter()
+        seed(args.sessions, args.years)
+        print(f'seeded {args.sessions} sessions in {time.perf_counter() - start:.2f} s')
+        
+        service = StatisticsService()
+        for days in args.days:
+            legacy = measure(lambda: legacy_activity(days), 1)
+            # キャッシュを通さずに毎回集計する
+            engine = measure(lambda: service._load_activity(1, days), args.repeat)
+            print(f'{days:>4} days  session walk: {legacy:9.1f} ms   '
+                  f'rollup + GROUP BY: {engine:7.1f} ms   ({legacy / engine:.0f}x)')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
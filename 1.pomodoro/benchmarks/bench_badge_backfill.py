@@ -0,0 +1,140 @@
+"""Benchmark: retroactive badge backfill across all users.
+
+使い方:
+    python benchmarks/bench_badge_backfill.py --users 1000000 --workers 1 2 4
+
+users 人のユーザーに累計（user_stats）・最長ストリーク・直近のセッションと一部の
+取得済みバッジを作成し、全ユーザーのバッジを判定して未取得分を授与する時間を計測する:
+- ユーザーごとの判定（GamificationService.check_and_award_badges を sample 人で計測して全体に換算）
+- バックフィル（BadgeBackfill。チャンクごとの範囲集計と executemany での授与）を workers 数ごとに
+- 処理済みのジョブの再実行（すべてのチャンクを飛ばすだけ）
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from models.week import local_now
+from repositories.database import get_db
+from services.badge_backfill import BadgeBackfill, DEFAULT_BACKFILL_CHUNK_SIZE
+from services.gamification_service import GamificationService
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+# 作成時から取得済みのバッジの earned_at（計測の合間にバックフィルの授与分だけを消すため）
+SEEDED_AT = '2000-01-01 00:00:00'
+
+
+def seed(users: int, recent: float) -> int:
+    """ユーザー・累計・直近のセッション・取得済みバッジを作成し、セッション数を返す"""
+    rng = random.Random(21)
+    now = local_now()
+    total = 0
+    with get_db() as conn:
+        existing = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+        for start in range(existing, users, SEED_CHUNK_SIZE):
+            conn.executemany(
+                'INSERT INTO users (username, current_streak, longest_streak) VALUES (?, ?, ?)',
+                [(f'bench_{i}', 0, rng.choice((0, 1, 2, 3, 5, 8)))
+                 for i in range(start, min(start + SEED_CHUNK_SIZE, users))]
+            )
+        
+        stats, sessions, badges = [], [], []
+        for user_id in range(1, users + 1):
+            completed = rng.choice((0, 5, 20, 60, 120))
+            stats.append((user_id, completed, completed, completed * 25, completed * 250))
+            if completed >= 50 and rng.random() < 0.5:
+                badges.append((user_id, 'total_50', SEEDED_AT))
+            # 直近7日間のセッション（平均 recent 回。weekly_10 に届くユーザーも作る）
+            for _ in range(int(rng.expovariate(1 / recent)) if recent else 0):
+                at = (now - timedelta(minutes=rng.randint(1, 7 * 24 * 60 - 1))).isoformat()
+                sessions.append((user_id, at, at))
+            if len(stats) >= SEED_CHUNK_SIZE or user_id == users:
+                conn.executemany(
+                    '''INSERT INTO user_stats
+                           (user_id, total_sessions, completed_sessions, total_focus_minutes, total_xp)
+                       VALUES (?, ?, ?, ?, ?)''',
+                    stats
+                )
+                conn.executemany(
+                    '''INSERT INTO sessions
+                           (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+                       VALUES (?, 25, 1, ?, ?, 250)''',
+                    sessions
+                )
+                conn.executemany(
+                    'INSERT OR IGNORE INTO user_badges (user_id, badge_id, earned_at) VALUES (?, ?, ?)',
+                    badges
+                )
+                total += len(sessions)
+                stats, sessions, badges = [], [], []
+    return total
+
+
+def clear_awards() -> None:
+    """バックフィルで授与したバッジと進捗を消して作成直後の状態に戻す"""
+    with get_db() as conn:
+        conn.execute('DELETE FROM user_badges WHERE earned_at != ?', (SEEDED_AT,))
+        conn.execute('DELETE FROM badge_backfill_chunks')
+
+
+def timed(action) -> tuple:
+    """処理時間（秒）と結果"""
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--recent', type=float, default=2.0,
+                        help='ユーザーあたりの直近7日間のセッション数の平均')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_BACKFILL_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sample', type=int, default=5000,
+                        help='ユーザーごとの判定を計測する人数')
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        elapsed, sessions = timed(lambda: seed(args.users, args.recent))
+        print(f'seeded {args.users} users and {sessions} recent sessions in {elapsed:.1f} s')
+        
+        service = GamificationService()
+        sample = random.Random(7).sample(range(1, args.users + 1), min(args.sample, args.users))
+        elapsed, _ = timed(lambda: [service.check_and_award_badges(user_id) for user_id in sample])
+        per_user = elapsed / len(sample)
+        print(f'per-user checks  {per_user * 1e6:7.1f} us/user'
+              f'  (~{per_user * args.users:7.1f} s for {args.users} users)')
+        
+        # 期間指標の基準時刻を揃えて、workers 数ごとの授与数を比較できるようにする
+        now = local_now()
+        for workers in args.workers:
+            clear_awards()
+            backfill = BadgeBackfill(chunk_size=args.chunk_size, now=now)
+            elapsed, stats = timed(lambda: backfill.run_parallel(workers))
+            print(f'backfill x{workers:<3}    {elapsed:7.2f} s  ({stats["chunks"]} chunks, '
+                  f'{elapsed / args.users * 1e6:5.1f} us/user, {stats["awarded"]} awarded)')
+        
+        elapsed, stats = timed(backfill.run)
+        print(f'resume (done)    {elapsed:7.2f} s  ({stats["skipped"]} chunks skipped)')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
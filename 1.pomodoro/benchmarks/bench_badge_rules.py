@@ -0,0 +1,120 @@
+"""Benchmark: badge evaluation cost as the number of badge definitions grows.
+
+使い方:
+    python benchmarks/bench_badge_rules.py --badges 6 50 500 5000
+
+定義数ごとに次を計測する:
+- 判定1回あたりの時間（コンパイル済みの BadgeRuleSet.evaluate と、
+  未取得のバッジを1件ずつ Badge.is_met で判定する場合）。ユーザーは前回の完了時点で
+  満たしていたバッジをすべて取得済みで、今回の完了で指標が1つずつ進んだ状態を想定する
+- セッション完了1回あたりの SQL 文の数と処理時間（定義数によらず一定であること）
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from models.badge import Badge, BADGE_METRICS
+from models.badge_rules import BadgeRuleSet, configure_badge_rules
+from repositories.database import get_db
+from services.pomodoro_service import PomodoroService
+
+# 指標ごとに生成するしきい値の範囲
+METRIC_RANGES = {
+    'streak': 60, 'weekly_count': 80, 'monthly_count': 300,
+    'total_count': 5000, 'focus_minutes': 100000, 'hour': 24,
+}
+
+OPERATORS = ('>=', '>=', '>=', '>', '<', '<=', '==')
+
+
+def generate_badges(count: int, seed: int = 20) -> list:
+    """指標・演算子・しきい値がランダムなバッジ定義を作成"""
+    rng = random.Random(seed)
+    badges = []
+    for i in range(count):
+        metric = BADGE_METRICS[i % len(BADGE_METRICS)]
+        badges.append(Badge(
+            id=f'rule_{i}', name=f'rule {i}', description='', icon='',
+            criteria_type=metric, criteria_value=rng.randint(1, METRIC_RANGES[metric]),
+            criteria_op=rng.choice(OPERATORS)
+        ))
+    return badges
+
+
+def per_call(action, calls: int) -> float:
+    """action を calls 回実行した1回あたりの時間（マイクロ秒）"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        action()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def bench_evaluation(badges: list, calls: int) -> tuple:
+    """コンパイル済みと1件ずつの判定の、1回あたりの時間を返す"""
+    rules = BadgeRuleSet(badges)
+    previous = {metric: limit // 2 for metric, limit in METRIC_RANGES.items()}
+    earned = {b.id for b in badges if b.is_met(previous)}
+    metrics = {metric: value + 1 for metric, value in previous.items()}
+    
+    compiled = per_call(lambda: rules.evaluate(metrics, earned), calls)
+    naive = per_call(
+        lambda: [b for b in badges if b.id not in earned and b.is_met(metrics)], calls
+    )
+    assert [b.id for b in rules.evaluate(metrics, earned)] == \
+        [b.id for b in badges if b.id not in earned and b.is_met(metrics)]
+    return compiled, naive
+
+
+def bench_completion(badges: list, completions: int) -> tuple:
+    """定義を設定した状態でセッションを完了し、（1回あたりの SQL 文の数, ミリ秒）を返す"""
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        configure_badge_rules(badges=badges)
+        service = PomodoroService()
+        session_ids = [service.start_session(1, 25).id for _ in range(completions)]
+        
+        statements = []
+        start = time.perf_counter()
+        for session_id in session_ids:
+            with get_db() as conn:
+                conn.set_trace_callback(statements.append)
+                service.complete_session(session_id)
+                conn.set_trace_callback(None)
+        elapsed = time.perf_counter() - start
+        
+        queries = [s for s in statements if not s.startswith(('BEGIN', 'COMMIT'))]
+        return len(queries) / completions, elapsed / completions * 1000
+    finally:
+        configure_badge_rules()
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--badges', type=int, nargs='+', default=[6, 50, 500, 5000])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--completions', type=int, default=200)
+    args = parser.parse_args()
+    
+    print(f'{"badges":>7}  {"compiled":>12}  {"per-badge":>12}  {"queries":>8}  {"complete":>10}')
+    for count in args.badges:
+        badges = generate_badges(count)
+        compiled, naive = bench_evaluation(badges, args.calls)
+        queries, latency = bench_completion(badges, args.completions)
+        print(f'{count:7d}  {compiled:9.1f} us  {naive:9.1f} us  {queries:8.1f}  {latency:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Micro-benchmark for the session start/complete API path.
+
+使い方:
+    python benchmarks/bench_complete_session.py --requests 500
+
+プールなし（毎回接続を開閉する従来の挙動）とプールありの
+1秒あたりの完了リクエスト数を比較する。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+
+
+def run(pool_size: int, requests: int) -> float:
+    """指定したプールサイズで start + complete を繰り返し、req/s を返す"""
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        app = create_app()
+        db_module.configure_pool(pool_size)
+        client = app.test_client()
+        
+        # セッションを事前に開始しておき、完了処理だけを計測する
+        session_ids = []
+        for _ in range(requests):
+            response = client.post('/api/session/start', json={'duration': 25})
+            session_ids.append(response.get_json()['session']['id'])
+        
+        start = time.perf_counter()
+        for session_id in session_ids:
+            client.post(f'/api/session/{session_id}/complete')
+        elapsed = time.perf_counter() - start
+        
+        return requests / elapsed
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--pool-size', type=int, default=db_module.DEFAULT_POOL_SIZE)
+    args = parser.parse_args()
+    
+    before = run(0, args.requests)
+    after = run(args.pool_size, args.requests)
+    
+    print(f'complete-session (pool disabled): {before:8.1f} req/s')
+    print(f'complete-session (pool size={args.pool_size}): {after:8.1f} req/s')
+    print(f'speedup: {after / before:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark: four-request page load vs. the batched /api/dashboard endpoint.
+
+使い方:
+    python benchmarks/bench_dashboard.py --sessions 5000 --loads 200
+
+サーバー側でダッシュボードの全データ（プロフィール・バッジ・統計・日別アクティビティ）が
+揃うまでの時間を、キャッシュなし（初回表示相当）とキャッシュあり（再表示相当）で比較する。
+ブラウザの描画時間は含まない。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from repositories.rollup_repository import RollupRepository
+from services.cache import read_cache
+
+LEGACY_URLS = [
+    '/api/gamification/profile',
+    '/api/gamification/badges',
+    '/api/statistics',
+    '/api/statistics/daily?days=30',
+]
+
+
+def seed(sessions: int) -> None:
+    """過去1年に分散したセッションを作成"""
+    now = datetime.now()
+    rows = []
+    for i in range(sessions):
+        started = now - timedelta(minutes=i * 97 % (365 * 24 * 60))
+        completed = i % 4 != 0
+        rows.append((
+            1, 25, completed, started.isoformat(),
+            (started + timedelta(minutes=25)).isoformat() if completed else None,
+            50 if completed else 0
+        ))
+    with get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO sessions
+               (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            rows
+        )
+    RollupRepository.rebuild()
+
+
+def measure(client, urls, loads: int) -> float:
+    """指定URL群をすべて取得するまでの平均時間（ミリ秒）"""
+    start = time.perf_counter()
+    for _ in range(loads):
+        for url in urls:
+            response = client.get(url)
+            response.get_json()
+    return (time.perf_counter() - start) / loads * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--loads', type=int, default=200)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        app = create_app()
+        client = app.test_client()
+        seed(args.sessions)
+        
+        original_size = read_cache.maxsize
+        for label, cache_size in (('cold (cache off)', 0), ('warm (cache on)', original_size)):
+            read_cache.maxsize = cache_size
+            read_cache.clear()
+            legacy = measure(client, LEGACY_URLS, args.loads)
+            batched = measure(client, ['/api/dashboard?days=30'], args.loads)
+            print(f'{label:<18} 4 requests: {legacy:7.2f} ms   /api/dashboard: {batched:7.2f} ms'
+                  f'   ({legacy / batched:.2f}x)')
+        read_cache.maxsize = original_size
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
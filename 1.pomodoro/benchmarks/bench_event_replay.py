@@ -0,0 +1,99 @@
+"""Benchmark: rebuilding user progress by replaying the session event log.
+
+使い方:
+    python benchmarks/bench_event_replay.py --events 1000000 --users 1000
+
+users 人のユーザーが1日4回ずつ完了した events 件の完了イベントを session_events に作成し、
+ReplayService.replay の処理時間を比較する:
+- 先頭からの再生（スナップショットなし）
+- スナップショットを保存した後、tail 件のイベントが追記された状態からの再生
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from services.replay_service import ReplayService
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+# 1ユーザーが1日に完了するセッション数
+SESSIONS_PER_DAY = 4
+
+
+def seed(first: int, count: int, users: int) -> None:
+    """first 件目から count 件の完了イベントを作成（ユーザーを順に回し、4周ごとに1日進める）"""
+    origin = datetime(2020, 1, 1, 9)
+    with get_db() as conn:
+        conn.executemany(
+            'INSERT INTO users (username) VALUES (?)',
+            [(f'bench_{i}',) for i in range(conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+                                             users)]
+        )
+        for offset in range(first, first + count, SEED_CHUNK_SIZE):
+            rows = []
+            for i in range(offset, min(offset + SEED_CHUNK_SIZE, first + count)):
+                rounds, user = divmod(i, users)
+                day, slot = divmod(rounds, SESSIONS_PER_DAY)
+                started = origin + timedelta(days=day, hours=slot)
+                rows.append((
+                    user + 1, i + 1, started.isoformat(),
+                    (started + timedelta(minutes=25)).isoformat()
+                ))
+            conn.executemany(
+                '''INSERT INTO session_events
+                       (type, user_id, session_id, duration_minutes, xp_earned,
+                        started_at, occurred_at)
+                   VALUES ('completed', ?, ?, 25, 50, ?, ?)''',
+                rows
+            )
+
+
+def timed(action) -> tuple:
+    """処理時間（秒）と結果"""
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--tail', type=int, default=10000)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        seed(0, args.events, args.users)
+        service = ReplayService()
+        
+        elapsed, (states, _) = timed(lambda: service.replay(use_snapshots=False))
+        print(f'full replay      {elapsed:7.2f} s  {args.events / elapsed:10.0f} events/s'
+              f'  ({len(states)} users)')
+        
+        elapsed, count = timed(service.take_snapshots)
+        print(f'take snapshots   {elapsed:7.2f} s  ({count} users)')
+        
+        seed(args.events, args.tail, args.users)
+        elapsed, _ = timed(service.replay)
+        print(f'snapshot + tail  {elapsed:7.2f} s  ({args.tail} events after the snapshot)')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark: idle SSE connections and push latency versus polling.
+
+使い方:
+    python benchmarks/bench_event_stream.py --connections 1000 --users 100 --poll-interval 5
+
+マルチスレッドの WSGI サーバー（werkzeug）を起動して connections 本の /api/events を
+users 人に分けて接続したまま、次を計測する:
+- 接続を保持するためのメモリ（RSS の増分）とアイドル時のサーバーの CPU 時間
+- セッション完了から同じユーザーの全接続に progress イベントが届くまでの時間
+- 比較: 同じ数のクライアントが poll-interval 秒ごとに /api/dashboard をポーリングした場合の
+  1秒あたりのリクエスト数と、それを処理する CPU 時間（1リクエストの処理時間から換算）
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from werkzeug.serving import make_server
+from app import create_app
+from services.event_hub import event_hub
+from services.pomodoro_service import PomodoroService
+
+
+def rss_kb() -> int:
+    """このプロセスの RSS（KB）"""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def open_stream(port: int, user_id: int) -> socket.socket:
+    """/api/events に接続し、最初のイベント（retry）まで読む"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    request = f'GET /api/events HTTP/1.1\r\nHost: localhost\r\nX-User-Id: {user_id}\r\n\r\n'
+    sock.sendall(request.encode())
+    buffer = b''
+    while b'retry:' not in buffer:
+        buffer += sock.recv(4096)
+    return sock
+
+
+def wait_for_event(sock: socket.socket, name: bytes) -> None:
+    """指定した種類のイベントが届くまで読む"""
+    buffer = b''
+    while b'event: ' + name not in buffer:
+        buffer += sock.recv(65536)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--completions', type=int, default=20)
+    parser.add_argument('--poll-interval', type=float, default=5.0)
+    parser.add_argument('--idle', type=float, default=5.0, help='アイドル時の CPU 時間を計測する秒数')
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    # 接続ごとのスレッドのスタックを小さくし、リクエストログは出さない
+    threading.stack_size(256 * 1024)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    try:
+        app = create_app()
+        # ユーザーはヘッダーで指定する（認証済みのプロキシの背後と同じ設定）
+        app.config['TRUST_USER_HEADER'] = True
+        client = app.test_client()
+        for i in range(2, args.users + 1):
+            client.post('/api/users', json={'username': f'bench_{i}'})
+        
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_port
+        
+        before = rss_kb()
+        streams = {}
+        start = time.perf_counter()
+        for i in range(args.connections):
+            user_id = i % args.users + 1
+            streams.setdefault(user_id, []).append(open_stream(port, user_id))
+        elapsed = time.perf_counter() - start
+        print(f'opened {args.connections} streams in {elapsed:.2f} s '
+              f'({(rss_kb() - before) / args.connections:.1f} KB RSS/connection, '
+              f'{threading.active_count()} threads)')
+        
+        cpu = time.process_time()
+        time.sleep(args.idle)
+        idle_cpu = (time.process_time() - cpu) / args.idle
+        print(f'idle CPU         {idle_cpu * 100:6.2f} % of one core (heartbeats only)')
+        
+        service = PomodoroService()
+        latencies = []
+        for i in range(args.completions):
+            user_id = i % args.users + 1
+            session = service.start_session(user_id, 25)
+            start = time.perf_counter()
+            service.complete_session(session.id, user_id)
+            for sock in streams[user_id]:
+                wait_for_event(sock, b'progress')
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        fanout = args.connections // args.users
+        print(f'push latency     p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms  '
+              f'max {latencies[-1] * 1000:6.2f} ms  (complete + fan-out to {fanout} streams)')
+        
+        # ポーリングとの比較（変化がなくても間隔ごとにダッシュボードを読む）
+        requests = 200
+        start = time.perf_counter()
+        for i in range(requests):
+            client.get('/api/dashboard?days=30', headers={'X-User-Id': str(i % args.users + 1)})
+        per_request = (time.perf_counter() - start) / requests
+        rate = args.connections / args.poll_interval
+        print(f'polling instead  {rate:6.0f} req/s x {per_request * 1e3:.2f} ms '
+              f'= {rate * per_request * 100:6.1f} % of one core')
+        print(f'hub              {event_hub.stats()}')
+        
+        for group in streams.values():
+            for sock in group:
+                sock.close()
+        event_hub.close()
+        server.shutdown()
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: peak memory of the full-history export, materialized vs. streamed.
+
+使い方:
+    python benchmarks/bench_history_export.py --sessions 100 1000000
+
+セッション数を変えながら、全件をリストに読み込む従来の方法（get_by_user(limit=None)）と
+/api/session/export の NDJSON ストリーミングについて、処理時間と Python 側の
+ピークメモリ（tracemalloc）を比較する。
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from services.pomodoro_service import PomodoroService
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+
+def seed(sessions: int) -> None:
+    """1分間隔で開始したセッションを作成"""
+    base = datetime(2020, 1, 1)
+    with get_db() as conn:
+        for offset in range(0, sessions, SEED_CHUNK_SIZE):
+            conn.executemany(
+                '''INSERT INTO sessions
+                   (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+                   VALUES (1, 25, 1, ?, ?, 50)''',
+                [
+                    ((base + timedelta(minutes=i)).isoformat(),
+                     (base + timedelta(minutes=i + 25)).isoformat())
+                    for i in range(offset, min(offset + SEED_CHUNK_SIZE, sessions))
+                ]
+            )
+
+
+def measure(action) -> tuple:
+    """action の処理時間（秒）とピークメモリ（MB）
+    
+    tracemalloc は割り当てごとに処理時間が増えるため、時間とメモリは別々に計測する。
+    """
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def run(sessions: int) -> None:
+    """指定件数で従来の全件読み込みとストリーミングを計測"""
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        app = create_app()
+        client = app.test_client()
+        seed(sessions)
+        
+        def materialized():
+            PomodoroService().get_user_sessions(1, None)
+        
+        def streamed():
+            response = client.get('/api/session/export')
+            for _ in response.response:
+                pass
+            response.close()
+        
+        for label, action in (('list', materialized), ('stream', streamed)):
+            elapsed, peak = measure(action)
+            print(f'{sessions:>10} sessions  {label:<6} {elapsed:8.2f} s  peak {peak:9.2f} MB')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[100, 100000, 1000000])
+    args = parser.parse_args()
+    
+    for sessions in args.sessions:
+        run(sessions)
+
+
+if __name__ == '__main__':
+    main()
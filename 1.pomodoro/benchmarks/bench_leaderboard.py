@@ -0,0 +1,82 @@
+"""Benchmark: leaderboard top-N and rank queries against a large users table.
+
+使い方:
+    python benchmarks/bench_leaderboard.py --users 1000000
+
+idx_users_xp (xp DESC, id) による上位N件の取得と、順位計算（インデックスの範囲検索）の
+レイテンシを計測する。比較用にインデックスを削除した状態でも同じクエリを計測する。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from repositories.user_repository import UserRepository
+from load_generator import seed_users
+
+
+def measure(action, repeat: int) -> float:
+    """action の平均実行時間（ミリ秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        action()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(users: list, repeat: int, limit: int) -> None:
+    """上位N件・上位/中位/下位ユーザーの順位を計測して表示"""
+    top = measure(lambda: UserRepository.get_top_by_xp(limit), repeat)
+    print(f'  top-{limit}:{"":<14} {top:8.3f} ms')
+    for label, user in users:
+        rank = measure(lambda: UserRepository.get_rank(user), max(1, repeat // 10))
+        print(f'  rank ({label:<6} #{UserRepository.get_rank(user):>8}): {rank:8.3f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        start = time.perf_counter()
+        seed_users(args.users, random.Random(0))
+        print(f'seeded {args.users} users in {time.perf_counter() - start:.2f} s')
+        
+        with get_db() as conn:
+            conn.execute('ANALYZE')
+        ranked = UserRepository.get_top_by_xp(args.users + 1)
+        users = [
+            ('top', ranked[0]),
+            ('middle', ranked[len(ranked) // 2]),
+            ('bottom', ranked[-1]),
+        ]
+        del ranked
+        
+        print('with idx_users_xp:')
+        run(users, args.repeat, args.limit)
+        
+        with get_db() as conn:
+            conn.execute('DROP INDEX idx_users_xp')
+        print('without index:')
+        run(users, max(1, args.repeat // 20), args.limit)
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
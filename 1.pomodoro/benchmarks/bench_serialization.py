@@ -0,0 +1,81 @@
+"""Benchmark: serialization cost of a 10k-session history response.
+
+使い方:
+    python benchmarks/bench_serialization.py --sessions 10000 --repeat 50
+
+SQLite から取得済みの行（タプル）をレスポンスの bytes に変換するまでを計測する。
+従来の方法（行 → モデル → to_dict() → Flask 標準の jsonify）と、行から直接
+レスポンス用の dict を作り、標準ライブラリ版・orjson 版のプロバイダで書き出す方法を比較する。
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from repositories.row_mappers import session_from_row, session_payload_from_row
+from routes.json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+def make_rows(count: int) -> list:
+    """SESSION_COLUMNS の順に並んだ履歴の行を作成"""
+    return [
+        (i, 1, 25, int(i % 4 != 0),
+         f'2024-01-01T09:{i % 60:02d}:00.{i:06d}',
+         f'2024-01-01T09:{i % 60:02d}:25.{i:06d}' if i % 4 else None,
+         50 if i % 4 else 0)
+        for i in range(count)
+    ]
+
+
+def measure(app: Flask, build, repeat: int) -> tuple:
+    """レスポンス1件あたりの平均時間（ミリ秒）とサイズ（KB）"""
+    with app.app_context():
+        response = jsonify(build())
+        size = len(response.get_data()) / 1024
+        start = time.perf_counter()
+        for _ in range(repeat):
+            jsonify(build()).get_data()
+        return (time.perf_counter() - start) / repeat * 1000, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    
+    rows = make_rows(args.sessions)
+    
+    def legacy():
+        sessions = [session_from_row(None, row) for row in rows]
+        return {'success': True, 'sessions': [s.to_dict() for s in sessions]}
+    
+    def direct():
+        return {'success': True, 'sessions': [session_payload_from_row(None, row) for row in rows]}
+    
+    cases = [
+        ('model + to_dict (json)', DefaultJSONProvider, legacy),
+        ('row payload (json)', StdlibJSONProvider, direct),
+    ]
+    if orjson is not None:
+        cases.append(('row payload (orjson)', OrjsonProvider, direct))
+    else:
+        print('orjson is not installed; skipping the orjson provider')
+    
+    baseline = None
+    for label, provider_class, build in cases:
+        app = Flask(__name__)
+        app.json = provider_class(app)
+        elapsed, size = measure(app, build, args.repeat)
+        baseline = baseline or elapsed
+        print(f'{label:<26} {elapsed:8.2f} ms/response  {size:8.1f} KB'
+              f'  ({baseline / elapsed:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""Load test: concurrent-connection capacity of the WSGI and ASGI serving modes.
+
+使い方:
+    pip install uvicorn
+    python benchmarks/bench_serving_modes.py --streams 1000 2000 4000 8000 --users 100
+
+それぞれのモードのサーバーを別プロセスで起動し（WSGI: werkzeug のスレッドサーバー = app.run と同じ、
+ASGI: uvicorn + asgi.py）、/api/events の接続を streams 本まで段階的に増やしながら次を計測する:
+- 接続できた数と失敗した数（10秒以内に最初のイベントが届かなければ失敗）
+- サーバープロセスの RSS とスレッド数
+- 接続を保持したままの /api/gamification/profile の応答時間（p50 / p99）
+- セッション完了から同じユーザーの接続に progress イベントが届くまでの時間
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+
+# 1本の接続を確立するまでの制限時間（秒）
+CONNECT_TIMEOUT = 10
+
+# 同時に確立を試みる接続数（サーバーの listen キューを溢れさせない）
+CONNECT_CONCURRENCY = 100
+
+
+def serve(mode: str, port: int, db_path: str) -> None:
+    """サーバーとして起動（このスクリプトを --serve 付きで実行した子プロセス）"""
+    db_module.DB_PATH = db_path
+    if mode == 'wsgi':
+        from werkzeug.serving import make_server
+        from app import create_app
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        make_server('127.0.0.1', port, create_app(), threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(), host='127.0.0.1', port=port, log_level='warning',
+                    backlog=4096, timeout_graceful_shutdown=1)
+
+
+def process_status(pid: int) -> Tuple[int, int]:
+    """プロセスの（RSS（KB）, スレッド数）"""
+    rss = threads = 0
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+            elif line.startswith('Threads:'):
+                threads = int(line.split()[1])
+    return rss, threads
+
+
+def free_port() -> int:
+    """空いているポート番号"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def http(port: int, method: str, path: str, user_id: int,
+               body: bytes = b'{}') -> Tuple[int, bytes]:
+    """HTTP リクエストを1件送り（ステータス, 本文）を返す"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nX-User-Id: {user_id}\r\n'
+                 f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+                 f'Connection: close\r\n\r\n'.encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), body
+
+
+async def open_stream(port: int, user_id: int) -> Optional[Tuple]:
+    """/api/events に接続して最初のイベント（retry）まで読む（失敗時は None）"""
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection('127.0.0.1', port), CONNECT_TIMEOUT
+        )
+        writer.write(f'GET /api/events HTTP/1.1\r\nHost: localhost\r\n'
+                     f'X-User-Id: {user_id}\r\n\r\n'.encode())
+        await asyncio.wait_for(reader.readuntil(b'retry:'), CONNECT_TIMEOUT)
+        return reader, writer
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+
+
+async def wait_for_server(port: int) -> None:
+    """サーバーが応答するまで待つ"""
+    for _ in range(200):
+        try:
+            await http(port, 'GET', '/api/health', 1)
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('server did not start')
+
+
+async def measure(mode: str, port: int, pid: int, steps: List[int], users: int) -> None:
+    """接続数を段階的に増やしながら計測"""
+    await wait_for_server(port)
+    streams: List[Tuple] = []
+    failed = 0
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    
+    async def connect(i: int) -> Optional[Tuple]:
+        async with semaphore:
+            return await open_stream(port, i % users + 1)
+    
+    for target in steps:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(connect(i) for i in range(len(streams) + failed, target)))
+        connect_time = time.perf_counter() - start
+        streams += [stream for stream in results if stream is not None]
+        failed += sum(stream is None for stream in results)
+        await asyncio.sleep(1)
+        rss, threads = process_status(pid)
+        
+        latencies = []
+        for _ in range(50):
+            request_start = time.perf_counter()
+            status, _ = await http(port, 'GET', '/api/gamification/profile', 1)
+            latencies.append(time.perf_counter() - request_start)
+            assert status == 200
+        latencies.sort()
+        
+        # ユーザー1の接続の1本で progress を待つ（それまでに届いた keep-alive は読み捨てる）
+        push = float('nan')
+        if streams:
+            reader = streams[0][0]
+            _, body = await http(port, 'POST', '/api/session/start', 1)
+            session_id = json.loads(body)['session']['id']
+            push_start = time.perf_counter()
+            await http(port, 'POST', f'/api/session/{session_id}/complete', 1)
+            await asyncio.wait_for(reader.readuntil(b'event: progress'), 30)
+            push = time.perf_counter() - push_start
+        
+        print(f'{mode:<5} {target:>7} {len(streams):>9} {failed:>6} {connect_time:>9.1f} '
+              f'{rss / 1024:>8.1f} {threads:>7} {latencies[len(latencies) // 2] * 1000:>9.1f} '
+              f'{latencies[int(len(latencies) * 0.99)] * 1000:>9.1f} {push * 1000:>8.1f}', flush=True)
+    
+    for _, writer in streams:
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--streams', type=int, nargs='+', default=[1000, 2000, 4000, 8000])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--modes', nargs='+', default=['wsgi', 'asgi'], choices=['wsgi', 'asgi'])
+    parser.add_argument('--serve', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.port, args.db)
+        return
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        from app import create_app
+        client = create_app().test_client()
+        for i in range(2, args.users + 1):
+            client.post('/api/users', json={'username': f'bench_{i}'})
+        db_module.close_pool()
+        
+        print(f'{"mode":<5} {"streams":>7} {"connected":>9} {"failed":>6} {"ramp (s)":>9} '
+              f'{"RSS (MB)":>8} {"threads":>7} {"p50 (ms)":>9} {"p99 (ms)":>9} {"push (ms)":>8}')
+        env = dict(os.environ, POMODORO_SSE_MAX_SUBSCRIBERS=str(max(args.streams) * 2),
+                   POMODORO_TRUST_USER_HEADER='1')
+        for mode in args.modes:
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, __file__, '--serve', mode, '--port', str(port), '--db', db_path],
+                env=env
+            )
+            try:
+                asyncio.run(measure(mode, port, server.pid, args.streams, args.users))
+            finally:
+                server.terminate()
+                try:
+                    server.wait(10)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    server.wait()
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
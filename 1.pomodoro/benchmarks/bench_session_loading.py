@@ -0,0 +1,127 @@
+"""Benchmark: bulk session loading, sqlite3.Row + dict-backed dataclass vs. slotted row factory.
+
+使い方:
+    python benchmarks/bench_session_loading.py --sessions 1000000
+
+1人のユーザーの全セッションを SessionRepository.get_by_user で読み込み、
+従来の方法（sqlite3.Row からキーワード引数で __dict__ を持つ dataclass を作る）と
+行ファクトリで __slots__ のモデルを直接作る現在の方法の処理時間と
+保持メモリ（読み込んだリストが使うメモリ, tracemalloc）を比較する。
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+from repositories.session_repository import SessionRepository
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+
+@dataclass
+class LegacySession:
+    """__slots__ を使わない従来のセッションモデル"""
+    
+    id: Optional[int] = None
+    user_id: int = 1
+    duration_minutes: int = 25
+    completed: bool = False
+    started_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    xp_earned: int = 0
+
+
+def legacy_load(user_id: int) -> list:
+    """sqlite3.Row を経由して1列ずつキーワード引数で作る従来の読み込み"""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT * FROM sessions WHERE user_id = ? ORDER BY started_at DESC', (user_id,)
+        )
+        return [
+            LegacySession(
+                id=row['id'],
+                user_id=row['user_id'],
+                duration_minutes=row['duration_minutes'],
+                completed=bool(row['completed']),
+                started_at=row['started_at'],
+                completed_at=row['completed_at'],
+                xp_earned=row['xp_earned']
+            )
+            for row in cursor.fetchall()
+        ]
+
+
+def seed(sessions: int) -> None:
+    """1分間隔で開始したセッションを作成"""
+    with get_db() as conn:
+        for offset in range(0, sessions, SEED_CHUNK_SIZE):
+            conn.executemany(
+                '''INSERT INTO sessions
+                   (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+                   VALUES (1, 25, 1, ?, ?, 50)''',
+                [
+                    (f'2020-01-01T00:00:00.{i:06d}', f'2020-01-01T00:25:00.{i:06d}')
+                    for i in range(offset, min(offset + SEED_CHUNK_SIZE, sessions))
+                ]
+            )
+
+
+def measure(load) -> tuple:
+    """読み込みの処理時間（秒）と、結果を保持している間のメモリ（MB）"""
+    gc.collect()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    del result
+    
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, retained / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=1000000)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        seed(args.sessions)
+        
+        results = {}
+        for label, load in (('Row + dataclass', lambda: legacy_load(1)),
+                            ('slotted factory', lambda: SessionRepository.get_by_user(1))):
+            elapsed, retained = measure(load)
+            results[label] = (elapsed, retained)
+            print(f'{label:<16} {elapsed:7.2f} s  {args.sessions / elapsed:10.0f} rows/s'
+                  f'  retained {retained:8.1f} MB')
+        
+        (before_time, before_mem), (after_time, after_mem) = results.values()
+        print(f'speedup: {before_time / after_time:.2f}x   memory: {after_mem / before_mem:.0%}')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Concurrent read/write latency benchmark for each storage profile.
+
+使い方:
+    python benchmarks/bench_storage_profiles.py --writers 4 --readers 8 --seconds 5
+
+書き込みスレッドがセッションの開始・完了とユーザー更新を繰り返す間に、
+読み込みスレッドが統計を取得し続け、プロファイルごとの p50/p99 レイテンシを出力する。
+比較用に SQLite デフォルト相当（rollback journal + synchronous=FULL）の
+``legacy`` も計測する。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from services.pomodoro_service import PomodoroService
+from services.statistics_service import StatisticsService
+
+# ベースライン計測用（アプリからは選択できない）
+db_module.STORAGE_PROFILES.setdefault('legacy', {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'busy_timeout': 5000,
+})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """パーセンタイル値を返す（ミリ秒）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index] * 1000
+
+
+def run(profile: str, writers: int, readers: int, seconds: float) -> Dict[str, List[float]]:
+    """指定プロファイルで読み書きを並行実行し、レイテンシを収集"""
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    db_module.configure_pool(writers + readers, profile)
+    db_module.init_db()
+    
+    pomodoro_service = PomodoroService()
+    statistics_service = StatisticsService()
+    latencies: Dict[str, List[float]] = {'read': [], 'write': [], 'errors': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    
+    def writer() -> None:
+        samples, errors = [], []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                session = pomodoro_service.start_session(1, 25)
+                pomodoro_service.complete_session(session.id)
+                samples.append(time.perf_counter() - start)
+            except Exception:
+                errors.append(time.perf_counter() - start)
+        with lock:
+            latencies['write'].extend(samples)
+            latencies['errors'].extend(errors)
+    
+    def reader() -> None:
+        samples, errors = [], []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                statistics_service.get_user_statistics(1)
+                samples.append(time.perf_counter() - start)
+            except Exception:
+                errors.append(time.perf_counter() - start)
+        with lock:
+            latencies['read'].extend(samples)
+            latencies['errors'].extend(errors)
+    
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    db_module.close_pool()
+    os.close(db_fd)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.unlink(db_path + suffix)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--profiles', nargs='*',
+                        default=['legacy', 'durable', 'balanced', 'throughput'])
+    args = parser.parse_args()
+    
+    print(f'{"profile":<12}{"ops(r/w)":>14}{"read p50":>11}{"read p99":>11}'
+          f'{"write p50":>11}{"write p99":>11}{"errors":>8}')
+    for profile in args.profiles:
+        result = run(profile, args.writers, args.readers, args.seconds)
+        reads, writes = result['read'], result['write']
+        print(f'{profile:<12}{len(reads):>7}/{len(writes):<6}'
+              f'{statistics.median(reads) * 1000 if reads else 0:>9.2f}ms'
+              f'{percentile(reads, 99):>9.2f}ms'
+              f'{statistics.median(writes) * 1000 if writes else 0:>9.2f}ms'
+              f'{percentile(writes, 99):>9.2f}ms'
+              f'{len(result["errors"]):>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark: incremental and bulk streak computation.
+
+使い方:
+    python benchmarks/bench_streaks.py --users 100000 --days 90
+
+users 人のユーザーが days 日間のうちランダムな日（確率 active）にセッションを完了した
+daily_rollup を作成し、次の処理時間を計測する:
+- 完了ごとの差分更新（UserRepository.add_progress。前回の完了日との比較だけの O(1)）
+- 全ユーザーの一括再計算（GamificationService.recompute_streaks。完了日の索引を1回走査して畳み込む）
+- マイグレーションで使う SQL での一括再計算（ウィンドウ関数。一括再計算と結果が一致することも確認する）
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db, transaction, CLEAR_STREAKS_SQL, RECOMPUTE_STREAKS_SQL
+from repositories.user_repository import UserRepository
+from services.gamification_service import GamificationService
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+
+def seed(users: int, days: int, active: float) -> int:
+    """ユーザーと daily_rollup を作成し、完了日の件数を返す"""
+    rng = random.Random(19)
+    origin = date(2024, 1, 1)
+    day_names = [(origin + timedelta(days=i)).isoformat() for i in range(days)]
+    total = 0
+    with get_db() as conn:
+        conn.executemany(
+            'INSERT INTO users (username) VALUES (?)',
+            [(f'bench_{i}',) for i in range(conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+                                             users)]
+        )
+        rows = []
+        for user_id in range(1, users + 1):
+            rows.extend((user_id, day) for day in day_names if rng.random() < active)
+            if len(rows) >= SEED_CHUNK_SIZE or user_id == users:
+                conn.executemany(
+                    '''INSERT INTO daily_rollup
+                           (user_id, day, started_sessions, completed_sessions, focus_minutes, xp_earned)
+                       VALUES (?, ?, 4, 4, 100, 200)''',
+                    rows
+                )
+                total += len(rows)
+                rows = []
+    return total
+
+
+def recompute_in_sql() -> int:
+    """マイグレーションの SQL で再計算し、値の変わったユーザー数を返す"""
+    with transaction() as conn:
+        return sum(len(conn.execute(statement + ' RETURNING users.id').fetchall())
+                   for statement in (RECOMPUTE_STREAKS_SQL, CLEAR_STREAKS_SQL))
+
+
+def timed(action) -> tuple:
+    """処理時間（秒）と結果"""
+    start = time.perf_counter()
+    result = action()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--active', type=float, default=0.7)
+    parser.add_argument('--updates', type=int, default=20000)
+    args = parser.parse_args()
+    
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        create_app()
+        rows = seed(args.users, args.days, args.active)
+        print(f'seeded {rows} completed user-days for {args.users} users')
+        
+        # 完了ごとの差分更新（最終日の翌日の完了をランダムなユーザーに反映する）
+        rng = random.Random(25)
+        day = (date(2024, 1, 1) + timedelta(days=args.days)).isoformat()
+        user_ids = [rng.randint(1, args.users) for _ in range(args.updates)]
+        
+        def incremental():
+            with transaction():
+                for user_id in user_ids:
+                    UserRepository.add_progress(user_id, 50, day)
+        
+        elapsed, _ = timed(incremental)
+        print(f'incremental      {elapsed / args.updates * 1e6:7.1f} us/completion'
+              f'  ({args.updates} completions)')
+        
+        elapsed, updated = timed(GamificationService().recompute_streaks)
+        print(f'bulk recompute   {elapsed:7.2f} s  ({updated} users updated)')
+        
+        elapsed, updated = timed(GamificationService().recompute_streaks)
+        print(f'bulk (no change) {elapsed:7.2f} s  ({updated} users updated)')
+        
+        # 一括再計算の直後のため、結果が一致すれば更新されるユーザーは0人になる
+        elapsed, updated = timed(recompute_in_sql)
+        print(f'sql (migration)  {elapsed:7.2f} s  ({updated} users differ)')
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark: per-event start/complete requests versus batched /api/sync.
+
+使い方:
+    python benchmarks/bench_sync.py --sessions 500 --batch-sizes 1 10 50 100 --rtt-ms 50
+
+sessions 件のセッション（開始 + 完了）を、従来の1イベント1リクエスト
+（/api/session/start と /api/session/<id>/complete）と、/api/sync への
+batch-size イベントずつのバッチで送信し、次を比較する:
+- サーバーの処理時間（1セッションあたり）とリクエスト数
+- ネットワークの往復時間を rtt-ms とした場合の、クライアントが送信し終えるまでの時間の見積もり
+  （リクエストを順に送るため、リクエスト数 x 往復時間 + サーバーの処理時間）
+- 同じバッチを再送した場合の処理時間（すべて適用済みのキーとして読み飛ばす）
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+
+
+def completed_count() -> int:
+    """完了したセッション数（送信したセッションがすべて1回だけ完了したことの確認用）"""
+    with sqlite3.connect(db_module.DB_PATH) as conn:
+        return conn.execute('SELECT COUNT(*) FROM sessions WHERE completed = 1').fetchone()[0]
+
+
+def make_events(sessions: int, prefix: str) -> list:
+    """開始・完了の順に並べたイベント列"""
+    now = int(time.time() * 1000)
+    events = []
+    for i in range(sessions):
+        events.append({'key': f'{prefix}{i}-s', 'type': 'start', 'duration': 25, 'at': now})
+        events.append({'key': f'{prefix}{i}-c', 'type': 'complete', 'start_key': f'{prefix}{i}-s',
+                       'at': now})
+    return events
+
+
+def run(sessions: int, batch_size: int) -> tuple:
+    """1つのDBでイベントを送信し、（サーバーの処理時間, リクエスト数, 再送の処理時間）を返す"""
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        app = create_app()
+        client = app.test_client()
+        
+        if batch_size == 0:
+            start = time.perf_counter()
+            for _ in range(sessions):
+                session = client.post('/api/session/start', json={'duration': 25}).get_json()['session']
+                client.post(f'/api/session/{session["id"]}/complete')
+            elapsed = time.perf_counter() - start
+            requests = 2 * sessions
+            retry = None
+        else:
+            events = make_events(sessions, 'k')
+            batches = [events[i:i + batch_size] for i in range(0, len(events), batch_size)]
+            start = time.perf_counter()
+            for batch in batches:
+                client.post('/api/sync', json={'events': batch})
+            elapsed = time.perf_counter() - start
+            requests = len(batches)
+            
+            start = time.perf_counter()
+            for batch in batches:
+                client.post('/api/sync', json={'events': batch})
+            retry = time.perf_counter() - start
+        
+        assert completed_count() == sessions
+        return elapsed, requests, retry
+    finally:
+        db_module.close_pool()
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=500)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--rtt-ms', type=float, default=50.0)
+    args = parser.parse_args()
+    
+    rtt = args.rtt_ms / 1000
+    print(f'{"mode":<18} {"requests":>8} {"server ms/session":>18} '
+          f'{"est. total (s)":>15} {"resend ms/session":>18}')
+    for batch_size in [0] + args.batch_sizes:
+        elapsed, requests, retry = run(args.sessions, batch_size)
+        mode = 'per-event' if batch_size == 0 else f'sync x{batch_size}'
+        resend = '-' if retry is None else f'{retry / args.sessions * 1000:.3f}'
+        print(f'{mode:<18} {requests:>8} {elapsed / args.sessions * 1000:>18.3f} '
+              f'{requests * rtt + elapsed:>15.2f} {resend:>18}')
+
+
+if __name__ == '__main__':
+    main()
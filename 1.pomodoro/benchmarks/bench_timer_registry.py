@@ -0,0 +1,138 @@
+"""Benchmark: server-side timer registry with many concurrent timers.
+
+使い方:
+    python benchmarks/bench_timer_registry.py --timers 100000 --churn 5
+
+timers 人分のタイマーを登録簿に登録し、次を計測する（時計は差し替え、DB は使わない）:
+- 登録・状態の取得・一時停止と再開（churn 回ずつ）の1件あたりの時間
+- タイマー1件あたりのメモリ（tracemalloc）と、一時停止・再開を繰り返した後のヒープの大きさ
+- 期限の来たタイマーをすべて取り出して完了させる時間（1件あたり）
+- 比較: 期限の判定を全タイマーの走査で行った場合の1回あたりの時間
+- 監視スレッドが、一斉に期限の来たタイマーを完了させ終えるまでの時間（実際の時計）
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.timer_registry import TimerRegistry
+
+
+class FakeClock:
+    """計測用の時計"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def per_op_us(elapsed: float, count: int) -> float:
+    """1件あたりの時間（マイクロ秒）"""
+    return elapsed / max(count, 1) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--timers', type=int, default=100000)
+    parser.add_argument('--churn', type=int, default=5, help='タイマーごとの一時停止・再開の回数')
+    args = parser.parse_args()
+    
+    rng = random.Random(0)
+    clock = FakeClock()
+    completed = []
+    registry = TimerRegistry(lambda timer, overdue: completed.append(timer.session_id),
+                             grace=5, pause_timeout=3600, clock=clock)
+    users = list(range(1, args.timers + 1))
+    durations = [rng.choice((15, 25, 45)) for _ in users]
+    
+    # 開始時刻をばらつかせる
+    offsets = [rng.random() * 600 for _ in users]
+    start = time.perf_counter()
+    for user_id, duration, offset in zip(users, durations, offsets):
+        clock.now = offset
+        registry.register(user_id, user_id, duration, '2024-01-01T09:00:00')
+    register_time = time.perf_counter() - start
+    clock.now = 600
+    
+    # メモリは別の登録簿で計測する（tracemalloc は処理時間を大きく伸ばすため）
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    measured = TimerRegistry(lambda timer, overdue: None, clock=clock)
+    for user_id, duration in zip(users, durations):
+        measured.register(user_id, user_id, duration, '2024-01-01T09:00:00')
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del measured
+    
+    start = time.perf_counter()
+    for user_id in users:
+        registry.get_state(user_id)
+    state_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    for _ in range(args.churn):
+        for user_id in users:
+            registry.pause(user_id, user_id)
+            registry.resume(user_id, user_id)
+    churn_time = time.perf_counter() - start
+    churn_ops = 2 * args.churn * len(users)
+    stats = registry.stats()
+    
+    # 比較: 期限の判定のたびに全タイマーを走査する場合
+    timers = [registry.get(user_id) for user_id in users]
+    start = time.perf_counter()
+    due = [timer for timer in timers if timer.due <= clock.now]
+    scan_time = time.perf_counter() - start
+    
+    # 期限がまだ来ていない間の確認はヒープの先頭を見るだけ
+    start = time.perf_counter()
+    for _ in range(1000):
+        registry.reap()
+    idle_reap_time = (time.perf_counter() - start) / 1000
+    
+    clock.now = 600 + 45 * 60 + 5
+    start = time.perf_counter()
+    reaped = registry.reap()
+    reap_time = time.perf_counter() - start
+    
+    print(f'timers           {len(users)}')
+    print(f'register         {per_op_us(register_time, len(users)):.2f} us/timer')
+    print(f'get_state        {per_op_us(state_time, len(users)):.2f} us/timer')
+    print(f'pause+resume     {per_op_us(churn_time, churn_ops):.2f} us/op ({churn_ops} ops)')
+    print(f'memory           {memory / len(users):.0f} B/timer ({memory / 1024 / 1024:.1f} MiB)')
+    print(f'heap after churn {stats["heap_size"]} entries for {stats["active"]} timers')
+    print(f'idle reap        {idle_reap_time * 1e6:.2f} us/call (nothing due)')
+    print(f'full scan        {scan_time * 1e3:.2f} ms/call ({len(due)} due)')
+    print(f'reap all due     {reap_time * 1e3:.1f} ms ({per_op_us(reap_time, len(reaped)):.2f} us/timer, '
+          f'{len(completed)} completed)')
+    
+    # 監視スレッド: 一斉に期限が来たタイマーを完了させ終えるまでの時間
+    done = threading.Event()
+    remaining = [len(users)]
+    
+    def on_expire(timer, overdue):
+        remaining[0] -= 1
+        if not remaining[0]:
+            done.set()
+    
+    registry = TimerRegistry(on_expire, grace=0).start()
+    start = time.perf_counter()
+    for user_id in users:
+        registry.register(user_id, user_id, 0, '2024-01-01T09:00:00')
+    registered = time.perf_counter() - start
+    done.wait(600)
+    print(f'thread drain     {(time.perf_counter() - start) * 1e3:.1f} ms to register and complete '
+          f'{len(users)} due timers (registration {registered * 1e3:.1f} ms)')
+    registry.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Synthetic load generator: seeds N users and replays a request mix across them.
+
+使い方:
+    python benchmarks/load_generator.py --users 10000 --requests 2000
+    python benchmarks/load_generator.py --users 1000000 --requests 0 --db /tmp/pomodoro_1m.db
+
+--requests 0 の場合はユーザーの作成だけを行う。--db を指定すると作成したDBを残すので、
+他のベンチマークや手動の検証に再利用できる。
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import repositories.database as db_module
+from app import create_app
+from repositories.database import get_db
+
+# 1回の INSERT で書き込む行数
+SEED_CHUNK_SIZE = 50000
+
+# リクエストの内訳（パス, 重み）。セッションの開始と完了は1組として扱う
+REQUEST_MIX = [
+    ('complete', 2),
+    ('/api/dashboard?days=30', 4),
+    ('/api/session/history?limit=10', 2),
+    ('/api/gamification/rank', 1),
+    ('/api/gamification/leaderboard?limit=10', 1),
+]
+
+
+def seed_users(count: int, rng: Optional[random.Random] = None) -> None:
+    """XP・レベル・ストリークがばらついた count 人のユーザーを作成"""
+    rng = rng or random.Random(0)
+    with get_db() as conn:
+        first_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users').fetchone()[0]
+        for offset in range(0, count, SEED_CHUNK_SIZE):
+            rows = []
+            for i in range(offset, min(offset + SEED_CHUNK_SIZE, count)):
+                # 少数のヘビーユーザーと多数のライトユーザーになるよう偏らせる
+                xp = int(rng.paretovariate(1.2) * 50) - 50
+                streak = rng.randrange(0, 30)
+                rows.append((f'user_{first_id + i}', xp, xp // 100 + 1, streak, streak))
+            conn.executemany(
+                '''INSERT INTO users (username, xp, level, current_streak, longest_streak)
+                   VALUES (?, ?, ?, ?, ?)''',
+                rows
+            )
+
+
+def replay(client, user_ids: list, requests: int, rng: random.Random) -> float:
+    """ランダムなユーザーでリクエストを発行し、req/s を返す"""
+    paths = [path for path, _ in REQUEST_MIX]
+    weights = [weight for _, weight in REQUEST_MIX]
+    
+    start = time.perf_counter()
+    for path in rng.choices(paths, weights, k=requests):
+        headers = {'X-User-Id': str(rng.choice(user_ids))}
+        if path == 'complete':
+            response = client.post('/api/session/start', json={'duration': 25}, headers=headers)
+            session_id = response.get_json()['session']['id']
+            client.post(f'/api/session/{session_id}/complete', headers=headers)
+        else:
+            client.get(path, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--active-users', type=int, default=1000,
+                        help='リクエストを発行するユーザー数（キャッシュの効き方に影響する）')
+    parser.add_argument('--db', help='作成するDBのパス（省略時は一時ファイル）')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    if args.db:
+        db_fd, db_path = None, args.db
+    else:
+        db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    db_module.DB_PATH = db_path
+    try:
+        app = create_app()
+        # ユーザーはヘッダーで指定する（認証済みのプロキシの背後と同じ設定）
+        app.config['TRUST_USER_HEADER'] = True
+        client = app.test_client()
+        
+        start = time.perf_counter()
+        seed_users(args.users, rng)
+        print(f'seeded {args.users} users in {time.perf_counter() - start:.2f} s ({db_path})')
+        
+        if args.requests:
+            with get_db() as conn:
+                max_id = conn.execute('SELECT MAX(id) FROM users').fetchone()[0]
+            user_ids = rng.sample(range(1, max_id + 1), min(args.active_users, max_id))
+            throughput = replay(client, user_ids, args.requests, rng)
+            print(f'mixed load ({args.requests} requests, {len(user_ids)} active users): '
+                  f'{throughput:8.1f} req/s')
+    finally:
+        db_module.close_pool()
+        if db_fd is not None:
+            os.close(db_fd)
+            os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
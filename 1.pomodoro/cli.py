@@ -0,0 +1,116 @@
+"""Flask CLI commands for maintenance tasks.
+
+使い方:
+    flask --app app rollups verify
+    flask --app app rollups rebuild
+    flask --app app events verify
+    flask --app app events rebuild
+    flask --app app events snapshot
+    flask --app app streaks recompute
+    flask --app app badges backfill [--chunk-size N] [--workers N] [--restart]
+"""
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from repositories.rollup_repository import RollupRepository
+from services.badge_backfill import BadgeBackfill, DEFAULT_BACKFILL_CHUNK_SIZE
+from services.gamification_service import GamificationService
+from services.replay_service import ReplayService
+
+
+rollups_cli = AppGroup('rollups', help='集計テーブル（user_stats / daily_rollup）の管理')
+events_cli = AppGroup('events', help='セッションイベントログ（session_events）の再生')
+streaks_cli = AppGroup('streaks', help='ストリーク（連続日数）の管理')
+badges_cli = AppGroup('badges', help='バッジ（user_badges）の管理')
+
+
+@rollups_cli.command('verify')
+def verify_rollups():
+    """sessions テーブルから再計算してロールアップとの差分を表示"""
+    drift = RollupRepository.verify()
+    for entry in drift:
+        click.echo(
+            f"{entry['table']} {entry['key']}: "
+            f"expected={entry['expected']} actual={entry['actual']}"
+        )
+    
+    if drift:
+        click.echo(f'{len(drift)} rows drifted', err=True)
+        raise SystemExit(1)
+    click.echo('rollups are consistent')
+
+
+@rollups_cli.command('rebuild')
+def rebuild_rollups():
+    """sessions テーブルからロールアップを作り直す"""
+    users, days = RollupRepository.rebuild()
+    click.echo(f'rebuilt user_stats for {users} users and daily_rollup for {days} user-days')
+
+
+@events_cli.command('verify')
+def verify_events():
+    """イベントログを再生して users / user_badges との差分を表示"""
+    drift = ReplayService().verify()
+    for entry in drift:
+        click.echo(
+            f"{entry['table']} {entry['key']}: "
+            f"expected={entry['expected']} actual={entry['actual']}"
+        )
+    
+    if drift:
+        click.echo(f'{len(drift)} users drifted', err=True)
+        raise SystemExit(1)
+    click.echo('users and user_badges match the event log')
+
+
+@events_cli.command('rebuild')
+def rebuild_from_events():
+    """イベントログから users の進捗と user_badges を作り直す"""
+    users, badges = ReplayService().rebuild()
+    click.echo(f'rebuilt progress for {users} users and {badges} badges')
+
+
+@events_cli.command('snapshot')
+def snapshot_events():
+    """全ユーザーの進捗のスナップショットを保存（以後の再生はこの位置から始まる）"""
+    count = ReplayService().take_snapshots()
+    click.echo(f'saved snapshots for {count} users')
+
+
+@streaks_cli.command('recompute')
+def recompute_streaks():
+    """全ユーザーのストリークを daily_rollup の完了日から計算し直す"""
+    count = GamificationService().recompute_streaks()
+    click.echo(f'recomputed streaks for {count} users')
+
+
+@badges_cli.command('backfill')
+@click.option('--chunk-size', default=DEFAULT_BACKFILL_CHUNK_SIZE, show_default=True,
+              help='1トランザクションで処理するユーザーID の幅')
+@click.option('--workers', default=1, show_default=True, help='並列に処理するプロセス数')
+@click.option('--job', default=None, help='ジョブ名（既定はバッジ定義とチャンク幅から決まる）')
+@click.option('--restart', is_flag=True, help='処理済みのチャンクも含めて最初からやり直す')
+def backfill_badges(chunk_size, workers, job, restart):
+    """現在のバッジ定義で全ユーザーを判定し、未授与のバッジを遡って授与する
+    
+    中断した場合は同じオプションで再実行すると、未処理のチャンクから再開する。
+    """
+    backfill = BadgeBackfill(chunk_size=chunk_size, job=job)
+    if restart:
+        backfill.reset()
+    stats = backfill.run_parallel(workers)
+    done, total, awarded = backfill.progress()
+    click.echo(
+        f"job {backfill.job}: processed {stats['chunks']} chunks ({stats['users']} users), "
+        f"skipped {stats['skipped']} finished chunks, awarded {stats['awarded']} badges"
+    )
+    click.echo(f'progress: {done}/{total} chunks, {awarded} badges awarded in total')
+
+
+def register_commands(app: Flask) -> None:
+    """CLI コマンドをアプリに登録"""
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(events_cli)
+    app.cli.add_command(streaks_cli)
+    app.cli.add_command(badges_cli)
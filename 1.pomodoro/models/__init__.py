@@ -4,5 +4,7 @@ from .user import User
 from .session import PomodoroSession
 from .badge import Badge, UserBadge
 from .statistics import Statistics
+from .user_state import UserState
+from .sync_event import SyncEvent
 
-__all__ = ['User', 'PomodoroSession', 'Badge', 'UserBadge', 'Statistics']
+__all__ = ['User', 'PomodoroSession', 'Badge', 'UserBadge', 'Statistics', 'UserState', 'SyncEvent']
@@ -1,7 +1,32 @@
 """Badge models for gamification."""
 
+import json
+import operator
+import os
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Any, Callable, Dict, Optional, List
+
+try:
+    import yaml
+except ImportError:  # PyYAML は任意の依存。なければ YAML の定義ファイルは読み込めない
+    yaml = None
+
+# バッジの条件に使える指標
+# - streak: 現在のストリーク / total_count: 累計完了数 / focus_minutes: 累計集中時間（分）
+# - weekly_count / monthly_count: 直近7日間・30日間の完了数 / hour: 完了した時刻（0-23時）
+BADGE_METRICS = ('streak', 'weekly_count', 'monthly_count', 'total_count', 'focus_minutes', 'hour')
+
+# 条件の比較演算子（指標 <演算子> 値 を満たせば達成）
+BADGE_OPERATORS: Dict[str, Callable[[int, int], bool]] = {
+    '>=': operator.ge,
+    '>': operator.gt,
+    '<=': operator.le,
+    '<': operator.lt,
+    '==': operator.eq,
+}
+
+# 同梱のバッジ定義ファイル
+BUNDLED_BADGES_FILE = os.path.join(os.path.dirname(__file__), 'badges.json')
 
 
 @dataclass
@@ -12,8 +37,37 @@ class Badge:
     name: str  # 例: "3日連続達成"
     description: str
     icon: str  # アイコン名またはemoji
-    criteria_type: str  # "streak", "weekly_count", "monthly_count", "total_count"
+    criteria_type: str  # BADGE_METRICS のいずれか
     criteria_value: int  # 達成に必要な値
+    criteria_op: str = '>='  # BADGE_OPERATORS のいずれか
+    
+    @classmethod
+    def from_config(cls, entry: Dict[str, Any]) -> 'Badge':
+        """定義ファイルの1件からバッジを作成（不正な定義は ValueError）"""
+        try:
+            badge = cls(
+                id=str(entry['id']),
+                name=str(entry['name']),
+                description=str(entry.get('description', '')),
+                icon=str(entry.get('icon', '')),
+                criteria_type=str(entry['criteria_type']),
+                criteria_value=int(entry['criteria_value']),
+                criteria_op=str(entry.get('criteria_op', '>='))
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f'Invalid badge definition {entry!r}: {exc}') from exc
+        if badge.criteria_type not in BADGE_METRICS:
+            raise ValueError(f'Unknown badge metric {badge.criteria_type!r} in {badge.id!r}')
+        if badge.criteria_op not in BADGE_OPERATORS:
+            raise ValueError(f'Unknown badge operator {badge.criteria_op!r} in {badge.id!r}')
+        return badge
+    
+    def is_met(self, metrics: Dict[str, int]) -> bool:
+        """指標が達成条件を満たしているか（指標がない場合は満たさない）"""
+        value = metrics.get(self.criteria_type)
+        if value is None:
+            return False
+        return BADGE_OPERATORS[self.criteria_op](value, self.criteria_value)
     
     def to_dict(self) -> dict:
         """辞書形式に変換"""
@@ -23,11 +77,12 @@ class Badge:
             'description': self.description,
             'icon': self.icon,
             'criteria_type': self.criteria_type,
-            'criteria_value': self.criteria_value
+            'criteria_value': self.criteria_value,
+            'criteria_op': self.criteria_op
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class UserBadge:
     """ユーザーが取得したバッジ"""
     
@@ -46,54 +101,22 @@ class UserBadge:
         }
 
 
-# 定義済みバッジ
-PREDEFINED_BADGES: List[Badge] = [
-    Badge(
-        id="streak_3",
-        name="3日連続達成",
-        description="3日連続でポモドーロを完了しました",
-        icon="🔥",
-        criteria_type="streak",
-        criteria_value=3
-    ),
-    Badge(
-        id="streak_7",
-        name="1週間連続達成",
-        description="7日連続でポモドーロを完了しました",
-        icon="⭐",
-        criteria_type="streak",
-        criteria_value=7
-    ),
-    Badge(
-        id="weekly_10",
-        name="今週10回完了",
-        description="今週10回のポモドーロを完了しました",
-        icon="🎯",
-        criteria_type="weekly_count",
-        criteria_value=10
-    ),
-    Badge(
-        id="weekly_20",
-        name="今週20回完了",
-        description="今週20回のポモドーロを完了しました",
-        icon="💎",
-        criteria_type="weekly_count",
-        criteria_value=20
-    ),
-    Badge(
-        id="total_50",
-        name="合計50回完了",
-        description="累計50回のポモドーロを完了しました",
-        icon="🏆",
-        criteria_type="total_count",
-        criteria_value=50
-    ),
-    Badge(
-        id="total_100",
-        name="合計100回完了",
-        description="累計100回のポモドーロを完了しました",
-        icon="👑",
-        criteria_type="total_count",
-        criteria_value=100
-    ),
-]
+def load_badges(path: str) -> List[Badge]:
+    """JSON / YAML（.yaml, .yml）のバッジ定義ファイルを読み込む
+    
+    ファイルはバッジ定義のリスト、または {"badges": [...]} の形式。
+    """
+    with open(path, encoding='utf-8') as config:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError('PyYAML is required to load YAML badge definitions')
+            data = yaml.safe_load(config)
+        else:
+            data = json.load(config)
+    
+    entries = data.get('badges', []) if isinstance(data, dict) else data
+    return [Badge.from_config(entry) for entry in entries or []]
+
+
+# 定義済みバッジ（同梱の定義ファイル）
+PREDEFINED_BADGES: List[Badge] = load_badges(BUNDLED_BADGES_FILE)
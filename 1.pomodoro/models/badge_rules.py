@@ -0,0 +1,116 @@
+"""Badge rule set compiled into per-metric threshold indexes."""
+
+import hashlib
+import os
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+from typing import AbstractSet, Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+from .badge import Badge, BUNDLED_BADGES_FILE, load_badges
+
+# バッジ定義ファイル（JSON / YAML。未設定の場合は同梱の定義を使う）
+DEFAULT_BADGES_FILE = os.environ.get('POMODORO_BADGES_FILE', BUNDLED_BADGES_FILE)
+
+# 指標ごとのコンパイル済みの条件:
+# (指標, 下限の昇順, 同じ順のバッジID, 上限の昇順, 同じ順のバッジID, 一致する値 → バッジID)
+_CompiledMetric = Tuple[str, List[int], List[str], List[int], List[str], Dict[int, List[str]]]
+
+
+class BadgeRuleSet:
+    """コンパイル済みのバッジ判定ルール
+    
+    指標は整数のため、条件をすべて「下限」「上限」「一致」に正規化して指標ごとに
+    しきい値の昇順で並べておく（例: hour < 7 は上限 6）。判定は指標ごとに二分探索で
+    満たしているバッジの範囲を切り出し、取得済みのものを集合演算で除くだけで、
+    バッジごとに条件を評価しない。
+    """
+    
+    def __init__(self, badges: Iterable[Badge]):
+        self.badges: List[Badge] = list(badges)
+        self._by_id: Dict[str, Badge] = {}
+        self._order: Dict[str, int] = {}
+        for i, badge in enumerate(self.badges):
+            if badge.id in self._by_id:
+                raise ValueError(f'Duplicate badge id {badge.id!r}')
+            self._by_id[badge.id] = badge
+            self._order[badge.id] = i
+        
+        conditions: Dict[str, Tuple[list, list, Dict[int, List[str]]]] = {}
+        for i, badge in enumerate(self.badges):
+            lower, upper, exact = conditions.setdefault(badge.criteria_type, ([], [], {}))
+            op, value = badge.criteria_op, badge.criteria_value
+            if op in ('>=', '>'):
+                lower.append((value + (op == '>'), i, badge.id))
+            elif op in ('<=', '<'):
+                upper.append((value - (op == '<'), i, badge.id))
+            else:
+                exact.setdefault(value, []).append(badge.id)
+        
+        self._compiled: List[_CompiledMetric] = []
+        self._ids_by_metric: Dict[str, FrozenSet[str]] = {}
+        for metric, (lower, upper, exact) in conditions.items():
+            lower.sort()
+            upper.sort()
+            self._compiled.append((
+                metric,
+                [rule[0] for rule in lower], [rule[2] for rule in lower],
+                [rule[0] for rule in upper], [rule[2] for rule in upper],
+                exact
+            ))
+            self._ids_by_metric[metric] = frozenset(
+                [rule[2] for rule in lower + upper] + [i for ids in exact.values() for i in ids]
+            )
+    
+    @cached_property
+    def fingerprint(self) -> str:
+        """判定条件（ID・指標・演算子・値）から求めた定義の識別子（表示名などは含まない）"""
+        conditions = '\n'.join(
+            f'{b.id}\t{b.criteria_type}\t{b.criteria_op}\t{b.criteria_value}' for b in self.badges
+        )
+        return hashlib.sha1(conditions.encode('utf-8')).hexdigest()[:12]
+    
+    def metrics_for(self, earned: AbstractSet[str]) -> Set[str]:
+        """未取得のバッジの判定に必要な指標（すべて取得済みなら空）"""
+        return {metric for metric, ids in self._ids_by_metric.items() if not ids <= earned}
+    
+    def evaluate(self, metrics: Dict[str, int],
+                 earned: Union[AbstractSet[str], Dict[str, Any]]) -> List[Badge]:
+        """指標が条件を満たす未取得のバッジを定義順に返す（指標がない条件は満たさない）
+        
+        earned は取得済みのバッジIDの集合（またはバッジIDをキーにした dict）。
+        """
+        met: List[str] = []
+        for metric, lower, lower_ids, upper, upper_ids, exact in self._compiled:
+            value = metrics.get(metric)
+            if value is None:
+                continue
+            if lower_ids:
+                met += lower_ids[:bisect_right(lower, value)]
+            if upper_ids:
+                met += upper_ids[bisect_left(upper, value):]
+            if exact:
+                met += exact.get(value, ())
+        
+        if not met:
+            return []
+        new_ids = set(met).difference(earned)
+        return [self._by_id[i] for i in sorted(new_ids, key=self._order.__getitem__)]
+
+
+_rules: Optional[BadgeRuleSet] = None
+
+
+def configure_badge_rules(path: Optional[str] = None,
+                          badges: Optional[Iterable[Badge]] = None) -> BadgeRuleSet:
+    """バッジ定義を読み込んで判定ルールを（再）作成（badges を渡した場合はそれを使う）"""
+    global _rules
+    if badges is None:
+        badges = load_badges(path or DEFAULT_BADGES_FILE)
+    _rules = BadgeRuleSet(badges)
+    return _rules
+
+
+def get_badge_rules() -> BadgeRuleSet:
+    """現在のバッジ判定ルールを取得（未設定の場合は既定の定義ファイルから読み込む）"""
+    if _rules is None:
+        return configure_badge_rules()
+    return _rules
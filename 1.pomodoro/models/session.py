@@ -1,13 +1,24 @@
 """Pomodoro session model."""
 
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
+from .week import local_now
 
+# セッションの長さの上限（分）
+MAX_DURATION_MINUTES = 24 * 60
 
-@dataclass
+
+def parse_duration(value: Any) -> int:
+    """リクエストで指定されたセッションの長さ（分）を検証（上限以下の正の整数でなければ ValueError）"""
+    if not isinstance(value, int) or isinstance(value, bool) \
+            or not 0 < value <= MAX_DURATION_MINUTES:
+        raise ValueError('Invalid duration')
+    return value
+
+
+@dataclass(slots=True)
 class PomodoroSession:
-    """ポモドーロセッションの記録"""
+    """ポモドーロセッションの記録（大量に読み込むため __slots__ で1件あたりのメモリを抑える）"""
     
     id: Optional[int] = None
     user_id: int = 1
@@ -17,10 +28,10 @@ class PomodoroSession:
     completed_at: Optional[str] = None
     xp_earned: int = 0
     
-    def complete(self, xp: int) -> None:
-        """セッションを完了としてマーク"""
+    def complete(self, xp: int, completed_at: Optional[str] = None) -> None:
+        """セッションを完了としてマーク（完了時刻を省略した場合は現在時刻）"""
         self.completed = True
-        self.completed_at = datetime.now().isoformat()
+        self.completed_at = completed_at or local_now().isoformat()
         self.xp_earned = xp
     
     def to_dict(self) -> dict:
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from typing import Optional, List
 
 
-@dataclass
+@dataclass(slots=True)
 class Statistics:
     """ユーザーの統計情報"""
     
@@ -27,9 +27,18 @@ class Statistics:
     
     def update_from_sessions(self, sessions: List['PomodoroSession']) -> None:
         """セッションリストから統計を更新"""
-        self.total_sessions = len(sessions)
-        self.completed_sessions = sum(1 for s in sessions if s.completed)
-        self.total_focus_minutes = sum(s.duration_minutes for s in sessions if s.completed)
+        self.update_from_totals(
+            total_sessions=len(sessions),
+            completed_sessions=sum(1 for s in sessions if s.completed),
+            total_focus_minutes=sum(s.duration_minutes for s in sessions if s.completed)
+        )
+    
+    def update_from_totals(self, total_sessions: int, completed_sessions: int,
+                           total_focus_minutes: int) -> None:
+        """集計済みの合計値から統計を更新"""
+        self.total_sessions = total_sessions
+        self.completed_sessions = completed_sessions
+        self.total_focus_minutes = total_focus_minutes
         
         if self.completed_sessions > 0:
             self.average_focus_minutes = self.total_focus_minutes / self.completed_sessions
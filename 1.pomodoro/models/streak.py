@@ -0,0 +1,58 @@
+"""Streak rules over calendar days in the application timezone."""
+
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+
+def day_number(day: str) -> int:
+    """'YYYY-MM-DD' の日付を通し番号に変換（連続する日付は1ずつ増える）"""
+    return date.fromisoformat(day).toordinal()
+
+
+def next_streak(current: int, last_day: Optional[str], day: str) -> int:
+    """最後の完了日が last_day のとき、day の完了を反映した現在のストリーク
+    
+    日付はセッションの完了時刻（POMODORO_TIMEZONE の時刻）の日付部分のため、
+    日の境界は設定したタイムゾーンの0時になる。前日なら1日延ばし、
+    2日以上空いた場合は1日目からやり直す。同じ日や（遅れて届いた）過去の日付は変えない。
+    """
+    if last_day is None:
+        return 1
+    if day <= last_day:
+        return current
+    if day_number(day) - day_number(last_day) == 1:
+        return current + 1
+    return 1
+
+
+def active_streak(current: int, last_day: Optional[str], today: date) -> int:
+    """today の時点で続いているストリーク
+    
+    最後の完了日が昨日より前なら、記録した長さにかかわらずストリークは途切れている（0）。
+    記録した値と最後の完了日は変えないため、次の完了は next_streak で1日目からやり直す。
+    """
+    if last_day is None or today.toordinal() - day_number(last_day) > 1:
+        return 0
+    return current
+
+
+def streaks_from_days(days: Iterable[str],
+                      today: Optional[date] = None) -> Tuple[int, int, Optional[str]]:
+    """昇順の完了日の列から（現在のストリーク, 最長ストリーク, 最後の完了日）を求める
+    
+    today を指定した場合、昨日より前に途切れたストリークは現在のストリークを 0 にする。
+    """
+    current = longest = 0
+    last_day = None
+    previous = None
+    for day in days:
+        number = day_number(day)
+        if previous is not None and number == previous:
+            continue
+        current = current + 1 if previous is not None and number - previous == 1 else 1
+        longest = max(longest, current)
+        previous = number
+        last_day = day
+    if today is not None:
+        current = active_streak(current, last_day, today)
+    return current, longest, last_day
@@ -0,0 +1,111 @@
+"""Client-generated session events submitted in batches to the sync endpoint."""
+
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from .session import MAX_DURATION_MINUTES, parse_duration
+from .week import local_from_timestamp, local_now
+
+# 1回の同期で受け付けるイベントの最大数
+MAX_SYNC_EVENTS = 100
+
+# 冪等キーの最大長（クライアントは UUID を使う）
+MAX_SYNC_KEY_LENGTH = 64
+
+# 受け付けるイベントの時刻の範囲（日。オフラインで記録してから同期するまでの期間）
+MAX_SYNC_AGE_DAYS = 30
+
+# セッションの長さの上限（分。開始APIと同じ）
+MAX_SYNC_DURATION = MAX_DURATION_MINUTES
+
+SYNC_EVENT_TYPES = ('start', 'complete')
+
+
+@dataclass(slots=True)
+class SyncEvent:
+    """クライアントがオフラインでも記録できるセッションイベント
+    
+    key はクライアントが生成する冪等キーで、同じキーのイベントは2回目以降を適用しない。
+    完了イベントは対象のセッションを、同じクライアントの開始イベントのキー（start_key）
+    またはサーバーのセッションID（session_id）で指定する。write-behind モードでは
+    開始イベントの session_id に採番済みのIDを入れてキューに積む。
+    """
+    
+    key: str
+    type: str
+    occurred_at: str
+    duration_minutes: int = 0
+    start_key: Optional[str] = None
+    session_id: Optional[int] = None
+    
+    @classmethod
+    def from_payload(cls, payload: Any) -> 'SyncEvent':
+        """リクエストの1イベントを検証して変換（不正な場合は ValueError）
+        
+        時刻 at は UNIX 時刻（ミリ秒）で受け取り、設定したタイムゾーンの時刻として記録する。
+        未来の時刻（クライアントの時計のずれ）は現在時刻に丸め、MAX_SYNC_AGE_DAYS 日より
+        前の時刻は拒否する。
+        """
+        if not isinstance(payload, dict):
+            raise ValueError('Event must be an object')
+        key = payload.get('key')
+        if not isinstance(key, str) or not 0 < len(key) <= MAX_SYNC_KEY_LENGTH:
+            raise ValueError('Invalid event key')
+        event_type = payload.get('type')
+        if event_type not in SYNC_EVENT_TYPES:
+            raise ValueError(f'Unknown event type: {event_type!r}')
+        
+        now = local_now()
+        at = payload.get('at')
+        if at is None:
+            occurred_at = now
+        elif isinstance(at, (int, float)) and not isinstance(at, bool):
+            try:
+                occurred_at = min(local_from_timestamp(at / 1000), now)
+            except (OverflowError, OSError, ValueError):
+                raise ValueError('Invalid event time') from None
+            if occurred_at < now - timedelta(days=MAX_SYNC_AGE_DAYS):
+                raise ValueError('Event time is too old')
+        else:
+            raise ValueError('Invalid event time')
+        event = cls(key, event_type, occurred_at.isoformat())
+        
+        if event_type == 'start':
+            event.duration_minutes = parse_duration(payload.get('duration', 25))
+        else:
+            start_key = payload.get('start_key')
+            session_id = payload.get('session_id')
+            if isinstance(start_key, str) and start_key:
+                event.start_key = start_key
+            elif isinstance(session_id, int) and not isinstance(session_id, bool):
+                event.session_id = session_id
+            else:
+                raise ValueError('Complete event requires start_key or session_id')
+        return event
+    
+    @classmethod
+    def parse_batch(cls, payload: Any) -> Tuple[List['SyncEvent'], Dict[int, Dict]]:
+        """リクエストのイベント列を1件ずつ検証し、（正しいイベント, {位置: rejected の結果}）を返す
+        
+        不正なイベントがあっても他のイベントは適用できるよう、バッチ全体は拒否しない。
+        イベント列そのものが不正な場合（リストでない・上限超過）だけ ValueError を送出する。
+        """
+        if not isinstance(payload, list):
+            raise ValueError('events must be a list')
+        if len(payload) > MAX_SYNC_EVENTS:
+            raise ValueError(f'Too many events (max {MAX_SYNC_EVENTS})')
+        
+        events = []
+        rejected = {}
+        for i, item in enumerate(payload):
+            try:
+                events.append(cls.from_payload(item))
+            except ValueError as exc:
+                key = item.get('key') if isinstance(item, dict) else None
+                rejected[i] = {'key': key if isinstance(key, str) else None, 'status': 'rejected',
+                               'session_id': None, 'error': str(exc)}
+        return events, rejected
+    
+    def to_dict(self) -> Dict:
+        """write-behind ログに書き込む dict に変換"""
+        return asdict(self)
@@ -3,9 +3,15 @@
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
+from .streak import active_streak, next_streak
+from .week import local_today
 
 
-@dataclass
+# 1レベルあたりのXP
+XP_PER_LEVEL = 100
+
+
+@dataclass(slots=True)
 class User:
     """ユーザープロフィール（XP、レベル、ストリーク管理）"""
     
@@ -22,22 +28,31 @@ class User:
     @property
     def xp_for_next_level(self) -> int:
         """次のレベルまでに必要なXP"""
-        return self.level * 100
+        return self.level * XP_PER_LEVEL
     
     @property
     def xp_progress_percentage(self) -> float:
         """現在のレベル内でのXP進捗率（0-100）"""
-        level_xp = (self.level - 1) * 100
+        level_xp = (self.level - 1) * XP_PER_LEVEL
         xp_in_current_level = self.xp - level_xp
         return (xp_in_current_level / self.xp_for_next_level) * 100
     
+    @property
+    def active_streak(self) -> int:
+        """今日の時点で続いているストリーク（最後の完了日が昨日より前なら 0）"""
+        return active_streak(self.current_streak, self.last_session_date, local_today())
+    
+    @staticmethod
+    def level_for_xp(xp: int) -> int:
+        """XPに対応するレベル（XP ÷ 100（切り捨て）+ 1）"""
+        return xp // XP_PER_LEVEL + 1
+    
     def add_xp(self, amount: int) -> bool:
         """XPを追加してレベルアップをチェック"""
         self.xp += amount
         old_level = self.level
         
-        # レベル計算: XP ÷ 100（切り捨て）+ 1
-        new_level = (self.xp // 100) + 1
+        new_level = self.level_for_xp(self.xp)
         
         if new_level > old_level:
             self.level = new_level
@@ -45,18 +60,11 @@ class User:
         return False  # レベルアップしなかった
     
     def update_streak(self, session_date: str) -> None:
-        """ストリークを更新"""
-        if self.last_session_date is None:
-            self.current_streak = 1
-            self.longest_streak = max(self.longest_streak, 1)
-        elif self.last_session_date != session_date:
-            # 日付が異なる場合、ストリークを更新
-            # TODO: 連続性チェック（日付の差が1日かどうか）
-            self.current_streak += 1
-            if self.current_streak > self.longest_streak:
-                self.longest_streak = self.current_streak
-        
-        self.last_session_date = session_date
+        """完了日 session_date のストリークを反映（前回の完了日との差だけで決まる O(1) の更新）"""
+        self.current_streak = next_streak(self.current_streak, self.last_session_date, session_date)
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+        if self.last_session_date is None or session_date > self.last_session_date:
+            self.last_session_date = session_date
     
     def to_dict(self) -> dict:
         """辞書形式に変換"""
@@ -65,7 +73,7 @@ class User:
             'username': self.username,
             'xp': self.xp,
             'level': self.level,
-            'current_streak': self.current_streak,
+            'current_streak': self.active_streak,
             'longest_streak': self.longest_streak,
             'last_session_date': self.last_session_date,
             'xp_for_next_level': self.xp_for_next_level,
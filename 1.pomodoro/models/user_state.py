@@ -0,0 +1,109 @@
+"""User progress state folded from the session event log."""
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+from .badge_rules import BadgeRuleSet, get_badge_rules
+from .user import User
+from .week import period_start
+
+# 期間ごとの完了数を指標に使うバッジの条件（直近の開始時刻を保持する必要がある）
+# 期間は完了日を含む直近 N 日（period_start）で、ライブの判定・バックフィルと同じ
+WINDOW_CRITERIA = {'weekly_count': 7, 'monthly_count': 30}
+
+# 保持する開始時刻の最長期間（日）
+_WINDOW_DAYS = max(WINDOW_CRITERIA.values())
+
+
+@dataclass(slots=True)
+class UserState:
+    """イベントログを先頭から畳み込んだユーザーの進捗（XP・レベル・ストリーク・バッジ）
+    
+    完了イベントの適用は、セッション完了時の処理（User.add_xp / update_streak と
+    未取得バッジの判定）と同じ規則で行うため、同じイベント列と同じバッジ定義からは
+    常に同じ状態になる。
+    """
+    
+    user: User
+    completed: int = 0
+    focus_minutes: int = 0
+    # スナップショット（またはログの先頭）の位置。これ以前のイベントは適用済み
+    seq: int = 0
+    # 期間指標の判定に使う、直近の完了セッションの開始時刻（昇順）
+    recent: List[str] = field(default_factory=list)
+    badges: Dict[str, str] = field(default_factory=dict)
+    
+    @classmethod
+    def empty(cls, user_id: int) -> 'UserState':
+        """イベントを適用する前の状態"""
+        return cls(User(id=user_id))
+    
+    def apply_completed(self, started_at: Optional[str], occurred_at: str, xp: int,
+                        duration_minutes: int = 0) -> None:
+        """完了イベントを適用"""
+        user = self.user
+        user.add_xp(xp)
+        day = occurred_at[:10]
+        if day != user.last_session_date:
+            user.update_streak(day)
+        self.completed += 1
+        self.focus_minutes += duration_minutes
+        
+        # すべてのバッジを取得した後は指標を計算しない
+        rules = get_badge_rules()
+        if len(self.badges) < len(rules.badges):
+            self._award_badges(rules, started_at or occurred_at, occurred_at)
+    
+    def _award_badges(self, rules: BadgeRuleSet, started_at: str, occurred_at: str) -> None:
+        """未取得のバッジを完了時点の指標で判定し、達成したものを記録"""
+        criteria_types = rules.metrics_for(self.badges.keys())
+        metrics = {
+            'streak': self.user.current_streak,
+            'total_count': self.completed,
+            'focus_minutes': self.focus_minutes,
+            'hour': int(occurred_at[11:13])
+        }
+        
+        if criteria_types & WINDOW_CRITERIA.keys():
+            today = datetime.fromisoformat(occurred_at).date()
+            recent = self.recent
+            insort(recent, started_at)
+            del recent[:bisect_left(recent, period_start(_WINDOW_DAYS, today).isoformat())]
+            for criteria_type, days in WINDOW_CRITERIA.items():
+                since = period_start(days, today).isoformat()
+                metrics[criteria_type] = len(recent) - bisect_left(recent, since)
+        else:
+            self.recent.clear()
+        
+        for badge in rules.evaluate(metrics, self.badges):
+            self.badges[badge.id] = occurred_at
+    
+    def to_snapshot(self) -> Dict:
+        """スナップショットとして保存する dict に変換"""
+        user = self.user
+        return {
+            'xp': user.xp,
+            'level': user.level,
+            'current_streak': user.current_streak,
+            'longest_streak': user.longest_streak,
+            'last_session_date': user.last_session_date,
+            'completed': self.completed,
+            'focus_minutes': self.focus_minutes,
+            'recent': self.recent,
+            'badges': self.badges
+        }
+    
+    @classmethod
+    def from_snapshot(cls, user_id: int, seq: int, snapshot: Dict) -> 'UserState':
+        """スナップショットから状態を復元"""
+        user = User(
+            id=user_id,
+            xp=snapshot['xp'],
+            level=snapshot['level'],
+            current_streak=snapshot['current_streak'],
+            longest_streak=snapshot['longest_streak'],
+            last_session_date=snapshot['last_session_date']
+        )
+        return cls(user, snapshot['completed'], snapshot['focus_minutes'], seq,
+                   list(snapshot['recent']), dict(snapshot['badges']))
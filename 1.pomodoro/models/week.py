@@ -0,0 +1,116 @@
+"""ISO-8601 week model and the application clock."""
+
+import os
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+# 日付の境界に使うタイムゾーン（未設定の場合はサーバーのローカル時刻）
+DEFAULT_TIMEZONE = os.environ.get('POMODORO_TIMEZONE', '')
+
+_timezone: Optional[tzinfo] = ZoneInfo(DEFAULT_TIMEZONE) if DEFAULT_TIMEZONE else None
+
+
+def configure_timezone(name: Optional[str]) -> None:
+    """日付の境界に使うタイムゾーンを設定（空文字・None でサーバーのローカル時刻）
+    
+    不明なタイムゾーン名の場合は ZoneInfoNotFoundError を送出する。
+    """
+    global _timezone
+    _timezone = ZoneInfo(name) if name else None
+
+
+def get_timezone() -> Optional[tzinfo]:
+    """設定中のタイムゾーンを取得"""
+    return _timezone
+
+
+def local_now() -> datetime:
+    """設定したタイムゾーンでの現在時刻（タイムゾーン情報なし）
+    
+    セッションの開始・完了時刻はこの値で記録するため、日付の境界は常に同じ基準になる。
+    """
+    if _timezone is None:
+        return datetime.now()
+    return datetime.now(_timezone).replace(tzinfo=None)
+
+
+def local_from_timestamp(timestamp: float) -> datetime:
+    """UNIX 時刻（秒）を設定したタイムゾーンの時刻（タイムゾーン情報なし）に変換"""
+    if _timezone is None:
+        return datetime.fromtimestamp(timestamp)
+    return datetime.fromtimestamp(timestamp, _timezone).replace(tzinfo=None)
+
+
+def local_today() -> date:
+    """設定したタイムゾーンでの今日の日付"""
+    return local_now().date()
+
+
+def localize(value: datetime) -> datetime:
+    """local_now() で記録したタイムゾーン情報のない時刻に、設定したタイムゾーンを付与"""
+    if _timezone is None:
+        return value.astimezone()
+    return value.replace(tzinfo=_timezone)
+
+
+def period_start(days: int, today: Optional[date] = None) -> datetime:
+    """今日を含む直近 days 日の期間の開始時刻（days - 1 日前の 00:00）
+    
+    期間は日付が変わるときだけ動くため、同じ日の間は書き込みがなければ集計結果も変わらない。
+    """
+    start = (today or local_today()) - timedelta(days=days - 1)
+    return datetime.combine(start, datetime.min.time())
+
+
+@dataclass(frozen=True, order=True)
+class IsoWeek:
+    """ISO 8601 形式の週（月曜開始、第1週は最初の木曜日を含む週）"""
+    
+    year: int
+    week: int
+    
+    @classmethod
+    def of(cls, day: date) -> 'IsoWeek':
+        """日付が属する週を取得"""
+        year, week, _ = day.isocalendar()
+        return cls(year, week)
+    
+    @classmethod
+    def current(cls) -> 'IsoWeek':
+        """今週を取得"""
+        return cls.of(local_today())
+    
+    @classmethod
+    def parse(cls, value: str) -> 'IsoWeek':
+        """'2024-W03' 形式の文字列から週を作成（不正な場合は ValueError）"""
+        year, sep, week = value.partition('-W')
+        if not sep or not year.isdigit() or not week.isdigit():
+            raise ValueError(f'Invalid ISO week: {value!r}')
+        return cls.of(date.fromisocalendar(int(year), int(week), 1))
+    
+    @property
+    def start(self) -> date:
+        """週の初日（月曜日）"""
+        return date.fromisocalendar(self.year, self.week, 1)
+    
+    @property
+    def end(self) -> date:
+        """週の最終日（日曜日）"""
+        return self.start + timedelta(days=6)
+    
+    def shift(self, weeks: int) -> 'IsoWeek':
+        """weeks 週後（負の値で前）の週を取得"""
+        return IsoWeek.of(self.start + timedelta(weeks=weeks))
+    
+    def previous(self) -> 'IsoWeek':
+        """前の週を取得"""
+        return self.shift(-1)
+    
+    def is_closed(self, today: Optional[date] = None) -> bool:
+        """週が終わっているか（終わった週の集計は以後変わらない）"""
+        return self.end < (today or local_today())
+    
+    def __str__(self) -> str:
+        return f'{self.year}-W{self.week:02d}'
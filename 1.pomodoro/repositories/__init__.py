@@ -3,6 +3,14 @@
 from .user_repository import UserRepository
 from .session_repository import SessionRepository
 from .badge_repository import BadgeRepository
-from .database import init_db, get_db
+from .rollup_repository import RollupRepository
+from .write_behind_repository import WriteBehindRepository
+from .event_repository import EventRepository
+from .badge_backfill_repository import BadgeBackfillRepository
+from .sync_repository import SyncRepository
+from .database import init_db, get_db, transaction, snapshot
+from .async_db import run_db
 
-__all__ = ['UserRepository', 'SessionRepository', 'BadgeRepository', 'init_db', 'get_db']
+__all__ = ['UserRepository', 'SessionRepository', 'BadgeRepository', 'RollupRepository',
+           'WriteBehindRepository', 'EventRepository', 'BadgeBackfillRepository',
+           'SyncRepository', 'init_db', 'get_db', 'transaction', 'snapshot', 'run_db']
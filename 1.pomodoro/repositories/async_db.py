@@ -0,0 +1,53 @@
+"""Async data-access path that runs blocking repository calls on a dedicated DB thread pool."""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar('T')
+
+# DB にアクセスする処理（ASGI モードでは Flask のリクエストも含む）を実行するスレッド数
+DEFAULT_DB_THREADS = int(os.environ.get('POMODORO_DB_THREADS', '8'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure_db_executor(threads: int = DEFAULT_DB_THREADS) -> ThreadPoolExecutor:
+    """DB 用のスレッドプールを（再）作成
+    
+    接続はスレッドローカルのため、各スレッドはプールから取得した接続を get_db() で
+    そのまま使う。同時に DB にアクセスするのは最大 threads スレッドで、
+    イベントループのスレッドは DB の I/O を待たない。
+    """
+    global _executor
+    close_db_executor()
+    _executor = ThreadPoolExecutor(max(threads, 1), thread_name_prefix='db')
+    return _executor
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """DB 用のスレッドプールを取得（未作成の場合は既定のスレッド数で作成）"""
+    if _executor is None:
+        return configure_db_executor()
+    return _executor
+
+
+def close_db_executor() -> None:
+    """DB 用のスレッドプールを停止（実行中の処理の終了を待つ）"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """ブロックする処理（リポジトリ・サービスの呼び出し）を DB スレッドで実行して結果を待つ
+    
+    例: user = await run_db(UserRepository.get_by_id, user_id)
+    """
+    loop = asyncio.get_running_loop()
+    if kwargs:
+        func = functools.partial(func, **kwargs)
+    return await loop.run_in_executor(get_db_executor(), func, *args)
@@ -0,0 +1,129 @@
+"""Repository for the set-based badge backfill over user-id ranges."""
+
+from typing import Dict, Iterable, List, Set, Tuple
+from .database import get_db
+
+
+class BadgeBackfillRepository:
+    """バッジのバックフィル用の範囲集計と進捗へのアクセス
+    
+    いずれのクエリもユーザーID の範囲（両端を含む）を1回で集計し、
+    ユーザーごとのクエリは発行しない。
+    """
+    
+    @staticmethod
+    def get_user_id_bounds() -> Tuple[int, int]:
+        """ユーザーID の最小値と最大値（ユーザーがいなければ (0, 0)）"""
+        with get_db() as conn:
+            row = conn.execute('SELECT MIN(id), MAX(id) FROM users').fetchone()
+            return (row[0] or 0, row[1] or 0)
+    
+    @staticmethod
+    def get_totals(start_id: int, end_id: int) -> List[Tuple[int, int, int, int]]:
+        """範囲内のユーザーの (user_id, 最長ストリーク, 累計完了数, 累計集中時間) を取得"""
+        with get_db() as conn:
+            cursor = conn.execute(
+                '''SELECT u.id, u.longest_streak,
+                          COALESCE(s.completed_sessions, 0), COALESCE(s.total_focus_minutes, 0)
+                   FROM users u
+                   LEFT JOIN user_stats s ON s.user_id = u.id
+                   WHERE u.id BETWEEN ? AND ?''',
+                (start_id, end_id)
+            )
+            return cursor.fetchall()
+    
+    @staticmethod
+    def get_period_counts(start_id: int, end_id: int, week_ago: str,
+                          month_ago: str) -> Dict[int, Tuple[int, int]]:
+        """範囲内のユーザーの直近7日・30日の完了数を {user_id: (週間, 月間)} で取得
+        
+        get_period_statistics と同じ条件（開始時刻が期間内の完了セッション）を
+        idx_sessions_user_started だけで集計する。完了のないユーザーは含まない。
+        """
+        with get_db() as conn:
+            cursor = conn.execute(
+                '''SELECT user_id, SUM(started_at >= ?), COUNT(*)
+                   FROM sessions
+                   WHERE user_id BETWEEN ? AND ? AND started_at >= ? AND completed = 1
+                   GROUP BY user_id''',
+                (week_ago, start_id, end_id, month_ago)
+            )
+            return {user_id: (weekly, monthly) for user_id, weekly, monthly in cursor}
+    
+    @staticmethod
+    def get_completion_hours(start_id: int, end_id: int) -> Dict[int, List[int]]:
+        """範囲内のユーザーが完了したことのある時（0〜23）を {user_id: [時]} で取得
+        
+        完了済みのみの部分インデックス idx_sessions_user_completed_at だけで読む。
+        """
+        with get_db() as conn:
+            cursor = conn.execute(
+                '''SELECT DISTINCT user_id, CAST(substr(completed_at, 12, 2) AS INTEGER)
+                   FROM sessions
+                   WHERE user_id BETWEEN ? AND ? AND completed = 1
+                     AND completed_at IS NOT NULL''',
+                (start_id, end_id)
+            )
+            hours: Dict[int, List[int]] = {}
+            for user_id, hour in cursor:
+                hours.setdefault(user_id, []).append(hour)
+            return hours
+    
+    @staticmethod
+    def get_earned(start_id: int, end_id: int) -> Dict[int, Set[str]]:
+        """範囲内のユーザーの取得済みバッジIDを {user_id: {badge_id}} で取得"""
+        with get_db() as conn:
+            cursor = conn.execute(
+                'SELECT user_id, badge_id FROM user_badges WHERE user_id BETWEEN ? AND ?',
+                (start_id, end_id)
+            )
+            earned: Dict[int, Set[str]] = {}
+            for user_id, badge_id in cursor:
+                earned.setdefault(user_id, set()).add(badge_id)
+            return earned
+    
+    @staticmethod
+    def insert_awards(awards: Iterable[Tuple[int, str]]) -> int:
+        """(user_id, badge_id) をまとめて授与し、新規授与数を返す（取得済みは無視する）"""
+        with get_db() as conn:
+            cursor = conn.executemany(
+                'INSERT OR IGNORE INTO user_badges (user_id, badge_id) VALUES (?, ?)',
+                awards
+            )
+            return max(cursor.rowcount, 0)
+    
+    @staticmethod
+    def get_done_chunks(job: str) -> Set[int]:
+        """ジョブで処理済みのチャンクの開始ID"""
+        with get_db() as conn:
+            cursor = conn.execute(
+                'SELECT start_id FROM badge_backfill_chunks WHERE job = ?', (job,)
+            )
+            return {row[0] for row in cursor}
+    
+    @staticmethod
+    def mark_chunk_done(job: str, start_id: int, end_id: int, awarded: int) -> None:
+        """チャンクを処理済みとして記録（授与と同じトランザクションで呼び出す）"""
+        with get_db() as conn:
+            conn.execute(
+                '''INSERT OR REPLACE INTO badge_backfill_chunks (job, start_id, end_id, awarded)
+                   VALUES (?, ?, ?, ?)''',
+                (job, start_id, end_id, awarded)
+            )
+    
+    @staticmethod
+    def get_progress(job: str) -> Tuple[int, int]:
+        """ジョブの (処理済みチャンク数, 授与数の合計)"""
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(awarded), 0) FROM badge_backfill_chunks WHERE job = ?',
+                (job,)
+            ).fetchone()
+            return (row[0], row[1])
+    
+    @staticmethod
+    def clear(job: str) -> int:
+        """ジョブの進捗を削除し、削除したチャンク数を返す"""
+        with get_db() as conn:
+            cursor = conn.execute('DELETE FROM badge_backfill_chunks WHERE job = ?', (job,))
+            return cursor.rowcount
@@ -1,9 +1,11 @@
 """Badge repository for data access."""
 
-from typing import List
+from typing import Dict, Iterable, List, Set, Tuple
 from datetime import datetime
-from models.badge import Badge, UserBadge, PREDEFINED_BADGES
-from .database import get_db
+from models.badge import Badge, UserBadge
+from models.badge_rules import get_badge_rules
+from .database import get_db, notify_user_changed
+from .row_mappers import USER_BADGE_COLUMNS, mapped_cursor, user_badge_from_row
 
 
 class BadgeRepository:
@@ -11,56 +13,43 @@ class BadgeRepository:
     
     @staticmethod
     def get_all_badges() -> List[Badge]:
-        """すべてのバッジ定義を取得"""
-        return PREDEFINED_BADGES
+        """すべてのバッジ定義を取得（設定したバッジ定義ファイルの内容）"""
+        return get_badge_rules().badges
     
     @staticmethod
     def get_user_badges(user_id: int) -> List[UserBadge]:
         """ユーザーが取得したバッジを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
+            cursor = mapped_cursor(conn, user_badge_from_row)
             cursor.execute(
-                'SELECT * FROM user_badges WHERE user_id = ? ORDER BY earned_at DESC',
+                f'''SELECT {USER_BADGE_COLUMNS} FROM user_badges
+                    WHERE user_id = ? ORDER BY earned_at DESC''',
                 (user_id,)
             )
-            rows = cursor.fetchall()
-            
-            return [
-                UserBadge(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    badge_id=row['badge_id'],
-                    earned_at=row['earned_at']
-                )
-                for row in rows
-            ]
+            return cursor.fetchall()
     
     @staticmethod
     def award_badge(user_id: int, badge_id: str) -> UserBadge:
         """ユーザーにバッジを授与"""
         with get_db() as conn:
-            cursor = conn.cursor()
+            cursor = mapped_cursor(conn, user_badge_from_row)
             
             # 既に取得済みかチェック
             cursor.execute(
-                'SELECT * FROM user_badges WHERE user_id = ? AND badge_id = ?',
+                f'SELECT {USER_BADGE_COLUMNS} FROM user_badges WHERE user_id = ? AND badge_id = ?',
                 (user_id, badge_id)
             )
             existing = cursor.fetchone()
             
             if existing:
-                return UserBadge(
-                    id=existing['id'],
-                    user_id=existing['user_id'],
-                    badge_id=existing['badge_id'],
-                    earned_at=existing['earned_at']
-                )
+                return existing
             
             # 新規バッジを授与
             cursor.execute(
                 'INSERT INTO user_badges (user_id, badge_id) VALUES (?, ?)',
                 (user_id, badge_id)
             )
+            notify_user_changed(user_id)
             
             return UserBadge(
                 id=cursor.lastrowid,
@@ -80,3 +69,56 @@ class BadgeRepository:
             )
             count = cursor.fetchone()[0]
             return count > 0
+    
+    @staticmethod
+    def get_earned_badge_ids(user_id: int) -> Set[str]:
+        """ユーザーが取得済みのバッジIDを1回のクエリで取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT badge_id FROM user_badges WHERE user_id = ?',
+                (user_id,)
+            )
+            return {row['badge_id'] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def award_badges(user_id: int, badge_ids: List[str]) -> int:
+        """複数のバッジを1回の INSERT でまとめて授与し、新規授与数を返す"""
+        if not badge_ids:
+            return 0
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            placeholders = ', '.join(['(?, ?)'] * len(badge_ids))
+            params = [value for badge_id in badge_ids for value in (user_id, badge_id)]
+            # 取得済みのバッジは UNIQUE(user_id, badge_id) により無視される
+            cursor.execute(
+                f'INSERT OR IGNORE INTO user_badges (user_id, badge_id) VALUES {placeholders}',
+                params
+            )
+            if cursor.rowcount > 0:
+                notify_user_changed(user_id)
+            return cursor.rowcount
+    
+    @staticmethod
+    def get_all_earned() -> Dict[int, Set[str]]:
+        """全ユーザーの取得済みバッジIDを {user_id: {badge_id}} で取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT user_id, badge_id FROM user_badges')
+            earned: Dict[int, Set[str]] = {}
+            for user_id, badge_id in cursor.fetchall():
+                earned.setdefault(user_id, set()).add(badge_id)
+            return earned
+    
+    @staticmethod
+    def replace_all(badges: Iterable[Tuple[int, str, str]]) -> int:
+        """(user_id, badge_id, earned_at) で全ユーザーの取得済みバッジを置き換え、件数を返す"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM user_badges')
+            cursor.executemany(
+                'INSERT INTO user_badges (user_id, badge_id, earned_at) VALUES (?, ?, ?)',
+                badges
+            )
+            return cursor.rowcount
@@ -1,17 +1,276 @@
 """Database initialization and connection."""
 
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from queue import LifoQueue, Empty, Full
+from typing import Callable, Dict, Generator, List, Optional, Set, Tuple, Union
 import os
+from models.week import local_now
 
 
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'pomodoro.db')
 
+# コネクションプールの最大保持数（0 の場合はプールせず毎回接続を閉じる）
+DEFAULT_POOL_SIZE = int(os.environ.get('POMODORO_DB_POOL_SIZE', '5'))
+
+# ストレージプロファイル（接続ごとに適用する PRAGMA の組み合わせ）
+# - durable: 電源断でもコミット済みデータを失わない
+# - balanced: WAL + synchronous=NORMAL（アプリクラッシュでは失わない）
+# - throughput: fsync を省略して書き込み性能を優先（OSクラッシュで直近のコミットを失う可能性あり）
+STORAGE_PROFILES: Dict[str, Dict[str, Union[str, int]]] = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'throughput': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+}
+
+DEFAULT_STORAGE_PROFILE = os.environ.get('POMODORO_DB_PROFILE', 'balanced')
+
+# sessions テーブルからロールアップを再計算するクエリ（マイグレーションと検証で共用）
+ROLLUP_USER_STATS_SQL = '''
+    SELECT user_id,
+           COUNT(*),
+           COALESCE(SUM(completed = 1), 0),
+           COALESCE(SUM(CASE WHEN completed = 1 THEN duration_minutes END), 0),
+           COALESCE(SUM(CASE WHEN completed = 1 THEN xp_earned END), 0)
+    FROM sessions
+    GROUP BY user_id
+'''
+
+ROLLUP_DAILY_SQL = '''
+    SELECT user_id, day, SUM(started), SUM(completed), SUM(focus), SUM(xp)
+    FROM (
+        SELECT user_id, substr(started_at, 1, 10) AS day,
+               1 AS started, 0 AS completed, 0 AS focus, 0 AS xp
+        FROM sessions
+        UNION ALL
+        SELECT user_id, substr(completed_at, 1, 10),
+               0, 1, duration_minutes, xp_earned
+        FROM sessions
+        WHERE completed = 1 AND completed_at IS NOT NULL
+    )
+    GROUP BY user_id, day
+'''
+
+# daily_rollup の完了日（主キー (user_id, day) がユーザーごとの重複のない日付の索引になる）から
+# （現在のストリーク, 最長ストリーク, 最後の完了日）を1回の走査で求めるクエリ。
+# 連続する日付は「日付 - 順位」が同じ値になるため、その値でまとめた区間が1つのストリークになる
+STREAKS_SQL = '''
+    SELECT user_id, length AS current_streak, longest_streak, last_day
+    FROM (
+        SELECT user_id, length, last_day,
+               MAX(length) OVER (PARTITION BY user_id) AS longest_streak,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY last_day DESC) AS recency
+        FROM (
+            SELECT user_id, COUNT(*) AS length, MAX(day) AS last_day
+            FROM (
+                SELECT user_id, day,
+                       julianday(day) - ROW_NUMBER() OVER (
+                           PARTITION BY user_id ORDER BY day
+                       ) AS run
+                FROM daily_rollup
+                WHERE completed_sessions > 0
+            )
+            GROUP BY user_id, run
+        )
+    )
+    WHERE recency = 1
+'''
+
+# 全ユーザーのストリークを完了日から計算し直し、値の変わった行だけを更新する（マイグレーション用。
+# 運用中の再計算は GamificationService.recompute_streaks が同じ索引を Python で畳み込む）。
+# 結合はクエリの結果を先に読み、users を主キーで引く
+RECOMPUTE_STREAKS_SQL = f'''
+    UPDATE users
+    SET current_streak = streaks.current_streak,
+        longest_streak = streaks.longest_streak,
+        last_session_date = streaks.last_day
+    FROM ({STREAKS_SQL}) AS streaks
+    WHERE users.id = streaks.user_id
+      AND (users.current_streak IS NOT streaks.current_streak
+           OR users.longest_streak IS NOT streaks.longest_streak
+           OR users.last_session_date IS NOT streaks.last_day)
+'''
+
+# 完了日のないユーザーのストリークを初期状態に戻す
+CLEAR_STREAKS_SQL = '''
+    UPDATE users
+    SET current_streak = 0, longest_streak = 0, last_session_date = NULL
+    WHERE (current_streak != 0 OR longest_streak != 0 OR last_session_date IS NOT NULL)
+      AND NOT EXISTS (
+          SELECT 1 FROM daily_rollup
+          WHERE daily_rollup.user_id = users.id AND completed_sessions > 0
+      )
+'''
+
+# スキーママイグレーション（PRAGMA user_version に適用済みバージョンを記録する）
+MIGRATIONS: List[Tuple[int, List[str]]] = [
+    (1, [
+        # get_by_user / 週間・月間の期間検索と集計（ORDER BY started_at もカバー）
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_user_started
+           ON sessions (user_id, started_at, completed, duration_minutes)''',
+        # get_completed_by_user と完了日ベースの集計（完了済みのみの部分インデックス）
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_user_completed_at
+           ON sessions (user_id, completed_at, duration_minutes)
+           WHERE completed = 1''',
+        # get_user_badges（ORDER BY earned_at まで含めたカバリングインデックス）
+        '''CREATE INDEX IF NOT EXISTS idx_user_badges_user_earned
+           ON user_badges (user_id, earned_at, badge_id)''',
+    ]),
+    (2, [
+        # ユーザーごとの累計カウンタ（セッション開始・完了時に差分更新）
+        '''CREATE TABLE IF NOT EXISTS user_stats (
+               user_id INTEGER PRIMARY KEY,
+               total_sessions INTEGER NOT NULL DEFAULT 0,
+               completed_sessions INTEGER NOT NULL DEFAULT 0,
+               total_focus_minutes INTEGER NOT NULL DEFAULT 0,
+               total_xp INTEGER NOT NULL DEFAULT 0,
+               FOREIGN KEY (user_id) REFERENCES users (id)
+           )''',
+        # 日別ロールアップ（開始数は開始日、完了数・集中時間・XPは完了日で集計）
+        '''CREATE TABLE IF NOT EXISTS daily_rollup (
+               user_id INTEGER NOT NULL,
+               day TEXT NOT NULL,
+               started_sessions INTEGER NOT NULL DEFAULT 0,
+               completed_sessions INTEGER NOT NULL DEFAULT 0,
+               focus_minutes INTEGER NOT NULL DEFAULT 0,
+               xp_earned INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (user_id, day)
+           ) WITHOUT ROWID''',
+        # 既存のセッションからロールアップを作成
+        'INSERT INTO user_stats ' + ROLLUP_USER_STATS_SQL,
+        'INSERT INTO daily_rollup ' + ROLLUP_DAILY_SQL,
+    ]),
+    (3, [
+        # 書き込みのたびに進むユーザー単位のリビジョン（ETag の生成に使う）
+        'ALTER TABLE users ADD COLUMN revision INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (4, [
+        # リーダーボード（XP降順の上位N件と順位計算をインデックスだけで行う）
+        'CREATE INDEX IF NOT EXISTS idx_users_xp ON users (xp DESC, id)',
+    ]),
+    (5, [
+        # 履歴のキーセットページング（started_at が同じ場合も id で順序を確定させる）
+        'CREATE INDEX IF NOT EXISTS idx_sessions_user_started_id ON sessions (user_id, started_at, id)',
+    ]),
+    (6, [
+        # write-behind ログの適用済み位置（イベントと同じトランザクションで進め、再生を冪等にする）
+        '''CREATE TABLE IF NOT EXISTS write_behind_state (
+               id INTEGER PRIMARY KEY CHECK (id = 1),
+               applied_seq INTEGER NOT NULL DEFAULT 0
+           )''',
+    ]),
+    (7, [
+        # セッションイベントログ（追記専用。users / user_badges はここから再構築できる）
+        '''CREATE TABLE IF NOT EXISTS session_events (
+               seq INTEGER PRIMARY KEY AUTOINCREMENT,
+               type TEXT NOT NULL,
+               user_id INTEGER NOT NULL,
+               session_id INTEGER NOT NULL,
+               duration_minutes INTEGER NOT NULL,
+               xp_earned INTEGER NOT NULL DEFAULT 0,
+               started_at TEXT,
+               occurred_at TEXT NOT NULL
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_session_events_user ON session_events (user_id, seq)',
+        # 追記以外の変更を禁止する
+        '''CREATE TRIGGER IF NOT EXISTS session_events_no_update
+           BEFORE UPDATE ON session_events
+           BEGIN SELECT RAISE(ABORT, 'session_events is append-only'); END''',
+        '''CREATE TRIGGER IF NOT EXISTS session_events_no_delete
+           BEFORE DELETE ON session_events
+           BEGIN SELECT RAISE(ABORT, 'session_events is append-only'); END''',
+        # ユーザーごとの進捗のスナップショット（seq までのイベントを畳み込んだ状態）
+        '''CREATE TABLE IF NOT EXISTS user_snapshots (
+               user_id INTEGER PRIMARY KEY,
+               seq INTEGER NOT NULL,
+               state TEXT NOT NULL,
+               created_at TEXT DEFAULT CURRENT_TIMESTAMP
+           )''',
+        # 既存のセッションからイベントを作成（発生時刻順。同時刻は開始を先にする）
+        '''INSERT INTO session_events
+               (type, user_id, session_id, duration_minutes, xp_earned, started_at, occurred_at)
+           SELECT type, user_id, id, duration_minutes, xp_earned, started_at, occurred_at
+           FROM (
+               SELECT 'started' AS type, user_id, id, duration_minutes, 0 AS xp_earned,
+                      started_at, started_at AS occurred_at
+               FROM sessions
+               UNION ALL
+               SELECT 'completed', user_id, id, duration_minutes, xp_earned,
+                      started_at, completed_at
+               FROM sessions
+               WHERE completed = 1 AND completed_at IS NOT NULL
+           )
+           ORDER BY occurred_at, id, type DESC''',
+    ]),
+    (8, [
+        # 日付の間隔を見ずに加算していたストリークを完了日から計算し直す
+        RECOMPUTE_STREAKS_SQL,
+        CLEAR_STREAKS_SQL,
+        # 古い規則で畳み込んだスナップショットは使わず、次回の再生はログの先頭から行う
+        'DELETE FROM user_snapshots',
+    ]),
+    (9, [
+        # スナップショットに累計集中時間（バッジの指標）を追加したため、古い形式は破棄する
+        'DELETE FROM user_snapshots',
+    ]),
+    (10, [
+        # バッジのバックフィルの進捗（中断後は処理済みのチャンクを飛ばして再開する）
+        '''CREATE TABLE IF NOT EXISTS badge_backfill_chunks (
+               job TEXT NOT NULL,
+               start_id INTEGER NOT NULL,
+               end_id INTEGER NOT NULL,
+               awarded INTEGER NOT NULL DEFAULT 0,
+               finished_at TEXT DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (job, start_id)
+           ) WITHOUT ROWID''',
+    ]),
+    (11, [
+        # /api/sync で適用済みのクライアントのイベント（冪等キー → 対象のセッション）
+        '''CREATE TABLE IF NOT EXISTS sync_keys (
+               user_id INTEGER NOT NULL,
+               key TEXT NOT NULL,
+               session_id INTEGER,
+               created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (user_id, key)
+           ) WITHOUT ROWID''',
+    ]),
+    (12, [
+        # 期間指標を日単位（period_start）で数えるようにしたため、直近の開始時刻を
+        # 移動する範囲で保持した古いスナップショットは破棄する
+        'DELETE FROM user_snapshots',
+    ]),
+]
+
 
 def init_db() -> None:
     """データベースを初期化"""
+    # DB_PATH が差し替えられた場合に古いプールを破棄する
+    pool = get_pool()
+    
     conn = sqlite3.connect(DB_PATH)
+    apply_storage_profile(conn, pool.profile)
     cursor = conn.cursor()
     
     # ユーザーテーブル
@@ -59,24 +318,288 @@ def init_db() -> None:
     cursor.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('default_user',))
     if cursor.fetchone()[0] == 0:
         cursor.execute(
-            'INSERT INTO users (username, xp, level) VALUES (?, ?, ?)',
-            ('default_user', 0, 1)
+            'INSERT INTO users (username, xp, level, updated_at) VALUES (?, ?, ?, ?)',
+            ('default_user', 0, 1, local_now().isoformat())
         )
     
     conn.commit()
+    migrate(conn)
     conn.close()
 
 
+def migrate(conn: sqlite3.Connection) -> int:
+    """未適用のスキーママイグレーションを適用し、現在のバージョンを返す"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    
+    for target, statements in MIGRATIONS:
+        if target <= version:
+            continue
+        try:
+            # DDL も含めて1バージョン分を1トランザクションで適用する
+            conn.execute('BEGIN')
+            for statement in statements:
+                conn.execute(statement)
+            # PRAGMA はパラメータ化できないが、値はコード内定義の整数のみ
+            conn.execute(f'PRAGMA user_version = {int(target)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    
+    return version
+
+
+def apply_storage_profile(conn: sqlite3.Connection,
+                          profile: Union[str, Dict[str, Union[str, int]]]) -> None:
+    """接続にストレージプロファイルの PRAGMA を適用"""
+    if isinstance(profile, str):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f'Unknown storage profile: {profile}')
+        profile = STORAGE_PROFILES[profile]
+    
+    # PRAGMA はパラメータ化できないため、値は定義済みプロファイルからのみ受け付ける
+    for name in ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size',
+                 'mmap_size', 'temp_store'):
+        if name in profile:
+            conn.execute(f'PRAGMA {name} = {profile[name]}')
+
+
+class ConnectionPool:
+    """SQLite コネクションプール
+    
+    アイドル状態の接続を最大 ``size`` 個まで保持して再利用する。
+    貸し出し時に疎通確認を行い、壊れた接続は破棄して作り直す。
+    """
+    
+    def __init__(self, db_path: str, size: int = DEFAULT_POOL_SIZE,
+                 profile: str = DEFAULT_STORAGE_PROFILE):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f'Unknown storage profile: {profile}')
+        self.db_path = db_path
+        self.size = size
+        self.profile = profile
+        self._idle: LifoQueue = LifoQueue(maxsize=max(size, 1))
+        self._closed = False
+        self.created = 0
+    
+    def _connect(self) -> sqlite3.Connection:
+        """新しい接続を作成"""
+        # プールを介してスレッド間で受け渡すため check_same_thread は無効化する
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        apply_storage_profile(conn, self.profile)
+        self.created += 1
+        return conn
+    
+    @staticmethod
+    def _is_ready(conn: sqlite3.Connection) -> bool:
+        """接続が利用可能な状態かチェック"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def acquire(self) -> sqlite3.Connection:
+        """接続を取得（アイドル接続があれば再利用）"""
+        if self._closed:
+            raise sqlite3.ProgrammingError('Connection pool is closed')
+        
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                return self._connect()
+            
+            if self._is_ready(conn):
+                return conn
+            self._discard(conn)
+    
+    def release(self, conn: sqlite3.Connection) -> None:
+        """接続をプールに返却"""
+        if self._closed or self.size <= 0:
+            self._discard(conn)
+            return
+        
+        # 未確定のトランザクションを残したまま再利用しない
+        if conn.in_transaction:
+            conn.rollback()
+        
+        try:
+            self._idle.put_nowait(conn)
+        except Full:
+            self._discard(conn)
+    
+    @staticmethod
+    def _discard(conn: sqlite3.Connection) -> None:
+        """接続を破棄"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def close(self) -> None:
+        """アイドル接続をすべて閉じる"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(conn)
+    
+    @property
+    def idle_count(self) -> int:
+        """プール内のアイドル接続数"""
+        return self._idle.qsize()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_local = threading.local()
+
+# ユーザーデータの変更通知を受け取るリスナー（引数 None は全ユーザーの変更を表す）
+_change_listeners: List[Callable[[Optional[int]], None]] = []
+
+
+def add_change_listener(listener: Callable[[Optional[int]], None]) -> None:
+    """ユーザーデータ変更時に呼び出すリスナーを登録"""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def _dispatch_changes(user_ids: Set[Optional[int]]) -> None:
+    """登録済みリスナーに変更を通知"""
+    for user_id in user_ids:
+        for listener in _change_listeners:
+            listener(user_id)
+
+
+def notify_user_changed(user_id: int) -> None:
+    """ユーザーデータの変更を記録
+    
+    コミット直前に users.revision を1トランザクションにつき1回進め、
+    コミット後にリスナーを呼び出す。ロールバックされた変更は通知しない。
+    """
+    if getattr(_local, 'conn', None) is None:
+        with get_db():
+            notify_user_changed(user_id)
+        return
+    _local.changed_users.add(user_id)
+
+
+def run_after_commit(callback: Callable[[], None]) -> None:
+    """現在のトランザクションのコミット後に呼び出す処理を登録（ロールバックした場合は呼ばない）"""
+    if getattr(_local, 'conn', None) is None:
+        callback()
+        return
+    _local.after_commit.append(callback)
+
+
+def _bump_revisions(conn: sqlite3.Connection, user_ids: Set[int]) -> None:
+    """変更のあったユーザーのリビジョンと更新日時を進める"""
+    if user_ids:
+        updated_at = local_now().isoformat()
+        conn.executemany(
+            'UPDATE users SET revision = revision + 1, updated_at = ? WHERE id = ?',
+            [(updated_at, user_id) for user_id in user_ids]
+        )
+
+
+def configure_pool(size: int = DEFAULT_POOL_SIZE,
+                   profile: Optional[str] = None) -> ConnectionPool:
+    """コネクションプールを（再）作成"""
+    global _pool
+    with _pool_lock:
+        if profile is None:
+            profile = _pool.profile if _pool is not None else DEFAULT_STORAGE_PROFILE
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(DB_PATH, size, profile)
+    
+    # 接続先が変わるとキャッシュ等の派生データはすべて無効になる
+    _dispatch_changes({None})
+    return _pool
+
+
+def get_pool() -> ConnectionPool:
+    """現在のコネクションプールを取得"""
+    pool = _pool
+    if pool is None or pool.db_path != DB_PATH:
+        size = pool.size if pool is not None else DEFAULT_POOL_SIZE
+        return configure_pool(size)
+    return pool
+
+
+def close_pool() -> None:
+    """コネクションプールを閉じる（アプリ終了時に呼び出す）"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """データベース接続のコンテキストマネージャ"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """データベース接続のコンテキストマネージャ
+    
+    同一スレッド内でネストして呼び出した場合は外側の接続とトランザクションを
+    そのまま共有し、コミットは最も外側のブロックを抜けたときに行う。
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+    
+    pool = get_pool()
+    conn = pool.acquire()
+    _local.conn = conn
+    _local.changed_users = set()
+    _local.after_commit = []
     try:
         yield conn
+        _bump_revisions(conn, _local.changed_users)
         conn.commit()
     except Exception:
         conn.rollback()
         raise
     finally:
-        conn.close()
+        changed_users = _local.changed_users
+        after_commit = _local.after_commit
+        _local.conn = None
+        _local.changed_users = None
+        _local.after_commit = None
+        pool.release(conn)
+    
+    # コミットが完了してから変更を通知する（キャッシュを無効化してから配信する）
+    _dispatch_changes(changed_users)
+    for callback in after_commit:
+        callback()
+
+
+@contextmanager
+def transaction() -> Generator[sqlite3.Connection, None, None]:
+    """書き込み用トランザクションのコンテキストマネージャ
+    
+    最も外側で開始する場合は BEGIN IMMEDIATE で書き込みロックを先に取得し、
+    読み取りから書き込みへの昇格時に発生するロック競合（SQLITE_BUSY）を避ける。
+    """
+    with get_db() as conn:
+        if not conn.in_transaction:
+            conn.execute('BEGIN IMMEDIATE')
+        yield conn
+
+
+@contextmanager
+def snapshot() -> Generator[sqlite3.Connection, None, None]:
+    """読み取り用トランザクションのコンテキストマネージャ
+    
+    複数のクエリを同じ接続・同じスナップショット（WAL の読み取り時点）で実行し、
+    途中で他の書き込みがコミットされても一貫した結果を返す。
+    """
+    with get_db() as conn:
+        if not conn.in_transaction:
+            conn.execute('BEGIN')
+        yield conn
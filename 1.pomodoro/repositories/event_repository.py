@@ -0,0 +1,90 @@
+"""Event repository for the append-only session event log and user snapshots."""
+
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models.session import PomodoroSession
+from .database import get_db
+
+# 完了イベントの行: (seq, user_id, started_at, occurred_at, xp_earned, duration_minutes)
+CompletedEvent = Tuple[int, int, Optional[str], str, int, int]
+
+
+class EventRepository:
+    """セッションイベントログ（session_events）とスナップショット（user_snapshots）へのアクセス"""
+    
+    @staticmethod
+    def append(event_type: str, session: PomodoroSession, occurred_at: str) -> int:
+        """イベントを追記してイベント番号を返す（セッションの更新と同じトランザクションで呼び出す）"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT INTO session_events
+                       (type, user_id, session_id, duration_minutes, xp_earned,
+                        started_at, occurred_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (event_type, session.user_id, session.id, session.duration_minutes,
+                 session.xp_earned, session.started_at, occurred_at)
+            )
+            return cursor.lastrowid
+    
+    @staticmethod
+    def get_last_seq() -> int:
+        """最後のイベント番号を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM session_events')
+            return cursor.fetchone()[0]
+    
+    @staticmethod
+    def iter_completed(after_seq: int, until_seq: int,
+                       user_ids: Optional[List[int]] = None) -> Iterator[CompletedEvent]:
+        """範囲内の完了イベントをイベント番号順に返す
+        
+        件数が多いため行はタプルのまま返し、結果は SQLite から少しずつ読み込む。
+        """
+        query = '''SELECT seq, user_id, started_at, occurred_at, xp_earned, duration_minutes
+                   FROM session_events
+                   WHERE seq > ? AND seq <= ? AND type = 'completed' '''
+        params: list = [after_seq, until_seq]
+        if user_ids is not None:
+            query += f"AND user_id IN ({', '.join('?' * len(user_ids))}) "
+            params += user_ids
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query + 'ORDER BY seq', params)
+            yield from cursor
+    
+    @staticmethod
+    def get_snapshots(user_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, Dict]]:
+        """ユーザーごとのスナップショットを {user_id: (seq, state)} で取得"""
+        query = 'SELECT user_id, seq, state FROM user_snapshots'
+        params: list = []
+        if user_ids is not None:
+            query += f" WHERE user_id IN ({', '.join('?' * len(user_ids))})"
+            params = list(user_ids)
+        
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params)
+            return {
+                user_id: (seq, json.loads(state))
+                for user_id, seq, state in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def save_snapshots(snapshots: Iterable[Tuple[int, int, Dict]]) -> int:
+        """(user_id, seq, state) のスナップショットを保存（既存のものは置き換える）し、件数を返す"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                '''INSERT INTO user_snapshots (user_id, seq, state) VALUES (?, ?, ?)
+                   ON CONFLICT (user_id) DO UPDATE
+                   SET seq = excluded.seq, state = excluded.state,
+                       created_at = CURRENT_TIMESTAMP''',
+                ((user_id, seq, json.dumps(state, separators=(',', ':')))
+                 for user_id, seq, state in snapshots)
+            )
+            return cursor.rowcount
@@ -0,0 +1,185 @@
+"""Rollup repository for incrementally maintained per-user counters."""
+
+from typing import Dict, Iterator, List, Tuple
+from models.session import PomodoroSession
+from .database import get_db, ROLLUP_USER_STATS_SQL, ROLLUP_DAILY_SQL
+
+
+class RollupRepository:
+    """ユーザー別累計（user_stats）と日別ロールアップ（daily_rollup）へのアクセス"""
+    
+    @staticmethod
+    def record_started(session: PomodoroSession) -> None:
+        """セッション開始をロールアップに反映"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT INTO user_stats (user_id, total_sessions) VALUES (?, 1)
+                   ON CONFLICT (user_id) DO UPDATE
+                   SET total_sessions = total_sessions + 1''',
+                (session.user_id,)
+            )
+            cursor.execute(
+                '''INSERT INTO daily_rollup (user_id, day, started_sessions) VALUES (?, ?, 1)
+                   ON CONFLICT (user_id, day) DO UPDATE
+                   SET started_sessions = started_sessions + 1''',
+                (session.user_id, session.started_at[:10])
+            )
+    
+    @staticmethod
+    def record_completed(session: PomodoroSession) -> Tuple[int, int]:
+        """セッション完了をロールアップに反映し、更新後の（累計完了数, 累計集中時間）を返す"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            # 累計値は RETURNING で受け取り、バッジ判定のための再取得を省く
+            completed_sessions, total_focus_minutes = cursor.execute(
+                '''INSERT INTO user_stats
+                       (user_id, completed_sessions, total_focus_minutes, total_xp)
+                   VALUES (?, 1, ?, ?)
+                   ON CONFLICT (user_id) DO UPDATE
+                   SET completed_sessions = completed_sessions + 1,
+                       total_focus_minutes = total_focus_minutes + excluded.total_focus_minutes,
+                       total_xp = total_xp + excluded.total_xp
+                   RETURNING completed_sessions, total_focus_minutes''',
+                (session.user_id, session.duration_minutes, session.xp_earned)
+            ).fetchone()
+            cursor.execute(
+                '''INSERT INTO daily_rollup
+                       (user_id, day, completed_sessions, focus_minutes, xp_earned)
+                   VALUES (?, ?, 1, ?, ?)
+                   ON CONFLICT (user_id, day) DO UPDATE
+                   SET completed_sessions = completed_sessions + 1,
+                       focus_minutes = focus_minutes + excluded.focus_minutes,
+                       xp_earned = xp_earned + excluded.xp_earned''',
+                (session.user_id, session.completed_at[:10],
+                 session.duration_minutes, session.xp_earned)
+            )
+            return completed_sessions, total_focus_minutes
+    
+    @staticmethod
+    def iter_completed_days() -> Iterator[Tuple[int, str]]:
+        """完了のあった (user_id, day) をユーザー順・日付順に返す
+        
+        主キー (user_id, day) の順に読むだけで並べ替えは行わない。件数が多いため
+        行はタプルのまま返し、結果は SQLite から少しずつ読み込む。
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(
+                '''SELECT user_id, day FROM daily_rollup
+                   WHERE completed_sessions > 0
+                   ORDER BY user_id, day'''
+            )
+            yield from cursor
+    
+    @staticmethod
+    def get_totals(user_id: int) -> Tuple[int, int, int]:
+        """累計の（開始数, 完了数, 集中時間）を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT total_sessions, completed_sessions, total_focus_minutes
+                   FROM user_stats WHERE user_id = ?''',
+                (user_id,)
+            )
+            row = cursor.fetchone()
+            
+            if row:
+                return row['total_sessions'], row['completed_sessions'], row['total_focus_minutes']
+            return 0, 0, 0
+    
+    @staticmethod
+    def get_daily(user_id: int, since_day: str) -> Dict[str, Tuple[int, int]]:
+        """指定日以降の日別（完了数, 集中時間）を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT day, completed_sessions, focus_minutes
+                   FROM daily_rollup
+                   WHERE user_id = ? AND day >= ?''',
+                (user_id, since_day)
+            )
+            return {
+                row['day']: (row['completed_sessions'], row['focus_minutes'])
+                for row in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def get_weekly(user_id: int, since_day: str, until_day: str) -> Dict[str, Tuple[int, int, int]]:
+        """期間内の日別ロールアップを週（月曜開始）ごとに合計し、
+        {週の初日: (開始数, 完了数, 集中時間)} を返す
+        
+        主キー (user_id, day) の範囲検索のみで、読む行数は期間の日数以下。
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT date(day, '-' || ((CAST(strftime('%w', day) AS INTEGER) + 6) % 7)
+                                || ' days') AS week_start,
+                          SUM(started_sessions) AS started_sessions,
+                          SUM(completed_sessions) AS completed_sessions,
+                          SUM(focus_minutes) AS focus_minutes
+                   FROM daily_rollup
+                   WHERE user_id = ? AND day BETWEEN ? AND ?
+                   GROUP BY week_start''',
+                (user_id, since_day, until_day)
+            )
+            return {
+                row['week_start']: (
+                    row['started_sessions'], row['completed_sessions'], row['focus_minutes']
+                )
+                for row in cursor.fetchall()
+            }
+    
+    @staticmethod
+    def rebuild() -> Tuple[int, int]:
+        """sessions テーブルからロールアップを作り直し、（ユーザー数, 日数）を返す"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM user_stats')
+            cursor.execute('DELETE FROM daily_rollup')
+            cursor.execute('INSERT INTO user_stats ' + ROLLUP_USER_STATS_SQL)
+            users = cursor.rowcount
+            cursor.execute('INSERT INTO daily_rollup ' + ROLLUP_DAILY_SQL)
+            days = cursor.rowcount
+            return users, days
+    
+    @staticmethod
+    def verify() -> List[Dict]:
+        """sessions テーブルから再計算した値とロールアップの差分を返す"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            drift = []
+            
+            checks = [
+                ('user_stats', ROLLUP_USER_STATS_SQL,
+                 'SELECT user_id, total_sessions, completed_sessions, '
+                 'total_focus_minutes, total_xp FROM user_stats', 1),
+                ('daily_rollup', ROLLUP_DAILY_SQL,
+                 'SELECT user_id, day, started_sessions, completed_sessions, '
+                 'focus_minutes, xp_earned FROM daily_rollup', 2),
+            ]
+            for table, expected_sql, actual_sql, key_size in checks:
+                expected = {
+                    tuple(row[:key_size]): tuple(row[key_size:])
+                    for row in cursor.execute(expected_sql)
+                }
+                actual = {
+                    tuple(row[:key_size]): tuple(row[key_size:])
+                    for row in cursor.execute(actual_sql)
+                }
+                # どちらのテーブルもカウンタは4列。0のみの行は「行がない」状態と同じとみなす
+                zero = (0, 0, 0, 0)
+                for key in sorted(expected.keys() | actual.keys()):
+                    want = expected.get(key, zero)
+                    have = actual.get(key, zero)
+                    if want != have:
+                        drift.append({
+                            'table': table,
+                            'key': key,
+                            'expected': want,
+                            'actual': have
+                        })
+            
+            return drift
@@ -0,0 +1,56 @@
+"""Row factories that build slotted model objects directly from SQLite rows."""
+
+import sqlite3
+from typing import Any, Callable, Tuple
+from models.session import PomodoroSession
+from models.user import User
+from models.badge import UserBadge
+
+# 各マッパーが前提とする SELECT 句の列順（モデルのフィールド順と一致させる）
+SESSION_COLUMNS = 'id, user_id, duration_minutes, completed, started_at, completed_at, xp_earned'
+USER_COLUMNS = ('id, username, xp, level, current_streak, longest_streak, '
+                'last_session_date, created_at, updated_at')
+USER_BADGE_COLUMNS = 'id, user_id, badge_id, earned_at'
+
+RowFactory = Callable[[sqlite3.Cursor, Tuple[Any, ...]], Any]
+
+
+def session_from_row(cursor: sqlite3.Cursor, row: Tuple[Any, ...]) -> PomodoroSession:
+    """SESSION_COLUMNS の行からセッションを作成"""
+    return PomodoroSession(row[0], row[1], row[2], bool(row[3]), row[4], row[5], row[6])
+
+
+def session_payload_from_row(cursor: sqlite3.Cursor, row: Tuple[Any, ...]) -> dict:
+    """SESSION_COLUMNS の行から、to_dict() と同じ形のレスポンス用 dict を直接作成
+    
+    モデルを経由しないため、読み込んだ行をそのまま JSON に書き出す一覧系のAPIで使う。
+    """
+    return {
+        'id': row[0],
+        'user_id': row[1],
+        'duration_minutes': row[2],
+        'completed': bool(row[3]),
+        'started_at': row[4],
+        'completed_at': row[5],
+        'xp_earned': row[6]
+    }
+
+
+def user_from_row(cursor: sqlite3.Cursor, row: Tuple[Any, ...]) -> User:
+    """USER_COLUMNS の行からユーザーを作成"""
+    return User(*row)
+
+
+def user_badge_from_row(cursor: sqlite3.Cursor, row: Tuple[Any, ...]) -> UserBadge:
+    """USER_BADGE_COLUMNS の行から取得済みバッジを作成"""
+    return UserBadge(*row)
+
+
+def mapped_cursor(conn: sqlite3.Connection, factory: RowFactory) -> sqlite3.Cursor:
+    """行をモデルに直接変換するカーソルを作成
+    
+    接続の既定の sqlite3.Row を経由せず、タプルから1行につき1つのオブジェクトだけを作る。
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = factory
+    return cursor
@@ -1,9 +1,13 @@
 """Session repository for data access."""
 
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
 from models.session import PomodoroSession
+from models.statistics import Statistics
+from models.week import local_now, period_start
 from .database import get_db
+from .row_mappers import (
+    SESSION_COLUMNS, mapped_cursor, session_from_row, session_payload_from_row
+)
 
 
 class SessionRepository:
@@ -11,14 +15,14 @@ class SessionRepository:
     
     @staticmethod
     def create(session: PomodoroSession) -> PomodoroSession:
-        """新しいセッションを作成"""
+        """新しいセッションを作成（id が未設定の場合は採番する）"""
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                '''INSERT INTO sessions (user_id, duration_minutes, completed, started_at)
-                   VALUES (?, ?, ?, ?)''',
-                (session.user_id, session.duration_minutes, session.completed, 
-                 session.started_at or datetime.now().isoformat())
+                '''INSERT INTO sessions (id, user_id, duration_minutes, completed, started_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (session.id, session.user_id, session.duration_minutes, session.completed, 
+                 session.started_at or local_now().isoformat())
             )
             session.id = cursor.lastrowid
             return session
@@ -35,32 +39,53 @@ class SessionRepository:
                 (session.completed, session.completed_at, session.xp_earned, session.id)
             )
     
+    @staticmethod
+    def complete(session_id: int, completed_at: str, xp_per_minute: int,
+                 user_id: Optional[int] = None) -> Optional[PomodoroSession]:
+        """未完了のセッションを完了にし、完了したセッションを返す
+        
+        completed = 0 を条件にした1回の UPDATE で状態を切り替えるため、同じセッションを
+        同時に完了しても成功するのは1回だけになる。完了済み・存在しない・
+        他のユーザーのセッションの場合は None を返す。
+        """
+        with get_db() as conn:
+            cursor = mapped_cursor(conn, session_from_row)
+            cursor.execute(
+                f'''UPDATE sessions
+                   SET completed = 1, completed_at = ?, xp_earned = duration_minutes * ?
+                   WHERE id = ? AND completed = 0 AND (? IS NULL OR user_id = ?)
+                   RETURNING {SESSION_COLUMNS}''',
+                (completed_at, xp_per_minute, session_id, user_id, user_id)
+            )
+            rows = cursor.fetchall()
+            return rows[0] if rows else None
+    
+    @staticmethod
+    def get_last_id() -> int:
+        """採番済みの最大のセッションIDを取得（削除済みの行も含む）"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'sessions'), 0),
+                              COALESCE((SELECT MAX(id) FROM sessions), 0))'''
+            )
+            return cursor.fetchone()[0]
+    
     @staticmethod
     def get_by_id(session_id: int) -> Optional[PomodoroSession]:
         """IDでセッションを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM sessions WHERE id = ?', (session_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                return PomodoroSession(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    duration_minutes=row['duration_minutes'],
-                    completed=bool(row['completed']),
-                    started_at=row['started_at'],
-                    completed_at=row['completed_at'],
-                    xp_earned=row['xp_earned']
-                )
-            return None
+            cursor = mapped_cursor(conn, session_from_row)
+            cursor.execute(f'SELECT {SESSION_COLUMNS} FROM sessions WHERE id = ?', (session_id,))
+            return cursor.fetchone()
     
     @staticmethod
     def get_by_user(user_id: int, limit: Optional[int] = None) -> List[PomodoroSession]:
         """ユーザーのセッション一覧を取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            query = 'SELECT * FROM sessions WHERE user_id = ? ORDER BY started_at DESC'
+            cursor = mapped_cursor(conn, session_from_row)
+            query = (f'SELECT {SESSION_COLUMNS} FROM sessions WHERE user_id = ? '
+                     'ORDER BY started_at DESC, id DESC')
             params = [user_id]
             
             if limit:
@@ -70,91 +95,150 @@ class SessionRepository:
                 params.append(limit)
             
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            return [
-                PomodoroSession(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    duration_minutes=row['duration_minutes'],
-                    completed=bool(row['completed']),
-                    started_at=row['started_at'],
-                    completed_at=row['completed_at'],
-                    xp_earned=row['xp_earned']
+            return cursor.fetchall()
+    
+    @staticmethod
+    def get_page(user_id: int, limit: int, before: Optional[Tuple[str, int]] = None,
+                 as_payload: bool = False) -> List:
+        """キーセットページングでセッションを新しい順に取得
+        
+        before には前のページの最後のセッションの (started_at, id) を渡す。
+        OFFSET を使わないため、何ページ目でもインデックスの範囲検索だけで済む。
+        as_payload=True の場合はモデルの代わりにレスポンス用の dict を返す。
+        """
+        factory = session_payload_from_row if as_payload else session_from_row
+        with get_db() as conn:
+            cursor = mapped_cursor(conn, factory)
+            if before is None:
+                cursor.execute(
+                    f'''SELECT {SESSION_COLUMNS} FROM sessions WHERE user_id = ?
+                       ORDER BY started_at DESC, id DESC LIMIT ?''',
+                    (user_id, int(limit))
                 )
-                for row in rows
-            ]
+            else:
+                # started_at <= ? で範囲を絞り、同時刻のセッションだけ id で除外する
+                started_at, session_id = before
+                cursor.execute(
+                    f'''SELECT {SESSION_COLUMNS} FROM sessions
+                       WHERE user_id = ? AND started_at <= ?
+                         AND (started_at < ? OR id < ?)
+                       ORDER BY started_at DESC, id DESC LIMIT ?''',
+                    (user_id, started_at, started_at, int(session_id), int(limit))
+                )
+            return cursor.fetchall()
+    
+    @staticmethod
+    def iter_by_user(user_id: int, batch_size: int = 500,
+                     as_payload: bool = False) -> Iterator:
+        """ユーザーの全セッションを新しい順に少しずつ読み込みながら返す
+        
+        batch_size 件ごとに接続を取得・返却するため、件数に関わらずメモリ使用量は
+        一定で、読み込みの合間に接続を占有し続けることもない。
+        as_payload=True の場合はモデルの代わりにレスポンス用の dict を返す。
+        """
+        before = None
+        while True:
+            sessions = SessionRepository.get_page(user_id, batch_size, before, as_payload)
+            yield from sessions
+            if len(sessions) < batch_size:
+                return
+            last = sessions[-1]
+            if as_payload:
+                before = (last['started_at'], last['id'])
+            else:
+                before = (last.started_at, last.id)
     
     @staticmethod
     def get_completed_by_user(user_id: int) -> List[PomodoroSession]:
         """ユーザーの完了済みセッションを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
+            cursor = mapped_cursor(conn, session_from_row)
             cursor.execute(
-                'SELECT * FROM sessions WHERE user_id = ? AND completed = 1 ORDER BY completed_at DESC',
+                f'''SELECT {SESSION_COLUMNS} FROM sessions
+                    WHERE user_id = ? AND completed = 1 ORDER BY completed_at DESC''',
                 (user_id,)
             )
-            rows = cursor.fetchall()
-            
-            return [
-                PomodoroSession(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    duration_minutes=row['duration_minutes'],
-                    completed=bool(row['completed']),
-                    started_at=row['started_at'],
-                    completed_at=row['completed_at'],
-                    xp_earned=row['xp_earned']
-                )
-                for row in rows
-            ]
+            return cursor.fetchall()
     
     @staticmethod
     def get_weekly_sessions(user_id: int) -> List[PomodoroSession]:
         """今週のセッションを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            week_ago = (datetime.now() - timedelta(days=7)).isoformat()
+            cursor = mapped_cursor(conn, session_from_row)
+            week_ago = period_start(7).isoformat()
             cursor.execute(
-                'SELECT * FROM sessions WHERE user_id = ? AND started_at >= ? ORDER BY started_at DESC',
+                f'''SELECT {SESSION_COLUMNS} FROM sessions
+                    WHERE user_id = ? AND started_at >= ? ORDER BY started_at DESC''',
                 (user_id, week_ago)
             )
-            rows = cursor.fetchall()
-            
-            return [
-                PomodoroSession(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    duration_minutes=row['duration_minutes'],
-                    completed=bool(row['completed']),
-                    started_at=row['started_at'],
-                    completed_at=row['completed_at'],
-                    xp_earned=row['xp_earned']
-                )
-                for row in rows
-            ]
+            return cursor.fetchall()
     
     @staticmethod
     def get_monthly_sessions(user_id: int) -> List[PomodoroSession]:
         """今月のセッションを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            month_ago = (datetime.now() - timedelta(days=30)).isoformat()
+            cursor = mapped_cursor(conn, session_from_row)
+            month_ago = period_start(30).isoformat()
             cursor.execute(
-                'SELECT * FROM sessions WHERE user_id = ? AND started_at >= ? ORDER BY started_at DESC',
+                f'''SELECT {SESSION_COLUMNS} FROM sessions
+                    WHERE user_id = ? AND started_at >= ? ORDER BY started_at DESC''',
                 (user_id, month_ago)
             )
-            rows = cursor.fetchall()
+            return cursor.fetchall()
+    
+    @staticmethod
+    def get_hourly_counts(user_id: int, since_day: str) -> List[Tuple[str, int, int]]:
+        """指定日以降の完了セッションを1時間ごと（'YYYY-MM-DDTHH'）に集計
+        
+        完了済みセッションの部分インデックスの範囲だけを読む。曜日への変換は
+        行ごとの strftime より安いため、呼び出し側で日付ごとに1回だけ行う。
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT substr(completed_at, 1, 13) AS hour,
+                          COUNT(*) AS completed,
+                          SUM(duration_minutes) AS focus_minutes
+                   FROM sessions
+                   WHERE user_id = ? AND completed = 1 AND completed_at >= ?
+                   GROUP BY hour''',
+                (user_id, since_day)
+            )
+            return [tuple(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_period_statistics(user_id: int) -> Statistics:
+        """週間・月間の統計を1回のクエリで集計（累計は user_stats から取得する）"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            # 期間は日単位（今日を含む直近7日・30日）。日付を含む ETag で検証できるよう、
+            # 同じ日の間は境界が動かない
+            week_ago = period_start(7).isoformat()
+            month_ago = period_start(30).isoformat()
+            # idx_sessions_user_started の範囲検索のみで完結する（テーブル本体を読まない）
+            cursor.execute(
+                '''SELECT
+                       COALESCE(SUM(started_at >= :week_ago), 0) AS weekly_sessions,
+                       COALESCE(SUM(started_at >= :week_ago AND completed = 1), 0)
+                           AS weekly_completed,
+                       COALESCE(SUM(CASE WHEN started_at >= :week_ago AND completed = 1
+                                         THEN duration_minutes END), 0)
+                           AS weekly_focus_minutes,
+                       COUNT(*) AS monthly_sessions,
+                       COALESCE(SUM(completed = 1), 0) AS monthly_completed,
+                       COALESCE(SUM(CASE WHEN completed = 1 THEN duration_minutes END), 0)
+                           AS monthly_focus_minutes
+                   FROM sessions
+                   WHERE user_id = :user_id AND started_at >= :month_ago''',
+                {'user_id': user_id, 'week_ago': week_ago, 'month_ago': month_ago}
+            )
+            row = cursor.fetchone()
             
-            return [
-                PomodoroSession(
-                    id=row['id'],
-                    user_id=row['user_id'],
-                    duration_minutes=row['duration_minutes'],
-                    completed=bool(row['completed']),
-                    started_at=row['started_at'],
-                    completed_at=row['completed_at'],
-                    xp_earned=row['xp_earned']
-                )
-                for row in rows
-            ]
+            stats = Statistics(user_id=user_id)
+            stats.weekly_sessions = row['weekly_sessions']
+            stats.weekly_completed = row['weekly_completed']
+            stats.weekly_focus_minutes = row['weekly_focus_minutes']
+            stats.monthly_sessions = row['monthly_sessions']
+            stats.monthly_completed = row['monthly_completed']
+            stats.monthly_focus_minutes = row['monthly_focus_minutes']
+            return stats
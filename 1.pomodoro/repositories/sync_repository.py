@@ -0,0 +1,32 @@
+"""Repository for idempotency keys of client-synced session events."""
+
+from typing import Dict, Iterable, Optional
+from .database import get_db
+
+
+class SyncRepository:
+    """/api/sync で適用済みのイベントの冪等キーへのアクセス"""
+    
+    @staticmethod
+    def get_sessions(user_id: int, keys: Iterable[str]) -> Dict[str, Optional[int]]:
+        """適用済みのキーと対象のセッションIDを取得（{キー: セッションID}）"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'''SELECT key, session_id FROM sync_keys
+                   WHERE user_id = ? AND key IN ({', '.join('?' * len(keys))})''',
+                (user_id, *keys)
+            )
+            return {row['key']: row['session_id'] for row in cursor.fetchall()}
+    
+    @staticmethod
+    def record(user_id: int, key: str, session_id: Optional[int]) -> None:
+        """適用したイベントのキーを記録（イベントの適用と同じトランザクションで呼び出す）"""
+        with get_db() as conn:
+            conn.execute(
+                'INSERT INTO sync_keys (user_id, key, session_id) VALUES (?, ?, ?)',
+                (user_id, key, session_id)
+            )
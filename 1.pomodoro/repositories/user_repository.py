@@ -1,9 +1,17 @@
 """User repository for data access."""
 
-from typing import Optional
-from datetime import datetime
-from models.user import User
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.user import User, XP_PER_LEVEL
+from models.week import local_now
 from .database import get_db
+from .row_mappers import USER_COLUMNS, mapped_cursor, user_from_row
+
+# models.streak.next_streak と同じ規則で、完了日 :day を反映した現在のストリーク
+_NEXT_STREAK_SQL = '''CASE WHEN last_session_date IS NULL THEN 1
+                            WHEN last_session_date >= :day THEN current_streak
+                            WHEN julianday(:day) - julianday(last_session_date) = 1
+                                THEN current_streak + 1
+                            ELSE 1 END'''
 
 
 class UserRepository:
@@ -13,45 +21,17 @@ class UserRepository:
     def get_by_id(user_id: int) -> Optional[User]:
         """IDでユーザーを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                return User(
-                    id=row['id'],
-                    username=row['username'],
-                    xp=row['xp'],
-                    level=row['level'],
-                    current_streak=row['current_streak'],
-                    longest_streak=row['longest_streak'],
-                    last_session_date=row['last_session_date'],
-                    created_at=row['created_at'],
-                    updated_at=row['updated_at']
-                )
-            return None
+            cursor = mapped_cursor(conn, user_from_row)
+            cursor.execute(f'SELECT {USER_COLUMNS} FROM users WHERE id = ?', (user_id,))
+            return cursor.fetchone()
     
     @staticmethod
     def get_by_username(username: str) -> Optional[User]:
         """ユーザー名でユーザーを取得"""
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM users WHERE username = ?', (username,))
-            row = cursor.fetchone()
-            
-            if row:
-                return User(
-                    id=row['id'],
-                    username=row['username'],
-                    xp=row['xp'],
-                    level=row['level'],
-                    current_streak=row['current_streak'],
-                    longest_streak=row['longest_streak'],
-                    last_session_date=row['last_session_date'],
-                    created_at=row['created_at'],
-                    updated_at=row['updated_at']
-                )
-            return None
+            cursor = mapped_cursor(conn, user_from_row)
+            cursor.execute(f'SELECT {USER_COLUMNS} FROM users WHERE username = ?', (username,))
+            return cursor.fetchone()
     
     @staticmethod
     def create(user: User) -> User:
@@ -59,9 +39,11 @@ class UserRepository:
         with get_db() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                '''INSERT INTO users (username, xp, level, current_streak, longest_streak)
-                   VALUES (?, ?, ?, ?, ?)''',
-                (user.username, user.xp, user.level, user.current_streak, user.longest_streak)
+                '''INSERT INTO users
+                       (username, xp, level, current_streak, longest_streak, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (user.username, user.xp, user.level, user.current_streak, user.longest_streak,
+                 local_now().isoformat())
             )
             user.id = cursor.lastrowid
             return user
@@ -77,5 +59,125 @@ class UserRepository:
                        last_session_date = ?, updated_at = ?
                    WHERE id = ?''',
                 (user.xp, user.level, user.current_streak, user.longest_streak,
-                 user.last_session_date, datetime.now().isoformat(), user.id)
+                 user.last_session_date, local_now().isoformat(), user.id)
+            )
+    
+    @staticmethod
+    def add_progress(user_id: int, xp: int, day: str) -> Optional[User]:
+        """XPを加算して完了日 day のストリークを反映し、更新後のユーザーを返す
+        
+        読み込んだ値を書き戻すのではなく、1回の UPDATE で現在の値に差分を適用するため、
+        同時に完了しても更新が失われない。レベル・ストリークの規則は User.add_xp /
+        update_streak と同じ。
+        """
+        with get_db() as conn:
+            cursor = mapped_cursor(conn, user_from_row)
+            cursor.execute(
+                f'''UPDATE users
+                   SET xp = xp + :xp,
+                       level = MAX(level, (xp + :xp) / :xp_per_level + 1),
+                       current_streak = {_NEXT_STREAK_SQL},
+                       longest_streak = MAX(longest_streak, {_NEXT_STREAK_SQL}),
+                       last_session_date = MAX(COALESCE(last_session_date, :day), :day),
+                       updated_at = :updated_at
+                   WHERE id = :user_id
+                   RETURNING {USER_COLUMNS}''',
+                {'xp': int(xp), 'xp_per_level': XP_PER_LEVEL, 'day': day,
+                 'updated_at': local_now().isoformat(), 'user_id': user_id}
+            )
+            rows = cursor.fetchall()
+            return rows[0] if rows else None
+    
+    @staticmethod
+    def get_revision(user_id: int) -> Optional[Tuple[int, Optional[str]]]:
+        """ユーザーのリビジョンと更新日時を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT revision, updated_at FROM users WHERE id = ?', (user_id,))
+            row = cursor.fetchone()
+            
+            if row:
+                return row['revision'], row['updated_at']
+            return None
+    
+    @staticmethod
+    def get_top_by_xp(limit: int = 10) -> List[User]:
+        """XPの多い順にユーザーを取得（idx_users_xp を先頭から読むだけで済む）"""
+        with get_db() as conn:
+            cursor = mapped_cursor(conn, user_from_row)
+            cursor.execute(
+                f'SELECT {USER_COLUMNS} FROM users ORDER BY xp DESC, id LIMIT ?',
+                (int(limit),)
+            )
+            return cursor.fetchall()
+    
+    @staticmethod
+    def get_rank(user: User) -> int:
+        """ユーザーの順位を取得（同じXPの場合はIDの小さい順）
+        
+        OR 条件はインデックスを使えないため2つの範囲検索に分けて数える。
+        どちらも idx_users_xp の範囲を数えるだけで users テーブル本体は読まない。
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT (SELECT COUNT(*) FROM users WHERE xp > :xp)
+                        + (SELECT COUNT(*) FROM users WHERE xp = :xp AND id < :id)
+                        + 1''',
+                {'xp': user.xp, 'id': user.id}
+            )
+            return cursor.fetchone()[0]
+    
+    @staticmethod
+    def get_all() -> List[User]:
+        """すべてのユーザーを取得"""
+        with get_db() as conn:
+            cursor = mapped_cursor(conn, user_from_row)
+            cursor.execute(f'SELECT {USER_COLUMNS} FROM users ORDER BY id')
+            return cursor.fetchall()
+    
+    @staticmethod
+    def replace_progress(users: Iterable[User]) -> List[int]:
+        """全ユーザーの XP・レベル・ストリークを置き換え、対象のユーザーIDを返す
+        
+        渡されなかったユーザーは初期状態に戻す（イベントログからの再構築用）。
+        """
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''UPDATE users
+                   SET xp = 0, level = 1, current_streak = 0, longest_streak = 0,
+                       last_session_date = NULL'''
+            )
+            cursor.executemany(
+                '''UPDATE users
+                   SET xp = ?, level = ?, current_streak = ?, longest_streak = ?,
+                       last_session_date = ?
+                   WHERE id = ?''',
+                ((user.xp, user.level, user.current_streak, user.longest_streak,
+                  user.last_session_date, user.id) for user in users)
+            )
+            cursor.execute('SELECT id FROM users')
+            return [row[0] for row in cursor.fetchall()]
+    
+    @staticmethod
+    def get_all_streaks() -> Dict[int, Tuple[int, int, Optional[str]]]:
+        """全ユーザーの（現在のストリーク, 最長ストリーク, 最後の完了日）を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(
+                'SELECT id, current_streak, longest_streak, last_session_date FROM users'
+            )
+            return {row[0]: row[1:] for row in cursor}
+    
+    @staticmethod
+    def update_streaks(streaks: Iterable[Tuple[int, Tuple[int, int, Optional[str]]]]) -> None:
+        """(user_id, (現在のストリーク, 最長ストリーク, 最後の完了日)) の組でストリークを置き換え"""
+        with get_db() as conn:
+            conn.executemany(
+                '''UPDATE users
+                   SET current_streak = ?, longest_streak = ?, last_session_date = ?
+                   WHERE id = ?''',
+                ((*values, user_id) for user_id, values in streaks)
             )
@@ -0,0 +1,26 @@
+"""Repository for the write-behind log checkpoint."""
+
+from .database import get_db
+
+
+class WriteBehindRepository:
+    """write-behind ログの適用済み位置へのアクセス"""
+    
+    @staticmethod
+    def get_applied_seq() -> int:
+        """DBに反映済みの最後のイベント番号を取得"""
+        with get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT applied_seq FROM write_behind_state WHERE id = 1')
+            row = cursor.fetchone()
+            return row['applied_seq'] if row else 0
+    
+    @staticmethod
+    def set_applied_seq(seq: int) -> None:
+        """DBに反映済みの最後のイベント番号を記録（イベントの反映と同じトランザクションで呼び出す）"""
+        with get_db() as conn:
+            conn.execute(
+                '''INSERT INTO write_behind_state (id, applied_seq) VALUES (1, ?)
+                   ON CONFLICT (id) DO UPDATE SET applied_seq = excluded.applied_seq''',
+                (seq,)
+            )
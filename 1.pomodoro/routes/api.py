@@ -1,9 +1,25 @@
 """API routes for Pomodoro Timer."""
 
-from flask import Blueprint, jsonify, request
+from datetime import datetime, timezone
+import os
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple
+from flask import (
+    Blueprint, Response, current_app, g, jsonify, make_response, request, session,
+    stream_with_context
+)
 from services.pomodoro_service import PomodoroService
 from services.gamification_service import GamificationService
 from services.statistics_service import StatisticsService
+from services.dashboard_service import DashboardService
+from services.cache import read_cache
+from services.event_hub import event_hub, ServerEvent, DEFAULT_SSE_HEARTBEAT
+from services.timer_registry import get_timer_registry
+from services.write_behind import WriteBehindUnavailable, STALLED_RETRY_INTERVAL
+from models.badge_rules import get_badge_rules
+from models.session import parse_duration
+from models.sync_event import SyncEvent
+from models.week import local_today, localize
 
 api_bp = Blueprint('api', __name__)
 
@@ -11,10 +27,149 @@ api_bp = Blueprint('api', __name__)
 pomodoro_service = PomodoroService()
 gamification_service = GamificationService()
 statistics_service = StatisticsService()
+dashboard_service = DashboardService()
 
-# デフォルトユーザーID（シングルユーザーアプリ用）
+# ユーザーが指定されなかった場合のユーザーID（シングルユーザー運用との互換用）
 DEFAULT_USER_ID = 1
 
+# ユーザーを指定するリクエストヘッダー（クエリパラメータ user_id でも指定可能）
+USER_ID_HEADER = 'X-User-Id'
+
+# ユーザー指定のヘッダー / クエリを信頼するか（認証済みのリバースプロキシの背後でだけ有効にする）
+DEFAULT_TRUST_USER_HEADER = os.environ.get(
+    'POMODORO_TRUST_USER_HEADER', 'False'
+).lower() in ('true', '1', 't')
+
+# ユーザーIDを保持するセッション Cookie のキー（ユーザー登録時に発行する）
+SESSION_USER_KEY = 'user_id'
+
+# ユーザーの解決が不要なエンドポイント
+USER_EXEMPT_ENDPOINTS = {
+    'api.register_user',
+    'api.get_leaderboard',
+    'api.get_cache_stats',
+    'api.get_event_stats',
+    'api.get_timer_stats',
+    'api.health_check',
+}
+
+# リーダーボードの最大取得件数
+MAX_LEADERBOARD_LIMIT = 100
+
+# セッション履歴の1ページあたりの最大件数（全件はエクスポートAPIで取得する）
+MAX_HISTORY_LIMIT = 100
+
+# アクティビティ集計の最大日数（約10年）
+MAX_ACTIVITY_DAYS = 3660
+
+# 週別推移の最大週数（約10年）
+MAX_TREND_WEEKS = 520
+
+# SSE の切断後にクライアントが再接続するまでの時間（ミリ秒）
+SSE_RETRY_MS = 3000
+
+
+def identify_user() -> Tuple[Optional[int], Optional[Tuple[str, int]]]:
+    """現在のリクエストの対象ユーザーを特定し、（ユーザーID, （エラー, ステータス））を返す
+    
+    通常はサーバーが発行した署名付きのセッション Cookie（ユーザー登録時に設定）で特定し、
+    Cookie がなければデフォルトユーザーとする。クライアントが自由に付けられる
+    ヘッダー / クエリでの指定は、TRUST_USER_HEADER を有効にした場合（認証済みの
+    リバースプロキシが設定する）だけ受け付け、それ以外は 403 にする。
+    """
+    raw = request.headers.get(USER_ID_HEADER) or request.args.get('user_id')
+    if raw is None:
+        return session.get(SESSION_USER_KEY, DEFAULT_USER_ID), None
+    if not current_app.config.get('TRUST_USER_HEADER', DEFAULT_TRUST_USER_HEADER):
+        return None, ('User header is not trusted', 403)
+    try:
+        return int(raw), None
+    except ValueError:
+        return None, ('Invalid user id', 400)
+
+
+@api_bp.before_request
+def resolve_user():
+    """リクエストごとに対象ユーザーを解決して g.user_id に設定
+    
+    存在確認はキャッシュ済みのリビジョンで行うため、通常はクエリを発行しない。
+    """
+    if request.endpoint in USER_EXEMPT_ENDPOINTS:
+        return None
+    
+    user_id, error = identify_user()
+    if error is not None:
+        message, status = error
+        return jsonify({'success': False, 'error': message}), status
+    
+    if gamification_service.get_user_revision(user_id) is None:
+        return jsonify({'success': False, 'error': 'User not found'}), 404
+    
+    # write-behind モードでは、自分の書き込みがコミットされてから読み取る
+    if request.method == 'GET':
+        pomodoro_service.wait_for_writes(user_id)
+    
+    g.user_id = user_id
+    return None
+
+
+@api_bp.errorhandler(WriteBehindUnavailable)
+def write_behind_unavailable(error: WriteBehindUnavailable):
+    """write-behind キューが書き込みを受け付けられない間は 503（クライアントは後で再送する）"""
+    response = jsonify({'success': False, 'error': 'Writes are temporarily unavailable'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(max(1, round(STALLED_RETRY_INTERVAL)))
+    return response
+
+
+def conditional(date_sensitive: bool = False, badge_rules: bool = False):
+    """ユーザーのリビジョンから ETag / Last-Modified を付与し、変更がなければ 304 を返す
+    
+    リビジョンは書き込みのコミット時に進み、キャッシュ経由で参照するため、
+    変更がない場合はサービス層のクエリを一切実行せずに 304 を返せる。
+    date_sensitive=True の場合は日付が変わると集計範囲が変わるため ETag に日付を含める。
+    集計範囲は日単位（period_start）でなければならない（同じ日の間に動く範囲は検証できない）。
+    badge_rules=True の場合はバッジの一覧が定義ファイルで変わるため、定義の識別子を ETag に含める。
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            revision = gamification_service.get_user_revision(g.user_id)
+            if revision is None:
+                return view(*args, **kwargs)
+            
+            version, updated_at = revision
+            etag = f'u{g.user_id}-r{version}'
+            if date_sensitive:
+                etag += '-' + local_today().strftime('%Y%m%d')
+            if badge_rules:
+                etag += '-b' + get_badge_rules().fingerprint
+            
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            
+            response.set_etag(etag)
+            if updated_at:
+                modified = datetime.fromisoformat(updated_at)
+                # 更新日時は local_now() で記録する。書き込み前の行に残る CURRENT_TIMESTAMP の
+                # 既定値（'YYYY-MM-DD HH:MM:SS'）だけは UTC
+                if 'T' in updated_at:
+                    response.last_modified = localize(modified)
+                else:
+                    response.last_modified = modified.replace(tzinfo=timezone.utc)
+            # キャッシュは保持してよいが、使う前に必ず再検証させる
+            response.cache_control.no_cache = True
+            # 同じURLでもユーザーごとに内容が異なる
+            response.vary.add(USER_ID_HEADER)
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
 
 # ========== セッション管理 ==========
 
@@ -22,9 +177,13 @@ DEFAULT_USER_ID = 1
 def start_session():
     """ポモドーロセッションを開始"""
     data = request.get_json() or {}
-    duration = data.get('duration', 25)
+    # セッションを作成する前に検証する（不正な値で行を作らない）
+    try:
+        duration = parse_duration(data.get('duration', 25))
+    except ValueError as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 400
     
-    session = pomodoro_service.start_session(DEFAULT_USER_ID, duration)
+    session = pomodoro_service.start_session(g.user_id, duration)
     return jsonify({
         'success': True,
         'session': session.to_dict()
@@ -33,42 +192,170 @@ def start_session():
 
 @api_bp.route('/session/<int:session_id>/complete', methods=['POST'])
 def complete_session(session_id):
-    """セッションを完了してXPを獲得"""
-    result = pomodoro_service.complete_session(session_id)
+    """セッションを完了してXPを獲得（完了済みの場合はXPを加算せずに現在の状態を返す）"""
+    # XP・ストリーク・バッジの更新まで1トランザクションで行う
+    result = pomodoro_service.complete_session(session_id, g.user_id)
     
     if not result:
         return jsonify({'success': False, 'error': 'Session not found'}), 404
     
-    # バッジの条件をチェック
-    new_badges = gamification_service.check_and_award_badges(DEFAULT_USER_ID)
-    
     return jsonify({
         'success': True,
         'session': result['session'],
         'user': result['user'],
         'leveled_up': result['leveled_up'],
         'xp_earned': result['xp_earned'],
-        'new_badges': [b.to_dict() for b in new_badges]
+        'new_badges': result['new_badges'],
+        'already_completed': result['already_completed']
+    })
+
+
+@api_bp.route('/sync', methods=['POST'])
+def sync_events():
+    """クライアントが記録したセッションイベント（冪等キー付き）をまとめて適用
+    
+    イベントごとの結果（applied / duplicate / rejected）と、バッチ全体で得たXP・バッジ、
+    適用後のユーザーを返す。同じキーのイベントは再送しても二重に適用しない。
+    不正なイベントはそのイベントだけを rejected にし、他のイベントは適用する。
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Request body must be a JSON object'}), 400
+    try:
+        events, rejected = SyncEvent.parse_batch(data.get('events'))
+    except ValueError as exc:
+        return jsonify({'success': False, 'error': str(exc)}), 400
+    
+    result = pomodoro_service.sync_events(g.user_id, events)
+    if not result:
+        return jsonify({'success': False, 'error': 'User not found'}), 404
+    
+    # 結果はリクエストのイベントと同じ順に並べる
+    applied = iter(result['results'])
+    results = [rejected[i] if i in rejected else next(applied)
+               for i in range(len(events) + len(rejected))]
+    return jsonify({
+        'success': True,
+        'results': results,
+        'user': result['user'],
+        'leveled_up': result['leveled_up'],
+        'xp_earned': result['xp_earned'],
+        'new_badges': result['new_badges']
+    })
+
+
+@api_bp.route('/session/<int:session_id>/pause', methods=['POST'])
+def pause_session(session_id):
+    """サーバー側のタイマーを一時停止"""
+    timer = pomodoro_service.pause_session(g.user_id, session_id)
+    if timer is None:
+        return jsonify({'success': False, 'error': 'Timer not found'}), 404
+    return jsonify({
+        'success': True,
+        'timer': timer
+    })
+
+
+@api_bp.route('/session/<int:session_id>/resume', methods=['POST'])
+def resume_session(session_id):
+    """一時停止したタイマーを残り時間から再開"""
+    timer = pomodoro_service.resume_session(g.user_id, session_id)
+    if timer is None:
+        return jsonify({'success': False, 'error': 'Timer not found'}), 404
+    return jsonify({
+        'success': True,
+        'timer': timer
+    })
+
+
+@api_bp.route('/session/<int:session_id>/cancel', methods=['POST'])
+def cancel_session(session_id):
+    """タイマーを中止（セッションは未完了のまま残り、自動完了しない）"""
+    if not pomodoro_service.cancel_session(g.user_id, session_id):
+        return jsonify({'success': False, 'error': 'Timer not found'}), 404
+    return jsonify({'success': True})
+
+
+@api_bp.route('/timer', methods=['GET'])
+def get_timer():
+    """実行中（一時停止中）のタイマーの状態を取得（ページの再読み込みや別の端末での復元用）"""
+    return jsonify({
+        'success': True,
+        'timer': pomodoro_service.get_timer_state(g.user_id)
+    })
+
+
+@api_bp.route('/timer/stats', methods=['GET'])
+def get_timer_stats():
+    """サーバー側のタイマーの登録数・自動完了数などを取得"""
+    registry = get_timer_registry()
+    return jsonify({
+        'success': True,
+        'timers': registry.stats() if registry is not None else None
     })
 
 
 @api_bp.route('/session/history', methods=['GET'])
+@conditional()
 def get_session_history():
-    """セッション履歴を取得"""
+    """セッション履歴を新しい順に1ページ分取得（cursor で次のページを指定）"""
     limit = request.args.get('limit', 10, type=int)
-    sessions = pomodoro_service.get_user_sessions(DEFAULT_USER_ID, limit)
+    limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+    cursor = request.args.get('cursor')
+    
+    try:
+        page = pomodoro_service.get_session_page(g.user_id, limit, cursor)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+    
     return jsonify({
         'success': True,
-        'sessions': sessions
+        **page
     })
 
 
+@api_bp.route('/session/export', methods=['GET'])
+@conditional()
+def export_sessions():
+    """全セッション履歴をストリーミングでエクスポート
+    
+    format=ndjson（既定）は1行1セッション、format=json は JSON 配列として、
+    どちらも生成した行から順に送信するため履歴の件数に関わらずメモリ使用量は一定。
+    """
+    export_format = request.args.get('format', 'ndjson')
+    sessions = pomodoro_service.iter_user_sessions(g.user_id)
+    
+    if export_format == 'ndjson':
+        def generate():
+            for row in sessions:
+                yield current_app.json.dumps(row) + '\n'
+        mimetype = 'application/x-ndjson'
+    elif export_format == 'json':
+        def generate():
+            yield '['
+            separator = ''
+            for row in sessions:
+                yield separator + current_app.json.dumps(row)
+                separator = ','
+            yield ']'
+        mimetype = 'application/json'
+    else:
+        return jsonify({'success': False, 'error': 'Unsupported format'}), 400
+    
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename=sessions.{"ndjson" if export_format == "ndjson" else "json"}'
+    )
+    return response
+
+
 # ========== ゲーミフィケーション ==========
 
 @api_bp.route('/gamification/profile', methods=['GET'])
+@conditional(date_sensitive=True)
 def get_profile():
     """ユーザープロフィールを取得（XP、レベル、ストリーク）"""
-    profile = gamification_service.get_user_profile(DEFAULT_USER_ID)
+    profile = gamification_service.get_user_profile(g.user_id)
     return jsonify({
         'success': True,
         'profile': profile
@@ -76,21 +363,68 @@ def get_profile():
 
 
 @api_bp.route('/gamification/badges', methods=['GET'])
+@conditional(badge_rules=True)
 def get_badges():
     """バッジ情報を取得"""
-    badges = gamification_service.get_user_badges(DEFAULT_USER_ID)
+    badges = gamification_service.get_user_badges(g.user_id)
     return jsonify({
         'success': True,
         'badges': badges
     })
 
 
+@api_bp.route('/gamification/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """XP順のリーダーボードを取得"""
+    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit, MAX_LEADERBOARD_LIMIT))
+    return jsonify({
+        'success': True,
+        'leaderboard': gamification_service.get_leaderboard(limit)
+    })
+
+
+@api_bp.route('/gamification/rank', methods=['GET'])
+def get_rank():
+    """ユーザーのリーダーボード上の順位を取得"""
+    rank = gamification_service.get_user_rank(g.user_id)
+    return jsonify({
+        'success': True,
+        'rank': rank
+    })
+
+
+# ========== ユーザー ==========
+
+@api_bp.route('/users', methods=['POST'])
+def register_user():
+    """新しいユーザーを登録"""
+    data = request.get_json() or {}
+    username = (data.get('username') or '').strip()
+    if not username:
+        return jsonify({'success': False, 'error': 'username is required'}), 400
+    
+    user = gamification_service.register_user(username)
+    if not user:
+        return jsonify({'success': False, 'error': 'Username already exists'}), 409
+    
+    # 以降のリクエストは署名付きのセッション Cookie で登録したユーザーとして扱う
+    session[SESSION_USER_KEY] = user['id']
+    session.permanent = True
+    
+    return jsonify({
+        'success': True,
+        'user': user
+    }), 201
+
+
 # ========== 統計データ ==========
 
 @api_bp.route('/statistics', methods=['GET'])
+@conditional(date_sensitive=True)
 def get_statistics():
     """統計データを取得"""
-    stats = statistics_service.get_user_statistics(DEFAULT_USER_ID)
+    stats = statistics_service.get_user_statistics(g.user_id)
     return jsonify({
         'success': True,
         'statistics': stats
@@ -98,26 +432,137 @@ def get_statistics():
 
 
 @api_bp.route('/statistics/daily', methods=['GET'])
+@conditional(date_sensitive=True)
 def get_daily_activity():
     """日別アクティビティを取得"""
     days = request.args.get('days', 30, type=int)
-    activity = statistics_service.get_daily_activity(DEFAULT_USER_ID, days)
+    days = min(days, MAX_ACTIVITY_DAYS)
+    activity = statistics_service.get_daily_activity(g.user_id, days)
     return jsonify({
         'success': True,
         'daily_activity': activity
     })
 
 
+@api_bp.route('/statistics/activity', methods=['GET'])
+@conditional(date_sensitive=True)
+def get_activity():
+    """日別・週別・年別の推移、ヒートマップ、曜日×時間帯の分布を取得"""
+    days = request.args.get('days', 365, type=int)
+    days = max(1, min(days, MAX_ACTIVITY_DAYS))
+    activity = statistics_service.get_activity(g.user_id, days)
+    return jsonify({
+        'success': True,
+        'activity': activity
+    })
+
+
 @api_bp.route('/statistics/weekly-comparison', methods=['GET'])
+@conditional(date_sensitive=True)
 def get_weekly_comparison():
     """週間比較データを取得"""
-    comparison = statistics_service.get_weekly_comparison(DEFAULT_USER_ID)
+    comparison = statistics_service.get_weekly_comparison(g.user_id)
     return jsonify({
         'success': True,
         'comparison': comparison
     })
 
 
+@api_bp.route('/statistics/weekly-trend', methods=['GET'])
+@conditional(date_sensitive=True)
+def get_weekly_trend():
+    """直近N週（ISO 8601 の週）の週別集計を取得"""
+    weeks = request.args.get('weeks', 12, type=int)
+    weeks = max(1, min(weeks, MAX_TREND_WEEKS))
+    trend = statistics_service.get_weekly_trend(g.user_id, weeks)
+    return jsonify({
+        'success': True,
+        'weeks': trend
+    })
+
+
+# ========== ダッシュボード ==========
+
+@api_bp.route('/dashboard', methods=['GET'])
+@conditional(date_sensitive=True, badge_rules=True)
+def get_dashboard():
+    """ページ読み込みに必要なデータ（プロフィール・バッジ・統計・日別アクティビティ）を一括取得"""
+    days = request.args.get('days', 30, type=int)
+    days = min(days, MAX_ACTIVITY_DAYS)
+    dashboard = dashboard_service.get_dashboard(g.user_id, days)
+    return jsonify({
+        'success': True,
+        **dashboard
+    })
+
+
+# ========== イベント配信（Server-Sent Events） ==========
+
+def format_sse(event: ServerEvent, dumps: Callable[[Any], str]) -> str:
+    """イベントを SSE の1メッセージに変換（WSGI・ASGI の両方の配信で使う）"""
+    return f'id: {event.id}\nevent: {event.type}\ndata: {dumps(event.data)}\n\n'
+
+
+@api_bp.route('/events', methods=['GET'])
+def stream_events():
+    """ユーザーの進捗の変化（XP・レベル・バッジ・統計の差分）を SSE で配信
+    
+    セッション完了のコミット後に progress イベントを送る。送信が追いつかず差分を
+    取りこぼした場合は resync イベントを送るため、クライアントは全体を読み込み直す。
+    イベントがない間は一定間隔でコメントを送り、切断された接続を検出する。
+    """
+    subscription = event_hub.subscribe(g.user_id)
+    if subscription is None:
+        response = jsonify({'success': False, 'error': 'Too many event streams'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(SSE_RETRY_MS // 1000)
+        return response
+    
+    # 接続中はリクエストコンテキストを保持しない（アイドルな接続をキューの待機だけにする）
+    dumps = current_app.json.dumps
+    
+    def generate():
+        try:
+            yield f'retry: {SSE_RETRY_MS}\n\n'
+            while True:
+                event = subscription.get(DEFAULT_SSE_HEARTBEAT)
+                if event is None:
+                    if subscription.closed:
+                        return
+                    yield ': keep-alive\n\n'
+                    continue
+                yield format_sse(event, dumps)
+        finally:
+            # クライアントの切断（書き込みの失敗）やサーバーの終了で購読を解除する
+            event_hub.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # リバースプロキシにバッファリングさせない
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_bp.route('/events/stats', methods=['GET'])
+def get_event_stats():
+    """イベント配信の購読者数・配信数などを取得"""
+    return jsonify({
+        'success': True,
+        'events': event_hub.stats()
+    })
+
+
+# ========== キャッシュ ==========
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """読み取りキャッシュのヒット率などを取得"""
+    return jsonify({
+        'success': True,
+        'cache': read_cache.stats()
+    })
+
+
 # ========== ヘルスチェック ==========
 
 @api_bp.route('/health', methods=['GET'])
@@ -0,0 +1,100 @@
+"""Pluggable JSON provider: orjson when it is installed, the standard library otherwise."""
+
+import dataclasses
+import os
+from operator import attrgetter
+from typing import Any, Callable, Dict, Tuple
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson は任意の依存。なければ標準ライブラリで直列化する
+    orjson = None
+
+# 直列化に使うライブラリ（auto: orjson があれば orjson、json: 標準ライブラリ）
+DEFAULT_JSON_BACKEND = os.environ.get('POMODORO_JSON_BACKEND', 'auto')
+
+# dataclass ごとのフィールド名と値の取得関数（初回の直列化時に作成）
+_field_getters: Dict[type, Tuple[Tuple[str, ...], Callable[[Any], Tuple[Any, ...]]]] = {}
+
+
+def encode_model(obj: Any) -> Any:
+    """モデル（dataclass）をフィールド名 → 値の dict に変換
+    
+    to_dict() のようにモデルごとの変換処理を経由せず、フィールドの値をまとめて取り出す。
+    dataclass 以外は Flask 既定の変換（日時・UUID など）に任せる。
+    """
+    cls = type(obj)
+    getter = _field_getters.get(cls)
+    if getter is None:
+        if not dataclasses.is_dataclass(obj) or isinstance(obj, type):
+            return DefaultJSONProvider.default(obj)
+        names = tuple(field.name for field in dataclasses.fields(cls))
+        # フィールドが1つの場合 attrgetter はタプルではなく値そのものを返す
+        if len(names) == 1:
+            def get(o: Any, _name: str = names[0]) -> Tuple[Any, ...]:
+                return (getattr(o, _name),)
+        else:
+            get = attrgetter(*names)
+        getter = _field_getters[cls] = (names, get)
+    names, get = getter
+    return dict(zip(names, get(obj)))
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """標準ライブラリの json で直列化する JSON プロバイダ（モデルはフィールドから直接書き出す）"""
+    
+    default = staticmethod(encode_model)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson で直列化する JSON プロバイダ
+    
+    dataclass は orjson が直接書き出すため、to_dict() の dict を作らない。
+    レスポンスは str を経由せず bytes のまま返す。
+    """
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """JSON 文字列に変換（json.dumps 用の引数が指定された場合は標準ライブラリを使う）"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+    
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """JSON の bytes に変換"""
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """JSON を読み込む"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        """引数を JSON のレスポンスに変換（jsonify から呼ばれる）"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self.dumps_bytes(obj, indent) + b'\n', mimetype=self.mimetype
+        )
+
+
+def create_json_provider(app: Flask, backend: str = DEFAULT_JSON_BACKEND) -> DefaultJSONProvider:
+    """設定に応じた JSON プロバイダを作成
+    
+    backend が 'orjson' で orjson がインストールされていない場合は ValueError を送出する。
+    """
+    if backend not in ('auto', 'orjson', 'json'):
+        raise ValueError(f'Unknown JSON backend: {backend!r}')
+    if backend == 'orjson' and orjson is None:
+        raise ValueError('orjson is not installed')
+    
+    if backend != 'json' and orjson is not None:
+        return OrjsonProvider(app)
+    return StdlibJSONProvider(app)
@@ -3,5 +3,8 @@
 from .pomodoro_service import PomodoroService
 from .gamification_service import GamificationService
 from .statistics_service import StatisticsService
+from .dashboard_service import DashboardService
+from .replay_service import ReplayService
 
-__all__ = ['PomodoroService', 'GamificationService', 'StatisticsService']
+__all__ = ['PomodoroService', 'GamificationService', 'StatisticsService', 'DashboardService',
+           'ReplayService']
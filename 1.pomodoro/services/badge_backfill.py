@@ -0,0 +1,181 @@
+"""Retroactive badge backfill over user-id ranges with resumable chunks."""
+
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import repositories.database as database
+from models.badge import Badge
+from models.badge_rules import BadgeRuleSet, configure_badge_rules, get_badge_rules
+from models.week import local_now, period_start
+from repositories.badge_backfill_repository import BadgeBackfillRepository
+from repositories.database import snapshot, transaction, notify_user_changed
+
+# 1トランザクションで処理するユーザーID の幅
+DEFAULT_BACKFILL_CHUNK_SIZE = int(os.environ.get('POMODORO_BACKFILL_CHUNK_SIZE', '20000'))
+
+# 他のワーカーの書き込みとロックが競合した場合の試行回数
+MAX_WRITE_ATTEMPTS = 8
+
+# 期間指標（get_period_statistics と同じ直近の日数）
+_PERIOD_CRITERIA = {'weekly_count', 'monthly_count'}
+
+
+class BadgeBackfill:
+    """全ユーザーへのバッジの遡及授与（バックフィル）
+    
+    ユーザーID を一定幅のチャンクに分け、チャンクごとに指標を範囲集計のクエリで
+    まとめて求め、取得済みのバッジとの差分だけを1回の executemany で授与する。
+    授与とチャンクの処理済みの記録は同じトランザクションで行うため、中断しても
+    同じジョブを再実行すれば未処理のチャンクから再開する。ワーカーはチャンクを
+    番号の剰余で分担するため、互いに調整しなくても重複しない。
+    
+    指標は完了時の判定と同じものを使うが、ストリークは過去の達成も含めるため
+    最長ストリーク、完了時刻は過去に完了したことのある時をすべて判定する。
+    期間指標は実行時点の直近7日・30日で数える。
+    """
+    
+    def __init__(self, rules: Optional[BadgeRuleSet] = None,
+                 chunk_size: int = DEFAULT_BACKFILL_CHUNK_SIZE,
+                 job: Optional[str] = None, now: Optional[datetime] = None):
+        self.rules = rules or get_badge_rules()
+        self.chunk_size = max(chunk_size, 1)
+        # 同じ定義・同じチャンク幅の実行は同じジョブとして再開する
+        self.job = job or f'{self.rules.fingerprint}-{self.chunk_size}'
+        self.now = now or local_now()
+        self.repo = BadgeBackfillRepository()
+    
+    def plan(self) -> List[Tuple[int, int]]:
+        """現在のユーザーID の範囲をチャンク (開始ID, 終了ID) に分割"""
+        first_id, last_id = self.repo.get_user_id_bounds()
+        if not last_id:
+            return []
+        start = first_id - (first_id - 1) % self.chunk_size
+        return [
+            (chunk_start, chunk_start + self.chunk_size - 1)
+            for chunk_start in range(start, last_id + 1, self.chunk_size)
+        ]
+    
+    def run(self, worker: int = 0, workers: int = 1,
+            chunks: Optional[Sequence[Tuple[int, int]]] = None) -> Dict[str, int]:
+        """担当するチャンク（番号 % workers == worker）のうち未処理のものを処理"""
+        if chunks is None:
+            chunks = self.plan()
+        done = self.repo.get_done_chunks(self.job)
+        stats = {'chunks': 0, 'skipped': 0, 'users': 0, 'awarded': 0}
+        for i, (start_id, end_id) in enumerate(chunks):
+            if i % workers != worker:
+                continue
+            if start_id in done:
+                stats['skipped'] += 1
+                continue
+            users, awarded = self.process_chunk(start_id, end_id)
+            stats['chunks'] += 1
+            stats['users'] += users
+            stats['awarded'] += awarded
+        return stats
+    
+    def run_parallel(self, workers: int) -> Dict[str, int]:
+        """チャンクを workers 個のプロセスで分担して処理し、合計を返す
+        
+        指標の集計（読み取り）は WAL によりプロセス間で並行し、書き込みはチャンク単位の
+        短いトランザクションで順番に行われる。
+        """
+        if workers <= 1:
+            return self.run()
+        
+        chunks = self.plan()
+        # 親プロセスの接続を子プロセスへ持ち込まないよう、fork ではなく spawn で起動する
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_run_worker, database.DB_PATH, self.rules.badges,
+                                self.chunk_size, self.job, self.now, worker, workers, chunks)
+                for worker in range(workers)
+            ]
+            results = [future.result() for future in futures]
+        return {key: sum(result[key] for result in results) for key in results[0]}
+    
+    def process_chunk(self, start_id: int, end_id: int) -> Tuple[int, int]:
+        """1チャンクのユーザーを判定して授与し、（ユーザー数, 授与数）を返す"""
+        rules = self.rules
+        criteria_types = rules.metrics_for(frozenset())
+        # 集計は読み取りトランザクションで行い、書き込みロックは授与の間だけ取る
+        with snapshot():
+            earned = self.repo.get_earned(start_id, end_id)
+            totals = self.repo.get_totals(start_id, end_id)
+            periods = {}
+            if criteria_types & _PERIOD_CRITERIA:
+                periods = self.repo.get_period_counts(
+                    start_id, end_id,
+                    period_start(7, self.now.date()).isoformat(),
+                    period_start(30, self.now.date()).isoformat()
+                )
+            hours = {}
+            if 'hour' in criteria_types:
+                hours = self.repo.get_completion_hours(start_id, end_id)
+        
+        awards = []
+        no_badges = frozenset()
+        for user_id, longest_streak, total_count, focus_minutes in totals:
+            user_earned = earned.get(user_id, no_badges)
+            weekly, monthly = periods.get(user_id, (0, 0))
+            metrics = {
+                'streak': longest_streak,
+                'total_count': total_count,
+                'focus_minutes': focus_minutes,
+                'weekly_count': weekly,
+                'monthly_count': monthly
+            }
+            new_ids = [badge.id for badge in rules.evaluate(metrics, user_earned)]
+            for hour in hours.get(user_id, ()):
+                new_ids += [badge.id for badge in rules.evaluate({'hour': hour}, user_earned)]
+            awards += [(user_id, badge_id) for badge_id in dict.fromkeys(new_ids)]
+        
+        return len(totals), self._write_chunk(start_id, end_id, awards)
+    
+    def _write_chunk(self, start_id: int, end_id: int, awards: List[Tuple[int, str]]) -> int:
+        """授与とチャンクの処理済みの記録を1トランザクションで行い、新規授与数を返す
+        
+        並列実行では他のワーカーの書き込みを待つため、ロック待ちで失敗した場合は
+        間隔を空けて再試行する。
+        """
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            try:
+                # 集計後に授与されたバッジは UNIQUE(user_id, badge_id) により無視される
+                with transaction():
+                    awarded = self.repo.insert_awards(awards)
+                    for user_id in {user_id for user_id, _ in awards}:
+                        notify_user_changed(user_id)
+                    self.repo.mark_chunk_done(self.job, start_id, end_id, awarded)
+                return awarded
+            except sqlite3.OperationalError:
+                if attempt == MAX_WRITE_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+        return 0
+    
+    def progress(self) -> Tuple[int, int, int]:
+        """ジョブの（処理済みチャンク数, 全チャンク数, 授与数の合計）"""
+        done, awarded = self.repo.get_progress(self.job)
+        return done, len(self.plan()), awarded
+    
+    def reset(self) -> int:
+        """ジョブの進捗を削除し、次回の実行を最初のチャンクからやり直す"""
+        with transaction():
+            return self.repo.clear(self.job)
+
+
+def _run_worker(db_path: str, badges: List[Badge], chunk_size: int, job: str,
+                now: datetime, worker: int, workers: int,
+                chunks: Sequence[Tuple[int, int]]) -> Dict[str, int]:
+    """ワーカープロセスの処理（親と同じDB・バッジ定義で担当分を処理する）"""
+    database.DB_PATH = db_path
+    try:
+        rules = configure_badge_rules(badges=badges)
+        return BadgeBackfill(rules, chunk_size, job, now).run(worker, workers, chunks)
+    finally:
+        database.close_pool()
@@ -0,0 +1,153 @@
+"""Per-user read cache for the service layer."""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from repositories.database import add_change_listener
+
+
+DEFAULT_CACHE_SIZE = int(os.environ.get('POMODORO_CACHE_SIZE', '1024'))
+DEFAULT_CACHE_TTL = float(os.environ.get('POMODORO_CACHE_TTL', '30'))
+
+
+class ReadCache:
+    """ユーザー単位の TTL 付き LRU キャッシュ
+    
+    エントリは (user_id, key) で管理し、ユーザーのデータが変更されたら
+    そのユーザーのエントリだけを無効化する。無効化と並行して読み込まれた
+    古い値を保存しないよう、無効化のたびに進む世代番号で確認する。
+    """
+    
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float = DEFAULT_CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: 'OrderedDict[Tuple[int, Hashable], Tuple[float, Any]]' = OrderedDict()
+        self._user_keys: Dict[int, set] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get_or_load(self, user_id: int, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """キャッシュから取得し、なければ loader で読み込んで保存"""
+        if self.maxsize <= 0:
+            return loader()
+        
+        entry_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(entry_key)
+            self.misses += 1
+            generation = self._generation
+        
+        value = loader()
+        
+        with self._lock:
+            # 読み込み中に無効化された場合は古い値を保存しない
+            if self._generation == generation:
+                self._store(entry_key, value)
+        return value
+    
+    def get(self, user_id: int, key: Hashable, default: Any = None) -> Any:
+        """キャッシュから取得（読み込みは行わない）"""
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end((user_id, key))
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return default
+    
+    def put(self, user_id: int, key: Hashable, value: Any,
+            generation: Optional[int] = None) -> None:
+        """値を保存
+        
+        generation を指定した場合、その世代番号から無効化されていたら保存しない
+        （読み込みの前に generation で取得した番号を渡す）。
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._store((user_id, key), value)
+    
+    @property
+    def generation(self) -> int:
+        """無効化のたびに進む世代番号"""
+        with self._lock:
+            return self._generation
+    
+    def invalidate_user(self, user_id: Optional[int]) -> None:
+        """ユーザーのエントリを無効化（None の場合はすべて無効化）"""
+        with self._lock:
+            self.invalidations += 1
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+                self._user_keys.clear()
+                return
+            
+            for entry_key in self._user_keys.pop(user_id, set()):
+                self._entries.pop(entry_key, None)
+    
+    def clear(self) -> None:
+        """すべてのエントリとカウンタを初期化"""
+        self.invalidate_user(None)
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+    
+    def _store(self, entry_key: Tuple[int, Hashable], value: Any) -> None:
+        """エントリを保存し、上限を超えた古いエントリを追い出す（ロック取得済みで呼び出す）"""
+        self._entries[entry_key] = (self._clock() + self.ttl, value)
+        self._entries.move_to_end(entry_key)
+        self._user_keys.setdefault(entry_key[0], set()).add(entry_key)
+        while len(self._entries) > self.maxsize:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+    
+    def _remove(self, entry_key: Tuple[int, Hashable]) -> None:
+        """エントリを削除（ロック取得済みで呼び出す）"""
+        self._entries.pop(entry_key, None)
+        user_keys = self._user_keys.get(entry_key[0])
+        if user_keys is not None:
+            user_keys.discard(entry_key)
+            if not user_keys:
+                del self._user_keys[entry_key[0]]
+    
+    def stats(self) -> Dict:
+        """ヒット数・ミス数などの統計を取得"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+# サービス層で共有するキャッシュ（コミット済みの変更通知で無効化する）
+read_cache = ReadCache()
+add_change_listener(read_cache.invalidate_user)
+
+# 終了した週の集計（期限なし）。/api/sync や完了時刻の遡りで過去の週にも書き込めるため、
+# ユーザーのデータが変更されたらそのユーザーの週を破棄する
+closed_week_cache = ReadCache(ttl=float('inf'))
+add_change_listener(closed_week_cache.invalidate_user)
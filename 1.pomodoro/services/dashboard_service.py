@@ -0,0 +1,28 @@
+"""Dashboard service that batches the page-load payloads."""
+
+from typing import Dict
+from repositories.database import snapshot
+from services.gamification_service import GamificationService
+from services.statistics_service import StatisticsService
+
+
+class DashboardService:
+    """ダッシュボード表示用データをまとめて取得するサービス"""
+    
+    def __init__(self):
+        self.gamification_service = GamificationService()
+        self.statistics_service = StatisticsService()
+    
+    def get_dashboard(self, user_id: int, days: int = 30) -> Dict:
+        """プロフィール・バッジ・統計・日別アクティビティを1回で取得
+        
+        4つの読み込みを1接続・1スナップショットで実行する。各ペイロードは
+        個別APIと同じキャッシュエントリを共有するため、どちらから読んでも再計算しない。
+        """
+        with snapshot():
+            return {
+                'profile': self.gamification_service.get_user_profile(user_id),
+                'badges': self.gamification_service.get_user_badges(user_id),
+                'statistics': self.statistics_service.get_user_statistics(user_id),
+                'daily_activity': self.statistics_service.get_daily_activity(user_id, days)
+            }
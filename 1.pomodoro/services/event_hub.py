@@ -0,0 +1,205 @@
+"""In-process pub/sub hub that fans out per-user events to Server-Sent Events streams."""
+
+import itertools
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+# 購読者ごとに保持する未送信イベントの上限（超えたら差分を捨てて再取得を促す）
+DEFAULT_SSE_QUEUE_SIZE = int(os.environ.get('POMODORO_SSE_QUEUE_SIZE', '64'))
+
+# 同時に接続できる購読者の上限（プロセスごと）
+DEFAULT_SSE_MAX_SUBSCRIBERS = int(os.environ.get('POMODORO_SSE_MAX_SUBSCRIBERS', '10000'))
+
+# イベントがないときに接続維持のコメントを送る間隔（秒）
+DEFAULT_SSE_HEARTBEAT = float(os.environ.get('POMODORO_SSE_HEARTBEAT', '15'))
+
+# 差分を取りこぼした購読者に送るイベント（クライアントは全体を読み込み直す）
+RESYNC_EVENT = 'resync'
+
+
+@dataclass(slots=True)
+class ServerEvent:
+    """購読者に送るイベント（id は SSE の id フィールド）"""
+    
+    id: int
+    type: str
+    data: Any
+
+
+class Subscription:
+    """1本の SSE 接続の購読（上限付きのキュー）
+    
+    送信が追いつかずキューが上限に達した場合は、溜まった差分をすべて捨てて
+    再取得を促すイベント1件に置き換え、それが送られるまでの差分も捨てる（再取得で
+    反映されるため）。遅い接続のためにメモリが増え続けたり、発行側が待たされたりすることはない。
+    """
+    
+    def __init__(self, user_id: int, maxsize: int = DEFAULT_SSE_QUEUE_SIZE):
+        self.user_id = user_id
+        self.maxsize = max(maxsize, 1)
+        self._events: Deque[ServerEvent] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._resync_pending = False
+        # イベントループで待つ購読者を起こすコールバック（ASGI モード）
+        self._waker: Optional[Callable[[], object]] = None
+        self.dropped = 0
+    
+    def set_waker(self, waker: Optional[Callable[[], object]]) -> None:
+        """イベントが積まれたとき・閉じられたときに呼ぶコールバックを設定
+        
+        スレッドでブロックせずに待つ場合に使う（発行側のスレッドから呼ばれるため、
+        コールバックは loop.call_soon_threadsafe のように待たずに戻ること）。
+        """
+        self._waker = waker
+    
+    def push(self, event: ServerEvent) -> bool:
+        """イベントをキューに積む（待たない）。届けられなかった場合は False"""
+        with self._cond:
+            if self._closed:
+                return False
+            if self._resync_pending:
+                self.dropped += 1
+                return False
+            if len(self._events) >= self.maxsize:
+                self.dropped += len(self._events) + 1
+                self._events.clear()
+                self._events.append(ServerEvent(event.id, RESYNC_EVENT, {}))
+                self._resync_pending = True
+                self._cond.notify()
+                delivered = False
+            else:
+                self._events.append(event)
+                self._cond.notify()
+                delivered = True
+        self._wake()
+        return delivered
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[ServerEvent]:
+        """次のイベントを取り出す（timeout までに届かないか、閉じられた場合は None）"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events or self._closed, timeout)
+            if self._events:
+                event = self._events.popleft()
+                if event.type == RESYNC_EVENT:
+                    self._resync_pending = False
+                return event
+            return None
+    
+    def close(self) -> None:
+        """購読を閉じ、待っている get を戻す"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._wake()
+    
+    def _wake(self) -> None:
+        """イベントループで待っている購読者を起こす"""
+        waker = self._waker
+        if waker is not None:
+            waker()
+    
+    @property
+    def closed(self) -> bool:
+        """閉じられたかどうか"""
+        return self._closed
+    
+    @property
+    def pending_count(self) -> int:
+        """未送信のイベント数"""
+        with self._cond:
+            return len(self._events)
+
+
+class EventHub:
+    """ユーザー単位の pub/sub ハブ
+    
+    発行はユーザーの購読者それぞれのキューに積むだけで、送信（ソケットへの書き込み）は
+    各接続のスレッドが行う。購読者数の上限を超えた接続は受け付けない。
+    """
+    
+    def __init__(self, queue_size: int = DEFAULT_SSE_QUEUE_SIZE,
+                 max_subscribers: int = DEFAULT_SSE_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._count = 0
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+    
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """ユーザーのイベントを購読（上限に達している場合は None）"""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """購読を解除して閉じる（接続の終了時に呼び出す）"""
+        subscription.close()
+        with self._lock:
+            subscriptions = self._subscribers.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+    
+    def publish(self, user_id: int, event_type: str, data: Any) -> int:
+        """ユーザーの購読者全員にイベントを送り、届けた購読者数を返す（購読者がいなければ何もしない）"""
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if not subscriptions:
+                return 0
+            subscriptions = list(subscriptions)
+            event = ServerEvent(next(self._ids), event_type, data)
+            self.published += 1
+        
+        dropped = sum(not subscription.push(event) for subscription in subscriptions)
+        with self._lock:
+            self.delivered += len(subscriptions)
+            self.dropped += dropped
+        return len(subscriptions)
+    
+    def has_subscribers(self, user_id: int) -> bool:
+        """ユーザーに購読者がいるかどうか（イベントの作成を省くために使う）"""
+        return user_id in self._subscribers
+    
+    def close(self) -> None:
+        """すべての購読を閉じる（アプリ終了時に呼び出す）"""
+        with self._lock:
+            subscriptions = [s for group in self._subscribers.values() for s in group]
+            self._subscribers.clear()
+            self._count = 0
+        for subscription in subscriptions:
+            subscription.close()
+    
+    def stats(self) -> Dict:
+        """購読者数・発行数などの統計を取得"""
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'users': len(self._subscribers),
+                'max_subscribers': self.max_subscribers,
+                'queue_size': self.queue_size,
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'rejected': self.rejected
+            }
+
+
+# アプリ全体で共有するハブ（コミット後のセッション完了を配信する）
+event_hub = EventHub()
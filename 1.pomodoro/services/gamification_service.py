@@ -1,11 +1,19 @@
 """Gamification service for XP, badges, and streaks."""
 
-from typing import List, Dict
+from itertools import groupby
+from operator import itemgetter
+from typing import List, Dict, Optional, Set, Tuple
 from models.user import User
-from models.badge import Badge, UserBadge, PREDEFINED_BADGES
+from models.streak import streaks_from_days
+from models.badge import Badge, UserBadge
+from models.badge_rules import get_badge_rules
+from models.week import local_today
 from repositories.user_repository import UserRepository
 from repositories.session_repository import SessionRepository
 from repositories.badge_repository import BadgeRepository
+from repositories.rollup_repository import RollupRepository
+from repositories.database import transaction, notify_user_changed
+from services.cache import read_cache
 
 
 class GamificationService:
@@ -15,54 +23,115 @@ class GamificationService:
         self.user_repo = UserRepository()
         self.session_repo = SessionRepository()
         self.badge_repo = BadgeRepository()
+        self.rollup_repo = RollupRepository()
     
     def get_user_profile(self, user_id: int) -> Dict:
         """ユーザープロフィールを取得（XP、レベル、ストリーク含む）"""
+        return read_cache.get_or_load(user_id, 'profile', lambda: self._load_profile(user_id))
+    
+    def _load_profile(self, user_id: int) -> Dict:
+        """プロフィールをDBから読み込む"""
         user = self.user_repo.get_by_id(user_id)
         if not user:
             return {}
         
         return user.to_dict()
     
-    def check_and_award_badges(self, user_id: int) -> List[Badge]:
-        """バッジの条件をチェックして新規バッジを授与"""
-        user = self.user_repo.get_by_id(user_id)
-        if not user:
-            return []
-        
-        # 完了済みセッションを取得
-        completed_sessions = self.session_repo.get_completed_by_user(user_id)
-        total_completed = len(completed_sessions)
-        
-        # 週間セッションを取得
-        weekly_sessions = self.session_repo.get_weekly_sessions(user_id)
-        weekly_completed = sum(1 for s in weekly_sessions if s.completed)
+    def register_user(self, username: str) -> Optional[Dict]:
+        """新しいユーザーを登録（ユーザー名が使われている場合は None）"""
+        with transaction():
+            if self.user_repo.get_by_username(username):
+                return None
+            user = self.user_repo.create(User(username=username))
+            # 登録前に「存在しない」とキャッシュされたリビジョンを無効化する
+            notify_user_changed(user.id)
+        return user.to_dict()
+    
+    def recompute_streaks(self) -> int:
+        """全ユーザーのストリークを完了日から一括で計算し直し、更新したユーザー数を返す
         
-        newly_awarded = []
+        daily_rollup の完了日をユーザー順・日付順に1回だけ走査し、完了時の差分更新と
+        同じ規則（models.streak）で畳み込む。値の変わったユーザーだけを書き込む。
+        最後の完了日が昨日より前のユーザーの現在のストリークは 0 にする（最後の完了日は残す）。
+        バックフィルや規則の変更後に使う。
+        """
+        today = local_today()
+        with transaction():
+            computed = {
+                user_id: streaks_from_days((day for _, day in rows), today)
+                for user_id, rows in groupby(self.rollup_repo.iter_completed_days(),
+                                             key=itemgetter(0))
+            }
+            changed = []
+            for user_id, current in self.user_repo.get_all_streaks().items():
+                streaks = computed.get(user_id, (0, 0, None))
+                if streaks != current:
+                    changed.append((user_id, streaks))
+            
+            self.user_repo.update_streaks(changed)
+            for user_id, _ in changed:
+                notify_user_changed(user_id)
+        return len(changed)
+    
+    def get_user_revision(self, user_id: int) -> Optional[Tuple[int, Optional[str]]]:
+        """ユーザーデータのリビジョンと更新日時を取得（変更がなければキャッシュから返す）"""
+        return read_cache.get_or_load(
+            user_id, 'revision', lambda: self.user_repo.get_revision(user_id)
+        )
+    
+    def check_and_award_badges(self, user_id: int, user: Optional[User] = None,
+                               metrics: Optional[Dict[str, int]] = None) -> List[Badge]:
+        """バッジの条件をチェックして新規バッジを授与
         
-        # 各バッジの条件をチェック
-        for badge in PREDEFINED_BADGES:
-            # 既に取得済みならスキップ
-            if self.badge_repo.has_badge(user_id, badge.id):
-                continue
+        取得済みバッジを1回で読み込み、未取得のバッジの判定に必要な指標だけを集めて
+        コンパイル済みのルールでまとめて判定・授与する。クエリ数はバッジの数によらない。
+        呼び出し元が読み込み済みのユーザーや指標（累計完了数・完了時刻など）を渡した場合は再取得しない。
+        """
+        with transaction():
+            if user is None:
+                user = self.user_repo.get_by_id(user_id)
+            if not user:
+                return []
             
-            should_award = False
+            # 未取得のバッジだけを判定対象にする
+            rules = get_badge_rules()
+            earned_badge_ids = self.badge_repo.get_earned_badge_ids(user_id)
+            criteria_types = rules.metrics_for(earned_badge_ids)
+            if not criteria_types:
+                return []
             
-            if badge.criteria_type == 'streak':
-                should_award = user.current_streak >= badge.criteria_value
-            elif badge.criteria_type == 'weekly_count':
-                should_award = weekly_completed >= badge.criteria_value
-            elif badge.criteria_type == 'total_count':
-                should_award = total_completed >= badge.criteria_value
+            metrics = self._collect_metrics(user, criteria_types, metrics)
+            newly_awarded = rules.evaluate(metrics, earned_badge_ids)
             
-            if should_award:
-                self.badge_repo.award_badge(user_id, badge.id)
-                newly_awarded.append(badge)
+            self.badge_repo.award_badges(user_id, [b.id for b in newly_awarded])
+            return newly_awarded
+    
+    def _collect_metrics(self, user: User, criteria_types: Set[str],
+                         known: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """判定に必要な指標のうち、渡されていないものだけを取得"""
+        metrics = dict(known or {})
+        metrics['streak'] = user.current_streak
+        
+        if criteria_types & {'total_count', 'focus_minutes'} - metrics.keys():
+            # 累計完了数・集中時間はロールアップから取得
+            _, metrics['total_count'], metrics['focus_minutes'] = (
+                self.rollup_repo.get_totals(user.id)
+            )
+        
+        if criteria_types & {'weekly_count', 'monthly_count'}:
+            # 週間・月間完了数はインデックスの範囲集計で取得
+            period = self.session_repo.get_period_statistics(user.id)
+            metrics['weekly_count'] = period.weekly_completed
+            metrics['monthly_count'] = period.monthly_completed
         
-        return newly_awarded
+        return metrics
     
     def get_user_badges(self, user_id: int) -> Dict:
         """ユーザーのバッジ情報を取得"""
+        return read_cache.get_or_load(user_id, 'badges', lambda: self._load_badges(user_id))
+    
+    def _load_badges(self, user_id: int) -> Dict:
+        """バッジ情報をDBから読み込む"""
         user_badges = self.badge_repo.get_user_badges(user_id)
         all_badges = self.badge_repo.get_all_badges()
         
@@ -73,14 +142,39 @@ class GamificationService:
         earned = [b for b in all_badges if b.id in earned_badge_ids]
         not_earned = [b for b in all_badges if b.id not in earned_badge_ids]
         
+        # バッジ定義はモデルのまま返し、JSON プロバイダがフィールドから直接書き出す
         return {
-            'earned': [b.to_dict() for b in earned],
-            'not_earned': [b.to_dict() for b in not_earned],
+            'earned': earned,
+            'not_earned': not_earned,
             'total_earned': len(earned),
             'total_available': len(all_badges)
         }
     
     def get_leaderboard(self, limit: int = 10) -> List[Dict]:
-        """リーダーボードを取得（今後の拡張用）"""
-        # TODO: 複数ユーザー対応時に実装
-        return []
+        """XP順のリーダーボードを取得"""
+        users = self.user_repo.get_top_by_xp(limit)
+        return [
+            {
+                'rank': rank,
+                'user_id': user.id,
+                'username': user.username,
+                'xp': user.xp,
+                'level': user.level,
+                'current_streak': user.active_streak
+            }
+            for rank, user in enumerate(users, start=1)
+        ]
+    
+    def get_user_rank(self, user_id: int) -> Optional[Dict]:
+        """ユーザーのリーダーボード上の順位を取得"""
+        user = self.user_repo.get_by_id(user_id)
+        if not user:
+            return None
+        
+        return {
+            'rank': self.user_repo.get_rank(user),
+            'user_id': user.id,
+            'username': user.username,
+            'xp': user.xp,
+            'level': user.level
+        }
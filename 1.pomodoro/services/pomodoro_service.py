@@ -1,11 +1,27 @@
 """Pomodoro session management service."""
 
-from datetime import datetime
-from typing import Optional
+import base64
+import binascii
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
 from models.session import PomodoroSession
+from models.sync_event import SyncEvent
 from models.user import User
+from models.week import local_now
 from repositories.user_repository import UserRepository
 from repositories.session_repository import SessionRepository
+from repositories.rollup_repository import RollupRepository
+from repositories.event_repository import EventRepository
+from repositories.sync_repository import SyncRepository
+from repositories.database import transaction, notify_user_changed, run_after_commit
+from services.event_hub import event_hub
+from services.gamification_service import GamificationService
+from services.timer_registry import ActiveTimer, TimerRegistry, get_timer_registry
+from services.write_behind import get_write_queue
+
+
+# 集中1分あたりのXP（基本: 25分 = 50XP）
+XP_PER_MINUTE = 2
 
 
 class PomodoroService:
@@ -14,52 +30,364 @@ class PomodoroService:
     def __init__(self):
         self.user_repo = UserRepository()
         self.session_repo = SessionRepository()
+        self.rollup_repo = RollupRepository()
+        self.event_repo = EventRepository()
+        self.sync_repo = SyncRepository()
+        self.gamification_service = GamificationService()
     
     def start_session(self, user_id: int, duration_minutes: int = 25) -> PomodoroSession:
-        """新しいポモドーロセッションを開始"""
+        """新しいポモドーロセッションを開始
+        
+        write-behind モードではIDだけを採番してキューに積み、コミットを待たずに返す。
+        """
         session = PomodoroSession(
             user_id=user_id,
             duration_minutes=duration_minutes,
-            started_at=datetime.now().isoformat()
+            started_at=local_now().isoformat()
         )
-        return self.session_repo.create(session)
+        
+        queue = get_write_queue()
+        if queue is not None:
+            session.id = queue.next_session_id()
+            queue.submit('start', user_id, session_id=session.id,
+                         duration_minutes=duration_minutes, started_at=session.started_at)
+        else:
+            session = self._create_session(session)
+        
+        # サーバー側のタイマーを開始（以前のタイマーは置き換える）
+        registry = get_timer_registry()
+        if registry is not None:
+            registry.register(user_id, session.id, duration_minutes, session.started_at)
+        return session
     
-    def complete_session(self, session_id: int) -> Optional[dict]:
-        """セッションを完了してXPとストリークを更新"""
-        session = self.session_repo.get_by_id(session_id)
-        if not session:
-            return None
+    def _create_session(self, session: PomodoroSession) -> PomodoroSession:
+        """セッションを保存"""
+        # セッションの作成・ロールアップ更新・イベントの追記を同じトランザクションで行う
+        with transaction():
+            session = self.session_repo.create(session)
+            self.rollup_repo.record_started(session)
+            self.event_repo.append('started', session, session.started_at)
+            notify_user_changed(session.user_id)
+        return session
+    
+    def complete_session(self, session_id: int, user_id: Optional[int] = None,
+                         completed_at: Optional[str] = None) -> Optional[dict]:
+        """セッションを完了してXP・ストリーク・バッジを更新
         
-        # XPを計算（基本: 25分 = 50XP）
-        xp = int(session.duration_minutes * 2)
+        user_id を指定した場合、他のユーザーのセッションは見つからないものとして扱う。
+        write-behind モードでは、レベルアップやバッジの結果を返すためにイベントが
+        コミットされるまで待つ（他のイベントと同じトランザクションにまとめてコミットされる）。
+        """
+        completed_at = completed_at or local_now().isoformat()
+        queue = get_write_queue()
+        if queue is not None:
+            result = queue.submit('complete', user_id, session_id=session_id,
+                                  completed_at=completed_at).result()
+        else:
+            result = self._complete_session(session_id, user_id, completed_at)
         
-        # セッションを完了
-        session.complete(xp)
-        self.session_repo.update(session)
+        registry = get_timer_registry()
+        if result and registry is not None:
+            registry.finish(result['session']['user_id'], session_id)
+        return result
+    
+    def complete_timer(self, timer: ActiveTimer, overdue_seconds: float) -> Optional[dict]:
+        """期限の来たサーバー側のタイマーのセッションを完了（監視スレッドから呼ばれる）
         
-        # ユーザー情報を更新
-        user = self.user_repo.get_by_id(session.user_id)
-        if user:
-            # XPを追加してレベルアップをチェック
-            leveled_up = user.add_xp(xp)
+        完了時刻は監視スレッドが処理した時刻ではなく、タイマーが終了した時刻にする。
+        """
+        completed_at = (local_now() - timedelta(seconds=overdue_seconds)).isoformat()
+        return self.complete_session(timer.session_id, timer.user_id, completed_at)
+    
+    @staticmethod
+    def get_timer_state(user_id: int) -> Optional[Dict]:
+        """ユーザーの実行中（一時停止中）のタイマーの状態を取得（なければ None）"""
+        registry = get_timer_registry()
+        if registry is None:
+            return None
+        return registry.get_state(user_id)
+    
+    @staticmethod
+    def pause_session(user_id: int, session_id: int) -> Optional[Dict]:
+        """タイマーを一時停止して状態を返す（該当するタイマーがなければ None）"""
+        registry = get_timer_registry()
+        if registry is None or registry.pause(user_id, session_id) is None:
+            return None
+        return registry.get_state(user_id)
+    
+    @staticmethod
+    def resume_session(user_id: int, session_id: int) -> Optional[Dict]:
+        """一時停止したタイマーを再開して状態を返す（該当するタイマーがなければ None）"""
+        registry = get_timer_registry()
+        if registry is None or registry.resume(user_id, session_id) is None:
+            return None
+        return registry.get_state(user_id)
+    
+    @staticmethod
+    def cancel_session(user_id: int, session_id: int) -> bool:
+        """タイマーを中止（セッションは未完了のまま残る）。該当するタイマーがなければ False"""
+        registry = get_timer_registry()
+        return registry is not None and registry.finish(user_id, session_id)
+    
+    def _complete_session(self, session_id: int, user_id: Optional[int],
+                          completed_at: str) -> Optional[dict]:
+        """セッションを完了として保存
+        
+        完了は冪等で、完了済みのセッションを再度完了してもXP・カウンタは加算しない。
+        XP・レベル・ストリークは読み込んだ値を書き戻さず、SQL の差分更新で反映する。
+        """
+        # セッション・ユーザー・ロールアップ・バッジの更新を1接続・1トランザクションにまとめる
+        with transaction():
+            # 未完了の場合だけ完了にする（同時に完了しても XP を得るのは1回だけ）
+            session = self.session_repo.complete(session_id, completed_at, XP_PER_MINUTE, user_id)
+            if session is None:
+                return self._get_completed_result(session_id, user_id)
             
-            # ストリークを更新
-            today = datetime.now().strftime('%Y-%m-%d')
-            user.update_streak(today)
+            completed_count, focus_minutes = self.rollup_repo.record_completed(session)
+            self.event_repo.append('completed', session, session.completed_at)
+            notify_user_changed(session.user_id)
             
-            # ユーザー情報を保存
-            self.user_repo.update(user)
+            # XPとストリークを現在の値への差分として更新（完了時刻の日付。再生時も記録した日付を使う）
+            user = self.user_repo.add_progress(session.user_id, session.xp_earned, completed_at[:10])
+            if not user:
+                return None
+            leveled_up = user.level > User.level_for_xp(user.xp - session.xp_earned)
             
-            return {
+            # 更新済みのユーザーと取得済みの指標を渡してバッジの条件をチェック
+            new_badges = self.gamification_service.check_and_award_badges(user.id, user, {
+                'total_count': completed_count,
+                'focus_minutes': focus_minutes,
+                'hour': int(completed_at[11:13])
+            })
+            
+            result = {
                 'session': session.to_dict(),
                 'user': user.to_dict(),
                 'leveled_up': leveled_up,
-                'xp_earned': xp
+                'xp_earned': session.xp_earned,
+                'new_badges': new_badges,
+                'already_completed': False
             }
+            # 他のタブ・端末へ差分を配信する（コミット後。購読者がいなければ何もしない）
+            if event_hub.has_subscribers(user.id):
+                run_after_commit(lambda: event_hub.publish(user.id, 'progress', {
+                    **result,
+                    'stats': {
+                        'completed_sessions': completed_count,
+                        'total_focus_minutes': focus_minutes,
+                        'day': completed_at[:10],
+                        'focus_minutes': session.duration_minutes
+                    }
+                }))
+            return result
+    
+    def _get_completed_result(self, session_id: int, user_id: Optional[int]) -> Optional[dict]:
+        """完了済みのセッションの結果を返す（XP・バッジは付与しない）"""
+        session = self.session_repo.get_by_id(session_id)
+        if not session or (user_id is not None and session.user_id != user_id):
+            return None
+        user = self.user_repo.get_by_id(session.user_id)
+        if not user:
+            return None
+        
+        return {
+            'session': session.to_dict(),
+            'user': user.to_dict(),
+            'leveled_up': False,
+            'xp_earned': 0,
+            'new_badges': [],
+            'already_completed': True
+        }
+    
+    def sync_events(self, user_id: int, events: List[SyncEvent]) -> Optional[dict]:
+        """クライアントが記録したセッションイベントをまとめて適用し、結果と進捗の差分を返す
+        
+        適用済みのキーのイベントは読み飛ばすため、同じバッチを再送しても二重に適用しない。
+        write-behind モードではバッチを1件のイベントとしてキューに積み、コミットを待つ。
+        """
+        queue = get_write_queue()
+        if queue is not None:
+            for event in events:
+                if event.type == 'start':
+                    event.session_id = queue.next_session_id()
+            result = queue.submit('sync', user_id,
+                                  events=[event.to_dict() for event in events]).result()
+        else:
+            result = self._apply_sync(user_id, events)
+        
+        registry = get_timer_registry()
+        if result and registry is not None:
+            self._sync_timers(registry, user_id, events, result['results'])
+        return result
+    
+    def _apply_sync(self, user_id: int, events: List[SyncEvent]) -> Optional[dict]:
+        """イベントを1トランザクションで順に適用
         
+        対象のセッションがない完了と、セッションの開始より前の時刻の完了は rejected にする。
+        """
+        with transaction():
+            before = self.user_repo.get_by_id(user_id)
+            if not before:
+                return None
+            # このバッチと、完了が参照する開始イベントの適用済みのキーを1回で読む
+            applied = self.sync_repo.get_sessions(user_id, {
+                key for event in events for key in (event.key, event.start_key) if key
+            })
+            
+            results = []
+            xp_earned = 0
+            new_badges = []
+            for event in events:
+                if event.key in applied:
+                    results.append({'key': event.key, 'status': 'duplicate',
+                                    'session_id': applied[event.key]})
+                    continue
+                
+                if event.type == 'start':
+                    session = self._create_session(PomodoroSession(
+                        id=event.session_id,
+                        user_id=user_id,
+                        duration_minutes=event.duration_minutes,
+                        started_at=event.occurred_at
+                    ))
+                    entry = {'key': event.key, 'status': 'applied', 'session_id': session.id}
+                else:
+                    session_id = applied.get(event.start_key) if event.start_key else event.session_id
+                    error = self._check_sync_completion(user_id, session_id, event.occurred_at)
+                    result = None
+                    if error is None:
+                        result = self._complete_session(session_id, user_id, event.occurred_at)
+                    if not result:
+                        # 記録しないため、開始イベントが届いた後に再送すれば適用できる
+                        results.append({'key': event.key, 'status': 'rejected',
+                                        'session_id': session_id,
+                                        'error': error or 'Session not found'})
+                        continue
+                    entry = {
+                        'key': event.key,
+                        'status': 'duplicate' if result['already_completed'] else 'applied',
+                        'session_id': session_id,
+                        'xp_earned': result['xp_earned']
+                    }
+                    xp_earned += result['xp_earned']
+                    new_badges += result['new_badges']
+                
+                self.sync_repo.record(user_id, event.key, entry['session_id'])
+                applied[event.key] = entry['session_id']
+                results.append(entry)
+            
+            user = self.user_repo.get_by_id(user_id)
+            return {
+                'results': results,
+                'user': user.to_dict(),
+                'leveled_up': user.level > before.level,
+                'xp_earned': xp_earned,
+                'new_badges': new_badges
+            }
+    
+    def _check_sync_completion(self, user_id: int, session_id: Optional[int],
+                               completed_at: str) -> Optional[str]:
+        """同期した完了イベントを適用できない理由を返す（適用できる場合は None）"""
+        session = self.session_repo.get_by_id(session_id) if session_id is not None else None
+        if not session or session.user_id != user_id:
+            return 'Session not found'
+        if not session.completed and session.started_at and \
+                datetime.fromisoformat(completed_at) < datetime.fromisoformat(session.started_at):
+            return 'Completion is earlier than the start'
         return None
     
+    @staticmethod
+    def _sync_timers(registry: TimerRegistry, user_id: int, events: List[SyncEvent],
+                     results: List[Dict]) -> None:
+        """同期したイベントをサーバー側のタイマーに反映
+        
+        完了したセッションのタイマーは削除し、まだ終了時刻前の開始イベントはタイマーを登録する
+        （オフライン中に開始したセッションは経過した時間を差し引いて数える）。
+        """
+        completed = {result['session_id'] for event, result in zip(events, results)
+                     if event.type == 'complete' and result['status'] != 'rejected'}
+        for session_id in completed:
+            registry.finish(user_id, session_id)
+        
+        now = local_now()
+        for event, result in zip(events, results):
+            if event.type != 'start' or result['status'] != 'applied' \
+                    or result['session_id'] in completed:
+                continue
+            elapsed = (now - datetime.fromisoformat(event.occurred_at)).total_seconds()
+            remaining = event.duration_minutes * 60 - elapsed
+            if remaining > 0:
+                registry.register(user_id, result['session_id'], event.duration_minutes,
+                                  event.occurred_at, remaining)
+    
+    def apply_event(self, event: Dict) -> Optional[object]:
+        """write-behind キューのイベントをDBに反映（書き込みスレッドから呼ばれる）"""
+        if event['type'] == 'start':
+            return self._create_session(PomodoroSession(
+                id=event['session_id'],
+                user_id=event['user_id'],
+                duration_minutes=event['duration_minutes'],
+                started_at=event['started_at']
+            ))
+        if event['type'] == 'complete':
+            return self._complete_session(
+                event['session_id'], event['user_id'], event['completed_at']
+            )
+        if event['type'] == 'sync':
+            return self._apply_sync(
+                event['user_id'], [SyncEvent(**item) for item in event['events']]
+            )
+        raise ValueError(f'Unknown event type: {event["type"]!r}')
+    
+    @staticmethod
+    def wait_for_writes(user_id: int) -> None:
+        """write-behind モードでユーザーの未反映の書き込みがコミットされるまで待つ"""
+        queue = get_write_queue()
+        if queue is not None:
+            queue.wait_for_user(user_id)
+    
     def get_user_sessions(self, user_id: int, limit: Optional[int] = 10) -> list:
         """ユーザーのセッション履歴を取得"""
         sessions = self.session_repo.get_by_user(user_id, limit)
         return [s.to_dict() for s in sessions]
+    
+    def get_session_page(self, user_id: int, limit: int = 10,
+                         cursor: Optional[str] = None) -> dict:
+        """セッション履歴を1ページ分取得（次ページがあれば next_cursor を返す）
+        
+        cursor が不正な場合は ValueError を送出する。
+        """
+        before = self.decode_cursor(cursor) if cursor else None
+        # 1件多く読み、次のページがあるかどうかを判定する。
+        # 行はモデルを経由せずレスポンス用の dict として読み込む
+        sessions = self.session_repo.get_page(user_id, limit + 1, before, as_payload=True)
+        
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = self.encode_cursor(sessions[-1]['started_at'], sessions[-1]['id'])
+        
+        return {
+            'sessions': sessions,
+            'next_cursor': next_cursor
+        }
+    
+    def iter_user_sessions(self, user_id: int) -> Iterator[dict]:
+        """ユーザーの全セッションをリストを作らずに1件ずつ返す（エクスポート用）"""
+        return self.session_repo.iter_by_user(user_id, as_payload=True)
+    
+    @staticmethod
+    def encode_cursor(started_at: str, session_id: int) -> str:
+        """(started_at, id) をページングカーソルに変換"""
+        raw = f'{started_at}|{session_id}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, int]:
+        """ページングカーソルを (started_at, id) に戻す"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            started_at, session_id = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+            return started_at, int(session_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError(f'Invalid cursor: {cursor!r}')
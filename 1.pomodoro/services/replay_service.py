@@ -0,0 +1,120 @@
+"""Replay engine that rebuilds users and user_badges from the session event log."""
+
+from typing import Dict, List, Optional, Tuple
+from models.user_state import UserState
+from repositories.user_repository import UserRepository
+from repositories.badge_repository import BadgeRepository
+from repositories.event_repository import EventRepository
+from repositories.database import snapshot, transaction, notify_user_changed
+
+# 検証で比較するユーザーの列
+# 現在のストリークは途切れたものを 0 として比べる（一括再計算は途切れたストリークを 0 で保存する）
+PROGRESS_FIELDS = ('xp', 'level', 'active_streak', 'longest_streak', 'last_session_date')
+
+
+class ReplayService:
+    """イベントログの再生サービス
+    
+    完了イベントをユーザーごとに UserState へ畳み込み、users の進捗（XP・レベル・
+    ストリーク）と user_badges を決定的に再構築する。スナップショットがあれば
+    その位置から再生するため、再生するのはスナップショット以降のイベントだけで済む。
+    """
+    
+    def __init__(self):
+        self.user_repo = UserRepository()
+        self.badge_repo = BadgeRepository()
+        self.event_repo = EventRepository()
+    
+    def replay(self, user_ids: Optional[List[int]] = None,
+               use_snapshots: bool = True) -> Tuple[Dict[int, UserState], int]:
+        """イベントを再生して {user_id: 状態} と再生した最後のイベント番号を返す"""
+        # 再生中に追記されたイベントを途中から拾わないよう、終端を先に決める
+        with snapshot():
+            until_seq = self.event_repo.get_last_seq()
+            states: Dict[int, UserState] = {}
+            if use_snapshots:
+                for user_id, (seq, state) in self.event_repo.get_snapshots(user_ids).items():
+                    states[user_id] = UserState.from_snapshot(user_id, seq, state)
+            # スナップショットは全ユーザー同じ位置で取るため、最も古い位置から読めば足りる
+            after_seq = min((state.seq for state in states.values()), default=0)
+            mixed = any(state.seq != after_seq for state in states.values())
+            
+            # イベント数に比例する部分のため、ループ内の処理は最小限にする
+            get_state = states.get
+            for seq, user_id, started_at, occurred_at, xp, duration in (
+                    self.event_repo.iter_completed(after_seq, until_seq, user_ids)):
+                state = get_state(user_id)
+                if state is None:
+                    state = states[user_id] = UserState.empty(user_id)
+                elif mixed and seq <= state.seq:
+                    continue
+                state.apply_completed(started_at, occurred_at, xp, duration)
+        
+        return states, until_seq
+    
+    def take_snapshots(self) -> int:
+        """全ユーザーの現在の状態をスナップショットとして保存し、件数を返す
+        
+        定期的に（cron などで）実行すると、以後の再生はこの位置から始まる。
+        """
+        states, until_seq = self.replay()
+        return self._save_snapshots(states, until_seq)
+    
+    def rebuild(self) -> Tuple[int, int]:
+        """イベントログから users の進捗と user_badges を作り直し、（ユーザー数, バッジ数）を返す
+        
+        再生から書き込みまでを1つの書き込みトランザクションで行い、途中の追記を取りこぼさない。
+        """
+        with transaction():
+            states, until_seq = self.replay()
+            user_ids = self.user_repo.replace_progress(state.user for state in states.values())
+            existing = set(user_ids)
+            badges = [
+                (user_id, badge_id, earned_at)
+                for user_id, state in states.items() if user_id in existing
+                for badge_id, earned_at in state.badges.items()
+            ]
+            self.badge_repo.replace_all(badges)
+            self._save_snapshots(states, until_seq)
+            for user_id in user_ids:
+                notify_user_changed(user_id)
+        return len(user_ids), len(badges)
+    
+    def verify(self) -> List[Dict]:
+        """再生した状態と users / user_badges の差分を返す（不変条件のチェック）"""
+        # 再生と現在の値の読み込みを同じ読み取り時点で行い、途中の書き込みを差分と誤認しない
+        with snapshot():
+            states, _ = self.replay()
+            users = self.user_repo.get_all()
+            earned = self.badge_repo.get_all_earned()
+        
+        drift = []
+        for user in users:
+            state = states.get(user.id) or UserState.empty(user.id)
+            expected = tuple(getattr(state.user, name) for name in PROGRESS_FIELDS)
+            actual = tuple(getattr(user, name) for name in PROGRESS_FIELDS)
+            if expected != actual:
+                drift.append({
+                    'table': 'users',
+                    'key': user.id,
+                    'expected': dict(zip(PROGRESS_FIELDS, expected)),
+                    'actual': dict(zip(PROGRESS_FIELDS, actual))
+                })
+            
+            expected_badges = sorted(state.badges)
+            actual_badges = sorted(earned.get(user.id, ()))
+            if expected_badges != actual_badges:
+                drift.append({
+                    'table': 'user_badges',
+                    'key': user.id,
+                    'expected': expected_badges,
+                    'actual': actual_badges
+                })
+        
+        return drift
+    
+    def _save_snapshots(self, states: Dict[int, UserState], until_seq: int) -> int:
+        """状態を until_seq 時点のスナップショットとして保存"""
+        return self.event_repo.save_snapshots(
+            (user_id, until_seq, state.to_snapshot()) for user_id, state in states.items()
+        )
@@ -1,10 +1,15 @@
 """Statistics service for tracking user performance."""
 
-from typing import Dict, List
-from datetime import datetime, timedelta
-from models.statistics import Statistics
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+from models.week import IsoWeek, get_timezone, local_today
 from repositories.session_repository import SessionRepository
 from repositories.user_repository import UserRepository
+from repositories.rollup_repository import RollupRepository
+from services.cache import read_cache, closed_week_cache
+
+# ヒートマップの濃淡の段階数（0 は記録なし）
+HEATMAP_LEVELS = 4
 
 
 class StatisticsService:
@@ -13,89 +18,244 @@ class StatisticsService:
     def __init__(self):
         self.session_repo = SessionRepository()
         self.user_repo = UserRepository()
+        self.rollup_repo = RollupRepository()
     
     def get_user_statistics(self, user_id: int) -> Dict:
         """ユーザーの全体統計を取得"""
-        stats = Statistics(user_id=user_id)
-        
-        # 全セッション
-        all_sessions = self.session_repo.get_by_user(user_id)
-        
-        # 週間セッション
-        weekly_sessions = self.session_repo.get_weekly_sessions(user_id)
-        
-        # 月間セッション
-        monthly_sessions = self.session_repo.get_monthly_sessions(user_id)
-        
-        # 全体統計を更新
-        stats.update_from_sessions(all_sessions)
-        
-        # 週間統計
-        stats.weekly_sessions = len(weekly_sessions)
-        stats.weekly_completed = sum(1 for s in weekly_sessions if s.completed)
-        stats.weekly_focus_minutes = sum(s.duration_minutes for s in weekly_sessions if s.completed)
-        
-        # 月間統計
-        stats.monthly_sessions = len(monthly_sessions)
-        stats.monthly_completed = sum(1 for s in monthly_sessions if s.completed)
-        stats.monthly_focus_minutes = sum(s.duration_minutes for s in monthly_sessions if s.completed)
-        
+        return read_cache.get_or_load(
+            user_id, 'statistics', lambda: self._load_statistics(user_id)
+        )
+    
+    def _load_statistics(self, user_id: int) -> Dict:
+        """全体統計をDBから集計"""
+        # 週間・月間は期間内のインデックス範囲のみを集計し、累計はロールアップから取得
+        stats = self.session_repo.get_period_statistics(user_id)
+        total_sessions, completed_sessions, total_focus_minutes = \
+            self.rollup_repo.get_totals(user_id)
+        stats.update_from_totals(total_sessions, completed_sessions, total_focus_minutes)
         return stats.to_dict()
     
     def get_daily_activity(self, user_id: int, days: int = 30) -> List[Dict]:
         """日別のアクティビティデータを取得（グラフ表示用）"""
-        sessions = self.session_repo.get_by_user(user_id)
+        # 日付が変わると集計範囲も変わるため、キーに当日の日付を含める
+        key = ('daily', days, local_today().isoformat())
+        return read_cache.get_or_load(
+            user_id, key, lambda: self._load_daily_activity(user_id, days)
+        )
+    
+    def _load_daily_activity(self, user_id: int, days: int) -> List[Dict]:
+        """日別のアクティビティデータをDBから読み込む"""
+        if days <= 0:
+            return []
+        
+        # 日付は序数の加算だけで生成する（1日ごとに datetime.now() を呼ばない）
+        first = local_today().toordinal() - days + 1
+        dates = [date.fromordinal(first + i).isoformat() for i in range(days)]
         
-        # 日付別にグループ化
-        daily_data = {}
-        for session in sessions:
-            if session.completed and session.completed_at:
-                date = session.completed_at[:10]  # YYYY-MM-DD
-                if date not in daily_data:
-                    daily_data[date] = {
-                        'date': date,
-                        'completed': 0,
-                        'focus_minutes': 0
-                    }
-                daily_data[date]['completed'] += 1
-                daily_data[date]['focus_minutes'] += session.duration_minutes
+        # 日別ロールアップから対象期間の行だけを読む（履歴の長さに依存しない）
+        daily_data = self.rollup_repo.get_daily(user_id, dates[0])
         
         # 過去N日分のデータを生成（データがない日は0）
         result = []
-        for i in range(days):
-            date = (datetime.now() - timedelta(days=days-i-1)).strftime('%Y-%m-%d')
-            if date in daily_data:
-                result.append(daily_data[date])
-            else:
-                result.append({
-                    'date': date,
+        for day in dates:
+            completed, focus_minutes = daily_data.get(day, (0, 0))
+            result.append({
+                'date': day,
+                'completed': completed,
+                'focus_minutes': focus_minutes
+            })
+        
+        return result
+    
+    def get_activity(self, user_id: int, days: int = 365) -> Dict:
+        """過去N日間の日別・週別・年別の推移、ヒートマップ、曜日×時間帯の分布を取得"""
+        key = ('activity', days, local_today().isoformat())
+        return read_cache.get_or_load(
+            user_id, key, lambda: self._load_activity(user_id, days)
+        )
+    
+    def _load_activity(self, user_id: int, days: int) -> Dict:
+        """アクティビティの各系列を集計
+        
+        日別ロールアップを1回読んで日別系列を作り、週別・年別・ヒートマップは
+        その日別系列から作る。曜日×時間帯だけは時刻が必要なため、期間内の完了セッションを
+        1時間単位で GROUP BY する。いずれも処理量は期間の日数（と期間内のセッション数）で決まり、
+        それより前の履歴は読まない。
+        """
+        daily = self._load_daily_activity(user_id, days)
+        if not daily:
+            return {
+                'days': 0,
+                'daily': [],
+                'weekly': [],
+                'yearly': [],
+                'heatmap': self._build_heatmap([]),
+                'hour_weekday': self._build_hour_weekday([])
+            }
+        
+        counts = self.session_repo.get_hourly_counts(user_id, daily[0]['date'])
+        return {
+            'days': days,
+            'daily': daily,
+            'weekly': self._build_weekly(daily),
+            'yearly': self._build_yearly(daily),
+            'heatmap': self._build_heatmap(daily),
+            'hour_weekday': self._build_hour_weekday(counts)
+        }
+    
+    @staticmethod
+    def _build_weekly(daily: List[Dict]) -> List[Dict]:
+        """日別系列を週（月曜開始）ごとに集計"""
+        weeks: List[Dict] = []
+        for entry in daily:
+            day = date.fromisoformat(entry['date'])
+            week_start = (day - timedelta(days=day.weekday())).isoformat()
+            if not weeks or weeks[-1]['week_start'] != week_start:
+                weeks.append({
+                    'week_start': week_start,
+                    'days': 0,
                     'completed': 0,
                     'focus_minutes': 0
                 })
+            week = weeks[-1]
+            week['days'] += 1
+            week['completed'] += entry['completed']
+            week['focus_minutes'] += entry['focus_minutes']
+        return weeks
+    
+    @staticmethod
+    def _build_yearly(daily: List[Dict]) -> List[Dict]:
+        """日別系列を年ごとに集計"""
+        years: List[Dict] = []
+        for entry in daily:
+            year = int(entry['date'][:4])
+            if not years or years[-1]['year'] != year:
+                years.append({'year': year, 'days': 0, 'completed': 0, 'focus_minutes': 0})
+            bucket = years[-1]
+            bucket['days'] += 1
+            bucket['completed'] += entry['completed']
+            bucket['focus_minutes'] += entry['focus_minutes']
+        return years
+    
+    @staticmethod
+    def _build_heatmap(daily: List[Dict]) -> Dict:
+        """カレンダーヒートマップ用に日ごとの濃淡（0〜HEATMAP_LEVELS）を付与
         
-        return result
+        濃淡は期間内の最大完了数に対する割合で決める。weekday は月曜=0。
+        """
+        max_completed = max((entry['completed'] for entry in daily), default=0)
+        cells = []
+        for entry in daily:
+            completed = entry['completed']
+            if completed:
+                level = min(HEATMAP_LEVELS, -(-completed * HEATMAP_LEVELS // max_completed))
+            else:
+                level = 0
+            cells.append({
+                'date': entry['date'],
+                'weekday': date.fromisoformat(entry['date']).weekday(),
+                'completed': completed,
+                'level': level
+            })
+        return {
+            'max_completed': max_completed,
+            'levels': HEATMAP_LEVELS,
+            'cells': cells
+        }
+    
+    @staticmethod
+    def _build_hour_weekday(counts: List[tuple]) -> Dict:
+        """1時間ごとの集計から曜日（月曜=0）× 時間帯（0〜23時）の行列を作成"""
+        completed = [[0] * 24 for _ in range(7)]
+        focus_minutes = [[0] * 24 for _ in range(7)]
+        weekdays: Dict[str, int] = {}
+        for hour_key, count, minutes in counts:
+            day = hour_key[:10]
+            weekday = weekdays.get(day)
+            if weekday is None:
+                weekday = weekdays[day] = date.fromisoformat(day).weekday()
+            hour = int(hour_key[11:13])
+            completed[weekday][hour] += count
+            focus_minutes[weekday][hour] += minutes
+        return {
+            'completed': completed,
+            'focus_minutes': focus_minutes
+        }
     
     def get_weekly_comparison(self, user_id: int) -> Dict:
-        """今週と先週の比較データを取得"""
-        now = datetime.now()
-        
-        # 今週のデータ
-        this_week_sessions = self.session_repo.get_weekly_sessions(user_id)
-        this_week_completed = sum(1 for s in this_week_sessions if s.completed)
-        this_week_minutes = sum(s.duration_minutes for s in this_week_sessions if s.completed)
-        
-        # TODO: 先週のデータ取得ロジックを実装
-        # 現在は今週のデータのみ返す（先週データは0）
-        # 将来実装: ISO 8601形式の週（月曜開始）に基づいた正確な週の境界計算
+        """今週と先週（ISO 8601 の週、月曜開始）の比較データを取得"""
+        this_week = IsoWeek.current()
+        last_week_bucket, this_week_bucket = self.get_week_buckets(
+            user_id, this_week.previous(), this_week
+        )
         
         return {
-            'this_week': {
-                'completed': this_week_completed,
-                'focus_minutes': this_week_minutes
-            },
-            'last_week': {
-                'completed': 0,  # TODO: 先週の完了数を計算
-                'focus_minutes': 0  # TODO: 先週の集中時間を計算
+            'this_week': this_week_bucket,
+            'last_week': last_week_bucket,
+            'change': {
+                'completed': this_week_bucket['completed'] - last_week_bucket['completed'],
+                'focus_minutes':
+                    this_week_bucket['focus_minutes'] - last_week_bucket['focus_minutes'],
+                'completed_percentage': self._percentage_change(
+                    last_week_bucket['completed'], this_week_bucket['completed']
+                )
             },
-            'note': '先週のデータは現在未実装です'
+            'timezone': str(get_timezone() or 'local')
         }
+    
+    def get_weekly_trend(self, user_id: int, weeks: int = 12) -> List[Dict]:
+        """今週を含む直近N週の週別集計を古い順に取得"""
+        this_week = IsoWeek.current()
+        return self.get_week_buckets(user_id, this_week.shift(-(weeks - 1)), this_week)
+    
+    def get_week_buckets(self, user_id: int, first: IsoWeek, last: IsoWeek) -> List[Dict]:
+        """first から last までの週別集計を古い順に取得
+        
+        終了した週の集計はユーザーのデータが変更されるまで期限なしでキャッシュし、
+        DBから読むのはキャッシュにない週と今週だけにする。読み込みは日別ロールアップの範囲検索1回。
+        """
+        today = local_today()
+        # 読み込み中に変更された場合は古い集計を保存しない
+        generation = closed_week_cache.generation
+        weeks = []
+        week = first
+        while week <= last:
+            weeks.append(week)
+            week = week.shift(1)
+        
+        buckets: Dict[IsoWeek, Dict] = {}
+        missing = []
+        for week in weeks:
+            bucket = closed_week_cache.get(user_id, week) if week.is_closed(today) else None
+            if bucket is None:
+                missing.append(week)
+            else:
+                buckets[week] = bucket
+        
+        if missing:
+            loaded = self.rollup_repo.get_weekly(
+                user_id, missing[0].start.isoformat(), missing[-1].end.isoformat()
+            )
+            for week in missing:
+                started, completed, focus_minutes = loaded.get(week.start.isoformat(), (0, 0, 0))
+                bucket = {
+                    'week': str(week),
+                    'start': week.start.isoformat(),
+                    'end': week.end.isoformat(),
+                    'sessions': started,
+                    'completed': completed,
+                    'focus_minutes': focus_minutes,
+                    'closed': week.is_closed(today)
+                }
+                if bucket['closed']:
+                    closed_week_cache.put(user_id, week, bucket, generation)
+                buckets[week] = bucket
+        
+        return [buckets[week] for week in weeks]
+    
+    @staticmethod
+    def _percentage_change(before: int, after: int) -> Optional[float]:
+        """before から after への増減率（%）。before が0の場合は None"""
+        if not before:
+            return None
+        return round((after - before) / before * 100, 1)
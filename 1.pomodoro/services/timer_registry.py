@@ -0,0 +1,283 @@
+"""In-memory registry of running timers ordered by deadline in a heap."""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from models.week import local_now
+
+logger = logging.getLogger(__name__)
+
+# サーバー側でタイマーを管理するか（期限の来たセッションを自動で完了する）
+DEFAULT_TIMER_REGISTRY = os.environ.get('POMODORO_TIMER_REGISTRY', 'True').lower() in ('true', '1', 't')
+
+# 期限を過ぎてから自動完了するまでの猶予（秒）。この間はクライアント自身の完了を待つ
+DEFAULT_TIMER_GRACE = float(os.environ.get('POMODORO_TIMER_GRACE', '5'))
+
+# 一時停止したまま放置されたタイマーを破棄するまでの時間（秒）
+DEFAULT_TIMER_PAUSE_TIMEOUT = float(os.environ.get('POMODORO_TIMER_PAUSE_TIMEOUT', '3600'))
+
+
+@dataclass(slots=True)
+class ActiveTimer:
+    """実行中（または一時停止中）のタイマー
+    
+    due はヒープ上の期限（実行中は終了時刻 + 猶予、一時停止中は破棄する時刻）で、
+    時刻はすべて単調時計の秒。seq はヒープの項目が最新かどうかの確認に使う。
+    """
+    
+    user_id: int
+    session_id: int
+    duration_minutes: int
+    started_at: str
+    # 実行中: 終了する時刻 / 一時停止中: None
+    deadline: Optional[float]
+    # 一時停止中の残り秒数（実行中は deadline から求める）
+    remaining: float
+    due: float
+    seq: int
+    
+    @property
+    def paused(self) -> bool:
+        """一時停止中かどうか"""
+        return self.deadline is None
+    
+    def remaining_at(self, now: float) -> float:
+        """now 時点の残り秒数"""
+        if self.deadline is None:
+            return self.remaining
+        return max(self.deadline - now, 0.0)
+
+
+class TimerRegistry:
+    """ユーザーごとのアクティブなタイマーの登録簿
+    
+    タイマーはユーザーIDをキーにした dict に1ユーザー1件で持ち、期限順の
+    ヒープ（期限, 番号, ユーザーID）と組み合わせる。一時停止・再開・完了では
+    古いヒープの項目を削除せず、番号が一致しない項目を取り出したときに読み捨てる
+    （いずれの操作も O(log n)）。読み捨てる項目が増えたらヒープを作り直す。
+    
+    監視スレッドは最も近い期限まで待ち、期限の来たタイマーを取り出して、
+    実行中のものは on_expire(タイマー, 終了からの経過秒数) で完了させ、
+    一時停止のまま放置されたものは破棄する。
+    """
+    
+    def __init__(self, on_expire: Callable[[ActiveTimer, float], object],
+                 grace: float = DEFAULT_TIMER_GRACE,
+                 pause_timeout: float = DEFAULT_TIMER_PAUSE_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.on_expire = on_expire
+        self.grace = grace
+        self.pause_timeout = pause_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._timers: Dict[int, ActiveTimer] = {}
+        self._heap: List[Tuple[float, int, int]] = []
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.auto_completed = 0
+        self.expired = 0
+        self.failed = 0
+    
+    def start(self) -> 'TimerRegistry':
+        """監視スレッドを開始"""
+        self._thread = threading.Thread(target=self._run, name='timer-registry', daemon=True)
+        self._thread.start()
+        return self
+    
+    def close(self) -> None:
+        """監視スレッドを止める（登録中のタイマーは完了させない）"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def register(self, user_id: int, session_id: int, duration_minutes: int,
+                 started_at: str, remaining: Optional[float] = None) -> ActiveTimer:
+        """開始したセッションのタイマーを登録（ユーザーの以前のタイマーは置き換える）
+        
+        remaining を指定した場合は開始から時間が経ったセッションとして残り秒数から数える。
+        """
+        with self._cond:
+            now = self._clock()
+            deadline = now + (duration_minutes * 60 if remaining is None else remaining)
+            timer = ActiveTimer(user_id, session_id, duration_minutes, started_at,
+                                deadline, 0.0, deadline + self.grace, 0)
+            self._timers[user_id] = timer
+            self._schedule(timer)
+            return timer
+    
+    def pause(self, user_id: int, session_id: int) -> Optional[ActiveTimer]:
+        """タイマーを一時停止（一時停止中ならそのまま。該当するタイマーがなければ None）"""
+        with self._cond:
+            timer = self._find(user_id, session_id)
+            if timer is None or timer.paused:
+                return timer
+            now = self._clock()
+            timer.remaining = timer.remaining_at(now)
+            timer.deadline = None
+            timer.due = now + self.pause_timeout
+            self._schedule(timer)
+            return timer
+    
+    def resume(self, user_id: int, session_id: int) -> Optional[ActiveTimer]:
+        """一時停止したタイマーを残り時間から再開（該当するタイマーがなければ None）"""
+        with self._cond:
+            timer = self._find(user_id, session_id)
+            if timer is None or not timer.paused:
+                return timer
+            timer.deadline = self._clock() + timer.remaining
+            timer.remaining = 0.0
+            timer.due = timer.deadline + self.grace
+            self._schedule(timer)
+            return timer
+    
+    def finish(self, user_id: int, session_id: int) -> bool:
+        """完了・中止したセッションのタイマーを削除（ヒープの項目は後で読み捨てる）"""
+        with self._cond:
+            if self._find(user_id, session_id) is None:
+                return False
+            del self._timers[user_id]
+            return True
+    
+    def get(self, user_id: int) -> Optional[ActiveTimer]:
+        """ユーザーのタイマーを取得"""
+        with self._cond:
+            return self._timers.get(user_id)
+    
+    def get_state(self, user_id: int) -> Optional[Dict]:
+        """ユーザーのタイマーの現在の状態（API のレスポンス用。タイマーがなければ None）"""
+        with self._cond:
+            timer = self._timers.get(user_id)
+            if timer is None:
+                return None
+            remaining = timer.remaining_at(self._clock())
+        
+        return {
+            'session_id': timer.session_id,
+            'duration_minutes': timer.duration_minutes,
+            'started_at': timer.started_at,
+            'state': 'paused' if timer.paused else 'running',
+            'remaining_seconds': round(remaining, 3),
+            'ends_at': None if timer.paused else (
+                local_now() + timedelta(seconds=remaining)).isoformat()
+        }
+    
+    def reap(self) -> List[ActiveTimer]:
+        """期限の来たタイマーを取り出し、実行中だったものを完了させて返す"""
+        with self._cond:
+            now = self._clock()
+            due = self._pop_due(now)
+        
+        completed = []
+        for timer in due:
+            if timer.paused:
+                self.expired += 1
+                continue
+            try:
+                self.on_expire(timer, now - timer.deadline)
+                self.auto_completed += 1
+                completed.append(timer)
+            except Exception as exc:
+                self.failed += 1
+                logger.error('Failed to auto-complete session %d: %s', timer.session_id, exc)
+        return completed
+    
+    def stats(self) -> Dict:
+        """登録数・自動完了数などの統計を取得"""
+        with self._cond:
+            paused = sum(timer.paused for timer in self._timers.values())
+            return {
+                'active': len(self._timers),
+                'running': len(self._timers) - paused,
+                'paused': paused,
+                'heap_size': len(self._heap),
+                'auto_completed': self.auto_completed,
+                'expired': self.expired,
+                'failed': self.failed
+            }
+    
+    def _find(self, user_id: int, session_id: int) -> Optional[ActiveTimer]:
+        """ユーザーのタイマーがそのセッションのものなら返す（ロック取得済みで呼び出す）"""
+        timer = self._timers.get(user_id)
+        if timer is None or timer.session_id != session_id:
+            return None
+        return timer
+    
+    def _schedule(self, timer: ActiveTimer) -> None:
+        """タイマーの期限をヒープに追加（ロック取得済みで呼び出す）"""
+        self._seq += 1
+        timer.seq = self._seq
+        # 読み捨てる古い項目が生きている項目を大きく上回ったらヒープを作り直す
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            self._heap = [(t.due, t.seq, t.user_id) for t in self._timers.values() if t is not timer]
+            heapq.heapify(self._heap)
+        was_first = not self._heap or timer.due < self._heap[0][0]
+        heapq.heappush(self._heap, (timer.due, timer.seq, timer.user_id))
+        # 最も近い期限が変わった場合だけ監視スレッドを起こす
+        if was_first:
+            self._cond.notify()
+    
+    def _pop_due(self, now: float) -> List[ActiveTimer]:
+        """期限が now 以前の最新の項目を取り出して登録から外す（ロック取得済みで呼び出す）"""
+        heap = self._heap
+        due = []
+        while heap and heap[0][0] <= now:
+            _, seq, user_id = heapq.heappop(heap)
+            timer = self._timers.get(user_id)
+            if timer is not None and timer.seq == seq:
+                del self._timers[user_id]
+                due.append(timer)
+        return due
+    
+    def _next_wait(self) -> Optional[float]:
+        """次の期限までの秒数（ロック取得済みで呼び出す。項目がなければ None）"""
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - self._clock(), 0.0)
+    
+    def _run(self) -> None:
+        """監視スレッド: 最も近い期限まで待ってから期限の来たタイマーを処理する"""
+        while True:
+            with self._cond:
+                while not self._closed:
+                    wait = self._next_wait()
+                    if wait == 0.0:
+                        break
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+            self.reap()
+
+
+_registry: Optional[TimerRegistry] = None
+
+
+def configure_timer_registry(on_expire: Callable[[ActiveTimer, float], object],
+                             grace: float = DEFAULT_TIMER_GRACE,
+                             pause_timeout: float = DEFAULT_TIMER_PAUSE_TIMEOUT,
+                             clock: Callable[[], float] = time.monotonic) -> TimerRegistry:
+    """タイマーの登録簿を（再）作成して監視スレッドを開始"""
+    global _registry
+    close_timer_registry()
+    _registry = TimerRegistry(on_expire, grace, pause_timeout, clock).start()
+    return _registry
+
+
+def get_timer_registry() -> Optional[TimerRegistry]:
+    """現在のタイマーの登録簿を取得（無効な場合は None）"""
+    return _registry
+
+
+def close_timer_registry() -> None:
+    """監視スレッドを止めて登録簿を破棄（アプリ終了時に呼び出す）"""
+    global _registry
+    if _registry is not None:
+        _registry.close()
+        _registry = None
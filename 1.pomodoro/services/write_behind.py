@@ -0,0 +1,307 @@
+"""Write-behind queue that group-commits session events on a background thread."""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import repositories.database as database
+from repositories.database import transaction
+from repositories.session_repository import SessionRepository
+from repositories.write_behind_repository import WriteBehindRepository
+
+logger = logging.getLogger(__name__)
+
+# write-behind モードを有効にするか（既定はリクエスト内で同期的に書き込む）
+DEFAULT_WRITE_BEHIND = os.environ.get('POMODORO_WRITE_BEHIND', 'False').lower() in ('true', '1', 't')
+
+# 1回のコミットにまとめるイベントの最大数
+DEFAULT_WRITE_BATCH_SIZE = int(os.environ.get('POMODORO_WRITE_BATCH_SIZE', '256'))
+
+# 同時期のイベントをまとめるために書き込みスレッドが待つ時間（ミリ秒）
+DEFAULT_WRITE_DELAY_MS = float(os.environ.get('POMODORO_WRITE_DELAY_MS', '2'))
+
+# ロック待ちなどでコミットに失敗した場合の試行回数
+MAX_COMMIT_ATTEMPTS = 5
+
+# 試行をすべて失敗したバッチをもう一度コミットするまでの間隔（秒）
+STALLED_RETRY_INTERVAL = 1.0
+
+
+class WriteBehindUnavailable(RuntimeError):
+    """キューが停止中、またはコミットできないバッチがあり新しいイベントを受け付けられない"""
+
+
+class WriteBehindQueue:
+    """セッションイベントの write-behind キュー
+    
+    リクエストはイベントを追記専用ログに書き込んでキューに積むだけで戻り、
+    バックグラウンドの書き込みスレッドが溜まったイベントを1トランザクションで
+    まとめてコミットする（グループコミット）。DB には反映済みのイベント番号を
+    同じトランザクションで記録するため、クラッシュ後は未反映のイベントだけを再生する。
+    コミットできないバッチがある間は反映済みの番号を先に進めず（後続のイベントも
+    コミットしない）、新しいイベントを受け付けずに同じバッチを再試行し続ける。
+    このプロセスが sessions への唯一の書き込み元であることを前提とする。
+    """
+    
+    def __init__(self, apply: Callable[[Dict], Any], log_path: str,
+                 batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+                 delay: float = DEFAULT_WRITE_DELAY_MS / 1000):
+        self.apply = apply
+        self.log_path = log_path
+        self.batch_size = max(batch_size, 1)
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._events: Deque[Tuple[Dict, Future]] = deque()
+        self._pending: Dict[int, int] = {}
+        self._seq = 0
+        self._last_session_id = 0
+        self._log = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        # 再試行中のバッチのコミットに失敗した理由（None なら正常）
+        self._error: Optional[Exception] = None
+        self.batches = 0
+        self.committed = 0
+        self.replayed = 0
+    
+    def start(self) -> 'WriteBehindQueue':
+        """未反映のイベントを再生してから書き込みスレッドを開始"""
+        self.replayed = self.replay()
+        self._last_session_id = SessionRepository.get_last_id()
+        self._log = open(self.log_path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        return self
+    
+    def replay(self) -> int:
+        """ログのうち DB に未反映のイベントを適用してログを空にし、適用した件数を返す"""
+        applied_seq = WriteBehindRepository.get_applied_seq()
+        events = [event for event in self._read_log() if event['seq'] > applied_seq]
+        for i in range(0, len(events), self.batch_size):
+            batch = events[i:i + self.batch_size]
+            for event, result in zip(batch, self._commit(batch)):
+                if isinstance(result, Exception):
+                    logger.error('Failed to replay write-behind event %r: %s', event, result)
+        
+        self._seq = max([applied_seq] + [event['seq'] for event in events])
+        open(self.log_path, 'w', encoding='utf-8').close()
+        return len(events)
+    
+    def _read_log(self) -> List[Dict]:
+        """ログからイベントを読み込む"""
+        if not os.path.exists(self.log_path):
+            return []
+        
+        events = []
+        with open(self.log_path, encoding='utf-8') as log:
+            for line in log:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # クラッシュで書きかけになった末尾の行は、リクエストにも応答していない
+                    break
+        return events
+    
+    def next_session_id(self) -> int:
+        """キューに積むセッションのIDを採番（コミット前にクライアントへ返すため）"""
+        with self._cond:
+            self._check_accepting()
+            self._last_session_id += 1
+            return self._last_session_id
+    
+    def submit(self, event_type: str, user_id: int, **fields: Any) -> Future:
+        """イベントをログに追記してキューに積む（コミット後の結果は Future で受け取る）"""
+        future: Future = Future()
+        with self._cond:
+            self._check_accepting()
+            self._seq += 1
+            event = {'seq': self._seq, 'type': event_type, 'user_id': user_id, **fields}
+            # ログへの追記とキューへの追加を同じロックの中で行い、順序を一致させる。
+            # 応答を返した後のクラッシュでも失われないよう、ディスクまで書き込んでから積む
+            self._log.write(json.dumps(event, separators=(',', ':')) + '\n')
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._events.append((event, future))
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+            self._cond.notify_all()
+        return future
+    
+    def _check_accepting(self) -> None:
+        """新しいイベントを受け付けられない場合は WriteBehindUnavailable を送出（ロック内で呼ぶ）"""
+        if self._closed:
+            raise WriteBehindUnavailable('Write-behind queue is closed')
+        if self._error is not None:
+            raise WriteBehindUnavailable(f'Write-behind queue is stalled: {self._error}')
+    
+    def wait_for_user(self, user_id: int, timeout: Optional[float] = None) -> bool:
+        """ユーザーの未反映イベントがすべてコミットされるまで待つ（read-your-writes）
+        
+        コミットできないバッチの再試行中は待たずに戻る（読み取りはコミット済みの内容になる）。
+        """
+        with self._cond:
+            self._cond.wait_for(
+                lambda: user_id not in self._pending or self._error is not None, timeout
+            )
+            return user_id not in self._pending
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """キュー内のイベントがすべてコミットされるまで待つ"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+    
+    def close(self) -> None:
+        """残りのイベントをすべてコミットしてから書き込みスレッドを止める"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        
+        if self._thread is not None:
+            self._thread.join()
+        if self._log is not None:
+            self._log.close()
+    
+    @property
+    def stalled(self) -> bool:
+        """コミットできないバッチを再試行中かどうか"""
+        return self._error is not None
+    
+    @property
+    def pending_count(self) -> int:
+        """未反映のイベント数"""
+        with self._cond:
+            return sum(self._pending.values())
+    
+    def _run(self) -> None:
+        """書き込みスレッド: キューのイベントをまとめてコミットする"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._events or self._closed)
+                if not self._events:
+                    return
+                # 少しだけ待って同時期のイベントを1回のコミットにまとめる
+                if self.delay > 0 and not self._closed:
+                    self._cond.wait_for(
+                        lambda: len(self._events) >= self.batch_size or self._closed, self.delay
+                    )
+                count = min(self.batch_size, len(self._events))
+                batch = [self._events.popleft() for _ in range(count)]
+            
+            events = [event for event, _ in batch]
+            try:
+                results = self._commit(events)
+            except Exception as exc:
+                logger.error('Failed to commit %d write-behind events: %s', len(events), exc)
+                if self._stall(batch, exc):
+                    continue
+                # 終了時: 未反映のイベントはログに残し、次回起動時に再生する
+                self._abandon(exc)
+                return
+            
+            with self._cond:
+                self._error = None
+                for event in events:
+                    remaining = self._pending[event['user_id']] - 1
+                    if remaining:
+                        self._pending[event['user_id']] = remaining
+                    else:
+                        del self._pending[event['user_id']]
+                self.batches += 1
+                self.committed += len(events)
+                # すべて反映済みならログを空にする（追記はこのロックの中で行うため取りこぼさない）
+                if not self._pending:
+                    self._log.truncate(0)
+                self._cond.notify_all()
+            
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+    
+    def _stall(self, batch: List[Tuple[Dict, Future]], error: Exception) -> bool:
+        """コミットできなかったバッチをキューの先頭に戻し、間隔を空けて再試行させる
+        
+        反映済みの番号は進めないため、後続のイベントが先にコミットされることはない。
+        終了処理中の場合は False を返す。
+        """
+        with self._cond:
+            self._events.extendleft(reversed(batch))
+            self._error = error
+            # read-your-writes で待っているリクエストを戻す
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._closed, STALLED_RETRY_INTERVAL)
+            return not self._closed
+    
+    def _abandon(self, error: Exception) -> None:
+        """コミットできないまま終了する: 残りのイベントの Future を失敗させる（ログは残す）"""
+        with self._cond:
+            batch = list(self._events)
+            self._events.clear()
+            self._pending.clear()
+            self._cond.notify_all()
+        for _, future in batch:
+            future.set_exception(error)
+    
+    def _commit(self, events: List[Dict]) -> List[Any]:
+        """イベントを1トランザクションで反映し、イベントごとの結果（失敗時は例外）を返す
+        
+        ロック待ちなどでトランザクション自体が失敗した場合は間隔を空けて再試行する。
+        """
+        for attempt in range(MAX_COMMIT_ATTEMPTS):
+            try:
+                return self._apply_batch(events)
+            except sqlite3.OperationalError:
+                if attempt == MAX_COMMIT_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+        return []
+    
+    def _apply_batch(self, events: List[Dict]) -> List[Any]:
+        """イベントを順に適用（失敗したイベントだけをセーブポイントで取り消す）"""
+        results = []
+        with transaction() as conn:
+            for event in events:
+                conn.execute('SAVEPOINT write_behind_event')
+                try:
+                    results.append(self.apply(event))
+                except Exception as exc:
+                    conn.execute('ROLLBACK TO write_behind_event')
+                    results.append(exc)
+                conn.execute('RELEASE write_behind_event')
+            WriteBehindRepository.set_applied_seq(events[-1]['seq'])
+        return results
+
+
+_queue: Optional[WriteBehindQueue] = None
+
+
+def configure_write_behind(apply: Callable[[Dict], Any], log_path: Optional[str] = None,
+                           batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+                           delay: float = DEFAULT_WRITE_DELAY_MS / 1000) -> WriteBehindQueue:
+    """write-behind キューを（再）作成して開始（ログの既定の置き場所はDBと同じディレクトリ）"""
+    global _queue
+    close_write_behind()
+    _queue = WriteBehindQueue(
+        apply, log_path or database.DB_PATH + '-events.log', batch_size, delay
+    ).start()
+    return _queue
+
+
+def get_write_queue() -> Optional[WriteBehindQueue]:
+    """現在の write-behind キューを取得（無効な場合は None）"""
+    return _queue
+
+
+def close_write_behind() -> None:
+    """キューに残ったイベントをコミットして停止（アプリ終了時に呼び出す）"""
+    global _queue
+    if _queue is not None:
+        _queue.close()
+        _queue = None
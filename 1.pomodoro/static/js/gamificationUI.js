@@ -14,6 +14,7 @@ class GamificationUI {
         };
         
         this.badgesGrid = document.getElementById('badges-grid');
+        this.badgesData = null;
     }
 
     /**
@@ -70,6 +71,7 @@ class GamificationUI {
      * バッジを表示
      */
     displayBadges(badgesData) {
+        this.badgesData = badgesData;
         this.badgesGrid.innerHTML = '';
         
         const allBadges = [...badgesData.earned, ...badgesData.not_earned];
@@ -81,6 +83,25 @@ class GamificationUI {
         });
     }
 
+    /**
+     * 新しく獲得したバッジを取得済みに移して再表示（サーバーからの配信用）
+     */
+    addEarnedBadges(badges) {
+        if (!this.badgesData || badges.length === 0) {
+            return;
+        }
+        
+        const newIds = new Set(badges.map(b => b.id));
+        const earnedIds = new Set(this.badgesData.earned.map(b => b.id));
+        const added = badges.filter(b => !earnedIds.has(b.id));
+        this.displayBadges({
+            ...this.badgesData,
+            earned: [...this.badgesData.earned, ...added],
+            not_earned: this.badgesData.not_earned.filter(b => !newIds.has(b.id)),
+            total_earned: this.badgesData.total_earned + added.length
+        });
+    }
+
     /**
      * バッジ要素を作成
      */
@@ -0,0 +1,66 @@
+/**
+ * Live Updates
+ * サーバーからの進捗の配信（Server-Sent Events）の受信
+ */
+
+class LiveUpdates {
+    constructor(gamificationUI, statisticsUI, reload) {
+        this.gamificationUI = gamificationUI;
+        this.statisticsUI = statisticsUI;
+        this.reload = reload;
+        this.source = null;
+        this.connected = false;
+    }
+
+    /**
+     * 配信に接続（EventSource が使えない場合は false）
+     */
+    connect() {
+        if (typeof EventSource === 'undefined') {
+            return false;
+        }
+
+        this.source = new EventSource('/api/events');
+        // 接続（再接続）のたびに全体を読み込み、切断中の変化を取りこぼさない
+        this.source.addEventListener('open', () => {
+            this.connected = true;
+            this.reload();
+        });
+        this.source.addEventListener('error', () => {
+            this.connected = false;
+            // サーバーが接続を受け付けなかった場合は再接続されないため、ここで読み込む
+            if (this.source && this.source.readyState === EventSource.CLOSED) {
+                this.source = null;
+                this.reload();
+            }
+        });
+        this.source.addEventListener('progress', (e) => this.handleProgress(JSON.parse(e.data)));
+        this.source.addEventListener('resync', () => this.reload());
+        return true;
+    }
+
+    /**
+     * セッション完了の差分を表示に反映（他のタブ・端末での完了も含む）
+     */
+    handleProgress(data) {
+        this.gamificationUI.displayProfile(data.user);
+        this.gamificationUI.addEarnedBadges(data.new_badges);
+        this.statisticsUI.applyCompletion(data.stats);
+    }
+
+    /**
+     * 接続を閉じる
+     */
+    close() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this.connected = false;
+    }
+}
+
+// CommonJS形式でエクスポート（テスト用）
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = LiveUpdates;
+}
@@ -9,6 +9,8 @@ let timerUI;
 let progressRing;
 let gamificationUI;
 let statisticsUI;
+let liveUpdates;
+let syncOutbox;
 
 /**
  * アプリケーション初期化
@@ -16,26 +18,57 @@ let statisticsUI;
 function initApp() {
     // タイマーの初期化
     timer = new TimerCore();
-    timerUI = new TimerUI(timer);
+    // セッションの開始・完了は送信待ちに積み、/api/sync へまとめて送信する
+    syncOutbox = new SyncOutbox();
+    window.syncOutbox = syncOutbox;
+    timerUI = new TimerUI(timer, syncOutbox);
     progressRing = new ProgressRing(timer);
     
+    // 前回送信できなかったイベントを送信してから、実行中（一時停止中）のセッションを
+    // サーバー側のタイマーから復元
+    syncOutbox.flush().then(() => timerUI.restore());
+    
     // ゲーミフィケーションUIの初期化
     gamificationUI = new GamificationUI();
-    gamificationUI.loadProfile();
-    gamificationUI.loadBadges();
     
     // 統計UIの初期化
     statisticsUI = new StatisticsUI();
-    statisticsUI.loadStatistics();
-    statisticsUI.loadActivityChart();
     
     // グローバルに公開（他のモジュールから参照できるように）
     window.gamificationUI = gamificationUI;
     window.statisticsUI = statisticsUI;
+    window.loadDashboard = loadDashboard;
+    
+    // 進捗の配信に接続し、接続のたびにダッシュボードを読み込む
+    // （配信を使えないブラウザではここで1回だけ読み込む）
+    liveUpdates = new LiveUpdates(gamificationUI, statisticsUI, loadDashboard);
+    window.liveUpdates = liveUpdates;
+    if (!liveUpdates.connect()) {
+        loadDashboard();
+    }
     
     console.log('🍅 ポモドーロタイマー初期化完了');
 }
 
+/**
+ * ダッシュボードのデータを一括取得して表示
+ */
+async function loadDashboard() {
+    try {
+        const response = await fetch('/api/dashboard?days=30');
+        const data = await response.json();
+        
+        if (data.success) {
+            gamificationUI.displayProfile(data.profile);
+            gamificationUI.displayBadges(data.badges);
+            statisticsUI.displayStatistics(data.statistics);
+            statisticsUI.displayChart(data.daily_activity);
+        }
+    } catch (error) {
+        console.error('ダッシュボード読み込みエラー:', error);
+    }
+}
+
 // DOMContentLoadedイベントで初期化
 if (typeof document !== 'undefined') {
     document.addEventListener('DOMContentLoaded', initApp);
@@ -43,5 +76,5 @@ if (typeof document !== 'undefined') {
 
 // CommonJS形式でエクスポート（テスト用）
 if (typeof module !== 'undefined' && module.exports) {
-    module.exports = { initApp };
+    module.exports = { initApp, loadDashboard };
 }
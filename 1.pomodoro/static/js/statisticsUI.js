@@ -16,6 +16,8 @@ class StatisticsUI {
         
         this.chartCanvas = document.getElementById('activity-chart');
         this.chart = null;
+        this.stats = null;
+        this.dailyActivity = null;
     }
 
     /**
@@ -38,6 +40,7 @@ class StatisticsUI {
      * 統計情報を表示
      */
     displayStatistics(stats) {
+        this.stats = stats;
         this.elements.weeklyCompleted.textContent = stats.weekly_completed;
         this.elements.monthlyCompleted.textContent = stats.monthly_completed;
         this.elements.totalCompleted.textContent = stats.completed_sessions;
@@ -46,6 +49,36 @@ class StatisticsUI {
         this.elements.totalFocusTime.textContent = `${stats.total_focus_minutes}分`;
     }
 
+    /**
+     * セッション完了の差分を統計とグラフに反映（サーバーからの配信用）
+     * 累計はサーバーの値で置き換え、直近7日・30日と当日の完了数は1回分を加算する
+     */
+    applyCompletion(delta) {
+        if (this.stats) {
+            const stats = { ...this.stats };
+            stats.completed_sessions = delta.completed_sessions;
+            stats.total_focus_minutes = delta.total_focus_minutes;
+            stats.weekly_completed += 1;
+            stats.monthly_completed += 1;
+            stats.average_focus_minutes =
+                Math.round(delta.total_focus_minutes / delta.completed_sessions * 100) / 100;
+            if (stats.total_sessions > 0) {
+                stats.completion_rate =
+                    Math.round(delta.completed_sessions / stats.total_sessions * 10000) / 100;
+            }
+            this.displayStatistics(stats);
+        }
+        
+        if (this.dailyActivity) {
+            const day = this.dailyActivity.find(d => d.date === delta.day);
+            if (day) {
+                day.completed += 1;
+                day.focus_minutes += delta.focus_minutes;
+                this.displayChart(this.dailyActivity);
+            }
+        }
+    }
+
     /**
      * アクティビティグラフを読み込んで表示
      */
@@ -66,6 +99,7 @@ class StatisticsUI {
      * グラフを表示（シンプルな棒グラフ）
      */
     displayChart(dailyActivity) {
+        this.dailyActivity = dailyActivity;
         const ctx = this.chartCanvas.getContext('2d');
         
         // キャンバスをクリア
@@ -0,0 +1,199 @@
+/**
+ * Sync Outbox
+ * セッションの開始・完了を localStorage に溜め、/api/sync へまとめて送信する
+ */
+
+class SyncOutbox {
+    constructor(storageKey = 'pomodoro.outbox', batchSize = 50) {
+        this.storageKey = storageKey;
+        this.batchSize = batchSize;
+        this.events = this.load();
+        // 開始イベントのキー → サーバーのセッションID（同期済みのもの）
+        this.sessions = {};
+        this.flushing = null;
+        // 送信中のバッチのキー（取り消せない）
+        this.inFlight = new Set();
+        this.retryDelay = 1000;
+        this.retryTimer = null;
+        // バッチの同期に成功するたびに呼ばれる（レベルアップ・バッジの通知など）
+        this.onSynced = null;
+
+        if (typeof window !== 'undefined') {
+            window.addEventListener('online', () => this.flush());
+        }
+    }
+
+    /**
+     * 保存済みの未送信イベントを読み込む
+     */
+    load() {
+        try {
+            const saved = localStorage.getItem(this.storageKey);
+            return saved ? JSON.parse(saved) : [];
+        } catch (error) {
+            return [];
+        }
+    }
+
+    /**
+     * 未送信イベントを保存（タブを閉じても次回の起動時に送信する）
+     */
+    save() {
+        try {
+            localStorage.setItem(this.storageKey, JSON.stringify(this.events));
+        } catch (error) {
+            console.error('送信待ちイベントの保存エラー:', error);
+        }
+    }
+
+    /**
+     * イベントに冪等キーと発生時刻を付けて積み、キーを返す
+     */
+    enqueue(event) {
+        const key = (typeof crypto !== 'undefined' && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        this.events.push({ ...event, key, at: Date.now() });
+        this.save();
+        return key;
+    }
+
+    /**
+     * 未送信のイベントを取り消す（送信済み・送信中の場合は false）
+     */
+    discard(key) {
+        if (this.inFlight.has(key)) {
+            return false;
+        }
+        const count = this.events.length;
+        this.events = this.events.filter((event) => event.key !== key);
+        this.save();
+        return this.events.length < count;
+    }
+
+    /**
+     * 開始イベントに対応するサーバーのセッションID（未同期なら null）
+     */
+    sessionIdFor(startKey) {
+        return this.sessions[startKey] || null;
+    }
+
+    /**
+     * 未送信イベントを古い順にまとめて送信（送信中に呼ばれた場合は同じ送信を待つ）
+     */
+    flush() {
+        if (!this.flushing) {
+            this.flushing = this.sendAll().finally(() => {
+                this.flushing = null;
+            });
+        }
+        return this.flushing;
+    }
+
+    /**
+     * 空になるか失敗するまでバッチを送信（失敗した場合は間隔を空けて再試行する）
+     */
+    async sendAll() {
+        let size = this.batchSize;
+        while (this.events.length > 0) {
+            const batch = this.events.slice(0, size);
+            let response;
+            this.inFlight = new Set(batch.map((event) => event.key));
+            try {
+                response = await fetch('/api/sync', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({ events: batch })
+                });
+            } catch (error) {
+                this.scheduleRetry();
+                return false;
+            } finally {
+                this.inFlight = new Set();
+            }
+
+            let data = null;
+            try {
+                data = await response.json();
+            } catch (error) {
+                // JSON 以外の応答（プロキシのエラーページなど）
+            }
+
+            if (!response.ok || !data || !data.success) {
+                // バッチ自体を受け付けられない（400 / 413）場合は小さく分けて送り直し、
+                // 1件でも受け付けられないイベントだけを捨てる。それ以外（404 / 429 / 5xx・
+                // 通信エラー）は何も捨てずに間隔を空けて再送する
+                if ((response.status === 400 || response.status === 413) && batch.length > 1) {
+                    size = Math.max(1, Math.floor(batch.length / 2));
+                    continue;
+                }
+                if (response.status === 400) {
+                    console.error('同期エラー:', data ? data.error : response.status);
+                    this.remove(batch);
+                    continue;
+                }
+                this.scheduleRetry();
+                return false;
+            }
+
+            // 不正なイベントはサーバーがイベントごとに rejected として返す（再送しない）
+            this.handleResults(batch, data);
+            this.remove(batch);
+        }
+        this.retryDelay = 1000;
+        return true;
+    }
+
+    /**
+     * 送信したイベントを取り除く（送信中に積まれた・取り消されたイベントがあるため、キーで比較する）
+     */
+    remove(batch) {
+        const sent = new Set(batch.map((event) => event.key));
+        this.events = this.events.filter((event) => !sent.has(event.key));
+        this.save();
+    }
+
+    /**
+     * 同期の結果を反映（開始イベントのセッションIDを記録し、通知する）
+     */
+    handleResults(batch, data) {
+        data.results.forEach((result, i) => {
+            if (result.status === 'rejected' && result.error) {
+                console.error('同期できないイベント:', batch[i], result.error);
+            } else if (batch[i].type === 'start' && result.session_id) {
+                this.sessions[result.key] = result.session_id;
+            }
+        });
+        if (this.onSynced) {
+            this.onSynced(data);
+        }
+    }
+
+    /**
+     * 一定時間後に再送（失敗が続くほど間隔を延ばす）
+     */
+    scheduleRetry() {
+        if (this.retryTimer) {
+            return;
+        }
+        this.retryTimer = setTimeout(() => {
+            this.retryTimer = null;
+            this.flush();
+        }, this.retryDelay);
+        this.retryDelay = Math.min(this.retryDelay * 2, 60000);
+    }
+
+    /**
+     * 未送信のイベント数
+     */
+    get pendingCount() {
+        return this.events.length;
+    }
+}
+
+// CommonJS形式でエクスポート（テスト用）
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = SyncOutbox;
+}
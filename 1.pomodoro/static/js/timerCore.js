@@ -83,6 +83,19 @@ class TimerCore {
         }
     }
 
+    /**
+     * サーバー側のタイマーの状態に合わせる（ページの再読み込み時などに使う）
+     */
+    restore(durationMinutes, remainingSeconds, sessionId) {
+        this.pause();
+        this.duration = durationMinutes * 60;
+        this.timeLeft = Math.max(0, Math.round(remainingSeconds));
+        this.sessionId = sessionId;
+        if (this.onTick) {
+            this.onTick(this.timeLeft);
+        }
+    }
+
     /**
      * 残り時間を取得
      */
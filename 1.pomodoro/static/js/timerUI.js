@@ -4,8 +4,11 @@
  */
 
 class TimerUI {
-    constructor(timer) {
+    constructor(timer, outbox) {
         this.timer = timer;
+        this.outbox = outbox;
+        // 実行中のセッションの開始イベントのキー（オフラインで開始した場合もある）
+        this.startKey = null;
         this.timerDisplay = document.getElementById('timer-display');
         this.startBtn = document.getElementById('start-btn');
         this.pauseBtn = document.getElementById('pause-btn');
@@ -27,18 +30,26 @@ class TimerUI {
         // タイマーのコールバックを設定
         this.timer.onTick = (timeLeft) => this.updateDisplay(timeLeft);
         this.timer.onComplete = () => this.handleComplete();
+
+        // 同期したバッチの結果を通知（オフライン中の完了は、後で同期したときに通知される）
+        this.outbox.onSynced = (data) => this.handleSynced(data);
     }
 
     /**
      * 開始ボタンのハンドラ
      */
     async handleStart() {
-        if (!this.timer.sessionId) {
-            // 新しいセッションを開始
+        if (!this.timer.sessionId && !this.startKey) {
+            // 新しいセッションを開始（オフラインでもタイマーは動かし、開始は後で同期する）
             const duration = parseInt(this.durationSelect.value);
-            const session = await this.startSession(duration);
-            if (session) {
-                this.timer.setSessionId(session.id);
+            this.startKey = this.outbox.enqueue({ type: 'start', duration });
+            await this.outbox.flush();
+            this.timer.setSessionId(this.outbox.sessionIdFor(this.startKey));
+        } else if (this.resolveSessionId()) {
+            // 一時停止したセッションをサーバー側でも再開し、残り時間を合わせる
+            const state = await this.sendTimerAction('resume');
+            if (state) {
+                this.timer.timeLeft = Math.round(state.remaining_seconds);
             }
         }
 
@@ -53,6 +64,9 @@ class TimerUI {
      */
     handlePause() {
         this.timer.pause();
+        if (this.resolveSessionId()) {
+            this.sendTimerAction('pause');
+        }
         this.startBtn.disabled = false;
         this.pauseBtn.disabled = true;
     }
@@ -60,9 +74,41 @@ class TimerUI {
     /**
      * リセットボタンのハンドラ
      */
-    handleReset() {
+    async handleReset() {
+        // 途中でやめたセッションはサーバー側でも自動完了させない。未送信の開始は送信待ちから
+        // 取り消し、送信中・バックグラウンドの再送で同期済みの開始は同期を待って中止する
+        const startKey = this.startKey;
+        let sessionId = this.resolveSessionId();
+        this.clearTimer();
+        if (!sessionId && startKey && !this.outbox.discard(startKey)) {
+            await this.outbox.flush();
+            sessionId = this.outbox.sessionIdFor(startKey);
+            if (!sessionId) {
+                this.outbox.discard(startKey);
+            }
+        }
+        if (sessionId) {
+            await this.sendTimerAction('cancel', sessionId);
+        }
+    }
+
+    /**
+     * 開始イベントが同期済みならセッションIDをタイマーに反映して返す（未同期なら null）
+     */
+    resolveSessionId() {
+        if (!this.timer.sessionId && this.startKey) {
+            this.timer.setSessionId(this.outbox.sessionIdFor(this.startKey));
+        }
+        return this.timer.sessionId;
+    }
+
+    /**
+     * タイマーを初期状態に戻す（サーバーには通知しない）
+     */
+    clearTimer() {
         this.timer.reset();
         this.timer.setSessionId(null);
+        this.startKey = null;
         this.startBtn.disabled = false;
         this.pauseBtn.disabled = true;
         this.durationSelect.disabled = false;
@@ -80,35 +126,40 @@ class TimerUI {
      * タイマー完了時のハンドラ
      */
     async handleComplete() {
-        // セッション完了をAPIに通知
-        if (this.timer.sessionId) {
-            const result = await this.completeSession(this.timer.sessionId);
-            if (result) {
-                // レベルアップやバッジ獲得の通知
-                if (result.leveled_up) {
-                    showLevelUpModal(result.user.level);
-                }
-                if (result.new_badges && result.new_badges.length > 0) {
-                    showBadgeModal(result.new_badges);
-                }
-                
-                // プロフィールと統計を更新
-                if (window.gamificationUI) {
-                    window.gamificationUI.loadProfile();
-                    window.gamificationUI.loadBadges();
-                }
-                if (window.statisticsUI) {
-                    window.statisticsUI.loadStatistics();
-                }
-            }
+        // 完了を送信待ちに積んで同期（オフラインの場合は接続が戻ってから送信する）
+        if (this.startKey) {
+            this.outbox.enqueue({ type: 'complete', start_key: this.startKey });
+        } else if (this.timer.sessionId) {
+            this.outbox.enqueue({ type: 'complete', session_id: this.timer.sessionId });
         }
+        await this.outbox.flush();
 
         // 完了通知（モーダルに置き換えることも検討）
         // TODO: カスタム通知システムの実装を検討
         alert('🎉 ポモドーロ完了！お疲れ様でした！');
         
-        // リセット
-        this.handleReset();
+        // リセット（完了したセッションのタイマーはサーバー側で削除済み）
+        this.clearTimer();
+    }
+
+    /**
+     * 同期したバッチの結果のハンドラ
+     */
+    handleSynced(data) {
+        // レベルアップやバッジ獲得の通知
+        if (data.leveled_up) {
+            showLevelUpModal(data.user.level);
+        }
+        if (data.new_badges && data.new_badges.length > 0) {
+            showBadgeModal(data.new_badges);
+        }
+
+        // プロフィール・バッジ・統計はサーバーからの配信で更新する
+        // （配信に接続できていない場合だけまとめて読み込み直す）
+        const live = window.liveUpdates;
+        if (data.xp_earned > 0 && !(live && live.connected) && window.loadDashboard) {
+            window.loadDashboard();
+        }
     }
 
     /**
@@ -122,37 +173,47 @@ class TimerUI {
     }
 
     /**
-     * セッションを開始（API呼び出し）
+     * サーバー側のタイマーを復元（ページの再読み込みや別の端末で開始した場合）
      */
-    async startSession(duration) {
+    async restore() {
         try {
-            const response = await fetch('/api/session/start', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ duration })
-            });
+            const response = await fetch('/api/timer');
             const data = await response.json();
-            return data.success ? data.session : null;
+            const state = data.success ? data.timer : null;
+            if (!state) {
+                return false;
+            }
+
+            this.timer.restore(state.duration_minutes, state.remaining_seconds, state.session_id);
+            this.durationSelect.value = String(state.duration_minutes);
+            this.durationSelect.disabled = true;
+            if (state.state === 'running') {
+                this.timer.start();
+                this.startBtn.disabled = true;
+                this.pauseBtn.disabled = false;
+            } else {
+                this.startBtn.disabled = false;
+                this.pauseBtn.disabled = true;
+            }
+            return true;
         } catch (error) {
-            console.error('セッション開始エラー:', error);
-            return null;
+            console.error('タイマー復元エラー:', error);
+            return false;
         }
     }
 
     /**
-     * セッションを完了（API呼び出し）
+     * サーバー側のタイマーを操作（pause / resume / cancel）し、操作後の状態を返す
      */
-    async completeSession(sessionId) {
+    async sendTimerAction(action, sessionId = this.timer.sessionId) {
         try {
-            const response = await fetch(`/api/session/${sessionId}/complete`, {
+            const response = await fetch(`/api/session/${sessionId}/${action}`, {
                 method: 'POST'
             });
             const data = await response.json();
-            return data.success ? data : null;
+            return data.success ? (data.timer || null) : null;
         } catch (error) {
-            console.error('セッション完了エラー:', error);
+            console.error('タイマー操作エラー:', error);
             return null;
         }
     }
@@ -0,0 +1,50 @@
+"""Shared fixtures for the unit and integration tests."""
+
+import os
+import tempfile
+import pytest
+import repositories.database as db_module
+from app import create_app
+from services.event_hub import event_hub
+from services.timer_registry import close_timer_registry
+from services.write_behind import close_write_behind
+
+
+@pytest.fixture
+def db_path():
+    """テスト用の一時DBを作成"""
+    db_fd, path = tempfile.mkstemp()
+    original_path = db_module.DB_PATH
+    db_module.DB_PATH = path
+    db_module.init_db()
+    
+    yield path
+    
+    db_module.close_pool()
+    db_module.DB_PATH = original_path
+    os.close(db_fd)
+    os.unlink(path)
+
+
+@pytest.fixture
+def client():
+    """テスト用のFlaskクライアントを作成（終了時はバックグラウンドの処理と接続を閉じる）"""
+    db_fd, path = tempfile.mkstemp()
+    original_path = db_module.DB_PATH
+    db_module.DB_PATH = path
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    
+    with app.test_client() as client:
+        yield client
+    
+    close_write_behind()
+    close_timer_registry()
+    event_hub.close()
+    db_module.close_pool()
+    db_module.DB_PATH = original_path
+    os.close(db_fd)
+    os.unlink(path)
+    if os.path.exists(path + '-events.log'):
+        os.unlink(path + '-events.log')
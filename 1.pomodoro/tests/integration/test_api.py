@@ -7,30 +7,7 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from app import create_app
-from repositories.database import init_db
-import tempfile
-
-
-@pytest.fixture
-def client():
-    """テスト用のFlaskクライアントを作成"""
-    db_fd, db_path = tempfile.mkstemp()
-    
-    # テスト用のDB pathを設定
-    import repositories.database as db_module
-    db_module.DB_PATH = db_path
-    
-    app = create_app()
-    app.config['TESTING'] = True
-    
-    with app.test_client() as client:
-        with app.app_context():
-            init_db()
-        yield client
-    
-    os.close(db_fd)
-    os.unlink(db_path)
+from routes.api import MAX_ACTIVITY_DAYS
 
 
 def test_health_check(client):
@@ -52,6 +29,16 @@ def test_start_session(client):
     assert data['session']['duration_minutes'] == 25
 
 
+def test_start_session_rejects_invalid_duration(client):
+    """不正なセッションの長さは 400 を返し、セッションを作成しないことをテスト"""
+    for duration in ('25', 0, -5, 1441, True, None):
+        response = client.post('/api/session/start', json={'duration': duration})
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Invalid duration'
+    
+    assert client.get('/api/session/history').get_json()['sessions'] == []
+
+
 def test_complete_session(client):
     """セッション完了APIのテスト"""
     # まずセッションを開始
@@ -135,3 +122,95 @@ def test_badge_award_after_sessions(client):
     # バッジシステムが動作していることを確認
     assert 'earned' in badges
     assert 'not_earned' in badges
+
+
+def test_cached_profile_is_invalidated_by_completion(client):
+    """セッション完了後にキャッシュ済みプロフィールが更新されることをテスト"""
+    before = client.get('/api/gamification/profile').get_json()['profile']
+    client.get('/api/gamification/profile')
+    
+    start_response = client.post('/api/session/start', json={'duration': 25})
+    session_id = start_response.get_json()['session']['id']
+    client.post(f'/api/session/{session_id}/complete')
+    
+    after = client.get('/api/gamification/profile').get_json()['profile']
+    assert after['xp'] == before['xp'] + 50
+
+
+def test_cache_stats(client):
+    """キャッシュ統計APIのテスト"""
+    client.get('/api/statistics')
+    client.get('/api/statistics')
+    
+    response = client.get('/api/cache/stats')
+    assert response.status_code == 200
+    
+    cache = response.get_json()['cache']
+    assert cache['hits'] >= 1
+    assert cache['misses'] >= 1
+
+
+def test_dashboard_matches_individual_endpoints(client):
+    """ダッシュボードAPIが個別APIと同じデータを返すことをテスト"""
+    start_response = client.post('/api/session/start', json={'duration': 25})
+    session_id = start_response.get_json()['session']['id']
+    client.post(f'/api/session/{session_id}/complete')
+    
+    response = client.get('/api/dashboard?days=14')
+    assert response.status_code == 200
+    
+    data = response.get_json()
+    assert data['success'] is True
+    assert data['profile'] == client.get('/api/gamification/profile').get_json()['profile']
+    assert data['badges'] == client.get('/api/gamification/badges').get_json()['badges']
+    assert data['statistics'] == client.get('/api/statistics').get_json()['statistics']
+    assert data['daily_activity'] == \
+        client.get('/api/statistics/daily?days=14').get_json()['daily_activity']
+
+
+def test_dashboard_days_are_clamped(client):
+    """ダッシュボードAPIの日数が上限に丸められることをテスト"""
+    response = client.get('/api/dashboard?days=800000')
+    
+    assert response.status_code == 200
+    assert len(response.get_json()['daily_activity']) == MAX_ACTIVITY_DAYS
+
+
+def test_daily_activity_days_are_clamped(client):
+    """日別アクティビティAPIの日数が上限に丸められることをテスト"""
+    response = client.get('/api/statistics/daily?days=1000000')
+    
+    assert response.status_code == 200
+    assert len(response.get_json()['daily_activity']) == MAX_ACTIVITY_DAYS
+
+
+def test_get_activity(client):
+    """アクティビティ集計APIのテスト"""
+    start_response = client.post('/api/session/start', json={'duration': 25})
+    session_id = start_response.get_json()['session']['id']
+    client.post(f'/api/session/{session_id}/complete')
+    
+    response = client.get('/api/statistics/activity?days=14')
+    assert response.status_code == 200
+    
+    activity = response.get_json()['activity']
+    assert len(activity['daily']) == 14
+    assert activity['daily'][-1]['completed'] == 1
+    assert sum(w['completed'] for w in activity['weekly']) == 1
+    assert sum(map(sum, activity['hour_weekday']['completed'])) == 1
+
+
+def test_weekly_comparison_and_trend(client):
+    """週間比較・週別推移APIのテスト"""
+    start_response = client.post('/api/session/start', json={'duration': 25})
+    session_id = start_response.get_json()['session']['id']
+    client.post(f'/api/session/{session_id}/complete')
+    
+    comparison = client.get('/api/statistics/weekly-comparison').get_json()['comparison']
+    assert comparison['this_week']['completed'] == 1
+    assert comparison['last_week']['completed'] == 0
+    assert comparison['change']['completed'] == 1
+    
+    weeks = client.get('/api/statistics/weekly-trend?weeks=4').get_json()['weeks']
+    assert len(weeks) == 4
+    assert weeks[-1] == comparison['this_week']
@@ -0,0 +1,210 @@
+"""Integration tests for the ASGI serving mode."""
+
+import asyncio
+import json
+import os
+import tempfile
+import pytest
+import repositories.database as db_module
+from asgi import create_asgi_app
+from repositories.async_db import close_db_executor, configure_db_executor, run_db
+from routes.api import pomodoro_service
+from services.event_hub import event_hub
+
+
+@pytest.fixture
+def asgi_app():
+    """テスト用の ASGI アプリを作成"""
+    db_fd, db_path = tempfile.mkstemp()
+    original_path = db_module.DB_PATH
+    db_module.DB_PATH = db_path
+    
+    app = create_asgi_app(threads=4)
+    # テストはヘッダーでユーザーを指定する（認証済みのプロキシの背後と同じ設定）
+    app.flask_app.config['TRUST_USER_HEADER'] = True
+    
+    yield app
+    
+    event_hub.close()
+    close_db_executor()
+    db_module.close_pool()
+    db_module.DB_PATH = original_path
+    os.close(db_fd)
+    os.unlink(db_path)
+
+
+def make_scope(method: str, path: str, query: bytes = b'', headers=()) -> dict:
+    """HTTP リクエストの ASGI スコープ"""
+    return {
+        'type': 'http', 'method': method, 'path': path, 'root_path': '',
+        'query_string': query, 'headers': list(headers), 'http_version': '1.1',
+        'scheme': 'http', 'server': ('testserver', 80), 'client': ('127.0.0.1', 50000)
+    }
+
+
+async def request(app, method: str, path: str, body: bytes = b'', query: bytes = b'',
+                  headers=()) -> tuple:
+    """リクエストを1件処理して（ステータス, ヘッダー, 本文）を返す"""
+    messages = []
+    incoming = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    
+    async def receive():
+        return incoming.pop(0) if incoming else {'type': 'http.disconnect'}
+    
+    async def send(message):
+        messages.append(message)
+    
+    await app(make_scope(method, path, query, headers), receive, send)
+    start = messages[0]
+    content = b''.join(m.get('body', b'') for m in messages[1:])
+    assert not messages[-1].get('more_body')
+    return start['status'], dict(start['headers']), content
+
+
+def test_flask_routes_are_served_through_db_threads(asgi_app):
+    """Flask のルート（JSON・リクエストボディ・ヘッダー・ストリーミング）をテスト"""
+    async def scenario():
+        status, _, content = await request(asgi_app, 'GET', '/api/health')
+        assert status == 200 and json.loads(content)['status'] == 'healthy'
+        
+        body = json.dumps({'duration': 15}).encode()
+        status, _, content = await request(
+            asgi_app, 'POST', '/api/session/start', body,
+            headers=[(b'content-type', b'application/json'), (b'x-user-id', b'1')]
+        )
+        session = json.loads(content)['session']
+        assert (status, session['duration_minutes']) == (200, 15)
+        await request(asgi_app, 'POST', f'/api/session/{session["id"]}/complete')
+        
+        # Content-Length のないストリーミングの応答
+        status, headers, content = await request(
+            asgi_app, 'GET', '/api/session/export', query=b'format=ndjson'
+        )
+        assert status == 200 and b'content-length' not in headers
+        assert [json.loads(line)['id'] for line in content.splitlines()] == [session['id']]
+        
+        status, _, _ = await request(asgi_app, 'GET', '/api/gamification/profile',
+                                     headers=[(b'x-user-id', b'999')])
+        assert status == 404
+    
+    asyncio.run(scenario())
+
+
+def test_slow_export_download_does_not_hold_a_db_thread(asgi_app):
+    """遅いクライアントへのエクスポート中も、DB 用のスレッドが1本で他のリクエストを処理できる"""
+    configure_db_executor(1)
+    
+    async def scenario():
+        release = asyncio.Event()
+        messages = []
+        
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        
+        async def send(message):
+            messages.append(message)
+            if message.get('more_body'):
+                await release.wait()
+        
+        _, _, content = await request(
+            asgi_app, 'POST', '/api/session/start', json.dumps({'duration': 15}).encode(),
+            headers=[(b'content-type', b'application/json'), (b'x-user-id', b'1')]
+        )
+        session_id = json.loads(content)['session']['id']
+        await request(asgi_app, 'POST', f'/api/session/{session_id}/complete')
+        
+        export = asyncio.create_task(asgi_app(
+            make_scope('GET', '/api/session/export', b'format=json', [(b'x-user-id', b'1')]),
+            receive, send
+        ))
+        while not any(m.get('more_body') for m in messages):
+            await asyncio.sleep(0.01)
+        
+        status, _, _ = await asyncio.wait_for(request(asgi_app, 'GET', '/api/health'), timeout=5)
+        assert status == 200
+        
+        release.set()
+        await export
+        content = b''.join(m.get('body', b'') for m in messages[1:])
+        assert messages[0]['status'] == 200
+        assert [session['id'] for session in json.loads(content)] == [session_id]
+        assert not messages[-1].get('more_body')
+    
+    asyncio.run(scenario())
+
+
+def test_event_stream_runs_on_the_event_loop(asgi_app):
+    """SSE をイベントループ上で配信し、切断で購読を解除することをテスト"""
+    async def scenario():
+        sent = asyncio.Queue()
+        disconnect = asyncio.Event()
+        
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+        
+        stream = asyncio.ensure_future(asgi_app(make_scope('GET', '/api/events'), receive, sent.put))
+        start = await sent.get()
+        assert start['status'] == 200
+        assert dict(start['headers'])[b'content-type'].startswith(b'text/event-stream')
+        assert (await sent.get())['body'].startswith(b'retry:')
+        assert event_hub.stats()['subscribers'] == 1
+        
+        # DB スレッドでの完了がコミット後にループ上の接続へ届く
+        session = await run_db(pomodoro_service.start_session, 1, 25)
+        await run_db(pomodoro_service.complete_session, session.id, 1)
+        chunk = (await asyncio.wait_for(sent.get(), 5))['body'].decode()
+        assert 'event: progress' in chunk
+        assert json.loads(chunk.split('data: ', 1)[1])['xp_earned'] == 50
+        
+        disconnect.set()
+        await asyncio.wait_for(stream, 5)
+        assert event_hub.stats()['subscribers'] == 0
+    
+    asyncio.run(scenario())
+
+
+def test_event_stream_limits(asgi_app, monkeypatch):
+    """不正なユーザー・購読者数の上限の扱いが WSGI 版と同じことをテスト"""
+    async def scenario():
+        status, _, _ = await request(asgi_app, 'GET', '/api/events', query=b'user_id=x')
+        assert status == 400
+        status, _, _ = await request(asgi_app, 'GET', '/api/events',
+                                     headers=[(b'x-user-id', b'999')])
+        assert status == 404
+        
+        monkeypatch.setattr(event_hub, 'max_subscribers', 0)
+        status, headers, _ = await request(asgi_app, 'GET', '/api/events')
+        assert status == 503 and headers[b'retry-after'] == b'3'
+    
+    asyncio.run(scenario())
+
+
+def test_lifespan_shutdown_closes_streams(asgi_app):
+    """終了時に配信中の接続を閉じることをテスト"""
+    async def scenario():
+        sent = asyncio.Queue()
+        never = asyncio.Event()
+        
+        async def receive():
+            await never.wait()
+        
+        stream = asyncio.ensure_future(asgi_app(make_scope('GET', '/api/events'), receive, sent.put))
+        await sent.get()
+        await sent.get()
+        
+        lifespan = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        replies = []
+        
+        async def lifespan_receive():
+            return lifespan.pop(0)
+        
+        async def lifespan_send(message):
+            replies.append(message['type'])
+        
+        await asgi_app({'type': 'lifespan'}, lifespan_receive, lifespan_send)
+        assert replies == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        await asyncio.wait_for(stream, 5)
+        assert not (await sent.get()).get('more_body')
+    
+    asyncio.run(scenario())
@@ -0,0 +1,119 @@
+"""Integration tests for the retroactive badge backfill job."""
+
+from datetime import datetime, timedelta
+import pytest
+from models.badge import Badge
+from models.badge_rules import BadgeRuleSet
+from models.user import User
+from repositories.badge_repository import BadgeRepository
+from repositories.database import get_db
+from repositories.rollup_repository import RollupRepository
+from repositories.user_repository import UserRepository
+from services.badge_backfill import BadgeBackfill
+from services.gamification_service import GamificationService
+
+NOW = datetime(2024, 3, 1, 12)
+
+RULES = BadgeRuleSet([
+    Badge(id='first', name='初完了', description='', icon='🌱',
+          criteria_type='total_count', criteria_value=1),
+    Badge(id='night_owl', name='夜更かし', description='', icon='🦉',
+          criteria_type='hour', criteria_value=22, criteria_op='>='),
+])
+
+
+def seed(sessions: dict) -> None:
+    """{user_id: [完了時刻]} の完了セッションを登録してロールアップとストリークを作り直す"""
+    with get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO sessions
+                   (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+               VALUES (?, 25, 1, ?, ?, 250)''',
+            [(user_id, at, at) for user_id, times in sessions.items() for at in times]
+        )
+    RollupRepository.rebuild()
+    GamificationService().recompute_streaks()
+
+
+def create_users(count: int) -> None:
+    """デフォルトユーザーに続けて count 人のユーザーを作成"""
+    for i in range(count):
+        UserRepository.create(User(username=f'user{i}'))
+
+
+def test_backfill_awards_missing_badges(db_path):
+    """範囲集計した指標で未取得のバッジだけを授与し、再実行では何も授与しないことをテスト"""
+    create_users(2)
+    recent = [(NOW - timedelta(hours=6 * i)).isoformat() for i in range(12)]
+    # 1月に3日連続（現在のストリークは途切れている）で計60回
+    veteran = [f'2024-01-{day:02d}T09:{minute:02d}:00'
+               for day in (1, 2, 3, 10) for minute in range(15)]
+    seed({1: recent, 2: veteran})
+    BadgeRepository.award_badges(2, ['total_50'])
+    revision = UserRepository.get_revision(2)[0]
+    
+    backfill = BadgeBackfill(chunk_size=2, now=NOW)
+    stats = backfill.run()
+    assert stats == {'chunks': 2, 'skipped': 0, 'users': 3, 'awarded': 3}
+    
+    earned = BadgeRepository.get_all_earned()
+    assert earned[1] == {'streak_3', 'weekly_10'}
+    # 過去に達成した最長ストリークも遡って判定する
+    assert earned[2] == {'streak_3', 'total_50'}
+    assert 3 not in earned
+    assert UserRepository.get_revision(2)[0] == revision + 1
+    assert backfill.progress() == (2, 2, 3)
+    
+    # 同じジョブは処理済み、別のジョブでも差分がないため授与しない
+    assert backfill.run()['skipped'] == 2
+    assert BadgeBackfill(chunk_size=3, now=NOW).run()['awarded'] == 0
+
+
+def test_backfill_resumes_after_interruption(db_path, monkeypatch):
+    """中断したジョブを再実行すると未処理のチャンクだけを処理することをテスト"""
+    create_users(4)
+    seed({user_id: ['2024-02-01T23:30:00', '2024-02-02T10:00:00'] for user_id in range(1, 6)})
+    
+    backfill = BadgeBackfill(RULES, chunk_size=2, now=NOW)
+    process_chunk = backfill.process_chunk
+    calls = []
+    
+    def interrupted(start_id, end_id):
+        calls.append(start_id)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return process_chunk(start_id, end_id)
+    
+    monkeypatch.setattr(backfill, 'process_chunk', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        backfill.run()
+    assert backfill.progress() == (1, 3, 4)
+    
+    resumed = BadgeBackfill(RULES, chunk_size=2, now=NOW)
+    stats = resumed.run()
+    assert stats == {'chunks': 2, 'skipped': 1, 'users': 3, 'awarded': 6}
+    assert all(badges == {'first', 'night_owl'}
+               for badges in BadgeRepository.get_all_earned().values())
+    
+    # やり直すと最初のチャンクから処理する
+    resumed.reset()
+    assert resumed.run() == {'chunks': 3, 'skipped': 0, 'users': 5, 'awarded': 0}
+
+
+def test_workers_split_chunks(db_path):
+    """ワーカーが重複なくチャンクを分担し、並列実行でも同じ結果になることをテスト"""
+    create_users(6)
+    seed({user_id: ['2024-02-01T10:00:00'] for user_id in range(1, 8)})
+    
+    backfill = BadgeBackfill(RULES, chunk_size=2, now=NOW)
+    first = backfill.run(worker=0, workers=2)
+    second = backfill.run(worker=1, workers=2)
+    assert (first['chunks'], second['chunks']) == (2, 2)
+    assert first['users'] + second['users'] == 7
+    assert first['awarded'] + second['awarded'] == 7
+    
+    with get_db() as conn:
+        conn.execute('DELETE FROM user_badges')
+    stats = BadgeBackfill(RULES, chunk_size=2, job='parallel', now=NOW).run_parallel(2)
+    assert stats == {'chunks': 4, 'skipped': 0, 'users': 7, 'awarded': 7}
+    assert BadgeRepository.get_all_earned() == {user_id: {'first'} for user_id in range(1, 8)}
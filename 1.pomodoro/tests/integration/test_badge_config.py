@@ -0,0 +1,49 @@
+"""Integration tests for badge rules loaded from a definition file."""
+
+import json
+from datetime import datetime
+import pytest
+import services.pomodoro_service as pomodoro_module
+from models.badge_rules import configure_badge_rules
+from services.replay_service import ReplayService
+
+BADGES = [
+    {'id': 'early_bird', 'name': '早起き', 'icon': '🌅',
+     'criteria_type': 'hour', 'criteria_value': 7, 'criteria_op': '<'},
+    {'id': 'focus_50', 'name': '50分集中', 'icon': '⏳',
+     'criteria_type': 'focus_minutes', 'criteria_value': 50},
+]
+
+
+@pytest.fixture
+def client(client, tmp_path):
+    """定義ファイルのバッジを設定したFlaskクライアントを作成"""
+    badges_path = tmp_path / 'badges.json'
+    badges_path.write_text(json.dumps({'badges': BADGES}), encoding='utf-8')
+    configure_badge_rules(str(badges_path))
+    
+    yield client
+    
+    configure_badge_rules()
+
+
+def complete_at(client, monkeypatch, timestamp: str) -> dict:
+    """指定した時刻にセッションを開始・完了"""
+    monkeypatch.setattr(pomodoro_module, 'local_now', lambda: datetime.fromisoformat(timestamp))
+    session_id = client.post('/api/session/start', json={'duration': 25}).get_json()['session']['id']
+    return client.post(f'/api/session/{session_id}/complete').get_json()
+
+
+def test_configured_badges_are_awarded_and_listed(client, monkeypatch):
+    """定義ファイルのバッジが完了時刻・累計集中時間で授与されることをテスト"""
+    data = complete_at(client, monkeypatch, '2024-01-01T06:30:00')
+    assert [badge['id'] for badge in data['new_badges']] == ['early_bird']
+    
+    data = complete_at(client, monkeypatch, '2024-01-01T12:00:00')
+    assert [badge['id'] for badge in data['new_badges']] == ['focus_50']
+    
+    badges = client.get('/api/gamification/badges').get_json()['badges']
+    assert badges['total_available'] == 2
+    assert badges['total_earned'] == 2
+    # 再生しても同じバッジになる
+    assert ReplayService().verify() == []
@@ -0,0 +1,77 @@
+"""Stress tests for idempotent, race-free session completion."""
+
+import threading
+import pytest
+from models.user import User
+from repositories.database import get_db
+from repositories.rollup_repository import RollupRepository
+from repositories.user_repository import UserRepository
+from services.pomodoro_service import PomodoroService
+from services.replay_service import ReplayService
+
+# 同時に完了を実行するスレッド数
+THREADS = 8
+
+
+def run_concurrently(target, args_list: list) -> list:
+    """各引数で target をスレッドで同時に実行し、発生した例外を返す"""
+    barrier = threading.Barrier(len(args_list))
+    errors = []
+    
+    def worker(*args):
+        barrier.wait()
+        try:
+            target(*args)
+        except Exception as exc:
+            errors.append(exc)
+    
+    threads = [threading.Thread(target=worker, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_completing_twice_does_not_award_xp_again(db_path):
+    """完了済みのセッションを再度完了してもXPが加算されないことをテスト"""
+    service = PomodoroService()
+    session = service.start_session(1, 25)
+    
+    first = service.complete_session(session.id)
+    second = service.complete_session(session.id)
+    
+    assert first['xp_earned'] == 50 and first['already_completed'] is False
+    assert second['xp_earned'] == 0 and second['already_completed'] is True
+    assert second['new_badges'] == []
+    assert second['user']['xp'] == 50
+    assert service.complete_session(session.id, user_id=2) is None
+
+
+def test_concurrent_completions_award_exact_xp(db_path):
+    """複数スレッドから同じセッションを重複して完了しても最終的なXPが正確なことをテスト"""
+    service = PomodoroService()
+    sessions_per_thread = 15
+    session_ids = [
+        service.start_session(1, 25).id for _ in range(THREADS * sessions_per_thread)
+    ]
+    
+    def complete_all(offset: int) -> None:
+        # 各セッションを2つのスレッドが完了する
+        for session_id in session_ids[offset::THREADS // 2]:
+            service.complete_session(session_id, 1)
+    
+    errors = run_concurrently(complete_all, [(i % (THREADS // 2),) for i in range(THREADS)])
+    assert errors == []
+    
+    user = UserRepository.get_by_id(1)
+    assert user.xp == len(session_ids) * 50
+    assert user.level == User.level_for_xp(user.xp)
+    assert RollupRepository.get_totals(1)[1] == len(session_ids)
+    with get_db() as conn:
+        completed_events = conn.execute(
+            "SELECT COUNT(*) FROM session_events WHERE type = 'completed'"
+        ).fetchone()[0]
+    assert completed_events == len(session_ids)
+    assert RollupRepository.verify() == []
+    assert ReplayService().verify() == []
@@ -0,0 +1,110 @@
+"""Integration tests for ETag / 304 handling on read APIs."""
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from models import week as week_module
+from models.badge import Badge
+from models.badge_rules import configure_badge_rules, get_badge_rules
+from repositories.database import ConnectionPool
+from services.cache import read_cache
+
+DASHBOARD_URLS = [
+    '/api/gamification/profile',
+    '/api/gamification/badges',
+    '/api/statistics',
+    '/api/statistics/daily?days=30',
+]
+
+
+def load_dashboard(client) -> dict:
+    """ダッシュボードの全APIを取得し、URLごとの ETag を返す"""
+    etags = {}
+    for url in DASHBOARD_URLS:
+        response = client.get(url)
+        assert response.status_code == 200
+        etags[url] = response.headers['ETag']
+    return etags
+
+
+def test_read_api_returns_validators(client):
+    """読み取りAPIが ETag と Last-Modified を返すことをテスト"""
+    response = client.get('/api/gamification/profile')
+    
+    assert response.status_code == 200
+    assert response.headers.get('ETag')
+    assert response.headers.get('Last-Modified')
+    assert 'no-cache' in response.headers.get('Cache-Control', '')
+
+
+def test_unchanged_resource_returns_304(client):
+    """変更がなければ 304 が返ることをテスト"""
+    etags = load_dashboard(client)
+    
+    for url, etag in etags.items():
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+
+def test_write_changes_etag(client):
+    """セッション開始・完了で ETag が変わることをテスト"""
+    etag = client.get('/api/gamification/profile').headers['ETag']
+    
+    start_response = client.post('/api/session/start', json={'duration': 25})
+    session_id = start_response.get_json()['session']['id']
+    client.post(f'/api/session/{session_id}/complete')
+    
+    response = client.get('/api/gamification/profile', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_unchanged_dashboard_reload_does_no_sql(client, monkeypatch):
+    """変更のないダッシュボード再読み込みでSQLを一切実行しないことをテスト"""
+    etags = load_dashboard(client)
+    
+    acquired = []
+    original_acquire = ConnectionPool.acquire
+    
+    def counting_acquire(self):
+        acquired.append(1)
+        return original_acquire(self)
+    
+    monkeypatch.setattr(ConnectionPool, 'acquire', counting_acquire)
+    
+    for url, etag in etags.items():
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+    
+    assert acquired == []
+
+
+def test_badge_definition_change_invalidates_etag(client):
+    """バッジの定義が変わると、リビジョンが同じでもバッジ一覧の ETag が変わることをテスト"""
+    etags = {url: client.get(url).headers['ETag'] for url in ('/api/gamification/badges', '/api/dashboard')}
+    total = client.get('/api/gamification/badges').get_json()['badges']['total_available']
+    
+    # 定義ファイルを編集して再起動した場合
+    extra = Badge('total_1', '初めての完了', '1回完了', 'seedling', 'total_count', 1)
+    configure_badge_rules(badges=get_badge_rules().badges + [extra])
+    read_cache.clear()
+    try:
+        for url, etag in etags.items():
+            response = client.get(url, headers={'If-None-Match': etag})
+            assert response.status_code == 200, url
+        assert response.headers['ETag'] != etags['/api/dashboard']
+        assert client.get('/api/gamification/badges').get_json()['badges']['total_available'] == total + 1
+    finally:
+        configure_badge_rules()
+
+
+def test_last_modified_uses_application_clock(client, monkeypatch):
+    """Last-Modified が設定したタイムゾーンの書き込み時刻を表すことをテスト"""
+    monkeypatch.setattr(week_module, '_timezone', ZoneInfo('Pacific/Kiritimati'))
+    client.post('/api/session/start', json={'duration': 25})
+    
+    response = client.get('/api/gamification/profile')
+    
+    modified = response.last_modified.astimezone(timezone.utc)
+    assert abs(modified - datetime.now(timezone.utc)) < timedelta(seconds=5)
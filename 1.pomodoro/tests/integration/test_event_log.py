@@ -0,0 +1,132 @@
+"""Integration tests for the session event log and the replay engine."""
+
+import sqlite3
+from datetime import datetime, time, timedelta
+import pytest
+import repositories.database as db_module
+import services.pomodoro_service as pomodoro_module
+from models.week import local_now, local_today
+from repositories.database import get_db
+from repositories.event_repository import EventRepository
+from repositories.user_repository import UserRepository
+from services.gamification_service import GamificationService
+from services.pomodoro_service import PomodoroService
+from services.replay_service import ReplayService
+
+
+def seed_history(count: int = 12, username: str = 'bob') -> None:
+    """既定のユーザーと username のユーザーでセッションを開始・完了"""
+    service = PomodoroService()
+    bob = GamificationService().register_user(username)['id']
+    for i in range(count):
+        service.complete_session(service.start_session(1, 25).id)
+        if i % 3 == 0:
+            service.complete_session(service.start_session(bob, 50).id)
+    # 完了しないセッション
+    service.start_session(bob, 25)
+
+
+def test_start_and_complete_append_events(db_path):
+    """開始・完了でイベントが追記され、再完了では追記されないことをテスト"""
+    service = PomodoroService()
+    session = service.start_session(1, 25)
+    service.complete_session(session.id)
+    service.complete_session(session.id)
+    
+    with get_db() as conn:
+        rows = conn.execute(
+            'SELECT type, session_id, xp_earned FROM session_events ORDER BY seq'
+        ).fetchall()
+    assert [tuple(row) for row in rows] == [('started', session.id, 0), ('completed', session.id, 50)]
+
+
+def test_event_log_is_append_only(db_path):
+    """イベントの更新・削除が拒否されることをテスト"""
+    PomodoroService().start_session(1, 25)
+    
+    with pytest.raises(sqlite3.IntegrityError):
+        with get_db() as conn:
+            conn.execute('UPDATE session_events SET xp_earned = 100')
+    with pytest.raises(sqlite3.IntegrityError):
+        with get_db() as conn:
+            conn.execute('DELETE FROM session_events')
+
+
+def test_replay_matches_live_tables(db_path):
+    """再生した状態が users / user_badges と一致することをテスト"""
+    seed_history()
+    
+    assert ReplayService().verify() == []
+    states, _ = ReplayService().replay()
+    assert states[1].user.xp == UserRepository.get_by_id(1).xp == 600
+    assert sorted(states[1].badges) == ['weekly_10']
+
+
+def test_replay_counts_weekly_sessions_by_calendar_day(db_path, monkeypatch):
+    """7日前の 23:59 に開始したセッションを、ライブの判定と再生の両方で週間完了数から除くことをテスト"""
+    service = PomodoroService()
+    boundary = datetime.combine(local_today() - timedelta(days=7), time(23, 59))
+    monkeypatch.setattr(pomodoro_module, 'local_now', lambda: boundary)
+    service.complete_session(service.start_session(1, 25).id)
+    
+    monkeypatch.setattr(pomodoro_module, 'local_now', local_now)
+    for _ in range(9):
+        result = service.complete_session(service.start_session(1, 25).id)
+    
+    assert 'weekly_10' not in [badge.id for badge in result['new_badges']]
+    assert ReplayService().verify() == []
+
+
+def test_verify_reports_drift_and_rebuild_fixes_it(db_path):
+    """ずれを検出し、イベントログからの再構築で解消できることをテスト"""
+    seed_history()
+    with get_db() as conn:
+        conn.execute('UPDATE users SET xp = 9999 WHERE id = 1')
+        conn.execute('DELETE FROM user_badges')
+    
+    drift = ReplayService().verify()
+    assert {(entry['table'], entry['key']) for entry in drift} == {('users', 1), ('user_badges', 1)}
+    
+    users, badges = ReplayService().rebuild()
+    assert (users, badges) == (2, 1)
+    assert ReplayService().verify() == []
+    assert GamificationService().get_user_profile(1)['xp'] == 600
+
+
+def test_replay_from_snapshots_matches_full_replay(db_path):
+    """スナップショットからの再生が先頭からの再生と一致することをテスト"""
+    seed_history()
+    service = ReplayService()
+    assert service.take_snapshots() == 2
+    
+    seed_history(30, 'carol')
+    from_snapshots, last_seq = service.replay()
+    full, _ = service.replay(use_snapshots=False)
+    
+    assert last_seq == EventRepository.get_last_seq()
+    assert {uid: s.to_snapshot() for uid, s in from_snapshots.items()} == \
+        {uid: s.to_snapshot() for uid, s in full.items() if uid in from_snapshots}
+    assert service.verify() == []
+
+
+def test_migration_backfills_events_from_sessions(db_path):
+    """既存のセッションからイベントが作成されることをテスト"""
+    with get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO sessions
+                   (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+               VALUES (1, 25, ?, ?, ?, ?)''',
+            [(1, '2024-01-01T09:00:00', '2024-01-01T09:25:00', 50),
+             (0, '2024-01-01T10:00:00', None, 0)]
+        )
+        conn.execute('DROP TABLE session_events')
+        conn.execute('PRAGMA user_version = 6')
+    db_module.init_db()
+    
+    with get_db() as conn:
+        rows = conn.execute('SELECT type, occurred_at FROM session_events ORDER BY seq').fetchall()
+    assert [tuple(row) for row in rows] == [
+        ('started', '2024-01-01T09:00:00'),
+        ('completed', '2024-01-01T09:25:00'),
+        ('started', '2024-01-01T10:00:00'),
+    ]
@@ -0,0 +1,71 @@
+"""Integration tests for the Server-Sent Events progress stream."""
+
+import json
+import pytest
+import routes.api as api_module
+from services.event_hub import event_hub
+
+
+def parse_event(chunk: bytes) -> dict:
+    """SSE のイベント1件をフィールドの dict に変換"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+def complete_session(client, headers=None) -> dict:
+    """セッションを開始・完了"""
+    session_id = client.post('/api/session/start', json={'duration': 25},
+                             headers=headers).get_json()['session']['id']
+    return client.post(f'/api/session/{session_id}/complete', headers=headers).get_json()
+
+
+def test_completion_is_pushed_after_commit(client):
+    """セッション完了のコミット後に XP・バッジ・統計の差分が配信されることをテスト"""
+    response = client.get('/api/events')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.iter_encoded()
+    assert next(chunks) == b'retry: 3000\n\n'
+    assert event_hub.stats()['subscribers'] == 1
+    
+    result = complete_session(client)
+    event = parse_event(next(chunks))
+    assert event['event'] == 'progress'
+    assert event['data']['user'] == result['user']
+    assert event['data']['xp_earned'] == 50
+    assert event['data']['stats']['completed_sessions'] == 1
+    assert event['data']['stats']['total_focus_minutes'] == 25
+    assert event['data']['stats']['day'] == result['session']['completed_at'][:10]
+    
+    # 完了済みのセッションの再完了は配信しない
+    client.post(f"/api/session/{result['session']['id']}/complete")
+    assert event_hub.publish(1, 'marker', {}) == 1
+    assert parse_event(next(chunks))['event'] == 'marker'
+    
+    response.close()
+    assert event_hub.stats()['subscribers'] == 0
+
+
+def test_streams_are_per_user_and_send_heartbeats(client, monkeypatch):
+    """他のユーザーの完了は届かず、イベントがない間は keep-alive を送ることをテスト"""
+    monkeypatch.setattr(api_module, 'DEFAULT_SSE_HEARTBEAT', 0.01)
+    # 別のクライアントで登録したユーザー（セッション Cookie で特定される）
+    other = client.application.test_client()
+    other.post('/api/users', json={'username': 'other'})
+    
+    response = client.get('/api/events')
+    chunks = response.iter_encoded()
+    next(chunks)
+    complete_session(other, {})
+    assert next(chunks) == b': keep-alive\n\n'
+    response.close()
+
+
+def test_stream_rejected_over_subscriber_limit(client, monkeypatch):
+    """購読者数の上限に達している場合は 503 を返すことをテスト"""
+    monkeypatch.setattr(event_hub, 'max_subscribers', 0)
+    response = client.get('/api/events')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3'
+    assert client.get('/api/events/stats').get_json()['events']['rejected'] >= 1
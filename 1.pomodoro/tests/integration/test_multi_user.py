@@ -0,0 +1,147 @@
+"""Integration tests for per-request user resolution and the leaderboard."""
+
+import pytest
+
+
+@pytest.fixture
+def client(client):
+    """ユーザー指定のヘッダーを信頼するFlaskクライアント（認証済みのプロキシの背後と同じ設定）"""
+    client.application.config['TRUST_USER_HEADER'] = True
+    return client
+
+
+def register(client, username: str) -> int:
+    """別のクライアントでユーザーを登録してIDを返す（client のセッション Cookie は変えない）"""
+    response = client.application.test_client().post('/api/users', json={'username': username})
+    assert response.status_code == 201
+    return response.get_json()['user']['id']
+
+
+def complete(client, user_id: int, duration: int = 25) -> None:
+    """指定ユーザーでセッションを開始して完了"""
+    headers = {'X-User-Id': str(user_id)}
+    response = client.post('/api/session/start', json={'duration': duration}, headers=headers)
+    session_id = response.get_json()['session']['id']
+    response = client.post(f'/api/session/{session_id}/complete', headers=headers)
+    assert response.status_code == 200
+
+
+def test_register_user(client):
+    """ユーザー登録APIのテスト"""
+    user_id = register(client, 'alice')
+    assert user_id != 1
+    
+    response = client.post('/api/users', json={'username': 'alice'})
+    assert response.status_code == 409
+    # 登録に失敗した場合はセッション Cookie を発行しない
+    assert client.get('/api/gamification/profile').get_json()['profile']['id'] == 1
+    
+    response = client.post('/api/users', json={})
+    assert response.status_code == 400
+
+
+def test_requests_are_scoped_to_user(client):
+    """ヘッダーで指定したユーザーのデータだけが返ることをテスト"""
+    alice = register(client, 'alice')
+    complete(client, alice)
+    
+    response = client.get('/api/gamification/profile', headers={'X-User-Id': str(alice)})
+    assert response.get_json()['profile']['username'] == 'alice'
+    assert response.get_json()['profile']['xp'] == 50
+    
+    # ユーザー未指定の場合はデフォルトユーザー
+    response = client.get('/api/gamification/profile')
+    assert response.get_json()['profile']['xp'] == 0
+    
+    response = client.get(f'/api/session/history?user_id={alice}')
+    assert len(response.get_json()['sessions']) == 1
+    assert client.get('/api/session/history').get_json()['sessions'] == []
+
+
+def test_etag_differs_per_user(client):
+    """ユーザーごとに異なる ETag が返ることをテスト"""
+    alice = register(client, 'alice')
+    
+    default_etag = client.get('/api/gamification/profile').headers['ETag']
+    response = client.get('/api/gamification/profile', headers={'X-User-Id': str(alice)})
+    
+    assert response.headers['ETag'] != default_etag
+    assert 'X-User-Id' in response.headers['Vary']
+    
+    response = client.get('/api/gamification/profile',
+                          headers={'X-User-Id': str(alice), 'If-None-Match': default_etag})
+    assert response.status_code == 200
+
+
+def test_cannot_complete_other_users_session(client):
+    """他のユーザーのセッションは完了できないことをテスト"""
+    alice = register(client, 'alice')
+    response = client.post('/api/session/start', json={'duration': 25})
+    session_id = response.get_json()['session']['id']
+    
+    response = client.post(f'/api/session/{session_id}/complete',
+                           headers={'X-User-Id': str(alice)})
+    assert response.status_code == 404
+
+
+def test_unknown_or_invalid_user(client):
+    """存在しない・不正なユーザー指定のテスト"""
+    response = client.get('/api/gamification/profile', headers={'X-User-Id': '9999'})
+    assert response.status_code == 404
+    
+    response = client.get('/api/gamification/profile', headers={'X-User-Id': 'abc'})
+    assert response.status_code == 400
+
+
+def test_user_registered_after_lookup_is_resolved(client):
+    """未登録時の参照結果がキャッシュに残らないことをテスト"""
+    assert client.get('/api/gamification/profile?user_id=2').status_code == 404
+    
+    user_id = register(client, 'alice')
+    assert user_id == 2
+    assert client.get('/api/gamification/profile?user_id=2').status_code == 200
+
+
+def test_leaderboard_and_rank(client):
+    """リーダーボードと順位のテスト"""
+    alice = register(client, 'alice')
+    bob = register(client, 'bob')
+    complete(client, alice, 45)
+    complete(client, bob, 25)
+    complete(client, bob, 15)
+    
+    response = client.get('/api/gamification/leaderboard?limit=2')
+    leaderboard = response.get_json()['leaderboard']
+    
+    assert [entry['username'] for entry in leaderboard] == ['alice', 'bob']
+    assert [entry['rank'] for entry in leaderboard] == [1, 2]
+    assert leaderboard[0]['xp'] == 90
+    
+    # 同じXPの場合はIDの小さいユーザーが上位
+    response = client.get('/api/gamification/rank')
+    assert response.get_json()['rank']['rank'] == 3
+    response = client.get('/api/gamification/rank', headers={'X-User-Id': str(bob)})
+    assert response.get_json()['rank']['rank'] == 2
+
+
+def test_registration_issues_session_cookie(client):
+    """登録したクライアントはセッション Cookie でそのユーザーとして扱われることをテスト"""
+    response = client.post('/api/users', json={'username': 'alice'})
+    alice = response.get_json()['user']['id']
+    assert 'HttpOnly' in response.headers['Set-Cookie']
+    
+    complete(client, alice)
+    response = client.get('/api/gamification/profile')
+    assert response.get_json()['profile']['username'] == 'alice'
+    assert 'Cookie' in response.headers['Vary']
+
+
+def test_user_header_rejected_unless_trusted(client):
+    """プロキシの設定がなければユーザー指定のヘッダー / クエリを拒否することをテスト"""
+    alice = register(client, 'alice')
+    client.application.config['TRUST_USER_HEADER'] = False
+    
+    response = client.get('/api/gamification/profile', headers={'X-User-Id': str(alice)})
+    assert response.status_code == 403
+    assert client.get(f'/api/session/history?user_id={alice}').status_code == 403
+    assert client.get('/api/gamification/profile').get_json()['profile']['id'] == 1
@@ -0,0 +1,84 @@
+"""Query count tests for the session completion pipeline."""
+
+import pytest
+from models.badge import Badge
+from models.badge_rules import configure_badge_rules
+from repositories.database import get_db
+from services.pomodoro_service import PomodoroService
+
+# セッション完了1回あたりに許容する SQL 文の数（BEGIN / COMMIT を除く）
+MAX_QUERIES_PER_COMPLETION = 8
+
+
+def count_statements(action) -> list:
+    """action 実行中に発行された SQL 文を収集（トランザクション制御文は除く）"""
+    statements = []
+    with get_db() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            action()
+        finally:
+            conn.set_trace_callback(None)
+    return [
+        s for s in statements
+        if not s.strip().upper().startswith(('BEGIN', 'COMMIT', 'ROLLBACK'))
+    ]
+
+
+def test_completion_uses_constant_number_of_queries(db_path):
+    """セッション完了のクエリ数が上限以内であることをテスト"""
+    service = PomodoroService()
+    session = service.start_session(1, 25)
+    
+    statements = count_statements(lambda: service.complete_session(session.id))
+    
+    assert len(statements) <= MAX_QUERIES_PER_COMPLETION, '\n'.join(statements)
+
+
+def test_completion_query_count_does_not_grow_with_history(db_path):
+    """履歴や取得済みバッジが増えてもクエリ数が増えないことをテスト"""
+    service = PomodoroService()
+    first = service.start_session(1, 25)
+    first_count = len(count_statements(lambda: service.complete_session(first.id)))
+    
+    for _ in range(60):
+        service.complete_session(service.start_session(1, 25).id)
+    
+    last = service.start_session(1, 25)
+    last_count = len(count_statements(lambda: service.complete_session(last.id)))
+    
+    assert last_count <= first_count
+
+
+def test_completion_awards_badges_in_single_insert(db_path):
+    """複数バッジの授与が1回の INSERT で行われることをテスト"""
+    service = PomodoroService()
+    for _ in range(49):
+        service.complete_session(service.start_session(1, 25).id)
+    
+    session = service.start_session(1, 25)
+    statements = count_statements(lambda: service.complete_session(session.id))
+    
+    inserts = [s for s in statements if 'INSERT' in s and 'user_badges' in s]
+    assert len(inserts) <= 1
+
+
+def test_completion_query_count_does_not_grow_with_badges(db_path):
+    """バッジ定義が500件に増えてもクエリ数が増えないことをテスト"""
+    service = PomodoroService()
+    first = service.start_session(1, 25)
+    baseline = len(count_statements(lambda: service.complete_session(first.id)))
+    
+    metrics = ('streak', 'weekly_count', 'monthly_count', 'total_count', 'focus_minutes')
+    configure_badge_rules(badges=[
+        Badge(id=f'rule_{i}', name=f'rule {i}', description='', icon='',
+              criteria_type=metrics[i % len(metrics)], criteria_value=1000 + i)
+        for i in range(500)
+    ])
+    try:
+        session = service.start_session(1, 25)
+        statements = count_statements(lambda: service.complete_session(session.id))
+    finally:
+        configure_badge_rules()
+    
+    assert len(statements) <= max(baseline, MAX_QUERIES_PER_COMPLETION), '\n'.join(statements)
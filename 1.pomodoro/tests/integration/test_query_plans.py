@@ -0,0 +1,132 @@
+"""EXPLAIN QUERY PLAN regression tests for hot repository queries."""
+
+import re
+import pytest
+import repositories.database as db_module
+from repositories.database import get_db
+from repositories.session_repository import SessionRepository
+from repositories.user_repository import UserRepository
+from repositories.badge_repository import BadgeRepository
+from services.pomodoro_service import PomodoroService
+from services.statistics_service import StatisticsService
+from services.gamification_service import GamificationService
+
+# インデックスを使わないテーブル全走査（"SCAN sessions" など）を検出する
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+def capture_queries(action) -> list:
+    """action 実行中に発行された SELECT 文を収集"""
+    statements = []
+    with get_db() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            action()
+        finally:
+            conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+
+
+def query_plan(sql: str) -> list:
+    """EXPLAIN QUERY PLAN の detail 列を取得"""
+    with get_db() as conn:
+        return [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+
+
+def hot_path_actions():
+    """ダッシュボードとセッション完了で実行される処理"""
+    pomodoro_service = PomodoroService()
+    statistics_service = StatisticsService()
+    gamification_service = GamificationService()
+    
+    def run():
+        session = pomodoro_service.start_session(1, 25)
+        pomodoro_service.complete_session(session.id)
+        gamification_service.check_and_award_badges(1)
+        gamification_service.get_user_profile(1)
+        gamification_service.get_user_badges(1)
+        statistics_service.get_user_statistics(1)
+        statistics_service.get_daily_activity(1)
+        statistics_service.get_activity(1)
+        statistics_service.get_weekly_comparison(1)
+        SessionRepository.get_by_user(1, 10)
+        SessionRepository.get_completed_by_user(1)
+        UserRepository.get_by_username('default_user')
+        BadgeRepository.get_user_badges(1)
+    
+    return run
+
+
+def test_hot_queries_are_captured(db_path):
+    """計測対象のクエリが収集できていることをテスト"""
+    queries = capture_queries(hot_path_actions())
+    assert any('FROM sessions' in q for q in queries)
+    assert any('FROM user_badges' in q for q in queries)
+
+
+def test_hot_queries_avoid_full_table_scans(db_path):
+    """ホットパスのクエリがテーブル全走査にフォールバックしないことをテスト"""
+    queries = capture_queries(hot_path_actions())
+    
+    for sql in set(queries):
+        for detail in query_plan(sql):
+            assert not FULL_SCAN.match(detail), f'full table scan: {detail}\n{sql}'
+
+
+def test_session_history_is_sorted_by_index(db_path):
+    """セッション履歴の並び替えにインデックスが使われることをテスト"""
+    queries = capture_queries(lambda: SessionRepository.get_by_user(1, 10))
+    
+    for sql in queries:
+        assert not any('TEMP B-TREE' in d for d in query_plan(sql)), sql
+
+
+def test_history_pages_are_sorted_by_index(db_path):
+    """キーセットページングの2ページ目以降もソートなしで範囲検索されることをテスト"""
+    queries = capture_queries(
+        lambda: SessionRepository.get_page(1, 10, ('2024-01-01T00:00:00', 100))
+    )
+    
+    for sql in queries:
+        plan = query_plan(sql)
+        assert any('idx_sessions_user_started_id' in d for d in plan), plan
+        assert not any('TEMP B-TREE' in d for d in plan), plan
+
+
+def test_migrations_are_recorded(db_path):
+    """マイグレーションのバージョンが記録されることをテスト"""
+    with get_db() as conn:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        indexes = {
+            row['name'] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+    
+    assert version == db_module.MIGRATIONS[-1][0]
+    assert 'idx_sessions_user_started' in indexes
+    assert 'idx_sessions_user_completed_at' in indexes
+
+
+def test_leaderboard_queries_use_xp_index(db_path):
+    """リーダーボードと順位の計算が users テーブルを走査しないことをテスト"""
+    with get_db() as conn:
+        conn.executemany(
+            'INSERT INTO users (username, xp) VALUES (?, ?)',
+            [(f'user{i}', i * 7 % 500) for i in range(200)]
+        )
+    user = UserRepository.get_by_id(50)
+    
+    queries = capture_queries(lambda: UserRepository.get_top_by_xp(10))
+    queries += capture_queries(lambda: UserRepository.get_rank(user))
+    assert queries
+    
+    for sql in queries:
+        plan = query_plan(sql)
+        assert any('idx_users_xp' in d for d in plan), plan
+        assert not any('TEMP B-TREE' in d for d in plan), plan
+        assert not any(FULL_SCAN.match(d) for d in plan), plan
+    
+    # 順位はインデックスの範囲検索だけで求める
+    assert all(d.startswith('SEARCH') or 'SCALAR SUBQUERY' in d or d == 'SCAN CONSTANT ROW'
+               for d in query_plan(queries[-1])), query_plan(queries[-1])
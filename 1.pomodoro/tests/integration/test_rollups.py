@@ -0,0 +1,65 @@
+"""Integration tests for incrementally maintained rollups."""
+
+import pytest
+import repositories.database as db_module
+from repositories.database import get_db
+from repositories.rollup_repository import RollupRepository
+from services.pomodoro_service import PomodoroService
+
+
+def test_rollups_follow_start_and_complete(db_path):
+    """開始・完了がロールアップに反映されることをテスト"""
+    service = PomodoroService()
+    first = service.start_session(1, 25)
+    service.start_session(1, 15)
+    service.complete_session(first.id)
+    
+    assert RollupRepository.get_totals(1) == (2, 1, 25)
+    assert RollupRepository.verify() == []
+
+
+def test_completing_twice_does_not_double_count(db_path):
+    """同じセッションを2回完了してもカウンタが二重加算されないことをテスト"""
+    service = PomodoroService()
+    session = service.start_session(1, 25)
+    service.complete_session(session.id)
+    service.complete_session(session.id)
+    
+    assert RollupRepository.get_totals(1) == (1, 1, 25)
+    assert RollupRepository.verify() == []
+
+
+def test_verify_reports_drift_and_rebuild_fixes_it(db_path):
+    """ずれを検出し、再構築で解消できることをテスト"""
+    service = PomodoroService()
+    service.complete_session(service.start_session(1, 25).id)
+    
+    with get_db() as conn:
+        conn.execute('UPDATE user_stats SET completed_sessions = 5 WHERE user_id = 1')
+    
+    drift = RollupRepository.verify()
+    assert len(drift) == 1
+    assert drift[0]['table'] == 'user_stats'
+    
+    RollupRepository.rebuild()
+    assert RollupRepository.verify() == []
+
+
+def test_migration_backfills_existing_sessions(db_path, monkeypatch):
+    """既存セッションがマイグレーションでロールアップに取り込まれることをテスト"""
+    with get_db() as conn:
+        conn.execute('DROP TABLE user_stats')
+        conn.execute('DROP TABLE daily_rollup')
+        conn.execute(
+            '''INSERT INTO sessions
+               (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+               VALUES (1, 25, 1, '2024-01-01T10:00:00', '2024-01-01T10:25:00', 50)'''
+        )
+        conn.execute('PRAGMA user_version = 1')
+    
+    # ロールアップ追加時点（バージョン2）までのマイグレーションを再適用
+    monkeypatch.setattr(db_module, 'MIGRATIONS', db_module.MIGRATIONS[:2])
+    db_module.init_db()
+    
+    assert RollupRepository.get_totals(1) == (1, 1, 25)
+    assert RollupRepository.get_daily(1, '2024-01-01') == {'2024-01-01': (1, 25)}
@@ -0,0 +1,101 @@
+"""Integration tests for keyset-paginated and streamed session history."""
+
+import json
+import pytest
+from repositories.database import get_db
+from repositories.session_repository import SessionRepository
+
+
+def seed(count: int) -> None:
+    """3件ずつ同じ開始時刻を持つセッションを作成（同時刻の並び順も検証するため）"""
+    with get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO sessions (user_id, duration_minutes, completed, started_at)
+               VALUES (1, 25, 0, ?)''',
+            [(f'2024-01-{i // 3 + 1:02d}T09:00:00',) for i in range(count)]
+        )
+
+
+def expected_ids() -> list:
+    """新しい順（同時刻は ID の大きい順）に並べたセッションID"""
+    return [s.id for s in SessionRepository.get_by_user(1)]
+
+
+def test_history_pages_cover_all_sessions_once(client):
+    """カーソルをたどると全セッションが重複・欠落なく返ることをテスト"""
+    seed(20)
+    
+    ids = []
+    cursor = None
+    while True:
+        url = '/api/session/history?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        ids += [s['id'] for s in data['sessions']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    
+    assert ids == expected_ids()
+    assert len(ids) == 20
+
+
+def test_history_last_page_has_no_cursor(client):
+    """最終ページでは next_cursor が null になることをテスト"""
+    seed(3)
+    
+    data = client.get('/api/session/history?limit=3').get_json()
+    assert len(data['sessions']) == 3
+    assert data['next_cursor'] is None
+
+
+def test_history_rejects_invalid_cursor(client):
+    """不正なカーソルは 400 を返すことをテスト"""
+    response = client.get('/api/session/history?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_export_ndjson(client):
+    """NDJSON エクスポートのテスト"""
+    seed(5)
+    
+    response = client.get('/api/session/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == expected_ids()
+
+
+def test_export_json_array(client):
+    """JSON 配列形式のエクスポートのテスト"""
+    seed(4)
+    
+    response = client.get('/api/session/export?format=json')
+    assert [s['id'] for s in json.loads(response.get_data(as_text=True))] == expected_ids()
+    
+    response = client.get('/api/session/export?format=csv')
+    assert response.status_code == 400
+
+
+def test_export_of_empty_history(client):
+    """セッションがない場合のエクスポートのテスト"""
+    assert client.get('/api/session/export').get_data() == b''
+    assert client.get('/api/session/export?format=json').get_data() == b'[]'
+
+
+def test_iter_by_user_reads_in_batches(client):
+    """全件を一度に読み込まずバッチごとに取得することをテスト"""
+    seed(10)
+    
+    statements = []
+    with get_db() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            ids = [s.id for s in SessionRepository.iter_by_user(1, batch_size=4)]
+        finally:
+            conn.set_trace_callback(None)
+    
+    assert ids == expected_ids()
+    selects = [s for s in statements if s.lstrip().startswith('SELECT')]
+    assert len(selects) == 3
+    assert all('LIMIT 4' in s for s in selects)
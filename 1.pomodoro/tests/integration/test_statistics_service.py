@@ -0,0 +1,198 @@
+"""Integration tests for StatisticsService aggregation."""
+
+from datetime import datetime, timedelta
+import pytest
+from repositories.database import get_db
+from repositories.session_repository import SessionRepository
+from repositories.rollup_repository import RollupRepository
+from models.statistics import Statistics
+from services.statistics_service import StatisticsService
+from models.week import IsoWeek
+
+
+def seed_sessions(user_id: int = 1) -> None:
+    """期間・完了状態・時間がばらばらのセッションを作成"""
+    now = datetime.now()
+    rows = []
+    for i in range(120):
+        started = now - timedelta(days=i % 45, hours=i % 7)
+        completed = i % 3 != 0
+        duration = (15, 25, 45)[i % 3]
+        rows.append((
+            user_id, duration, completed, started.isoformat(),
+            (started + timedelta(minutes=duration)).isoformat() if completed else None,
+            duration * 2 if completed else 0
+        ))
+    with get_db() as conn:
+        conn.executemany(
+            '''INSERT INTO sessions
+               (user_id, duration_minutes, completed, started_at, completed_at, xp_earned)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            rows
+        )
+    RollupRepository.rebuild()
+
+
+def legacy_statistics(user_id: int) -> dict:
+    """集計を SQL に移す前の Python 側での計算結果"""
+    stats = Statistics(user_id=user_id)
+    stats.update_from_sessions(SessionRepository.get_by_user(user_id))
+    
+    weekly = SessionRepository.get_weekly_sessions(user_id)
+    stats.weekly_sessions = len(weekly)
+    stats.weekly_completed = sum(1 for s in weekly if s.completed)
+    stats.weekly_focus_minutes = sum(s.duration_minutes for s in weekly if s.completed)
+    
+    monthly = SessionRepository.get_monthly_sessions(user_id)
+    stats.monthly_sessions = len(monthly)
+    stats.monthly_completed = sum(1 for s in monthly if s.completed)
+    stats.monthly_focus_minutes = sum(s.duration_minutes for s in monthly if s.completed)
+    return stats.to_dict()
+
+
+def test_sql_aggregation_matches_python_aggregation(db_path):
+    """SQL 集計の結果が従来の Python 集計と一致することをテスト"""
+    seed_sessions()
+    
+    assert StatisticsService().get_user_statistics(1) == legacy_statistics(1)
+
+
+def test_daily_activity_matches_session_walk(db_path):
+    """ロールアップからの日別集計が全セッションの走査結果と一致することをテスト"""
+    seed_sessions()
+    
+    expected = {}
+    for session in SessionRepository.get_by_user(1):
+        if session.completed and session.completed_at:
+            day = expected.setdefault(session.completed_at[:10], [0, 0])
+            day[0] += 1
+            day[1] += session.duration_minutes
+    
+    activity = StatisticsService().get_daily_activity(1, days=60)
+    
+    assert len(activity) == 60
+    for entry in activity:
+        completed, focus_minutes = expected.get(entry['date'], (0, 0))
+        assert entry['completed'] == completed
+        assert entry['focus_minutes'] == focus_minutes
+
+
+def test_sql_aggregation_without_sessions(db_path):
+    """セッションがない場合にすべて0になることをテスト"""
+    stats = StatisticsService().get_user_statistics(1)
+    
+    assert stats == Statistics(user_id=1).to_dict()
+
+
+def test_activity_series_match_session_walk(db_path):
+    """週別・年別・曜日×時間帯の集計が全セッションの走査結果と一致することをテスト"""
+    seed_sessions()
+    days = 40
+    since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+    
+    weekly, yearly = {}, {}
+    hour_weekday = [[0] * 24 for _ in range(7)]
+    for session in SessionRepository.get_by_user(1):
+        if not session.completed or session.completed_at[:10] < since:
+            continue
+        completed_at = datetime.fromisoformat(session.completed_at)
+        week_start = (completed_at.date() - timedelta(days=completed_at.weekday())).isoformat()
+        weekly[week_start] = weekly.get(week_start, 0) + 1
+        yearly[completed_at.year] = yearly.get(completed_at.year, 0) + 1
+        hour_weekday[completed_at.weekday()][completed_at.hour] += 1
+    
+    activity = StatisticsService().get_activity(1, days)
+    
+    assert activity['days'] == days
+    assert activity['daily'] == StatisticsService().get_daily_activity(1, days)
+    assert {w['week_start']: w['completed'] for w in activity['weekly'] if w['completed']} == weekly
+    assert sum(w['days'] for w in activity['weekly']) == days
+    assert {y['year']: y['completed'] for y in activity['yearly'] if y['completed']} == yearly
+    assert activity['hour_weekday']['completed'] == hour_weekday
+
+
+def test_activity_heatmap_levels(db_path):
+    """ヒートマップの濃淡が最大完了数に対する割合で決まることをテスト"""
+    seed_sessions()
+    
+    heatmap = StatisticsService().get_activity(1, 30)['heatmap']
+    
+    assert len(heatmap['cells']) == 30
+    assert heatmap['max_completed'] == max(c['completed'] for c in heatmap['cells'])
+    for cell in heatmap['cells']:
+        assert (cell['level'] == 0) == (cell['completed'] == 0)
+        assert 0 <= cell['level'] <= heatmap['levels']
+        if cell['completed'] == heatmap['max_completed']:
+            assert cell['level'] == heatmap['levels']
+
+
+def test_activity_without_sessions(db_path):
+    """セッションがない場合のアクティビティ集計のテスト"""
+    activity = StatisticsService().get_activity(1, 7)
+    
+    assert [d['completed'] for d in activity['daily']] == [0] * 7
+    assert activity['heatmap']['max_completed'] == 0
+    assert activity['hour_weekday']['completed'] == [[0] * 24 for _ in range(7)]
+
+
+def completed_by_week(user_id: int = 1) -> dict:
+    """全セッションを走査して ISO 週ごとの完了数を数える"""
+    counts = {}
+    for session in SessionRepository.get_by_user(user_id):
+        if session.completed:
+            week = str(IsoWeek.of(datetime.fromisoformat(session.completed_at).date()))
+            counts[week] = counts.get(week, 0) + 1
+    return counts
+
+
+def test_weekly_comparison_uses_iso_weeks(db_path):
+    """今週・先週の比較が ISO 週の境界で集計されることをテスト"""
+    seed_sessions()
+    expected = completed_by_week()
+    this_week = IsoWeek.current()
+    
+    comparison = StatisticsService().get_weekly_comparison(1)
+    
+    assert comparison['this_week']['week'] == str(this_week)
+    assert comparison['this_week']['start'] == this_week.start.isoformat()
+    assert comparison['last_week']['week'] == str(this_week.previous())
+    assert comparison['this_week']['completed'] == expected.get(str(this_week), 0)
+    assert comparison['last_week']['completed'] == expected.get(str(this_week.previous()), 0)
+    assert comparison['last_week']['closed'] is True
+    assert comparison['this_week']['closed'] is False
+    assert comparison['change']['completed'] == \
+        comparison['this_week']['completed'] - comparison['last_week']['completed']
+
+
+def test_weekly_trend_matches_session_walk(db_path):
+    """週別推移が全セッションの走査結果と一致することをテスト"""
+    seed_sessions()
+    expected = completed_by_week()
+    
+    trend = StatisticsService().get_weekly_trend(1, weeks=10)
+    
+    assert len(trend) == 10
+    assert trend[-1]['week'] == str(IsoWeek.current())
+    assert [IsoWeek.parse(w['week']) for w in trend] == \
+        sorted(IsoWeek.parse(w['week']) for w in trend)
+    for bucket in trend:
+        assert bucket['completed'] == expected.get(bucket['week'], 0)
+
+
+def test_closed_weeks_are_read_once(db_path):
+    """終了した週は2回目以降DBから読まず、今週だけを読み込むことをテスト"""
+    seed_sessions()
+    service = StatisticsService()
+    first = service.get_weekly_trend(1, weeks=8)
+    
+    statements = []
+    with get_db() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            second = service.get_weekly_trend(1, weeks=8)
+        finally:
+            conn.set_trace_callback(None)
+    
+    assert second == first
+    assert len(statements) == 1
+    assert IsoWeek.current().start.isoformat() in statements[0]
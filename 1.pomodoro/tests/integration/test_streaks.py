@@ -0,0 +1,131 @@
+"""Integration tests for the calendar-day streak engine."""
+
+import random
+from datetime import date, datetime, timedelta
+import pytest
+import repositories.database as db_module
+import services.pomodoro_service as pomodoro_module
+from models.streak import streaks_from_days
+from models.user import User
+from models.week import local_today
+from repositories.database import get_db
+from repositories.user_repository import UserRepository
+from services.gamification_service import GamificationService
+from services.pomodoro_service import PomodoroService
+from services.replay_service import ReplayService
+
+
+def complete_on(service: PomodoroService, monkeypatch, user_id: int, day: str) -> dict:
+    """指定した日の 09:00 に開始・完了したセッションを記録"""
+    monkeypatch.setattr(pomodoro_module, 'local_now',
+                        lambda: datetime.fromisoformat(day + 'T09:00:00'))
+    session = service.start_session(user_id, 25)
+    return service.complete_session(session.id)
+
+
+def test_gap_resets_streak_and_defers_badge(db_path, monkeypatch):
+    """間の空いた日ではストリークが途切れ、連続3日で初めて streak_3 を授与する"""
+    service = PomodoroService()
+    for day in ('2024-01-01', '2024-01-02', '2024-01-04'):
+        result = complete_on(service, monkeypatch, 1, day)
+        assert 'streak_3' not in [badge.id for badge in result['new_badges']]
+    
+    user = UserRepository.get_by_id(1)
+    assert (user.current_streak, user.longest_streak) == (1, 2)
+    
+    complete_on(service, monkeypatch, 1, '2024-01-05')
+    result = complete_on(service, monkeypatch, 1, '2024-01-06')
+    assert [badge.id for badge in result['new_badges']] == ['streak_3']
+    assert ReplayService().verify() == []
+
+
+def test_add_progress_matches_model(db_path):
+    """SQL の差分更新がモデルの規則と同じストリークを返す"""
+    rng = random.Random(19)
+    user = UserRepository.create(User(username='streaker'))
+    expected = User()
+    day = date(2024, 1, 1)
+    for _ in range(200):
+        day += timedelta(days=rng.choice((0, 1, 1, 1, 2, 5)))
+        # 遅れて届いた過去の日付も混ぜる
+        reported = (day - timedelta(days=rng.choice((0, 0, 0, 0, 3)))).isoformat()
+        expected.update_streak(reported)
+        actual = UserRepository.add_progress(user.id, 0, reported)
+        assert (actual.current_streak, actual.longest_streak, actual.last_session_date) == (
+            expected.current_streak, expected.longest_streak, expected.last_session_date
+        )
+
+
+def test_recompute_streaks_from_completed_days(db_path, monkeypatch):
+    """一括再計算が完了日から正しい値を求め、変化のあったユーザーだけを更新する"""
+    service = PomodoroService()
+    UserRepository.create(User(username='second'))
+    UserRepository.create(User(username='idle'))
+    days = {
+        1: ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-07', '2024-01-08'],
+        2: ['2024-02-28', '2024-02-29', '2024-03-01'],
+    }
+    for user_id, user_days in days.items():
+        for day in user_days:
+            complete_on(service, monkeypatch, user_id, day)
+    # 開始だけの日はストリークに数えない
+    monkeypatch.setattr(pomodoro_module, 'local_now', lambda: datetime(2024, 3, 2, 9))
+    service.start_session(2, 25)
+    
+    with get_db() as conn:
+        conn.execute('UPDATE users SET current_streak = 9, longest_streak = 9')
+    
+    # 完了日のないユーザーは初期状態に戻す
+    gamification = GamificationService()
+    assert gamification.recompute_streaks() == 3
+    assert UserRepository.get_by_username('idle').longest_streak == 0
+    for user_id, user_days in days.items():
+        user = UserRepository.get_by_id(user_id)
+        assert (user.current_streak, user.longest_streak, user.last_session_date) == (
+            streaks_from_days(user_days, local_today())
+        )
+    assert gamification.recompute_streaks() == 0
+    assert ReplayService().verify() == []
+
+
+def test_recompute_reports_broken_streaks_as_zero(db_path, monkeypatch):
+    """昨日まで続くストリークは残し、それより前に途切れたストリークは 0 にすることをテスト"""
+    service = PomodoroService()
+    UserRepository.create(User(username='lapsed'))
+    today = local_today()
+    for user_id, last in ((1, today - timedelta(days=1)), (2, today - timedelta(days=2))):
+        for offset in (2, 1, 0):
+            complete_on(service, monkeypatch, user_id, (last - timedelta(days=offset)).isoformat())
+    
+    gamification = GamificationService()
+    assert gamification.recompute_streaks() == 1
+    user = UserRepository.get_by_id(2)
+    assert (user.current_streak, user.longest_streak) == (0, 3)
+    assert user.last_session_date == (today - timedelta(days=2)).isoformat()
+    assert [gamification.get_user_profile(user_id)['current_streak'] for user_id in (1, 2)] == [3, 0]
+    assert ReplayService().verify() == []
+    
+    # 途切れた後の完了は1日目から数え直す
+    result = complete_on(service, monkeypatch, 2, today.isoformat())
+    assert (result['user']['current_streak'], result['user']['longest_streak']) == (1, 3)
+
+
+def test_migration_recomputes_streaks(db_path):
+    """マイグレーションが古い規則のストリークとスナップショットを作り直すことをテスト"""
+    with get_db() as conn:
+        conn.executemany(
+            'INSERT INTO daily_rollup (user_id, day, completed_sessions) VALUES (1, ?, 1)',
+            [('2024-01-01',), ('2024-01-03',), ('2024-01-04',)]
+        )
+        conn.execute(
+            '''UPDATE users SET current_streak = 3, longest_streak = 3,
+                   last_session_date = '2024-01-04' WHERE id = 1'''
+        )
+        conn.execute("INSERT INTO user_snapshots (user_id, seq, state) VALUES (1, 1, '{}')")
+        conn.execute('PRAGMA user_version = 7')
+    db_module.init_db()
+    
+    user = UserRepository.get_by_id(1)
+    assert (user.current_streak, user.longest_streak) == (2, 2)
+    with get_db() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM user_snapshots').fetchone()[0] == 0
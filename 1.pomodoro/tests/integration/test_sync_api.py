@@ -0,0 +1,176 @@
+"""Integration tests for the batched /api/sync endpoint."""
+
+from datetime import datetime, time, timedelta
+import pytest
+from models.sync_event import MAX_SYNC_AGE_DAYS
+from models.week import IsoWeek, get_timezone, local_today
+from routes.api import pomodoro_service
+from services.write_behind import configure_write_behind
+
+
+def at(*args) -> int:
+    """設定したタイムゾーンの時刻を UNIX 時刻（ミリ秒）に変換"""
+    return int(datetime(*args, tzinfo=get_timezone()).timestamp() * 1000)
+
+
+def yesterday() -> tuple:
+    """昨日の (年, 月, 日)"""
+    day = local_today() - timedelta(days=1)
+    return day.year, day.month, day.day
+
+
+def offline_batch() -> list:
+    """昨日オフライン中に記録した2セッション分の開始・完了"""
+    day = yesterday()
+    return [
+        {'key': 'a-start', 'type': 'start', 'duration': 25, 'at': at(*day, 10, 0)},
+        {'key': 'a-done', 'type': 'complete', 'start_key': 'a-start', 'at': at(*day, 10, 25)},
+        {'key': 'b-start', 'type': 'start', 'duration': 15, 'at': at(*day, 10, 30)},
+        {'key': 'b-done', 'type': 'complete', 'start_key': 'b-start', 'at': at(*day, 10, 45)},
+    ]
+
+
+def test_batch_is_applied_once(client):
+    """バッチを1回で適用し、再送しても二重に適用しないことをテスト"""
+    data = client.post('/api/sync', json={'events': offline_batch()}).get_json()
+    assert data['success']
+    assert [result['status'] for result in data['results']] == ['applied'] * 4
+    assert data['xp_earned'] == 80
+    assert data['user']['xp'] == 80
+    
+    day = (local_today() - timedelta(days=1)).isoformat()
+    sessions = client.get('/api/session/history').get_json()['sessions']
+    assert [(s['started_at'], s['completed_at'], s['xp_earned']) for s in sessions] == [
+        (f'{day}T10:30:00', f'{day}T10:45:00', 30),
+        (f'{day}T10:00:00', f'{day}T10:25:00', 50),
+    ]
+    
+    # 応答が届かずにクライアントが同じバッチを再送した場合
+    retry = client.post('/api/sync', json={'events': offline_batch()}).get_json()
+    assert [result['status'] for result in retry['results']] == ['duplicate'] * 4
+    assert [result['session_id'] for result in retry['results']] == [
+        result['session_id'] for result in data['results']
+    ]
+    assert (retry['xp_earned'], retry['new_badges'], retry['user']['xp']) == (0, [], 80)
+    assert len(client.get('/api/session/history').get_json()['sessions']) == 2
+
+
+def test_complete_targets_and_rejections(client):
+    """サーバーのセッションIDでの完了と、開始が届いていない完了の扱いをテスト"""
+    session_id = client.post('/api/session/start', json={'duration': 25}).get_json()['session']['id']
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'online-done', 'type': 'complete', 'session_id': session_id},
+        {'key': 'orphan-done', 'type': 'complete', 'start_key': 'late-start'},
+    ]}).get_json()
+    assert [result['status'] for result in data['results']] == ['applied', 'rejected']
+    assert data['xp_earned'] == 50
+    
+    # 開始イベントが届いた後は、拒否された完了を再送すれば適用できる
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'late-start', 'type': 'start', 'duration': 25},
+        {'key': 'orphan-done', 'type': 'complete', 'start_key': 'late-start'},
+    ]}).get_json()
+    assert [result['status'] for result in data['results']] == ['applied', 'applied']
+    assert data['user']['xp'] == 100
+
+
+def test_invalid_batches_are_rejected(client):
+    """イベント列そのものが不正なバッチは何も適用せずに 400 を返すことをテスト"""
+    invalid = [
+        {},
+        {'events': {'key': 'x'}},
+        {'events': [{'key': 'x', 'type': 'start'}] * 101},
+    ]
+    for payload in invalid + ['x', [{'key': 'x', 'type': 'start'}], 3]:
+        response = client.post('/api/sync', json=payload)
+        assert response.status_code == 400, payload
+    assert client.get('/api/session/history').get_json()['sessions'] == []
+
+
+def test_invalid_events_do_not_block_the_batch(client):
+    """不正なイベントだけが rejected になり、同じバッチの他のイベントは適用されることをテスト"""
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'bad-type', 'type': 'pause'},
+        {'key': 'ok-start', 'type': 'start', 'duration': 25},
+        {'key': 'bad-duration', 'type': 'start', 'duration': 0},
+        {'key': 'bad-time', 'type': 'start', 'at': 'yesterday'},
+        {'key': 'no-target', 'type': 'complete'},
+        {'key': 'ok-done', 'type': 'complete', 'start_key': 'ok-start'},
+    ]}).get_json()
+    
+    assert [(r['key'], r['status']) for r in data['results']] == [
+        ('bad-type', 'rejected'), ('ok-start', 'applied'), ('bad-duration', 'rejected'),
+        ('bad-time', 'rejected'), ('no-target', 'rejected'), ('ok-done', 'applied'),
+    ]
+    assert data['results'][2]['error'] == 'Invalid duration'
+    assert data['user']['xp'] == 50
+
+
+def test_completion_time_must_follow_the_start(client):
+    """開始より前の時刻の完了と、MAX_SYNC_AGE_DAYS 日より前のイベントを拒否することをテスト"""
+    day = yesterday()
+    old = local_today() - timedelta(days=MAX_SYNC_AGE_DAYS + 1)
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'start', 'type': 'start', 'duration': 25, 'at': at(*day, 10, 0)},
+        {'key': 'early-done', 'type': 'complete', 'start_key': 'start', 'at': at(*day, 9, 59)},
+        {'key': 'epoch', 'type': 'start', 'duration': 25, 'at': 0},
+        {'key': 'old', 'type': 'start', 'duration': 25, 'at': at(old.year, old.month, old.day, 10)},
+    ]}).get_json()
+    
+    assert [(r['key'], r['status']) for r in data['results']] == [
+        ('start', 'applied'), ('early-done', 'rejected'), ('epoch', 'rejected'), ('old', 'rejected'),
+    ]
+    assert data['results'][1]['error'] == 'Completion is earlier than the start'
+    assert data['results'][2]['error'] == 'Event time is too old'
+    assert data['user']['xp'] == 0
+    assert client.get('/api/session/history').get_json()['sessions'][0]['completed'] is False
+
+
+def test_sync_into_a_closed_week_refreshes_weekly_statistics(client):
+    """終了した週に届いたオフラインの記録が、キャッシュ済みの週別集計に反映されることをテスト"""
+    last_week = IsoWeek.current().previous()
+    comparison = client.get('/api/statistics/weekly-comparison').get_json()['comparison']
+    assert comparison['last_week']['completed'] == 0
+    client.get('/api/statistics/weekly-trend')
+    
+    started = datetime.combine(last_week.start, time(10))
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'late-start', 'type': 'start', 'duration': 25, 'at': at(*started.timetuple()[:5])},
+        {'key': 'late-done', 'type': 'complete', 'start_key': 'late-start',
+         'at': at(*(started + timedelta(minutes=25)).timetuple()[:5])},
+    ]}).get_json()
+    assert [result['status'] for result in data['results']] == ['applied', 'applied']
+    
+    comparison = client.get('/api/statistics/weekly-comparison').get_json()['comparison']
+    assert comparison['last_week']['completed'] == 1
+    trend = client.get('/api/statistics/weekly-trend').get_json()['weeks']
+    assert [w['completed'] for w in trend if w['week'] == str(last_week)] == [1]
+
+
+def test_synced_start_registers_server_timer(client):
+    """同期した開始イベントがサーバー側のタイマーに反映されることをテスト"""
+    data = client.post('/api/sync', json={'events': [
+        {'key': 'now-start', 'type': 'start', 'duration': 25}
+    ]}).get_json()
+    session_id = data['results'][0]['session_id']
+    timer = client.get('/api/timer').get_json()['timer']
+    assert (timer['session_id'], timer['state']) == (session_id, 'running')
+    
+    client.post('/api/sync', json={'events': [
+        {'key': 'now-done', 'type': 'complete', 'start_key': 'now-start'}
+    ]})
+    assert client.get('/api/timer').get_json()['timer'] is None
+
+
+def test_sync_in_write_behind_mode(client):
+    """write-behind モードでもバッチを1回だけ適用することをテスト"""
+    configure_write_behind(pomodoro_service.apply_event)
+    data = client.post('/api/sync', json={'events': offline_batch()}).get_json()
+    assert [result['status'] for result in data['results']] == ['applied'] * 4
+    retry = client.post('/api/sync', json={'events': offline_batch()}).get_json()
+    assert [result['status'] for result in retry['results']] == ['duplicate'] * 4
+    
+    # 同期後に開始したセッションのIDは、同期で採番したIDと重ならない
+    session = client.post('/api/session/start', json={'duration': 25}).get_json()['session']
+    assert session['id'] > max(result['session_id'] for result in data['results'])
+    assert client.get('/api/gamification/profile').get_json()['profile']['xp'] == 80
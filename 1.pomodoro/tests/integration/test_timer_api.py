@@ -0,0 +1,87 @@
+"""Integration tests for the server-side timer endpoints."""
+
+from datetime import datetime
+import pytest
+import services.pomodoro_service as pomodoro_module
+import services.timer_registry as timer_module
+from routes.api import pomodoro_service
+from services.timer_registry import configure_timer_registry
+
+
+class FakeClock:
+    """テスト用の時計"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    """時計を差し替えたサーバー側のタイマー"""
+    return FakeClock()
+
+
+@pytest.fixture
+def client(client, clock):
+    """時計を差し替えたサーバー側のタイマーを設定したFlaskクライアント"""
+    configure_timer_registry(pomodoro_service.complete_timer, grace=5, clock=clock)
+    return client
+
+
+def start(client) -> int:
+    """25分のセッションを開始"""
+    return client.post('/api/session/start', json={'duration': 25}).get_json()['session']['id']
+
+
+def test_timer_state_follows_pause_resume_and_cancel(client, clock):
+    """開始・一時停止・再開・中止がタイマーの状態に反映されることをテスト"""
+    assert client.get('/api/timer').get_json()['timer'] is None
+    session_id = start(client)
+    
+    clock.now += 60
+    timer = client.get('/api/timer').get_json()['timer']
+    assert (timer['session_id'], timer['state'], timer['remaining_seconds']) == (
+        session_id, 'running', 24 * 60
+    )
+    
+    timer = client.post(f'/api/session/{session_id}/pause').get_json()['timer']
+    assert (timer['state'], timer['ends_at']) == ('paused', None)
+    clock.now += 300
+    timer = client.post(f'/api/session/{session_id}/resume').get_json()['timer']
+    assert (timer['state'], timer['remaining_seconds']) == ('running', 24 * 60)
+    
+    assert client.post(f'/api/session/{session_id + 1}/pause').status_code == 404
+    assert client.post(f'/api/session/{session_id}/cancel').get_json()['success']
+    assert client.get('/api/timer').get_json()['timer'] is None
+    assert client.post(f'/api/session/{session_id}/resume').status_code == 404
+
+
+def test_completion_removes_timer(client):
+    """クライアントが完了したセッションのタイマーは自動完了しないことをテスト"""
+    session_id = start(client)
+    client.post(f'/api/session/{session_id}/complete')
+    assert client.get('/api/timer').get_json()['timer'] is None
+    assert client.get('/api/timer/stats').get_json()['timers']['active'] == 0
+
+
+def test_abandoned_timer_is_completed_at_its_deadline(client, clock, monkeypatch):
+    """クライアントが完了しなかったセッションを終了時刻で自動完了することをテスト"""
+    monkeypatch.setattr(pomodoro_module, 'local_now', lambda: datetime(2024, 1, 1, 9))
+    session_id = start(client)
+    
+    clock.now += 25 * 60 + 5
+    monkeypatch.setattr(pomodoro_module, 'local_now', lambda: datetime(2024, 1, 1, 9, 25, 5))
+    completed = timer_module.get_timer_registry().reap()
+    assert [timer.session_id for timer in completed] == [session_id]
+    
+    history = client.get('/api/session/history').get_json()['sessions']
+    assert history[0]['completed']
+    assert history[0]['completed_at'] == '2024-01-01T09:25:00'
+    assert client.get('/api/gamification/profile').get_json()['profile']['xp'] == 50
+    
+    # 後から届いたクライアントの完了はXPを加算しない
+    result = client.post(f'/api/session/{session_id}/complete').get_json()
+    assert result['already_completed']
@@ -0,0 +1,194 @@
+"""Integration tests for the write-behind session event queue."""
+
+import json
+import os
+import sqlite3
+import pytest
+import services.write_behind as write_behind_module
+import repositories.database as db_module
+from routes.api import pomodoro_service
+from repositories.session_repository import SessionRepository
+from repositories.user_repository import UserRepository
+from repositories.write_behind_repository import WriteBehindRepository
+from services.write_behind import (
+    configure_write_behind, close_write_behind, get_write_queue, WriteBehindUnavailable
+)
+
+
+@pytest.fixture
+def log_path(db_path):
+    """テスト用のDBのイベントログを作成"""
+    path = db_path + '-events.log'
+    
+    yield path
+    
+    close_write_behind()
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+@pytest.fixture
+def client(client):
+    """write-behind モードのFlaskクライアントを作成"""
+    configure_write_behind(pomodoro_service.apply_event, db_module.DB_PATH + '-events.log')
+    return client
+
+
+def write_log(path: str, events: list, torn: str = '') -> None:
+    """コミット前にクラッシュした状態のイベントログを作成"""
+    with open(path, 'w', encoding='utf-8') as log:
+        for event in events:
+            log.write(json.dumps(event) + '\n')
+        log.write(torn)
+
+
+def test_start_returns_id_and_history_reads_own_writes(client):
+    """開始APIがコミット前にIDを返し、直後の履歴にそのセッションが含まれることをテスト"""
+    ids = [
+        client.post('/api/session/start', json={'duration': 25}).get_json()['session']['id']
+        for _ in range(3)
+    ]
+    assert ids == sorted(ids) and len(set(ids)) == 3
+    
+    data = client.get('/api/session/history?limit=10').get_json()
+    assert [s['id'] for s in data['sessions']] == ids[::-1]
+
+
+def test_complete_waits_for_commit(client):
+    """完了APIがコミット後のXP・ユーザー情報を返すことをテスト"""
+    session_id = client.post('/api/session/start', json={}).get_json()['session']['id']
+    
+    data = client.post(f'/api/session/{session_id}/complete').get_json()
+    assert data['success'] is True
+    assert data['xp_earned'] == 50
+    assert data['user']['xp'] == 50
+    assert data['new_badges'] == []
+    
+    response = client.post('/api/session/99999/complete')
+    assert response.status_code == 404
+
+
+def test_events_are_group_committed(client):
+    """複数のイベントがまとめてコミットされることをテスト"""
+    queue = get_write_queue()
+    for _ in range(50):
+        pomodoro_service.start_session(1, 25)
+    assert queue.flush(timeout=5)
+    
+    assert len(SessionRepository.get_by_user(1)) == 50
+    assert queue.committed == 50
+    assert queue.batches < 50
+    assert WriteBehindRepository.get_applied_seq() == 50
+    # すべて反映済みになったらログは空になる
+    assert os.path.getsize(queue.log_path) == 0
+
+
+def test_close_flushes_pending_events(log_path):
+    """停止時にキューに残ったイベントがコミットされることをテスト"""
+    # 書き込みスレッドが待っている間に停止する
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path, delay=10)
+    session = pomodoro_service.start_session(1, 25)
+    close_write_behind()
+    
+    assert queue.pending_count == 0
+    assert SessionRepository.get_by_id(session.id) is not None
+
+
+def test_replay_applies_unapplied_events_once(log_path):
+    """起動時に未反映のイベントだけが再生されることをテスト"""
+    write_log(log_path, [
+        {'seq': 1, 'type': 'start', 'user_id': 1, 'session_id': 1,
+         'duration_minutes': 25, 'started_at': '2024-01-01T09:00:00'},
+        {'seq': 2, 'type': 'complete', 'user_id': 1, 'session_id': 1,
+         'completed_at': '2024-01-01T09:25:00'},
+    ], torn='{"seq": 3, "type": "sta')
+    
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path)
+    assert queue.replayed == 2
+    
+    session = SessionRepository.get_by_id(1)
+    assert session.completed and session.completed_at == '2024-01-01T09:25:00'
+    user = UserRepository.get_by_id(1)
+    assert user.xp == 50 and user.last_session_date == '2024-01-01'
+    # 再生後のIDと番号は再生済みの値の続きから採番する
+    assert pomodoro_service.start_session(1, 25).id == 2
+    close_write_behind()
+    
+    # 反映済みのイベントは再度起動しても二重に適用しない
+    write_log(log_path, [
+        {'seq': 2, 'type': 'complete', 'user_id': 1, 'session_id': 1,
+         'completed_at': '2024-01-01T09:25:00'},
+    ])
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path)
+    assert queue.replayed == 0
+    assert UserRepository.get_by_id(1).xp == 50
+    assert len(SessionRepository.get_by_user(1)) == 2
+
+
+def test_failed_event_does_not_abort_batch(log_path):
+    """失敗したイベントだけが取り消され、同じバッチの他のイベントは反映されることをテスト"""
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path, delay=10)
+    unknown = queue.submit('unknown', 1)
+    session = pomodoro_service.start_session(1, 25)
+    close_write_behind()
+    
+    with pytest.raises(ValueError):
+        unknown.result()
+    assert SessionRepository.get_by_id(session.id) is not None
+
+
+def fail_commits(monkeypatch, queue, failures: int) -> list:
+    """最初の failures 回のバッチのコミットをロックエラーで失敗させ、試みたバッチを返す"""
+    attempts = []
+    apply_batch = queue._apply_batch
+    
+    def flaky(events):
+        attempts.append([event['seq'] for event in events])
+        if len(attempts) <= failures:
+            raise sqlite3.OperationalError('database is locked')
+        return apply_batch(events)
+    
+    monkeypatch.setattr(queue, '_apply_batch', flaky)
+    monkeypatch.setattr(write_behind_module.time, 'sleep', lambda seconds: None)
+    return attempts
+
+
+def test_failed_batch_is_retried_before_later_events(log_path, monkeypatch):
+    """コミットできないバッチを飛ばさず、反映するまで新しいイベントを受け付けないことをテスト"""
+    monkeypatch.setattr(write_behind_module, 'STALLED_RETRY_INTERVAL', 0.05)
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path)
+    attempts = fail_commits(monkeypatch, queue, write_behind_module.MAX_COMMIT_ATTEMPTS)
+    
+    session = pomodoro_service.start_session(1, 25)
+    assert queue.wait_for_user(1) is False and queue.stalled
+    with pytest.raises(WriteBehindUnavailable):
+        pomodoro_service.start_session(1, 25)
+    
+    assert queue.flush(5)
+    assert not queue.stalled
+    assert SessionRepository.get_by_id(session.id) is not None
+    assert WriteBehindRepository.get_applied_seq() == 1
+    assert attempts[-1] == [1]
+    assert pomodoro_service.start_session(1, 25).id == session.id + 1
+
+
+def test_unapplied_batch_is_replayed_after_shutdown(log_path, monkeypatch):
+    """コミットできないまま終了したイベントがログに残り、次回起動時に再生されることをテスト"""
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path)
+    fail_commits(monkeypatch, queue, 10 ** 6)
+    session = pomodoro_service.start_session(1, 25)
+    close_write_behind()
+    assert SessionRepository.get_by_id(session.id) is None
+    
+    queue = configure_write_behind(pomodoro_service.apply_event, log_path)
+    assert queue.replayed == 1
+    assert SessionRepository.get_by_id(session.id) is not None
+
+
+def test_stalled_queue_returns_503(client, monkeypatch):
+    """書き込みを受け付けられない間は 503 を返すことをテスト"""
+    monkeypatch.setattr(get_write_queue(), '_error', sqlite3.OperationalError('disk I/O error'))
+    
+    response = client.post('/api/session/start', json={'duration': 25})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
@@ -1,7 +1,7 @@
 """Unit tests for Badge models."""
 
 import pytest
-from models.badge import Badge, UserBadge, PREDEFINED_BADGES
+from models.badge import Badge, UserBadge, PREDEFINED_BADGES, BADGE_METRICS, BADGE_OPERATORS
 
 
 def test_badge_creation():
@@ -57,6 +57,18 @@ def test_predefined_badges_exist():
     assert "total_50" in badge_ids
 
 
+def test_bundled_badges_match_previous_definitions():
+    """同梱の定義ファイルが従来の定義済みバッジと同じ6種類であることをテスト"""
+    assert [(b.id, b.criteria_type, b.criteria_value) for b in PREDEFINED_BADGES] == [
+        ("streak_3", "streak", 3),
+        ("streak_7", "streak", 7),
+        ("weekly_10", "weekly_count", 10),
+        ("weekly_20", "weekly_count", 20),
+        ("total_50", "total_count", 50),
+        ("total_100", "total_count", 100),
+    ]
+
+
 def test_predefined_badges_structure():
     """定義済みバッジの構造をテスト"""
     for badge in PREDEFINED_BADGES:
@@ -64,5 +76,6 @@ def test_predefined_badges_structure():
         assert badge.name is not None
         assert badge.description is not None
         assert badge.icon is not None
-        assert badge.criteria_type in ["streak", "weekly_count", "monthly_count", "total_count"]
+        assert badge.criteria_type in BADGE_METRICS
+        assert badge.criteria_op in BADGE_OPERATORS
         assert badge.criteria_value > 0
@@ -0,0 +1,80 @@
+"""Unit tests for the compiled badge rule set and badge definition files."""
+
+import json
+import pytest
+from models.badge import Badge, load_badges
+from models.badge_rules import BadgeRuleSet
+
+
+def badge(badge_id: str, metric: str, value: int, op: str = '>=') -> Badge:
+    """判定用のバッジを作成"""
+    return Badge(id=badge_id, name=badge_id, description='', icon='',
+                 criteria_type=metric, criteria_value=value, criteria_op=op)
+
+
+RULES = BadgeRuleSet([
+    badge('total_10', 'total_count', 10),
+    badge('streak_3', 'streak', 3),
+    badge('total_5', 'total_count', 5),
+    badge('early_bird', 'hour', 7, '<'),
+    badge('night_owl', 'hour', 22, '>='),
+    badge('focus_over_100', 'focus_minutes', 100, '>'),
+    badge('lucky_7', 'total_count', 7, '=='),
+])
+
+
+def test_evaluate_returns_met_badges_in_definition_order():
+    """条件を満たすバッジだけが定義順に返ることをテスト"""
+    metrics = {'total_count': 10, 'streak': 3, 'hour': 6, 'focus_minutes': 100}
+    met = RULES.evaluate(metrics, set())
+    
+    assert [b.id for b in met] == ['total_10', 'streak_3', 'total_5', 'early_bird']
+
+
+def test_evaluate_matches_each_badge_predicate():
+    """索引による判定が各バッジの条件（is_met）と一致することをテスト"""
+    for total in range(12):
+        for hour in (0, 6, 7, 21, 22, 23):
+            metrics = {'total_count': total, 'hour': hour, 'focus_minutes': total * 20}
+            expected = [b.id for b in RULES.badges if b.is_met(metrics)]
+            assert [b.id for b in RULES.evaluate(metrics, set())] == expected
+
+
+def test_only_unearned_badges_are_evaluated():
+    """取得済みのバッジは返さず、判定に必要な指標も求めないことをテスト"""
+    earned = {'total_10', 'total_5', 'lucky_7', 'streak_3'}
+    assert RULES.evaluate({'total_count': 50, 'streak': 9}, earned) == []
+    assert RULES.metrics_for(earned) == {'hour', 'focus_minutes'}
+    assert RULES.metrics_for({b.id for b in RULES.badges}) == set()
+
+
+def test_missing_metric_does_not_meet_criteria():
+    """指標が渡されなければ条件を満たさないことをテスト（上限の条件も含む）"""
+    assert RULES.evaluate({'streak': 1}, set()) == []
+
+
+def test_invalid_definitions_are_rejected():
+    """重複したIDや未知の指標・演算子を拒否することをテスト"""
+    with pytest.raises(ValueError):
+        BadgeRuleSet([badge('a', 'streak', 1), badge('a', 'streak', 2)])
+    with pytest.raises(ValueError):
+        Badge.from_config({'id': 'x', 'name': 'x', 'criteria_type': 'mood', 'criteria_value': 1})
+    with pytest.raises(ValueError):
+        Badge.from_config({'id': 'x', 'name': 'x', 'criteria_type': 'streak',
+                           'criteria_value': 1, 'criteria_op': '!='})
+    with pytest.raises(ValueError):
+        Badge.from_config({'id': 'x', 'name': 'x', 'criteria_type': 'streak'})
+
+
+def test_load_badges_from_json_and_yaml(tmp_path):
+    """JSON と YAML の定義ファイルを読み込めることをテスト"""
+    entries = [{'id': 'early_bird', 'name': '早起き', 'icon': '🌅',
+                'criteria_type': 'hour', 'criteria_value': 7, 'criteria_op': '<'}]
+    json_path = tmp_path / 'badges.json'
+    json_path.write_text(json.dumps({'badges': entries}), encoding='utf-8')
+    assert load_badges(str(json_path)) == [Badge.from_config(entries[0])]
+    
+    yaml = pytest.importorskip('yaml')
+    yaml_path = tmp_path / 'badges.yaml'
+    yaml_path.write_text(yaml.safe_dump(entries, allow_unicode=True), encoding='utf-8')
+    assert load_badges(str(yaml_path)) == load_badges(str(json_path))
@@ -0,0 +1,135 @@
+"""Unit tests for database connection pooling."""
+
+import sqlite3
+import pytest
+import repositories.database as db_module
+from repositories.database import ConnectionPool, get_db
+
+
+def test_pool_reuses_connection(db_path):
+    """返却した接続が再利用されることをテスト"""
+    pool = ConnectionPool(db_path, size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    
+    assert pool.acquire() is conn
+    assert pool.created == 1
+
+
+def test_pool_replaces_broken_connection(db_path):
+    """壊れた接続は破棄して作り直すことをテスト"""
+    pool = ConnectionPool(db_path, size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+    
+    new_conn = pool.acquire()
+    assert new_conn is not conn
+    assert new_conn.execute('SELECT 1').fetchone()[0] == 1
+
+
+def test_pool_size_zero_disables_pooling(db_path):
+    """サイズ0ではプールせずに接続を閉じることをテスト"""
+    pool = ConnectionPool(db_path, size=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    
+    assert pool.idle_count == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+
+
+def test_closed_pool_rejects_acquire(db_path):
+    """クローズ後のプールは接続を貸し出さないことをテスト"""
+    pool = ConnectionPool(db_path, size=2)
+    pool.release(pool.acquire())
+    pool.close()
+    
+    assert pool.idle_count == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        pool.acquire()
+
+
+def test_nested_get_db_shares_transaction(db_path):
+    """ネストした get_db が同じ接続・トランザクションを共有することをテスト"""
+    with pytest.raises(RuntimeError):
+        with get_db() as outer:
+            outer.execute("INSERT INTO users (username) VALUES ('nested')")
+            with get_db() as inner:
+                assert inner is outer
+            raise RuntimeError('rollback')
+    
+    with get_db() as conn:
+        count = conn.execute(
+            "SELECT COUNT(*) FROM users WHERE username = 'nested'"
+        ).fetchone()[0]
+    assert count == 0
+
+
+def test_pool_follows_db_path_change(db_path):
+    """DB_PATH を差し替えるとプールが作り直されることをテスト"""
+    pool = db_module.get_pool()
+    assert pool.db_path == db_path
+    
+    db_module.DB_PATH = db_path + '-other'
+    try:
+        assert db_module.get_pool().db_path == db_path + '-other'
+    finally:
+        db_module.DB_PATH = db_path
+
+
+def test_pool_applies_storage_profile(db_path):
+    """接続にストレージプロファイルが適用されることをテスト"""
+    pool = ConnectionPool(db_path, size=1, profile='durable')
+    conn = pool.acquire()
+    
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 2  # FULL
+    assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+    pool.release(conn)
+    pool.close()
+
+
+def test_unknown_storage_profile_is_rejected(db_path):
+    """未定義のプロファイルはエラーになることをテスト"""
+    with pytest.raises(ValueError):
+        ConnectionPool(db_path, profile='unknown')
+
+
+def test_change_listeners_run_after_commit_only(db_path):
+    """変更通知がコミット後にのみ届くことをテスト"""
+    received = []
+    db_module.add_change_listener(received.append)
+    try:
+        with get_db():
+            db_module.notify_user_changed(1)
+            assert received == []
+        assert received == [1]
+        
+        with pytest.raises(RuntimeError):
+            with get_db():
+                db_module.notify_user_changed(2)
+                raise RuntimeError('rollback')
+        assert received == [1]
+    finally:
+        db_module._change_listeners.remove(received.append)
+
+
+def test_after_commit_callbacks_skip_rollback(db_path):
+    """コミット後の処理が最も外側のコミット後にだけ呼ばれることをテスト"""
+    called = []
+    with get_db():
+        with get_db():
+            db_module.run_after_commit(lambda: called.append('inner'))
+        assert called == []
+    assert called == ['inner']
+    
+    with pytest.raises(RuntimeError):
+        with get_db():
+            db_module.run_after_commit(lambda: called.append('rolled back'))
+            raise RuntimeError('rollback')
+    assert called == ['inner']
+    
+    # トランザクションの外ではすぐに呼ぶ
+    db_module.run_after_commit(lambda: called.append('now'))
+    assert called == ['inner', 'now']
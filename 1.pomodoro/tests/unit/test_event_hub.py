@@ -0,0 +1,80 @@
+"""Unit tests for the in-process event hub."""
+
+import threading
+from services.event_hub import EventHub, RESYNC_EVENT
+
+
+def test_publish_reaches_only_the_users_subscribers():
+    """発行したイベントが同じユーザーの購読者全員にだけ届くことをテスト"""
+    hub = EventHub()
+    first = hub.subscribe(1)
+    second = hub.subscribe(1)
+    other = hub.subscribe(2)
+    
+    assert hub.publish(1, 'progress', {'xp': 50}) == 2
+    assert hub.publish(3, 'progress', {'xp': 50}) == 0
+    
+    for subscription in (first, second):
+        event = subscription.get(0)
+        assert (event.type, event.data) == ('progress', {'xp': 50})
+    assert other.get(0) is None
+    assert hub.stats()['published'] == 1
+
+
+def test_slow_subscriber_gets_single_resync():
+    """キューが上限に達した購読者は差分を捨てて resync を1件だけ受け取ることをテスト"""
+    hub = EventHub(queue_size=3)
+    slow = hub.subscribe(1)
+    for i in range(10):
+        hub.publish(1, 'progress', {'n': i})
+    
+    # resync が送られるまでの差分は再取得で反映されるため積まない
+    assert slow.pending_count == 1
+    assert slow.get(0).type == RESYNC_EVENT
+    assert slow.dropped == 10
+    assert hub.stats()['dropped'] == 7
+    
+    hub.publish(1, 'progress', {'n': 10})
+    assert slow.get(0).data == {'n': 10}
+
+
+def test_subscriber_limit_and_unsubscribe():
+    """購読者数の上限を超えた購読は拒否し、解除すると枠が空くことをテスト"""
+    hub = EventHub(max_subscribers=1)
+    subscription = hub.subscribe(1)
+    assert hub.subscribe(2) is None
+    assert hub.stats()['rejected'] == 1
+    
+    hub.unsubscribe(subscription)
+    hub.unsubscribe(subscription)
+    assert subscription.closed
+    assert hub.subscribe(2) is not None
+    assert hub.stats()['subscribers'] == 1
+
+
+def test_close_wakes_waiting_subscriber():
+    """ハブを閉じると待機中の購読者が戻ることをテスト"""
+    hub = EventHub()
+    subscription = hub.subscribe(1)
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(subscription.get(10)))
+    waiter.start()
+    
+    hub.close()
+    waiter.join(5)
+    assert results == [None]
+    assert subscription.closed
+
+
+def test_waker_is_called_on_push_and_close():
+    """イベントが積まれたとき・閉じられたときに待機中の購読者を起こすことをテスト"""
+    hub = EventHub(queue_size=1)
+    subscription = hub.subscribe(1)
+    wakes = []
+    subscription.set_waker(lambda: wakes.append(subscription.pending_count))
+    
+    hub.publish(1, 'progress', {'xp': 50})
+    hub.publish(1, 'progress', {'xp': 100})
+    hub.unsubscribe(subscription)
+    # 2件目はキューが溢れて resync に置き換わるが、起こすことに変わりはない
+    assert wakes == [1, 1, 1]
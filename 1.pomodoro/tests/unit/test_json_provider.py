@@ -0,0 +1,90 @@
+"""Unit tests for the pluggable JSON provider."""
+
+import json
+import pytest
+from flask import Flask, jsonify
+from models.badge import PREDEFINED_BADGES, UserBadge
+from models.session import PomodoroSession
+from routes import json_provider
+from routes.json_provider import (
+    OrjsonProvider, StdlibJSONProvider, create_json_provider, encode_model
+)
+
+
+def sample_payload() -> dict:
+    """モデルを含むレスポンス"""
+    return {
+        'success': True,
+        'sessions': [
+            PomodoroSession(id=i, duration_minutes=25, completed=bool(i % 2),
+                            started_at='2024-01-01T09:00:00', xp_earned=50 * (i % 2))
+            for i in range(3)
+        ],
+        'badges': PREDEFINED_BADGES[:2],
+        'user_badge': UserBadge(id=1, badge_id='streak_3', earned_at='2024-01-01')
+    }
+
+
+def expected_payload() -> dict:
+    """to_dict() で変換した場合のレスポンス"""
+    payload = sample_payload()
+    return {
+        'success': True,
+        'sessions': [s.to_dict() for s in payload['sessions']],
+        'badges': [b.to_dict() for b in payload['badges']],
+        'user_badge': payload['user_badge'].to_dict()
+    }
+
+
+def test_encode_model_matches_to_dict():
+    """フィールドからの変換結果が to_dict() と一致することをテスト"""
+    session = PomodoroSession(id=1, completed=True, started_at='2024-01-01T09:00:00')
+    
+    assert encode_model(session) == session.to_dict()
+    assert encode_model(PREDEFINED_BADGES[0]) == PREDEFINED_BADGES[0].to_dict()
+
+
+def test_encode_model_rejects_unknown_types():
+    """dataclass 以外の未知の型は TypeError になることをテスト"""
+    with pytest.raises(TypeError):
+        encode_model(object())
+
+
+@pytest.mark.parametrize('backend', ['json', 'orjson'])
+def test_providers_write_models_like_to_dict(backend):
+    """どちらのプロバイダでもモデルが to_dict() と同じ JSON になることをテスト"""
+    if backend == 'orjson':
+        pytest.importorskip('orjson')
+    app = Flask(__name__)
+    app.json = create_json_provider(app, backend)
+    
+    @app.route('/')
+    def index():
+        return jsonify(sample_payload())
+    
+    response = app.test_client().get('/')
+    
+    assert response.mimetype == 'application/json'
+    assert json.loads(response.get_data()) == expected_payload()
+    assert json.loads(app.json.dumps(sample_payload())) == expected_payload()
+
+
+def test_create_json_provider_selects_backend():
+    """設定に応じたプロバイダが選ばれることをテスト"""
+    pytest.importorskip('orjson')
+    app = Flask(__name__)
+    
+    assert isinstance(create_json_provider(app, 'auto'), OrjsonProvider)
+    assert type(create_json_provider(app, 'json')) is StdlibJSONProvider
+    with pytest.raises(ValueError):
+        create_json_provider(app, 'yaml')
+
+
+def test_fallback_without_orjson(monkeypatch):
+    """orjson がない環境では標準ライブラリにフォールバックすることをテスト"""
+    monkeypatch.setattr(json_provider, 'orjson', None)
+    app = Flask(__name__)
+    
+    assert type(create_json_provider(app, 'auto')) is StdlibJSONProvider
+    with pytest.raises(ValueError):
+        create_json_provider(app, 'orjson')
@@ -0,0 +1,100 @@
+"""Unit tests for the per-user read cache."""
+
+import pytest
+from services.cache import ReadCache
+
+
+class FakeClock:
+    """テスト用の時計"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_hit_and_miss():
+    """2回目の取得がキャッシュから返ることをテスト"""
+    cache = ReadCache(maxsize=10, ttl=60)
+    calls = []
+    
+    def loader():
+        calls.append(1)
+        return {'xp': 50}
+    
+    assert cache.get_or_load(1, 'profile', loader) == {'xp': 50}
+    assert cache.get_or_load(1, 'profile', loader) == {'xp': 50}
+    
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_entry_expires_after_ttl():
+    """TTL を過ぎたエントリは再読み込みされることをテスト"""
+    clock = FakeClock()
+    cache = ReadCache(maxsize=10, ttl=30, clock=clock)
+    values = iter([1, 2])
+    
+    assert cache.get_or_load(1, 'stats', lambda: next(values)) == 1
+    clock.now = 31
+    assert cache.get_or_load(1, 'stats', lambda: next(values)) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    """上限を超えると最も使われていないエントリが追い出されることをテスト"""
+    cache = ReadCache(maxsize=2, ttl=60)
+    cache.get_or_load(1, 'a', lambda: 'a')
+    cache.get_or_load(2, 'b', lambda: 'b')
+    cache.get_or_load(1, 'a', lambda: 'unused')  # 1-a を最新にする
+    cache.get_or_load(3, 'c', lambda: 'c')
+    
+    assert cache.get_or_load(1, 'a', lambda: 'reloaded') == 'a'
+    assert cache.get_or_load(2, 'b', lambda: 'reloaded') == 'reloaded'
+    assert cache.stats()['evictions'] >= 1
+
+
+def test_invalidate_user_only_drops_that_user():
+    """無効化が対象ユーザーのエントリだけに効くことをテスト"""
+    cache = ReadCache(maxsize=10, ttl=60)
+    cache.get_or_load(1, 'profile', lambda: 'user1')
+    cache.get_or_load(2, 'profile', lambda: 'user2')
+    
+    cache.invalidate_user(1)
+    
+    assert cache.get_or_load(1, 'profile', lambda: 'user1-new') == 'user1-new'
+    assert cache.get_or_load(2, 'profile', lambda: 'user2-new') == 'user2'
+
+
+def test_value_loaded_during_invalidation_is_not_stored():
+    """読み込み中に無効化された古い値を保存しないことをテスト"""
+    cache = ReadCache(maxsize=10, ttl=60)
+    
+    def stale_loader():
+        cache.invalidate_user(1)  # 読み込み中に書き込みがコミットされた
+        return 'stale'
+    
+    assert cache.get_or_load(1, 'profile', stale_loader) == 'stale'
+    assert cache.get_or_load(1, 'profile', lambda: 'fresh') == 'fresh'
+
+
+def test_put_after_invalidation_is_skipped():
+    """読み込み前の世代番号を渡した put が、その後の無効化で保存されないことをテスト"""
+    cache = ReadCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.invalidate_user(1)
+    cache.put(1, 'week', 'stale', generation)
+    assert cache.get(1, 'week') is None
+    
+    cache.put(1, 'week', 'fresh', cache.generation)
+    assert cache.get(1, 'week') == 'fresh'
+
+
+def test_zero_size_disables_cache():
+    """サイズ0ではキャッシュしないことをテスト"""
+    cache = ReadCache(maxsize=0, ttl=60)
+    values = iter([1, 2])
+    
+    assert cache.get_or_load(1, 'a', lambda: next(values)) == 1
+    assert cache.get_or_load(1, 'a', lambda: next(values)) == 2
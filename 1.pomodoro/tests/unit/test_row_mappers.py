@@ -0,0 +1,80 @@
+"""Unit tests for the row factories in repositories.row_mappers."""
+
+import sqlite3
+import pytest
+from models.session import PomodoroSession
+from models.user import User
+from repositories.row_mappers import (
+    SESSION_COLUMNS, USER_COLUMNS, mapped_cursor, session_from_row, user_from_row
+)
+
+
+@pytest.fixture
+def conn():
+    """テスト用のインメモリDB"""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        '''CREATE TABLE sessions (
+               id INTEGER PRIMARY KEY, user_id INTEGER, duration_minutes INTEGER,
+               completed BOOLEAN, started_at TEXT, completed_at TEXT, xp_earned INTEGER
+           )'''
+    )
+    conn.execute(
+        '''CREATE TABLE users (
+               id INTEGER PRIMARY KEY, username TEXT, xp INTEGER, level INTEGER,
+               current_streak INTEGER, longest_streak INTEGER, last_session_date TEXT,
+               created_at TEXT, updated_at TEXT, revision INTEGER
+           )'''
+    )
+    yield conn
+    conn.close()
+
+
+def test_session_from_row(conn):
+    """セッションの行がモデルに直接変換されることをテスト"""
+    conn.execute(
+        '''INSERT INTO sessions VALUES
+           (1, 2, 25, 1, '2024-01-01T09:00:00', '2024-01-01T09:25:00', 50)'''
+    )
+    cursor = mapped_cursor(conn, session_from_row)
+    cursor.execute(f'SELECT {SESSION_COLUMNS} FROM sessions')
+    
+    session = cursor.fetchone()
+    
+    assert session == PomodoroSession(
+        id=1, user_id=2, duration_minutes=25, completed=True,
+        started_at='2024-01-01T09:00:00', completed_at='2024-01-01T09:25:00', xp_earned=50
+    )
+    assert session.completed is True
+
+
+def test_user_from_row_ignores_extra_columns(conn):
+    """モデルにない列（revision など）があっても USER_COLUMNS で変換できることをテスト"""
+    conn.execute(
+        "INSERT INTO users VALUES (1, 'alice', 150, 2, 3, 5, '2024-01-01', 'c', 'u', 7)"
+    )
+    cursor = mapped_cursor(conn, user_from_row)
+    cursor.execute(f'SELECT {USER_COLUMNS} FROM users')
+    
+    user = cursor.fetchone()
+    
+    assert isinstance(user, User)
+    assert (user.username, user.xp, user.level, user.longest_streak) == ('alice', 150, 2, 5)
+    assert user.updated_at == 'u'
+
+
+def test_mapped_cursor_does_not_change_connection_factory(conn):
+    """マッパーはカーソル単位で、接続の既定の行形式を変えないことをテスト"""
+    mapped_cursor(conn, session_from_row)
+    
+    assert conn.execute('SELECT 1 AS one').fetchone()['one'] == 1
+
+
+def test_models_are_slotted():
+    """モデルが __dict__ を持たないことをテスト"""
+    session = PomodoroSession()
+    
+    assert not hasattr(session, '__dict__')
+    with pytest.raises(AttributeError):
+        session.unknown_field = 1
@@ -0,0 +1,46 @@
+"""Unit tests for the streak rules."""
+
+from datetime import date
+from models.streak import active_streak, next_streak, streaks_from_days
+
+
+def test_next_streak():
+    """前日なら延長、同じ日は据え置き、間が空けば1に戻る"""
+    assert next_streak(0, None, "2024-03-01") == 1
+    assert next_streak(2, "2024-03-01", "2024-03-02") == 3
+    assert next_streak(2, "2024-03-01", "2024-03-01") == 2
+    assert next_streak(2, "2024-03-01", "2024-03-03") == 1
+
+
+def test_streaks_from_days():
+    """完了日の列から現在・最長のストリークを求める"""
+    days = ["2024-01-01", "2024-01-02", "2024-01-02", "2024-01-03",
+            "2024-01-10", "2024-01-11"]
+    assert streaks_from_days(days) == (2, 3, "2024-01-11")
+    assert streaks_from_days([]) == (0, 0, None)
+
+
+def test_broken_streak_is_not_current():
+    """最後の完了日が昨日より前のストリークは、今日の時点では 0 になる"""
+    assert active_streak(4, "2024-03-01", date(2024, 3, 1)) == 4
+    assert active_streak(4, "2024-03-01", date(2024, 3, 2)) == 4
+    assert active_streak(4, "2024-03-01", date(2024, 3, 3)) == 0
+    assert active_streak(0, None, date(2024, 3, 3)) == 0
+    
+    days = ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert streaks_from_days(days, date(2024, 1, 4)) == (3, 3, "2024-01-03")
+    assert streaks_from_days(days, date(2024, 1, 5)) == (0, 3, "2024-01-03")
+
+
+def test_streaks_from_days_matches_incremental_rule():
+    """一括計算が完了ごとの差分更新と同じ結果になる"""
+    days = ["2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01", "2024-03-03",
+            "2024-03-04", "2024-04-01"]
+    current = longest = 0
+    last_day = None
+    for day in days:
+        current = next_streak(current, last_day, day)
+        longest = max(longest, current)
+        last_day = day
+    
+    assert streaks_from_days(days) == (current, longest, last_day)
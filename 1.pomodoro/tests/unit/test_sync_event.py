@@ -0,0 +1,61 @@
+"""Unit tests for client-synced session events."""
+
+from datetime import date, datetime, time, timedelta
+import pytest
+from models.sync_event import SyncEvent, MAX_SYNC_EVENTS
+from models.week import local_now
+
+
+def test_start_event_uses_client_time():
+    """開始イベントの時刻をクライアントの時刻（ミリ秒）から求めることをテスト"""
+    started = datetime.combine(date.today() - timedelta(days=1), time(10))
+    event = SyncEvent.from_payload({
+        'key': 'k1', 'type': 'start', 'duration': 45, 'at': started.timestamp() * 1000
+    })
+    assert (event.occurred_at, event.duration_minutes) == (started.isoformat(), 45)
+
+
+def test_future_time_is_clamped_to_now():
+    """未来の時刻は現在時刻に丸めることをテスト"""
+    future = (datetime.now() + timedelta(days=1)).timestamp() * 1000
+    event = SyncEvent.from_payload({'key': 'k1', 'type': 'complete', 'session_id': 3, 'at': future})
+    assert datetime.fromisoformat(event.occurred_at) <= local_now()
+    assert (event.session_id, event.start_key) == (3, None)
+
+
+@pytest.mark.parametrize('payload', [
+    [],
+    {'type': 'start'},
+    {'key': 'x' * 65, 'type': 'start'},
+    {'key': 'k', 'type': 'start', 'duration': True},
+    {'key': 'k', 'type': 'start', 'duration': 24 * 60 + 1},
+    {'key': 'k', 'type': 'complete', 'session_id': '3'},
+    {'key': 'k', 'type': 'complete', 'start_key': 'a', 'at': 1e20},
+    {'key': 'k', 'type': 'start', 'at': 0},
+])
+def test_invalid_events_raise(payload):
+    """不正なイベントは ValueError になることをテスト"""
+    with pytest.raises(ValueError):
+        SyncEvent.from_payload(payload)
+
+
+def test_batch_size_is_limited():
+    """1回の同期のイベント数に上限があることをテスト"""
+    with pytest.raises(ValueError):
+        SyncEvent.parse_batch([{'key': str(i), 'type': 'start'} for i in range(MAX_SYNC_EVENTS + 1)])
+    events, rejected = SyncEvent.parse_batch([{'key': 'k', 'type': 'start'}])
+    assert len(events) == 1 and rejected == {}
+
+
+def test_invalid_events_are_rejected_individually():
+    """不正なイベントだけを位置ごとの rejected にし、他のイベントは変換することをテスト"""
+    events, rejected = SyncEvent.parse_batch([
+        {'key': 'a', 'type': 'start'},
+        {'key': 'b', 'type': 'pause'},
+        'c',
+        {'key': 'd', 'type': 'complete', 'start_key': 'a'},
+    ])
+    assert [event.key for event in events] == ['a', 'd']
+    assert sorted(rejected) == [1, 2]
+    assert rejected[1]['key'] == 'b' and rejected[1]['status'] == 'rejected'
+    assert rejected[2]['key'] is None
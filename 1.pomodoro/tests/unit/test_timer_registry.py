@@ -0,0 +1,123 @@
+"""Unit tests for the in-memory timer registry."""
+
+import threading
+from services.timer_registry import TimerRegistry
+
+
+class FakeClock:
+    """テスト用の時計"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_registry(clock, grace=5, pause_timeout=600):
+    """期限の来たタイマーを記録する登録簿を作成（監視スレッドは開始しない）"""
+    expired = []
+    registry = TimerRegistry(lambda timer, overdue: expired.append((timer.session_id, overdue)),
+                             grace, pause_timeout, clock)
+    return registry, expired
+
+
+def test_running_timer_completes_after_grace():
+    """実行中のタイマーは終了時刻 + 猶予で一度だけ完了することをテスト"""
+    clock = FakeClock()
+    registry, expired = make_registry(clock)
+    registry.register(1, 10, 25, '2024-01-01T09:00:00')
+    
+    clock.now += 25 * 60
+    assert registry.get_state(1)['remaining_seconds'] == 0
+    assert registry.reap() == []
+    
+    clock.now += 5
+    assert [timer.session_id for timer in registry.reap()] == [10]
+    assert expired == [(10, 5)]
+    assert registry.get(1) is None
+    assert registry.reap() == []
+    assert registry.stats()['auto_completed'] == 1
+
+
+def test_pause_and_resume_keep_remaining_time():
+    """一時停止中は残り時間が減らず、再開後は残り時間から数えることをテスト"""
+    clock = FakeClock()
+    registry, expired = make_registry(clock, pause_timeout=3600)
+    registry.register(1, 10, 25, '2024-01-01T09:00:00')
+    
+    clock.now += 60
+    state = registry.pause(1, 10) and registry.get_state(1)
+    assert state['state'] == 'paused'
+    assert state['remaining_seconds'] == 24 * 60
+    assert state['ends_at'] is None
+    
+    # 一時停止前の期限が来ても完了しない
+    clock.now += 25 * 60
+    registry.reap()
+    assert expired == []
+    
+    registry.resume(1, 10)
+    clock.now += 24 * 60 + 5
+    registry.reap()
+    assert expired == [(10, 5)]
+
+
+def test_paused_timer_expires_without_completing():
+    """一時停止のまま放置されたタイマーは完了させずに破棄することをテスト"""
+    clock = FakeClock()
+    registry, expired = make_registry(clock, pause_timeout=600)
+    registry.register(1, 10, 25, '2024-01-01T09:00:00')
+    registry.pause(1, 10)
+    
+    clock.now += 600
+    registry.reap()
+    assert expired == []
+    assert registry.get(1) is None
+    assert registry.stats()['expired'] == 1
+
+
+def test_replaced_and_finished_timers_are_skipped():
+    """置き換え・完了したタイマーの古い期限は読み捨てることをテスト"""
+    clock = FakeClock()
+    registry, expired = make_registry(clock)
+    registry.register(1, 10, 25, '2024-01-01T09:00:00')
+    registry.register(1, 11, 50, '2024-01-01T09:01:00')
+    registry.register(2, 12, 25, '2024-01-01T09:02:00')
+    assert registry.pause(1, 10) is None
+    assert registry.finish(2, 12)
+    assert not registry.finish(2, 12)
+    
+    clock.now += 25 * 60 + 5
+    registry.reap()
+    assert expired == []
+    clock.now += 25 * 60
+    registry.reap()
+    assert [session_id for session_id, _ in expired] == [11]
+
+
+def test_heap_stays_compact_under_pause_churn():
+    """一時停止・再開を繰り返してもヒープの大きさが登録数に比例することをテスト"""
+    clock = FakeClock()
+    registry, _ = make_registry(clock)
+    for user_id in range(100):
+        registry.register(user_id, user_id, 25, '2024-01-01T09:00:00')
+    for _ in range(50):
+        for user_id in range(100):
+            registry.pause(user_id, user_id)
+            registry.resume(user_id, user_id)
+    
+    stats = registry.stats()
+    assert stats['active'] == 100
+    assert stats['heap_size'] <= 2 * 100 + 65
+
+
+def test_monitor_thread_completes_due_timer():
+    """監視スレッドが期限の来たタイマーを完了させることをテスト"""
+    done = threading.Event()
+    registry = TimerRegistry(lambda timer, overdue: done.set(), grace=0).start()
+    try:
+        registry.register(1, 10, 0, '2024-01-01T09:00:00')
+        assert done.wait(5)
+    finally:
+        registry.close()
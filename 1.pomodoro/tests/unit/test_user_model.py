@@ -1,7 +1,9 @@
 """Unit tests for User model."""
 
+from datetime import timedelta
 import pytest
 from models.user import User
+from models.week import local_today
 
 
 def test_user_creation():
@@ -93,9 +95,39 @@ def test_update_streak_consecutive_days():
     assert user.longest_streak == 2
 
 
+def test_update_streak_resets_after_gap():
+    """1日以上空くとストリークが1からやり直しになり、最長記録は残る"""
+    user = User(current_streak=4, longest_streak=4, last_session_date="2024-01-04")
+    user.update_streak("2024-01-06")
+    
+    assert user.current_streak == 1
+    assert user.longest_streak == 4
+    assert user.last_session_date == "2024-01-06"
+
+
+def test_update_streak_across_month_and_year_boundary():
+    """月末・年末をまたいでも連続した日として数える"""
+    user = User()
+    for day in ("2023-12-31", "2024-01-01", "2024-01-31", "2024-02-01", "2024-02-29"):
+        user.update_streak(day)
+    
+    assert user.current_streak == 1
+    assert user.longest_streak == 2
+
+
+def test_update_streak_ignores_earlier_day():
+    """遅れて届いた過去の日付ではストリークも最後の完了日も変わらない"""
+    user = User(current_streak=3, longest_streak=3, last_session_date="2024-01-03")
+    user.update_streak("2024-01-01")
+    
+    assert user.current_streak == 3
+    assert user.last_session_date == "2024-01-03"
+
+
 def test_to_dict():
     """辞書への変換をテスト"""
-    user = User(id=1, username="test", xp=150, level=2, current_streak=5)
+    user = User(id=1, username="test", xp=150, level=2, current_streak=5,
+                last_session_date=local_today().isoformat())
     user_dict = user.to_dict()
     
     assert user_dict['id'] == 1
@@ -105,3 +137,14 @@ def test_to_dict():
     assert user_dict['current_streak'] == 5
     assert 'xp_for_next_level' in user_dict
     assert 'xp_progress_percentage' in user_dict
+
+
+def test_to_dict_reports_broken_streak_as_zero():
+    """最後の完了日が昨日より前なら、現在のストリークを 0 として返すことをテスト"""
+    yesterday = (local_today() - timedelta(days=1)).isoformat()
+    user = User(current_streak=5, longest_streak=5, last_session_date=yesterday)
+    assert user.to_dict()['current_streak'] == 5
+    
+    user.last_session_date = (local_today() - timedelta(days=2)).isoformat()
+    assert user.to_dict()['current_streak'] == 0
+    assert (user.current_streak, user.to_dict()['longest_streak']) == (5, 5)
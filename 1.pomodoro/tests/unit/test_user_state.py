@@ -0,0 +1,76 @@
+"""Unit tests for the user state folded from session events."""
+
+from models.user_state import UserState
+
+
+def completions(days: int, per_day: int = 1) -> list:
+    """1日 per_day 回ずつ days 日分の完了イベント (started_at, occurred_at, xp) を作成"""
+    events = []
+    for day in range(1, days + 1):
+        for i in range(per_day):
+            started_at = f'2024-01-{day:02d}T{9 + i:02d}:00:00'
+            events.append((started_at, started_at[:11] + f'{9 + i:02d}:25:00', 50))
+    return events
+
+
+def fold(events: list, state: UserState = None) -> UserState:
+    """イベント列を状態に適用"""
+    state = state or UserState.empty(1)
+    for started_at, occurred_at, xp in events:
+        state.apply_completed(started_at, occurred_at, xp)
+    return state
+
+
+def test_apply_completed_updates_xp_level_and_streak():
+    """XP・レベル・ストリークがセッション完了時と同じ規則で更新されることをテスト"""
+    state = fold(completions(3, per_day=2))
+    
+    assert state.completed == 6
+    assert state.user.xp == 300
+    assert state.user.level == 4
+    assert state.user.current_streak == 3
+    assert state.user.last_session_date == '2024-01-03'
+
+
+def test_badges_record_the_event_that_met_the_criteria():
+    """条件を満たした完了イベントの時刻でバッジが記録されることをテスト"""
+    state = fold(completions(5, per_day=3))
+    
+    assert state.badges['streak_3'] == '2024-01-03T09:25:00'
+    assert state.badges['weekly_10'] == '2024-01-04T09:25:00'
+    assert 'weekly_20' not in state.badges
+    assert 'total_50' not in state.badges
+
+
+def test_weekly_count_uses_last_seven_days():
+    """週間完了数が直近7日間の開始時刻で数えられることをテスト"""
+    # 1日1回では7日間で最大7回のため、今週10回のバッジは取得できない
+    state = fold(completions(20))
+    
+    assert 'weekly_10' not in state.badges
+    assert len(state.recent) <= 31
+
+
+def test_weekly_count_starts_at_midnight_six_days_before():
+    """7日前の 23:59 に開始したセッションは週間完了数に含まれないことをテスト"""
+    events = [('2024-01-01T23:59:00', '2024-01-02T00:24:00', 50)]
+    events += [(f'2024-01-08T{9 + i:02d}:00:00', f'2024-01-08T{9 + i:02d}:25:00', 50) for i in range(9)]
+    state = fold(events)
+    
+    assert 'weekly_10' not in state.badges
+    
+    state.apply_completed('2024-01-08T20:00:00', '2024-01-08T20:25:00', 50)
+    assert state.badges['weekly_10'] == '2024-01-08T20:25:00'
+
+
+def test_snapshot_round_trip_continues_identically():
+    """スナップショットから再開しても先頭から畳み込んだ状態と一致することをテスト"""
+    events = completions(20, per_day=3)
+    expected = fold(events)
+    
+    partial = fold(events[:25])
+    restored = UserState.from_snapshot(1, 25, partial.to_snapshot())
+    resumed = fold(events[25:], restored)
+    
+    assert resumed.to_snapshot() == expected.to_snapshot()
+    assert resumed.seq == 25
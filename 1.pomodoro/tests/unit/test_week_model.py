@@ -0,0 +1,71 @@
+"""Unit tests for the ISO week model and the application clock."""
+
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+import pytest
+from models import week as week_module
+from models.week import IsoWeek, configure_timezone, local_now
+
+
+@pytest.fixture
+def restore_timezone():
+    """テスト後にタイムゾーン設定を元に戻す"""
+    original = week_module.get_timezone()
+    yield
+    week_module._timezone = original
+
+
+def test_week_of_date():
+    """日付が属する週のテスト（月曜開始）"""
+    week = IsoWeek.of(date(2024, 1, 17))
+    
+    assert str(week) == '2024-W03'
+    assert week.start == date(2024, 1, 15)
+    assert week.end == date(2024, 1, 21)
+    assert IsoWeek.of(date(2024, 1, 21)) == week
+    assert IsoWeek.of(date(2024, 1, 22)) == week.shift(1)
+
+
+def test_week_at_year_boundaries():
+    """年をまたぐ週のテスト（ISO 8601 の年）"""
+    assert str(IsoWeek.of(date(2024, 12, 30))) == '2025-W01'
+    assert str(IsoWeek.of(date(2021, 1, 3))) == '2020-W53'
+    assert str(IsoWeek.parse('2025-W01').previous()) == '2024-W52'
+    assert str(IsoWeek.parse('2020-W53').shift(1)) == '2021-W01'
+
+
+def test_parse_week():
+    """週の文字列表現のテスト"""
+    assert IsoWeek.parse('2024-W03') == IsoWeek(2024, 3)
+    
+    with pytest.raises(ValueError):
+        IsoWeek.parse('2024-03')
+    with pytest.raises(ValueError):
+        IsoWeek.parse('2024-W54')
+
+
+def test_week_ordering_and_closed():
+    """週の比較と終了判定のテスト"""
+    week = IsoWeek.parse('2024-W03')
+    
+    assert week.previous() < week < week.shift(1)
+    assert week.is_closed(date(2024, 1, 22))
+    assert not week.is_closed(date(2024, 1, 21))
+
+
+def test_local_now_uses_configured_timezone(restore_timezone):
+    """設定したタイムゾーンの現在時刻を返すことをテスト"""
+    configure_timezone('Pacific/Kiritimati')
+    expected = datetime.now(ZoneInfo('Pacific/Kiritimati')).replace(tzinfo=None)
+    
+    assert local_now().tzinfo is None
+    assert abs(local_now() - expected) < timedelta(seconds=5)
+    
+    configure_timezone(None)
+    assert abs(local_now() - datetime.now()) < timedelta(seconds=5)
+
+
+def test_period_start_is_aligned_to_days():
+    """直近の期間の開始時刻が今日を含む日単位になることをテスト"""
+    assert week_module.period_start(7, date(2024, 1, 17)) == datetime(2024, 1, 11)
+    assert week_module.period_start(1, date(2024, 1, 17)) == datetime(2024, 1, 17)